@@ -1,9 +1,10 @@
+# Time every import below; the report is served at /api/diagnostics/startup
+import startup_profiler
+startup_profiler.install()
+
 # Legacy search_engine removed from app imports; unified service is used instead
 from schemas.discord import DiscordWebhook
 from services.auth_service import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from discord_bot import SecondBrainCog
-from obsidian_sync import ObsidianSync
-from file_processor import FileProcessor
 import sqlite3
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
@@ -48,12 +49,19 @@ from services.audio_queue import audio_queue
 from services.auth_service import AuthService, Token, TokenData, User, UserInDB, oauth2_scheme, auth_scheme, verify_webhook_token, router as auth_router, init_auth_router
 from services.webhook_service import WebhookService
 from services.upload_service import UploadService
+from services.processing_status import resolve_status
+from services.app_schema import ensure_app_schema
+from services.note_index import NoteIndexService
+from services.advanced_search_parser import AdvancedSearchParser, DateRange, SearchField, SearchOperator, SearchTerm
+from services.search_planner import SearchPlanner
+from services.router_registry import RouterRegistry, LazyRouterMiddleware
+from services.background_supervisor import BackgroundServiceSupervisor
 from services.analytics_service import AnalyticsService
 from services.notification_service import get_notification_service, notify_processing_started, notify_processing_completed, notify_processing_failed, notify_note_created
 from services.notification_router import router as notification_router, init_notification_router
 from services.websocket_manager import get_connection_manager
 from services.realtime_events import notify_note_update, schedule_note_update
-from services.web_ingestion_service import WebIngestionService
+from db_writer import web_load
 
 try:
     from realtime_status import create_status_endpoint
@@ -67,7 +75,6 @@ try:
 except ImportError:
     process_note_with_status = None  # type: ignore
 from markupsafe import Markup, escape
-from bs4 import BeautifulSoup
 import re
 from config import settings
 from passlib.context import CryptContext
@@ -144,14 +151,37 @@ async def _startup_tasks():
     # Ensure directories exist
     _ensure_base_directories()
 
+    # Schema first: background workers and feature routers expect it
+    await asyncio.to_thread(init_db)
+    with startup_profiler.phase("eager_routers"):
+        router_registry.load_eager()
+
     # Start background workers
     await _start_worker()
+    await _start_note_indexer()
+    await _start_search_history()
+    await _start_dedup_index_backfill()
     await _start_automation()
     await _start_audio_worker()
+    await _start_web_ingestion_worker()
+
+    # Realtime events from other threads/worker processes reach this worker's SSE and WebSocket clients
+    get_connection_manager().attach_event_bus()
+    if REALTIME_AVAILABLE:
+        from realtime_status import status_manager
+        status_manager.attach_event_bus()
+
+    # Deliver batched notifications over WebSocket
+    get_connection_manager().attach_notification_bus()
+
+    # Finish upload extractions interrupted by a restart
+    asyncio.create_task(asyncio.to_thread(upload_service.resume_pending_extractions))
 
     # Initialize memory system
     await _init_memory_system()
 
+    startup_profiler.finish()
+
 app = FastAPI(lifespan=lifespan)
 
 # Initialize rate limiter
@@ -176,6 +206,15 @@ app.add_middleware(SlowAPIMiddleware)
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
+# Track in-flight requests so background jobs can back off under load
+@app.middleware("http")
+async def track_web_load(request: Request, call_next):
+    web_load.request_started()
+    try:
+        return await call_next(request)
+    finally:
+        web_load.request_finished()
+
 templates = Jinja2Templates(directory=str(settings.base_dir / "templates"))
 app.mount("/static", StaticFiles(directory=str(settings.base_dir / "static")), name="static")
 
@@ -244,7 +283,11 @@ def get_conn():
 auth_service = AuthService(get_conn)
 webhook_service = WebhookService(get_conn, auth_service)
 upload_service = UploadService(get_conn, auth_service, audio_queue)
+# Background loops run only in the worker(s) holding their lease (see /health)
+background_supervisor = BackgroundServiceSupervisor(get_conn, lease_seconds=settings.background_lease_seconds)
 analytics_service = AnalyticsService(get_conn)
+# The one full-text index; note writes queue notes for it via triggers
+note_index = NoteIndexService(get_conn)
 
 # Access auth constants from service
 #ACCESS_TOKEN_EXPIRE_MINUTES = auth_service.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -391,297 +434,93 @@ def get_current_user_from_discord_header(authorization: str = Header(None)) -> U
     return auth_service.get_current_user_from_discord(authorization)
 
 def init_db():
-    conn = get_conn()
-    c = conn.cursor()
-    
-    # Users table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            hashed_password TEXT NOT NULL
-        )
-    ''')
-    
-    # Notes table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            summary TEXT,
-            tags TEXT,
-            actions TEXT,
-            type TEXT,
-            timestamp TEXT,
-            audio_filename TEXT,
-            content TEXT,
-            status TEXT DEFAULT 'complete',
-            user_id INTEGER,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # FTS table
-    c.execute('''
-        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
-            title, summary, tags, actions, content, content='notes', content_rowid='id'
-        )
-    ''')
-    
-    # Enhanced FTS5 table
-    c.execute('''
-        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts5 USING fts5(
-            title, content, summary, tags, actions,
-            content='notes', content_rowid='id',
-            tokenize='porter unicode61'
-        )
-    ''')
-    
-    # Discord users table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS discord_users (
-            discord_id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            linked_at TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # Reminders table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            note_id INTEGER,
-            user_id INTEGER,
-            due_date TEXT,
-            completed BOOLEAN DEFAULT FALSE,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(note_id) REFERENCES notes(id),
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # Search analytics
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS search_analytics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            query TEXT,
-            results_count INTEGER,
-            clicked_result_id INTEGER,
-            search_type TEXT,
-            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sync_status (
-            id INTEGER PRIMARY KEY,
-            last_sync TEXT
-        )
-    ''')
-    
-    # Ensure columns exist (compatibility with legacy schema)
-    cols = [row[1] for row in c.execute("PRAGMA table_info(notes)")]
-    if 'status' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN status TEXT DEFAULT 'complete'")
-        c.execute("UPDATE notes SET status='complete' WHERE status IS NULL")
-    if 'user_id' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN user_id INTEGER")
-    # Legacy content fields expected by various services/routes
-    if 'summary' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN summary TEXT")
-    if 'content' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN content TEXT")
-    if 'timestamp' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN timestamp TEXT")
-    if 'type' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN type TEXT")
-    if 'audio_filename' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN audio_filename TEXT")
-    if 'actions' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN actions TEXT")
-    # New file-related columns used by capture pipeline
-    if 'file_filename' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN file_filename TEXT")
-    if 'file_type' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN file_type TEXT")
-    if 'file_mime_type' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN file_mime_type TEXT")
-    if 'file_size' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN file_size INTEGER")
-    if 'extracted_text' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN extracted_text TEXT")
-    if 'file_metadata' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN file_metadata TEXT")
-    # Web ingestion metadata
-    if 'source_url' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN source_url TEXT")
-    if 'web_metadata' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN web_metadata TEXT")
-    if 'screenshot_path' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN screenshot_path TEXT")
-    if 'content_hash' not in cols:
-        c.execute("ALTER TABLE notes ADD COLUMN content_hash TEXT")
-
-    # One-time backfill: align legacy fields to core schema
-    try:
-        c.execute("UPDATE notes SET body=COALESCE(content, '') WHERE (body IS NULL OR body='') AND content IS NOT NULL")
-    except Exception:
-        pass
-    try:
-        c.execute("UPDATE notes SET timestamp = COALESCE(timestamp, created_at) WHERE timestamp IS NULL")
-    except Exception:
-        pass
+    """Apply the app schema once per version (see services/app_schema.py); run at startup"""
+    with startup_profiler.phase("app_schema"):
+        ensure_app_schema(get_conn)
 
-    # Update FTS if needed: ensure FTS matches core schema: (title, body, tags)
-    try:
-        fts_cols = [row[1] for row in c.execute("PRAGMA table_info(notes_fts)")]
-    except sqlite3.OperationalError:
-        fts_cols = []
-    # Drop/recreate FTS if columns don't match expected core set
-    expected_fts = {"title", "body", "tags"}
-    if set(fts_cols) != expected_fts:
-        c.execute("DROP TABLE IF EXISTS notes_fts")
-        c.execute('''
-            CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
-              title, body, tags,
-              content='notes', content_rowid='id'
-            )
-        ''')
-        # Populate FTS from notes; prefer body, fall back to content
-        rows = c.execute(
-            "SELECT id, title, CASE WHEN COALESCE(body,'') <> '' THEN body ELSE COALESCE(content,'') END AS body, tags FROM notes"
-        ).fetchall()
-        if rows:
-            c.executemany(
-                "INSERT INTO notes_fts(rowid, title, body, tags) VALUES (?, ?, ?, ?)",
-                rows,
-            )
-
-    # Ensure notes_fts5 population only if table exists (legacy advanced search)
-    try:
-        exists_fts5 = c.execute(
-            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='notes_fts5'"
-        ).fetchone()
-        if exists_fts5:
-            count_fts5 = c.execute("SELECT count(*) FROM notes_fts5").fetchone()[0]
-            if count_fts5 == 0:
-                rows5 = c.execute("SELECT id, title, content, summary, tags, actions FROM notes").fetchall()
-                if rows5:
-                    c.executemany(
-                        "INSERT INTO notes_fts5(rowid, title, content, summary, tags, actions) VALUES (?, ?, ?, ?, ?, ?)",
-                        rows5,
-                    )
-    except sqlite3.OperationalError:
-        pass
-    
-    conn.commit()
-    conn.close()
-
-init_db()
-
-# --- Include Search Router ---
+# --- Core routers: needed by the dashboard and login, so mounted at import ---
 from services.search_router import router as search_router, init_search_router
 init_search_router(get_conn, get_current_user, get_current_user_silent)  # Initialize with functions
 app.include_router(search_router)
 
-# --- Include Auth Router ---
 init_auth_router(get_conn, render_page, set_flash, auth_service)
 app.include_router(auth_router)
 
-# --- Include Smart Automation Router ---
-from services.smart_automation_router import router as automation_router, init_smart_automation_router
-init_smart_automation_router(get_conn)
-app.include_router(automation_router)
-
-# --- Include Web Ingestion Router ---
-from services.web_ingestion_router import router as web_router, init_web_ingestion_router
-from services.workflow_engine import WorkflowEngine
-workflow_engine = WorkflowEngine(get_conn)
-init_web_ingestion_router(get_conn, workflow_engine, get_current_user)
-app.include_router(web_router)
-
-# --- Include Apple Shortcuts Router ---
-from services.apple_shortcuts_router import router as shortcuts_router, init_apple_shortcuts_router
-init_apple_shortcuts_router(get_conn, get_current_user)
-app.include_router(shortcuts_router)
-
-# --- Smart Templates Router archived ---
-# init_smart_templates_router(get_conn, get_current_user)
-# app.include_router(templates_router)
-
-# --- Include Bulk Operations Router ---
-from services.bulk_operations_router import router as bulk_router, init_bulk_operations_router
-init_bulk_operations_router(get_conn, get_current_user)
-app.include_router(bulk_router)
-
-# --- Include GitHub Integration Router ---
-from services.github_integration_router import router as github_router, init_github_integration_router
-init_github_integration_router(get_conn, get_current_user)
-app.include_router(github_router)
-
-# --- Include ArXiv Integration Router ---
-from services.arxiv_integration_router import router as arxiv_router, init_arxiv_integration_router
-init_arxiv_integration_router(get_conn, get_current_user)
-app.include_router(arxiv_router)
-
-# --- Include Mobile Capture Router ---
-from services.mobile_capture_router import router as mobile_router, init_mobile_capture_router
-init_mobile_capture_router(get_conn, get_current_user)
-app.include_router(mobile_router)
-
-# --- Include Unified Search Router ---
-from services.search_router import router as search_router, init_search_router
-init_search_router(get_conn, get_current_user, get_current_user_silent)
-app.include_router(search_router)
-
-# --- Include Diagnostics Router ---
-from services.diagnostics_router import router as diagnostics_router, init_diagnostics_router
-init_diagnostics_router(get_conn, get_current_user)
-app.include_router(diagnostics_router)
-
-# --- Include Search Benchmarking Router ---
-# ---- Advanced Capture Router ----
-from services.advanced_capture_router import router as advanced_capture_router, init_advanced_capture_router
-init_advanced_capture_router(get_conn)
-app.include_router(advanced_capture_router)
-
-# ---- Enhanced Apple Shortcuts Router ----
-from services.enhanced_apple_shortcuts_router import router as enhanced_shortcuts_router, init_enhanced_apple_shortcuts_router
-init_enhanced_apple_shortcuts_router(get_conn)
-app.include_router(enhanced_shortcuts_router)
-
-# ---- Unified Capture Router ----
-from services.unified_capture_router import router as unified_capture_router, init_unified_capture_router
-init_unified_capture_router(get_conn)
-app.include_router(unified_capture_router)
-
-# ---- Enhanced Discord Router ----
-from services.enhanced_discord_router import router as enhanced_discord_router, init_enhanced_discord_router
-init_enhanced_discord_router(get_conn)
-app.include_router(enhanced_discord_router)
-
-# ---- Notification Router ----
 init_notification_router(get_current_user)
 app.include_router(notification_router)
 
-# ---- Memory-Augmented Chat Router ----
-from api.routes_chat import router as chat_router
-app.include_router(chat_router)
+# --- Feature routers: imported on the first request under their prefix ---
+# Set LAZY_ROUTERS=false, or list names in EAGER_ROUTERS, to load them at startup instead
+router_registry = RouterRegistry(app, lazy=settings.lazy_routers, eager=settings.eager_routers.split(","))
+app.add_middleware(LazyRouterMiddleware, registry=router_registry)
 
-# ---- Build Log Router ----
-from services.build_log_router import router as build_log_router, init_build_log_router
-init_build_log_router(get_conn)
-app.include_router(build_log_router)
+_workflow_engine = None
 
-# ---- Theme Router ----
-from services.theme_router import router as theme_router
-app.include_router(theme_router)
+def get_workflow_engine():
+    """Shared Smart Automation engine, created on first use"""
+    global _workflow_engine
+    if _workflow_engine is None:
+        from services.workflow_engine import WorkflowEngine
+        _workflow_engine = WorkflowEngine(get_conn)
+    return _workflow_engine
 
-# ---- Advanced Search Router ----
-from services.advanced_search_router import router as advanced_search_router
-app.include_router(advanced_search_router)
+router_registry.register(
+    "smart_automation", "services.smart_automation_router", ["/api/automation"],
+    setup=lambda m: m.init_smart_automation_router(get_conn),
+)
+router_registry.register(
+    "web_ingestion", "services.web_ingestion_router", ["/api/web"],
+    setup=lambda m: m.init_web_ingestion_router(get_conn, get_workflow_engine(), get_current_user),
+)
+router_registry.register(
+    "apple_shortcuts", "services.apple_shortcuts_router", ["/api/shortcuts"],
+    setup=lambda m: m.init_apple_shortcuts_router(get_conn, get_current_user),
+)
+# Smart Templates router archived
+router_registry.register(
+    "bulk_operations", "services.bulk_operations_router", ["/api/bulk"],
+    setup=lambda m: m.init_bulk_operations_router(get_conn, get_current_user),
+)
+router_registry.register(
+    "github", "services.github_integration_router", ["/api/github"],
+    setup=lambda m: m.init_github_integration_router(get_conn, get_current_user),
+)
+router_registry.register(
+    "arxiv", "services.arxiv_integration_router", ["/api/arxiv"],
+    setup=lambda m: m.init_arxiv_integration_router(get_conn, get_current_user),
+)
+router_registry.register(
+    "mobile_capture", "services.mobile_capture_router", ["/api/mobile"],
+    setup=lambda m: m.init_mobile_capture_router(get_conn, get_current_user),
+)
+router_registry.register(
+    "advanced_capture", "services.advanced_capture_router", ["/api/capture/advanced"],
+    setup=lambda m: m.init_advanced_capture_router(get_conn),
+)
+router_registry.register(
+    "enhanced_apple_shortcuts", "services.enhanced_apple_shortcuts_router", ["/api/shortcuts"],
+    setup=lambda m: m.init_enhanced_apple_shortcuts_router(get_conn),
+)
+router_registry.register(
+    "unified_capture", "services.unified_capture_router", ["/api/unified-capture"],
+    setup=lambda m: m.init_unified_capture_router(get_conn),
+)
+router_registry.register(
+    "enhanced_discord", "services.enhanced_discord_router", ["/api/discord"],
+    setup=lambda m: m.init_enhanced_discord_router(get_conn),
+)
+router_registry.register("chat", "api.routes_chat", ["/api/chat"])
+router_registry.register(
+    "build_log", "services.build_log_router", ["/build-logs"],
+    setup=lambda m: m.init_build_log_router(get_conn),
+)
+router_registry.register("theme", "services.theme_router", ["/api/themes"])
+router_registry.register("advanced_search", "services.advanced_search_router", ["/api/search/advanced"])
+
+# --- Diagnostics Router (also reports startup import timings and router loads) ---
+from services.diagnostics_router import router as diagnostics_router, init_diagnostics_router
+init_diagnostics_router(get_conn, get_current_user, router_registry)
+app.include_router(diagnostics_router)
 
 # ---- Demo Data Router ----
 
@@ -758,7 +597,40 @@ async def _start_worker():
     if getattr(app.state, "job_worker_started", False):
         return
     app.state.job_worker_started = True
-    asyncio.create_task(job_worker())
+    background_supervisor.register(
+        "job_worker", job_worker, replicas=settings.background_job_worker_replicas
+    )
+
+async def _start_note_indexer():
+    """Drain note_index_queue in the background (searches also drain it before querying)"""
+    if getattr(app.state, "note_indexer_started", False):
+        return
+    app.state.note_indexer_started = True
+    background_supervisor.register("note_indexer", note_index.run)
+
+async def _start_search_history():
+    """Flush buffered search history in every worker; trim old history in one"""
+    if getattr(app.state, "search_history_started", False):
+        return
+    app.state.search_history_started = True
+    from services.search_history_service import run_history_flusher, run_history_retention
+    # Each worker buffers its own searches, so the flusher isn't behind a lease
+    app.state.search_history_flusher = asyncio.create_task(
+        run_history_flusher(settings.search_history_flush_interval)
+    )
+    background_supervisor.register("search_history_retention", run_history_retention)
+
+async def _start_dedup_index_backfill():
+    """Keep the near-duplicate index current so duplicate checks only read it"""
+    if getattr(app.state, "dedup_backfill_started", False):
+        return
+    app.state.dedup_backfill_started = True
+    from services.content_deduplication_service import run_index_backfill
+
+    async def run_dedup_index_backfill():
+        await run_index_backfill(get_conn, settings.dedup_index_backfill_interval)
+
+    background_supervisor.register("dedup_index_backfill", run_dedup_index_backfill)
 
 async def _start_automation():
     """Start automated relationship discovery system"""
@@ -766,16 +638,24 @@ async def _start_automation():
         return
     app.state.automation_started = True
 
-    # TEMPORARILY DISABLED to resolve database locking issues
-    # try:
-    #     from automated_relationships import get_automation_engine
-    #     automation_engine = get_automation_engine(str(settings.db_path))
-    #     app.state.automation_engine = automation_engine
-    #     asyncio.create_task(automation_engine.start_automation())
-    #     print("🤖 Automated relationship discovery started")
-    # except ImportError:
-    #     print("⚠️  Automated relationships not available")
-    print("⚠️  Automated relationship discovery temporarily disabled to resolve database locking")
+    if not settings.relationship_automation_enabled:
+        print("⚠️  Automated relationship discovery disabled (RELATIONSHIP_AUTOMATION_ENABLED=false)")
+        return
+
+    # Writes go through the shared batched writer and the loop backs off
+    # while web requests are in flight, so this no longer fights captures
+    try:
+        from automated_relationships import get_automation_engine
+        automation_engine = get_automation_engine(str(settings.db_path))
+        app.state.automation_engine = automation_engine
+        background_supervisor.register(
+            "relationship_automation",
+            automation_engine.start_automation,
+            stop=automation_engine.stop_automation,
+        )
+        print("🤖 Automated relationship discovery registered")
+    except ImportError:
+        print("⚠️  Automated relationships not available")
 
 async def _start_audio_worker():
     """Start automated audio processing worker"""
@@ -798,12 +678,47 @@ async def _start_audio_worker():
                 # Wait longer on errors to avoid spam
                 await asyncio.sleep(30)
 
-    asyncio.create_task(audio_processing_worker())
-    print("🎵 Audio processing worker started (checking every 10 seconds)")
+    background_supervisor.register("audio_worker", audio_processing_worker)
+    print("🎵 Audio processing worker registered (checking every 10 seconds)")
     queue_stats = audio_queue.get_queue_status()
     queued_count = queue_stats.get('status_counts', {}).get('queued', 0)
     print(f"📊 Found {queued_count} items in audio processing queue")
 
+async def _start_web_ingestion_worker():
+    """Run queued web ingestion jobs in-process when using the local SQLite queue"""
+    if getattr(app.state, "web_ingestion_worker_started", False):
+        return
+    app.state.web_ingestion_worker_started = True
+
+    if not settings.web_ingestion_inprocess_worker:
+        return
+
+    from services.web_ingestion_service import WebIngestionService, WebIngestionWorker
+    service = WebIngestionService(get_conn)
+    # With Redis, scripts/web_ingestion_worker.py is expected to run separately
+    if service.job_queue.backend != "sqlite":
+        return
+
+    async def run_web_ingestion_worker():
+        # A stopped worker can't be restarted, so each lease gets a fresh one
+        worker = WebIngestionWorker(
+            service,
+            concurrency=settings.web_ingestion_worker_concurrency,
+            per_domain_limit=settings.web_ingestion_per_domain_limit,
+        )
+        app.state.web_ingestion_worker = worker
+        await worker.run()
+
+    async def stop_web_ingestion_worker():
+        worker = getattr(app.state, "web_ingestion_worker", None)
+        if worker is not None:
+            await worker.stop()
+
+    background_supervisor.register(
+        "web_ingestion_worker", run_web_ingestion_worker, stop=stop_web_ingestion_worker
+    )
+    print(f"🌐 Web ingestion worker registered (local queue, concurrency {settings.web_ingestion_worker_concurrency})")
+
 async def _init_memory_system():
     """Initialize memory augmentation system on startup"""
     if getattr(app.state, "memory_system_started", False):
@@ -844,6 +759,46 @@ async def _init_memory_system():
 
 async def _shutdown_tasks():
     """Shutdown tasks for graceful cleanup"""
+    # Stops the loops this worker leads and hands their leases to another worker
+    await background_supervisor.stop()
+    flusher = getattr(app.state, "search_history_flusher", None)
+    if flusher is not None:
+        flusher.cancel()
+    try:
+        from services.search_history_service import flush_history_recorders
+        await asyncio.to_thread(flush_history_recorders)
+    except Exception as e:
+        print(f"⚠️  Error flushing search history: {e}")
+    try:
+        from db_writer import stop_batched_writers
+        await asyncio.to_thread(stop_batched_writers)
+    except Exception as e:
+        print(f"⚠️  Error flushing batched writers: {e}")
+
+    try:
+        from services.browser_pool import shutdown_browser_pool
+        await shutdown_browser_pool()
+    except Exception as e:
+        print(f"⚠️  Error closing browser pool: {e}")
+
+    try:
+        from services.notification_service import shutdown_notification_service
+        shutdown_notification_service()
+    except Exception as e:
+        print(f"⚠️  Error flushing notifications: {e}")
+
+    try:
+        from services.event_bus import shutdown_event_bus
+        shutdown_event_bus()
+    except Exception as e:
+        print(f"⚠️  Error stopping event bus: {e}")
+
+    try:
+        from document_extraction import shutdown_document_extractor
+        shutdown_document_extractor()
+    except Exception as e:
+        print(f"⚠️  Error stopping document extraction workers: {e}")
+
     try:
         from services.memory_consolidation_service import shutdown_consolidation_queue
         shutdown_consolidation_queue()
@@ -992,6 +947,17 @@ def health():
             health_data["status"] = "critical"
             health_data["issues"].extend(resources_health.get("warnings", []))
         
+        # Background services: which worker leads each loop
+        background_health = background_supervisor.status()
+        health_data["background_services"] = background_health
+        for service_name, service_data in background_health["services"].items():
+            if service_data["active_holders"] == 0:
+                health_data["status"] = "degraded"
+                health_data["issues"].append(f"Background service {service_name} has no leader")
+            elif service_data["leader"] and service_data["state"] == "failed":
+                health_data["status"] = "degraded"
+                health_data["issues"].append(f"Background service {service_name} failed: {service_data['last_error']}")
+        
         # Processing queue health
         queue_health = _check_queue_health()
         health_data["processing_queue"] = queue_health
@@ -1052,11 +1018,11 @@ def _check_database_health():
         # Check FTS5 index if notes table exists
         if "notes" in table_names:
             try:
-                fts_tables = c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'notes_fts%'").fetchall()
+                fts_tables = c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name = 'note_chunks_fts'").fetchall()
                 if fts_tables:
                     health_info["fts_index_status"] = "present"
                     # Test FTS search functionality
-                    c.execute("SELECT COUNT(*) FROM notes_fts WHERE notes_fts MATCH 'test' LIMIT 1")
+                    c.execute("SELECT COUNT(*) FROM note_chunks_fts WHERE note_chunks_fts MATCH 'test' LIMIT 1")
                     health_info["fts_index_status"] = "functional"
                 else:
                     health_info["fts_index_status"] = "missing"
@@ -1859,7 +1825,7 @@ async def create_calendar_event(
 # Enhanced Search - MOVED to services/search_router.py
 # Hybrid Search - MOVED to services/search_router.py
 # Search Suggestions - MOVED to services/search_router.py
-# Helper functions _fuzzy_match and _extract_phrases - MOVED to services/search_router.py
+# Suggestion helpers - REPLACED by services/suggestion_index.py
 # Search Enhancement Endpoint - MOVED to services/search_router.py
 @app.get("/api/analytics")
 async def get_analytics(current_user: User = Depends(get_current_user)):
@@ -2183,7 +2149,12 @@ async def get_note_processing_status(
     c = conn.cursor()
     
     note = c.execute(
-        "SELECT status, title, summary FROM notes WHERE id = ? AND user_id = ?",
+        """
+        SELECT n.status, n.title, n.summary, ps.stage, ps.pct, ps.message, ps.updated_at
+        FROM notes n
+        LEFT JOIN note_processing_status ps ON ps.note_id = n.id
+        WHERE n.id = ? AND n.user_id = ?
+        """,
         (note_id, current_user.id)
     ).fetchone()
     
@@ -2192,11 +2163,17 @@ async def get_note_processing_status(
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     
+    status, title, summary, live_stage, live_pct, live_message, live_updated_at = note
+    live = {"stage": live_stage, "pct": live_pct} if live_stage is not None else None
+    stage, progress = resolve_status(status, live)
     return {
-        "status": note["status"],
-        "title": note["title"],
-        "summary": note["summary"],
-        "progress": 100 if note["status"] == "complete" else 50
+        "status": status,
+        "stage": stage,
+        "title": title,
+        "summary": summary,
+        "progress": progress,
+        "message": live_message,
+        "updated_at": live_updated_at
     }
 
 # Batch operations
@@ -2218,7 +2195,6 @@ async def batch_operations(
                     "DELETE FROM notes WHERE id = ? AND user_id = ?",
                     (op["note_id"], current_user.id)
                 )
-                c.execute("DELETE FROM notes_fts WHERE rowid = ?", (op["note_id"],))
                 results.append({"note_id": op["note_id"], "status": "deleted"})
             
             elif op["action"] == "tag":
@@ -2553,6 +2529,7 @@ def snapshot_artifact_inline(request: Request, note_id: int, artifact_id: str):
     except Exception:
         raise HTTPException(status_code=500, detail="Unable to read artifact content")
 
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_content, "html.parser")
     for tag in soup(["script", "style", "iframe", "object", "embed"]):
         tag.decompose()
@@ -2592,6 +2569,7 @@ def web_ingestion_jobs(request: Request, limit: int = 50):
     except Exception:
         limit = 50
 
+    from services.web_ingestion_service import WebIngestionService
     job_service = WebIngestionService(get_conn)
     jobs = job_service.list_jobs(current_user.id, limit=limit)
 
@@ -2646,14 +2624,7 @@ def edit_post(
         "UPDATE notes SET body = ?, content = ?, tags = ?, updated_at = datetime('now') WHERE id = ? AND user_id = ?",
         (content, content, tags, note_id, current_user.id),
     )
-    row = c.execute(
-        "SELECT title, summary, actions FROM notes WHERE id = ? AND user_id = ?",
-        (note_id, current_user.id),
-    ).fetchone()
-    if row:
-        title, summary, actions = row
-        c.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
-        # FTS triggers keep notes_fts in sync; no manual insert needed
+    # The note_index triggers queue the note for re-indexing
     conn.commit()
     conn.close()
     if "application/json" in request.headers.get("accept", ""):
@@ -2690,7 +2661,6 @@ def delete_note(
         "DELETE FROM notes WHERE id = ? AND user_id = ?",
         (note_id, current_user.id),
     )
-    c.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
     conn.commit()
     conn.close()
     if "application/json" in request.headers.get("accept", ""):
@@ -2951,8 +2921,9 @@ async def capture(
                     out.write(chunk)
 
             # Process saved file
+            from file_processor import FileProcessor
             processor = FileProcessor()
-            result = processor.process_saved_file(tmp_path, file.filename)
+            result = await asyncio.to_thread(processor.process_saved_file, tmp_path, file.filename)
             
             if not result['success']:
                 error_msg = f"File processing failed: {result['error']}"
@@ -3058,7 +3029,7 @@ async def capture(
             }
             
             # Trigger content created workflow (which includes URL detection)
-            await workflow_engine.trigger_workflow(TriggerType.CONTENT_CREATED, trigger_data)
+            await get_workflow_engine().trigger_workflow(TriggerType.CONTENT_CREATED, trigger_data)
             
         except Exception as e:
             print(f"Smart Automation workflow trigger failed: {e}")
@@ -3413,17 +3384,19 @@ def _get_search_performance_analytics():
         
         # FTS index analysis
         try:
-            fts_stats = c.execute("SELECT COUNT(*) FROM notes_fts").fetchone()
-            if fts_stats:
-                analytics["fts_index_health"]["indexed_documents"] = fts_stats[0]
-                analytics["fts_index_health"]["status"] = "functional"
-                
-                # Test search performance
-                import time
-                start_time = time.time()
-                c.execute("SELECT COUNT(*) FROM notes_fts WHERE notes_fts MATCH 'test' LIMIT 10")
-                search_time = (time.time() - start_time) * 1000
-                analytics["performance_metrics"]["fts_search_time_ms"] = round(search_time, 2)
+            index_stats = note_index.get_stats()
+            analytics["fts_index_health"]["indexed_documents"] = index_stats["indexed_notes"]
+            analytics["fts_index_health"]["chunks"] = index_stats["chunks"]
+            analytics["fts_index_health"]["pending"] = index_stats["pending"]
+            analytics["fts_index_health"]["status"] = "functional"
+            analytics["performance_metrics"]["index_batch_ms"] = index_stats["last_batch_ms"]
+
+            # Test search performance
+            import time
+            start_time = time.time()
+            c.execute("SELECT COUNT(*) FROM note_chunks_fts WHERE note_chunks_fts MATCH 'test' LIMIT 10")
+            search_time = (time.time() - start_time) * 1000
+            analytics["performance_metrics"]["fts_search_time_ms"] = round(search_time, 2)
         except Exception as e:
             analytics["fts_index_health"]["status"] = "error"
             analytics["fts_index_health"]["error"] = str(e)
@@ -3708,13 +3681,13 @@ def _perform_search_healing():
         
         # Check if FTS index needs rebuilding
         try:
-            c.execute("SELECT COUNT(*) FROM notes_fts WHERE notes_fts MATCH 'test' LIMIT 1")
+            c.execute("SELECT COUNT(*) FROM note_chunks_fts WHERE note_chunks_fts MATCH 'test' LIMIT 1")
             results["actions"].append("FTS index verified as functional")
         except Exception as e:
             # Try to rebuild FTS index
             try:
-                c.execute("INSERT INTO notes_fts(notes_fts) VALUES('rebuild')")
-                results["actions"].append("FTS index rebuilt")
+                indexed = note_index.rebuild()
+                results["actions"].append(f"FTS index rebuilt ({indexed} notes)")
             except Exception as rebuild_error:
                 results["errors"].append(f"FTS index rebuild failed: {str(rebuild_error)}")
         
@@ -4087,6 +4060,7 @@ async def sync_note_to_obsidian(note_id: int, current_user: User = Depends(get_c
     
     try:
         # Use existing Obsidian sync functionality
+        from obsidian_sync import ObsidianSync
         sync = ObsidianSync()
         filename = safe_filename(note_dict['title'] or f'note_{note_id}')
         
@@ -4914,71 +4888,32 @@ async def api_advanced_search(
     current_user: User = Depends(get_current_user)
 ):
     """Advanced search with filters"""
+    # Query operators plus the form filters, compiled into one indexed statement
+    query = AdvancedSearchParser().parse(q)
+    if type:
+        query.terms.append(SearchTerm(field=SearchField.TYPE, value=type))
+    for i, tag in enumerate(t.strip() for t in tags.split(",") if t.strip()):
+        query.terms.append(SearchTerm(field=SearchField.TAG, value=tag,
+                                      operator=SearchOperator.OR if i else SearchOperator.AND))
+    days = {"today": 0, "week": 7, "month": 30, "year": 365}.get(date_range)
+    if days is not None:
+        now = datetime.now()
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0) if days == 0 else now - timedelta(days=days)
+        query.date_ranges.append(DateRange(start=start))
+
     conn = get_conn()
     c = conn.cursor()
     
     try:
-        # Build query conditions
-        conditions = ["user_id = ?", "status != 'deleted'"]
-        params = [current_user.id]
-        
-        # Text search
-        if q:
-            conditions.append("(title LIKE ? OR content LIKE ? OR summary LIKE ?)")
-            search_term = f"%{q}%"
-            params.extend([search_term, search_term, search_term])
-        
-        # Date range filter
-        if date_range:
-            now = datetime.now()
-            if date_range == "today":
-                start_date = now.strftime("%Y-%m-%d 00:00:00")
-                conditions.append("COALESCE(timestamp, created_at, updated_at) >= ?")
-                params.append(start_date)
-            elif date_range == "week":
-                start_date = (now - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S")
-                conditions.append("COALESCE(timestamp, created_at, updated_at) >= ?")
-                params.append(start_date)
-            elif date_range == "month":
-                start_date = (now - timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S")
-                conditions.append("COALESCE(timestamp, created_at, updated_at) >= ?")
-                params.append(start_date)
-            elif date_range == "year":
-                start_date = (now - timedelta(days=365)).strftime("%Y-%m-%d %H:%M:%S")
-                conditions.append("COALESCE(timestamp, created_at, updated_at) >= ?")
-                params.append(start_date)
-        
-        # Type filter
-        if type:
-            conditions.append("type = ?")
-            params.append(type)
-        
-        # Tags filter
-        if tags:
-            tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
-            tag_conditions = []
-            for tag in tag_list:
-                tag_conditions.append("tags LIKE ?")
-                params.append(f"%{tag}%")
-            if tag_conditions:
-                conditions.append(f"({' OR '.join(tag_conditions)})")
-        
-        # Execute query
-        where_clause = " AND ".join(conditions)
-        query = f"""
-            SELECT id, title, content, summary, tags, type, timestamp, created_at, updated_at
-            FROM notes 
-            WHERE {where_clause}
-            ORDER BY COALESCE(timestamp, created_at, updated_at) DESC 
-            LIMIT ?
-        """
-        params.append(limit)
-        
-        rows = c.execute(query, params).fetchall()
+        note_index.sync_for_search()
+        columns = [row[1] for row in c.execute("PRAGMA table_info(notes)")]
+        plan = SearchPlanner(columns).plan(query, user_id=current_user.id, exclude_deleted=True, limit=limit)
+        rows = c.execute(plan.sql, plan.params).fetchall()
         
         results = []
         for row in rows:
             note_dict = dict(zip([col[0] for col in c.description], row))
+            note_dict.pop('total_count', None)
             created_at = note_dict.get('created_at') or note_dict.get('timestamp') or note_dict.get('updated_at')
             note_dict['created_at'] = created_at
             results.append(note_dict)
@@ -5104,6 +5039,12 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
     except WebSocketDisconnect:
         await manager.disconnect(connection_id, user_id)
 
+@app.get("/api/websocket/stats")
+async def websocket_stats(current_user: User = Depends(get_current_user)):
+    """Fan-out totals plus send-queue depth and lag for the caller's connections"""
+    connections = [c for c in manager.get_all_connections() if c['user_id'] == current_user.id]
+    return {"stats": manager.get_connection_stats(), "connections": connections}
+
 # Enhanced note creation with real-time updates
 async def notify_note_change(user_id: int, action: str, note_data: dict) -> None:
     """Backward-compatible wrapper around realtime broadcast helper."""
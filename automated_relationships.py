@@ -14,6 +14,8 @@ import time
 import json
 from pathlib import Path
 
+from db_writer import get_batched_writer, web_load
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -28,6 +30,14 @@ class AutomationConfig:
     max_similar_notes: int = 5
     auto_cluster_frequency_hours: int = 6
     enable_real_time_updates: bool = True
+    # Scheduling and back-pressure
+    cycle_interval_seconds: int = 30
+    cycle_time_budget_seconds: float = 2.0
+    max_jobs_per_cycle: int = 5
+    busy_max_in_flight_requests: int = 4
+    busy_max_requests_per_second: float = 20.0
+    writer_high_water: int = 1000
+    busy_backoff_seconds: int = 15
 
 class AutomatedRelationshipEngine:
     """Manages automated relationship discovery and maintenance"""
@@ -39,6 +49,16 @@ class AutomatedRelationshipEngine:
         self._background_task = None
         self._last_cluster_update = {}  # user_id -> timestamp
         self._adaptive_thresholds = {}  # user_id -> threshold
+        self._cycle_stats = {
+            'cycles': 0,
+            'cycles_deferred': 0,
+            'jobs_processed': 0,
+            'jobs_deferred_budget': 0,
+            'last_cycle_ms': 0.0,
+        }
+        
+        # Every write goes through the shared batched writer
+        self.writer = get_batched_writer(db_path)
         
         # Initialize components
         self._relationship_engine = None
@@ -52,7 +72,7 @@ class AutomatedRelationshipEngine:
         if self._relationship_engine is None:
             try:
                 from note_relationships import NoteRelationshipEngine
-                self._relationship_engine = NoteRelationshipEngine(self.db_path)
+                self._relationship_engine = NoteRelationshipEngine(self.db_path, writer=self.writer)
             except ImportError:
                 logger.warning("Relationship engine not available")
                 return None
@@ -162,10 +182,27 @@ class AutomatedRelationshipEngine:
                 pass
         logger.info("🛑 Automation system stopped")
     
+    def _is_backpressured(self) -> bool:
+        """True when the web tier is busy or the writer is falling behind"""
+        if self.writer.depth >= self.config.writer_high_water:
+            return True
+        return web_load.is_busy(
+            self.config.busy_max_in_flight_requests,
+            self.config.busy_max_requests_per_second
+        )
+    
     async def _automation_loop(self):
         """Main automation processing loop"""
         while self._running:
             try:
+                if self._is_backpressured():
+                    self._cycle_stats['cycles_deferred'] += 1
+                    logger.debug("Automation cycle deferred: web tier busy")
+                    await asyncio.sleep(self.config.busy_backoff_seconds)
+                    continue
+                
+                started = time.perf_counter()
+                
                 # Process pending jobs
                 await self._process_automation_jobs()
                 
@@ -175,8 +212,14 @@ class AutomatedRelationshipEngine:
                 # Adapt thresholds based on performance
                 await self._adapt_similarity_thresholds()
                 
+                # Commit this cycle's writes before sleeping
+                await asyncio.to_thread(self.writer.flush, 30)
+                
+                self._cycle_stats['cycles'] += 1
+                self._cycle_stats['last_cycle_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                
                 # Sleep before next iteration
-                await asyncio.sleep(30)  # Check every 30 seconds
+                await asyncio.sleep(self.config.cycle_interval_seconds)
                 
             except Exception as e:
                 logger.error(f"Error in automation loop: {e}")
@@ -185,23 +228,12 @@ class AutomatedRelationshipEngine:
     async def _initialize_user_settings(self):
         """Initialize automation settings for all users"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # Get all users who don't have automation settings
-            users_without_settings = conn.execute("""
-                SELECT DISTINCT u.id FROM users u
+            await asyncio.wrap_future(await self.writer.execute_async("""
+                INSERT OR IGNORE INTO user_automation_settings (user_id)
+                SELECT u.id FROM users u
                 LEFT JOIN user_automation_settings uas ON u.id = uas.user_id
                 WHERE uas.user_id IS NULL
-            """).fetchall()
-            
-            for (user_id,) in users_without_settings:
-                conn.execute("""
-                    INSERT OR IGNORE INTO user_automation_settings (user_id)
-                    VALUES (?)
-                """, (user_id,))
-            
-            conn.commit()
-            conn.close()
+            """))
             
         except Exception as e:
             logger.error(f"Failed to initialize user settings: {e}")
@@ -235,25 +267,23 @@ class AutomatedRelationshipEngine:
                         metadata: Dict = None):
         """Queue an automation job"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            
             metadata_json = json.dumps(metadata) if metadata else None
             
-            conn.execute("""
+            await self.writer.execute_async("""
                 INSERT INTO automation_jobs 
                 (job_type, target_id, user_id, priority, metadata)
                 VALUES (?, ?, ?, ?, ?)
             """, (job_type, target_id, user_id, priority, metadata_json))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Failed to queue job: {e}")
     
     async def _process_automation_jobs(self):
-        """Process pending automation jobs"""
+        """Process pending automation jobs within the cycle's time budget"""
         try:
+            # Make sure freshly queued jobs are visible
+            await asyncio.to_thread(self.writer.flush, 30)
+            
             conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row
             
@@ -262,13 +292,19 @@ class AutomatedRelationshipEngine:
                 SELECT * FROM automation_jobs 
                 WHERE status = 'pending'
                 ORDER BY priority ASC, created_at ASC
-                LIMIT 5
-            """).fetchall()
+                LIMIT ?
+            """, (self.config.max_jobs_per_cycle,)).fetchall()
             
             conn.close()
             
-            for job in jobs:
+            deadline = time.monotonic() + self.config.cycle_time_budget_seconds
+            for index, job in enumerate(jobs):
+                # Leave the rest for the next cycle once over budget or under load
+                if time.monotonic() >= deadline or self._is_backpressured():
+                    self._cycle_stats['jobs_deferred_budget'] += len(jobs) - index
+                    break
                 await self._process_single_job(job)
+                self._cycle_stats['jobs_processed'] += 1
                 
         except Exception as e:
             logger.error(f"Failed to process automation jobs: {e}")
@@ -283,7 +319,7 @@ class AutomatedRelationshipEngine:
         
         try:
             # Update job status to running
-            self._update_job_status(job_id, 'running', datetime.now().isoformat())
+            await self._update_job_status(job_id, 'running', datetime.now().isoformat())
             
             if job_type == 'update_embeddings':
                 await self._job_update_embeddings(user_id, metadata)
@@ -295,51 +331,46 @@ class AutomatedRelationshipEngine:
                 await self._job_refresh_relationships(user_id, metadata)
             else:
                 logger.warning(f"Unknown job type: {job_type}")
-                self._update_job_status(job_id, 'failed', error_message="Unknown job type")
+                await self._update_job_status(job_id, 'failed', error_message="Unknown job type")
                 return
             
             # Mark job as completed
-            self._update_job_status(job_id, 'completed', completed_at=datetime.now().isoformat())
+            await self._update_job_status(job_id, 'completed', completed_at=datetime.now().isoformat())
             
         except Exception as e:
             logger.error(f"Job {job_id} failed: {e}")
-            self._update_job_status(job_id, 'failed', error_message=str(e))
+            await self._update_job_status(job_id, 'failed', error_message=str(e))
     
-    def _update_job_status(self, job_id: int, status: str, 
-                          started_at: str = None, completed_at: str = None,
-                          error_message: str = None):
-        """Update job status in database"""
+    async def _update_job_status(self, job_id: int, status: str, 
+                                started_at: str = None, completed_at: str = None,
+                                error_message: str = None):
+        """Queue a job status update for the batched writer"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            
             if started_at:
-                conn.execute("""
+                await self.writer.execute_async("""
                     UPDATE automation_jobs 
                     SET status = ?, started_at = ?
                     WHERE id = ?
                 """, (status, started_at, job_id))
             elif completed_at:
-                conn.execute("""
+                await self.writer.execute_async("""
                     UPDATE automation_jobs 
                     SET status = ?, completed_at = ?
                     WHERE id = ?
                 """, (status, completed_at, job_id))
             elif error_message:
-                conn.execute("""
+                await self.writer.execute_async("""
                     UPDATE automation_jobs 
                     SET status = ?, error_message = ?
                     WHERE id = ?
                 """, (status, error_message, job_id))
             else:
-                conn.execute("""
+                await self.writer.execute_async("""
                     UPDATE automation_jobs 
                     SET status = ?
                     WHERE id = ?
                 """, (status, job_id))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Failed to update job status: {e}")
     
@@ -375,11 +406,12 @@ class AutomatedRelationshipEngine:
         # Get adaptive threshold
         threshold = await self._get_adaptive_threshold(user_id)
         
-        # Discover clusters
-        clusters = relationship_engine.discover_note_clusters(
+        # Discover clusters (incremental unless a full rebuild was requested)
+        clusters = await relationship_engine.discover_note_clusters_async(
             user_id, 
             min_cluster_size=self.config.cluster_min_size,
-            similarity_threshold=threshold
+            similarity_threshold=threshold,
+            full_rebuild=bool(metadata.get('full_rebuild', False))
         )
         
         # Update last cluster time
@@ -399,7 +431,8 @@ class AutomatedRelationshipEngine:
         # Get adaptive threshold
         threshold = await self._get_adaptive_threshold(user_id)
         
-        similar_notes = relationship_engine.find_similar_notes(
+        similar_notes = await asyncio.to_thread(
+            relationship_engine.find_similar_notes,
             note_id, user_id,
             limit=self.config.max_similar_notes,
             min_similarity=threshold
@@ -437,6 +470,8 @@ class AutomatedRelationshipEngine:
                 AND (last_full_update IS NULL OR last_full_update < ?)
             """, (cutoff_time.isoformat(),)).fetchall()
             
+            conn.close()
+            
             for (user_id,) in users_needing_clusters:
                 if user_id not in self._last_cluster_update or \
                    self._last_cluster_update[user_id] < cutoff_time:
@@ -444,15 +479,12 @@ class AutomatedRelationshipEngine:
                     await self._queue_job("discover_clusters", user_id=user_id, priority=7)
                     
                     # Update timestamp
-                    conn.execute("""
+                    await self.writer.execute_async("""
                         UPDATE user_automation_settings
                         SET last_full_update = ?
                         WHERE user_id = ?
                     """, (datetime.now().isoformat(), user_id))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Failed to schedule periodic updates: {e}")
     
@@ -496,7 +528,7 @@ class AutomatedRelationshipEngine:
                         self._adaptive_thresholds[user_id] = new_threshold
                         
                         # Update in database
-                        conn.execute("""
+                        await self.writer.execute_async("""
                             UPDATE user_automation_settings
                             SET similarity_threshold = ?
                             WHERE user_id = ?
@@ -504,7 +536,6 @@ class AutomatedRelationshipEngine:
                         
                         logger.info(f"Adapted threshold for user {user_id}: {current_threshold:.3f} -> {new_threshold:.3f}")
             
-            conn.commit()
             conn.close()
             
         except Exception as e:
@@ -536,18 +567,13 @@ class AutomatedRelationshipEngine:
                          metadata: Dict = None):
         """Log automation metrics"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            
             metadata_json = json.dumps(metadata) if metadata else None
             
-            conn.execute("""
+            await self.writer.execute_async("""
                 INSERT INTO automation_metrics (user_id, metric_type, metric_value, metadata)
                 VALUES (?, ?, ?, ?)
             """, (user_id, metric_type, metric_value, metadata_json))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Failed to log metric: {e}")
     
@@ -574,6 +600,11 @@ class AutomatedRelationshipEngine:
         if note_count >= self.config.min_notes_for_clustering:
             await self._queue_job("discover_clusters", user_id=user_id, priority=8)
     
+    async def request_full_recluster(self, user_id: int):
+        """Queue an on-demand full clustering rebuild for a user"""
+        await self._queue_job("discover_clusters", user_id=user_id, priority=4,
+                              metadata={'full_rebuild': True})
+    
     async def on_note_updated(self, note_id: int, user_id: int):
         """Trigger automation when a note is updated"""
         if not self.config.enable_real_time_updates:
@@ -620,7 +651,10 @@ class AutomatedRelationshipEngine:
                 "settings": dict(settings) if settings else {},
                 "recent_jobs": recent_jobs,
                 "metrics": {row[0]: row[1] for row in recent_metrics},
-                "adaptive_threshold": self._adaptive_thresholds.get(user_id, self.config.similarity_threshold_base)
+                "adaptive_threshold": self._adaptive_thresholds.get(user_id, self.config.similarity_threshold_base),
+                "cycle_stats": dict(self._cycle_stats),
+                "backpressured": self._is_backpressured(),
+                "writer": self.writer.get_stats()
             }
             
         except Exception as e:
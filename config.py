@@ -58,6 +58,22 @@ class Settings(BaseSettings):
     # Max seconds to process a single note before marking failed:timeout
     # Increase this if you plan to upload longer audio recordings
     processing_timeout_seconds: int = 1800  # 30 minutes
+    # Processes for page-parallel PDF extraction and OCR (0 = min(4, CPUs), -1 = inline)
+    document_extraction_workers: int = 0
+    # Render resolution for OCR of image-only PDF pages
+    document_ocr_dpi: int = 200
+    # SQLite change feed that fans realtime events out to every worker process
+    realtime_events_path: Path = BASE_DIR / "realtime_events.db"
+    # How often each process checks the feed for new events
+    realtime_poll_interval_ms: int = 20
+    # Background loops run only in the gunicorn worker(s) holding their lease
+    background_lease_seconds: int = 30
+    # Workers allowed to run the note job worker at once (claims are atomic)
+    background_job_worker_replicas: int = 1
+    # Feature routers are imported on the first request under their prefix
+    lazy_routers: bool = True
+    # Comma-separated router names to load at startup anyway ("all" for every router)
+    eager_routers: str = ""
 
     # Web ingestion defaults and quotas
     web_capture_screenshot_default: bool = Field(
@@ -100,6 +116,50 @@ class Settings(BaseSettings):
         default=False,
         validation_alias=AliasChoices('web_async_ingestion_default', 'WEB_ASYNC_INGESTION_DEFAULT')
     )
+    web_ingestion_local_queue: bool = Field(
+        default=True,
+        validation_alias=AliasChoices('web_ingestion_local_queue', 'WEB_INGESTION_LOCAL_QUEUE')
+    )
+    web_ingestion_inprocess_worker: bool = Field(
+        default=True,
+        validation_alias=AliasChoices('web_ingestion_inprocess_worker', 'WEB_INGESTION_INPROCESS_WORKER')
+    )
+    web_ingestion_worker_concurrency: int = Field(
+        default=4,
+        validation_alias=AliasChoices('web_ingestion_worker_concurrency', 'WEB_INGESTION_WORKER_CONCURRENCY')
+    )
+    web_ingestion_per_domain_limit: int = Field(
+        default=2,
+        validation_alias=AliasChoices('web_ingestion_per_domain_limit', 'WEB_INGESTION_PER_DOMAIN_LIMIT')
+    )
+    web_ingestion_max_attempts: int = Field(
+        default=3,
+        validation_alias=AliasChoices('web_ingestion_max_attempts', 'WEB_INGESTION_MAX_ATTEMPTS')
+    )
+    web_ingestion_visibility_timeout: int = Field(
+        default=300,
+        validation_alias=AliasChoices('web_ingestion_visibility_timeout', 'WEB_INGESTION_VISIBILITY_TIMEOUT')
+    )
+    web_url_cache_ttl_seconds: int = Field(
+        default=900,
+        validation_alias=AliasChoices('web_url_cache_ttl_seconds', 'WEB_URL_CACHE_TTL_SECONDS')
+    )
+    web_fetch_strategy_default: str = Field(
+        default="auto",
+        validation_alias=AliasChoices('web_fetch_strategy_default', 'WEB_FETCH_STRATEGY_DEFAULT')
+    )
+    web_browser_pool_size: int = Field(
+        default=2,
+        validation_alias=AliasChoices('web_browser_pool_size', 'WEB_BROWSER_POOL_SIZE')
+    )
+    web_browser_max_pages: int = Field(
+        default=50,
+        validation_alias=AliasChoices('web_browser_max_pages', 'WEB_BROWSER_MAX_PAGES')
+    )
+    web_browser_max_concurrency: int = Field(
+        default=4,
+        validation_alias=AliasChoices('web_browser_max_concurrency', 'WEB_BROWSER_MAX_CONCURRENCY')
+    )
 
     redis_url: Optional[str] = Field(
         default=None,
@@ -207,6 +267,34 @@ class Settings(BaseSettings):
         default="cross-encoder/ms-marco-MiniLM-L-6-v2",
         validation_alias=AliasChoices('search_cross_encoder_model', 'SEARCH_CROSS_ENCODER_MODEL')
     )
+    # FTS5 tokenizer and prefix lengths for the note index; a change is applied by an online rebuild
+    search_fts_tokenizer: str = Field(
+        default="porter unicode61 remove_diacritics 2",
+        validation_alias=AliasChoices('search_fts_tokenizer', 'SEARCH_FTS_TOKENIZER')
+    )
+    search_fts_prefix: str = Field(
+        default="2 3",
+        validation_alias=AliasChoices('search_fts_prefix', 'SEARCH_FTS_PREFIX')
+    )
+    # bm25 weights for the title, tags and text columns
+    search_fts_weights: str = Field(
+        default="10,4,1",
+        validation_alias=AliasChoices('search_fts_weights', 'SEARCH_FTS_WEIGHTS')
+    )
+    # Search history is buffered in memory and written in batches off the request path
+    search_history_flush_interval: float = Field(
+        default=2.0,
+        validation_alias=AliasChoices('search_history_flush_interval', 'SEARCH_HISTORY_FLUSH_INTERVAL')
+    )
+    search_history_buffer_size: int = Field(
+        default=10000,
+        validation_alias=AliasChoices('search_history_buffer_size', 'SEARCH_HISTORY_BUFFER_SIZE')
+    )
+    # Searches kept per user; older rows are trimmed periodically
+    search_history_keep_last: int = Field(
+        default=1000,
+        validation_alias=AliasChoices('search_history_keep_last', 'SEARCH_HISTORY_KEEP_LAST')
+    )
 
     # Email Configuration for Magic Links
     email_enabled: bool = Field(
@@ -298,6 +386,12 @@ class Settings(BaseSettings):
     )
 
 
+    # Background relationship discovery (similar notes + clustering)
+    relationship_automation_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices('relationship_automation_enabled', 'RELATIONSHIP_AUTOMATION_ENABLED')
+    )
+
     # Capture deduplication (prevent duplicate notes based on content hash)
     capture_dedup_enabled: bool = Field(
         default=True,
@@ -308,6 +402,11 @@ class Settings(BaseSettings):
         default=30,
         validation_alias=AliasChoices('capture_dedup_window_days', 'CAPTURE_DEDUP_WINDOW_DAYS')
     )
+    # Seconds between passes that add new or edited notes to the near-duplicate index
+    dedup_index_backfill_interval: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices('dedup_index_backfill_interval', 'DEDUP_INDEX_BACKFILL_INTERVAL')
+    )
 
     # Memory System Settings
     memory_extraction_enabled: bool = Field(
@@ -10,29 +10,8 @@ CREATE TABLE IF NOT EXISTS notes (
 CREATE INDEX IF NOT EXISTS idx_notes_updated_at ON notes(updated_at);
 CREATE INDEX IF NOT EXISTS idx_notes_created_at ON notes(created_at);
 
--- FTS5 virtual table referencing notes
-CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
-  title, body, tags,
-  content='notes', content_rowid='id'
-);
-
--- Triggers to keep FTS5 in sync with notes
-CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
-  INSERT INTO notes_fts(rowid, title, body, tags)
-  VALUES (new.id, new.title, new.body, new.tags);
-END;
-
-CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
-  INSERT INTO notes_fts(notes_fts, rowid, title, body, tags)
-  VALUES('delete', old.id, old.title, old.body, old.tags);
-  INSERT INTO notes_fts(rowid, title, body, tags)
-  VALUES (new.id, new.title, new.body, new.tags);
-END;
-
-CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
-  INSERT INTO notes_fts(notes_fts, rowid, title, body, tags)
-  VALUES('delete', old.id, old.title, old.body, old.tags);
-END;
+-- Full-text search lives in the chunk index (note_chunks / note_chunks_fts),
+-- created by services/note_index.py and db/migrations/018_note_index.sql
 
 -- Jobs & Rules (embedded automation)
 CREATE TABLE IF NOT EXISTS jobs (
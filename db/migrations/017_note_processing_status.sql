@@ -0,0 +1,23 @@
+-- Live processing progress, kept out of notes so progress ticks don't touch FTS
+CREATE TABLE IF NOT EXISTS note_processing_status (
+    note_id INTEGER PRIMARY KEY,
+    stage TEXT NOT NULL,
+    pct INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    worker TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE TRIGGER IF NOT EXISTS notes_processing_status_ad AFTER DELETE ON notes
+BEGIN
+    DELETE FROM note_processing_status WHERE note_id = OLD.id;
+END;
+
+-- Re-index only when indexed columns change (was: any UPDATE of notes)
+DROP TRIGGER IF EXISTS notes_au;
+CREATE TRIGGER notes_au AFTER UPDATE OF title, body, tags ON notes BEGIN
+  INSERT INTO notes_fts(notes_fts, rowid, title, body, tags)
+  VALUES('delete', old.id, old.title, old.body, old.tags);
+  INSERT INTO notes_fts(rowid, title, body, tags)
+  VALUES (new.id, new.title, new.body, new.tags);
+END;
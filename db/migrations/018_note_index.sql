@@ -0,0 +1,42 @@
+-- One chunk-level full-text index replaces notes_fts, notes_fts5 and fts_chunk.
+-- Note writes only queue the note; services/note_index.py indexes the queue in batches.
+CREATE TABLE IF NOT EXISTS note_chunks (
+    id INTEGER PRIMARY KEY,
+    note_id INTEGER NOT NULL,
+    ord INTEGER NOT NULL DEFAULT 0,
+    title TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_note_chunks_note ON note_chunks(note_id, ord);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS note_chunks_fts USING fts5(
+    title, tags, text,
+    content='note_chunks', content_rowid='id'
+);
+
+CREATE TABLE IF NOT EXISTS note_index_queue (
+    note_id INTEGER PRIMARY KEY,
+    queued_at REAL NOT NULL
+);
+
+DROP TRIGGER IF EXISTS notes_ai;
+DROP TRIGGER IF EXISTS notes_au;
+DROP TRIGGER IF EXISTS notes_ad;
+DROP TABLE IF EXISTS notes_fts;
+DROP TABLE IF EXISTS notes_fts5;
+DROP TABLE IF EXISTS fts_chunk;
+DROP TABLE IF EXISTS chunk;
+
+CREATE TRIGGER IF NOT EXISTS note_index_ai AFTER INSERT ON notes BEGIN
+    INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (new.id, julianday('now'));
+END;
+CREATE TRIGGER IF NOT EXISTS note_index_au AFTER UPDATE OF title, body, tags, content ON notes BEGIN
+    INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (new.id, julianday('now'));
+END;
+CREATE TRIGGER IF NOT EXISTS note_index_ad AFTER DELETE ON notes BEGIN
+    INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (old.id, julianday('now'));
+END;
+
+-- Index every existing note; queued_at 0 lets new writes go first
+INSERT OR IGNORE INTO note_index_queue(note_id, queued_at) SELECT id, 0 FROM notes;
@@ -37,25 +37,6 @@ def migrate_notes_table_for_files():
         print(f"Executing: {migration}")
         c.execute(migration)
     
-    # Update FTS table to include extracted_text
-    fts_columns = [row[1] for row in c.execute("PRAGMA table_info(notes_fts)")]
-    if 'extracted_text' not in fts_columns:
-        print("Updating FTS table for extracted_text...")
-        c.execute("DROP TABLE IF EXISTS notes_fts")
-        c.execute('''
-            CREATE VIRTUAL TABLE notes_fts USING fts5(
-                title, summary, tags, actions, content, extracted_text,
-                content='notes', content_rowid='id'
-            )
-        ''')
-        
-        # Repopulate FTS from existing notes
-        c.execute("""
-            INSERT INTO notes_fts(rowid, title, summary, tags, actions, content, extracted_text)
-            SELECT id, title, summary, tags, actions, content, COALESCE(extracted_text, '')
-            FROM notes
-        """)
-    
     conn.commit()
     conn.close()
     print("Database migration completed successfully!")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Batched SQLite Writer for Second Brain
+Funnels background writes through one connection so they stop fighting
+capture writes for the database lock
+"""
+
+import asyncio
+import sqlite3
+import threading
+import queue
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[sqlite3.Connection], Any]
+
+
+class BatchedWriter:
+    """Single writer thread that applies queued operations in short transactions.
+
+    Each operation is a callable taking a connection. Operations are grouped
+    into one ``BEGIN IMMEDIATE`` transaction of at most ``max_batch`` ops or
+    ``max_delay`` seconds of waiting, each under its own savepoint so one bad
+    op doesn't roll back its neighbours. Callers get a Future with the op's
+    return value once the batch commits.
+    """
+
+    def __init__(self, db_path: str, max_batch: int = 200, max_delay: float = 0.05,
+                 max_queue: int = 10000, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.busy_timeout_ms = busy_timeout_ms
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._stats = {
+            'ops_committed': 0,
+            'ops_failed': 0,
+            'batches': 0,
+            'lock_retries': 0,
+            'last_batch_ms': 0.0,
+            'last_batch_size': 0,
+        }
+
+    # --- public API -------------------------------------------------------
+
+    def submit(self, op: WriteOp) -> Future:
+        """Queue a write operation; blocks only if the queue is full"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def execute(self, sql: str, params: Sequence = ()) -> Future:
+        """Queue a single statement"""
+        return self.submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> Future:
+        """Queue a statement applied to many parameter rows"""
+        rows = list(rows)
+        return self.submit(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    async def submit_async(self, op: WriteOp) -> Future:
+        """submit() for coroutines: waits for room in a thread, never on the event loop"""
+        self._ensure_started()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((op, future))
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, (op, future))
+        return future
+
+    async def execute_async(self, sql: str, params: Sequence = ()) -> Future:
+        """execute() for coroutines"""
+        return await self.submit_async(lambda conn: conn.execute(sql, params).rowcount)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been committed"""
+        try:
+            self.submit(lambda conn: None).result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    @property
+    def depth(self) -> int:
+        """Number of operations waiting to be written"""
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['queue_depth'] = self.depth
+        stats['running'] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+    def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer thread"""
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self._stop.clear()
+
+    # --- writer thread ----------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f"batched-writer:{self.db_path}", daemon=True
+            )
+            self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                               timeout=self.busy_timeout_ms / 1000)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def _next_batch(self) -> list:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._apply_batch(conn, batch)
+            except Exception as e:
+                logger.error(f"Batched writer failed to apply {len(batch)} ops: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._stats['ops_failed'] += len(batch)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = None
+        if conn is not None:
+            conn.close()
+
+    def _apply_batch(self, conn: sqlite3.Connection, batch: list):
+        started = time.perf_counter()
+        for attempt in range(5):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e).lower() or attempt == 4:
+                    raise
+                self._stats['lock_retries'] += 1
+                time.sleep(0.05 * (2 ** attempt))
+
+        results = []
+        for index, (op, future) in enumerate(batch):
+            savepoint = f"op_{index}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                results.append((future, op(conn), None))
+                conn.execute(f"RELEASE {savepoint}")
+            except Exception as e:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                results.append((future, None, e))
+
+        conn.execute("COMMIT")
+
+        failed = 0
+        for future, result, error in results:
+            if error is not None:
+                failed += 1
+                logger.warning(f"Batched write failed: {error}")
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        self._stats['batches'] += 1
+        self._stats['ops_committed'] += len(batch) - failed
+        self._stats['ops_failed'] += failed
+        self._stats['last_batch_size'] = len(batch)
+        self._stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+
+class WebLoadMonitor:
+    """Tracks in-flight web requests so background work can back off"""
+
+    def __init__(self, window_seconds: float = 10.0):
+        self.window_seconds = window_seconds
+        self._in_flight = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._recent.append(now)
+            self._trim(now)
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def requests_per_second(self) -> float:
+        with self._lock:
+            self._trim(time.monotonic())
+            return len(self._recent) / self.window_seconds
+
+    def is_busy(self, max_in_flight: int, max_rps: float) -> bool:
+        return self.in_flight >= max_in_flight or self.requests_per_second() >= max_rps
+
+
+# Global instances
+web_load = WebLoadMonitor()
+
+_writers: Dict[str, BatchedWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_batched_writer(db_path: str) -> BatchedWriter:
+    """Get the process-wide writer for a database path"""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = BatchedWriter(db_path)
+            _writers[db_path] = writer
+        return writer
+
+
+def stop_batched_writers():
+    """Flush and stop every writer - for shutdown"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Document Extraction Engine for Second Brain
+Splits PDFs into page ranges and extracts them in a process pool. Pages with a
+text layer are read directly; only image-only pages are rendered and OCR'd.
+Results come back page by page (in order) so callers can index the first pages
+while the rest of a long scan is still running, and finished documents are
+cached by file checksum.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+try:
+    from PIL import Image
+    import pytesseract
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pages with less extractable text than this are treated as scans
+MIN_TEXT_LAYER_CHARS = 25
+# Pages handed to a worker at once; keeps IPC and per-task PDF opens cheap
+PAGES_PER_TASK = 4
+CACHE_VERSION = 1
+
+PageCallback = Callable[["PageResult", int], None]
+
+
+@dataclass
+class PageResult:
+    """Text extracted from one page"""
+    page_number: int
+    text: str
+    method: str  # "text", "ocr", "empty" or "error"
+    error: Optional[str] = None
+
+
+# --- Worker functions (run in the process pool, so module-level) ---
+
+def _ocr_pixmap(page, dpi: int) -> str:
+    pix = page.get_pixmap(dpi=dpi)
+    mode = "RGBA" if pix.alpha else "RGB"
+    img = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(img, config='--psm 3').strip()
+
+
+def extract_page_range(path: str, start: int, stop: int, ocr_dpi: int = 200) -> List[PageResult]:
+    """Extract pages [start, stop) of a PDF, OCR'ing only pages without a text layer"""
+    results: List[PageResult] = []
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(path) as doc:
+            for index in range(start, min(stop, doc.page_count)):
+                page_number = index + 1
+                try:
+                    page = doc.load_page(index)
+                    text = page.get_text("text").strip()
+                    if len(text) >= MIN_TEXT_LAYER_CHARS:
+                        results.append(PageResult(page_number, text, "text"))
+                    elif OCR_AVAILABLE:
+                        ocr_text = _ocr_pixmap(page, ocr_dpi)
+                        results.append(PageResult(page_number, ocr_text or text, "ocr" if ocr_text else "empty"))
+                    else:
+                        results.append(PageResult(page_number, text, "text" if text else "empty"))
+                except Exception as e:
+                    results.append(PageResult(page_number, "", "error", str(e)))
+        return results
+
+    # PyPDF2 has no renderer, so image-only pages stay empty
+    reader = PyPDF2.PdfReader(path)
+    for index in range(start, min(stop, len(reader.pages))):
+        try:
+            text = (reader.pages[index].extract_text() or "").strip()
+            results.append(PageResult(index + 1, text, "text" if text else "empty"))
+        except Exception as e:
+            results.append(PageResult(index + 1, "", "error", str(e)))
+    return results
+
+
+def ocr_image_file(path: str) -> str:
+    with Image.open(path) as img:
+        return pytesseract.image_to_string(img, config='--psm 3').strip()
+
+
+def _pdf_info(path: str) -> Tuple[int, Dict[str, str]]:
+    """Page count and document info dictionary"""
+    if PYMUPDF_AVAILABLE:
+        with fitz.open(path) as doc:
+            info = {k: v for k, v in (doc.metadata or {}).items() if isinstance(v, str) and v}
+            return doc.page_count, info
+    reader = PyPDF2.PdfReader(path)
+    info = {}
+    if reader.metadata:
+        info = {k.replace('/', ''): v for k, v in reader.metadata.items() if isinstance(v, str)}
+    return len(reader.pages), info
+
+
+def file_checksum(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class _InlineExecutor(Executor):
+    """Runs tasks in the caller's thread; used when the pool is disabled"""
+
+    def submit(self, fn, *args, **kwargs):
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class DocumentExtractor:
+    """Page-parallel PDF/image text extraction with a checksum-keyed cache"""
+
+    def __init__(self, max_workers: Optional[int] = None, cache_dir: Optional[Path] = None,
+                 pages_per_task: int = PAGES_PER_TASK, ocr_dpi: Optional[int] = None):
+        workers = settings.document_extraction_workers if max_workers is None else max_workers
+        if workers < 0:
+            workers = 0
+        elif workers == 0 and max_workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        self.max_workers = workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.ocr_dpi = ocr_dpi or settings.document_ocr_dpi
+        self.cache_dir = Path(cache_dir or settings.base_dir / "cache" / "extraction")
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return PYMUPDF_AVAILABLE or PYPDF2_AVAILABLE
+
+    def _executor(self) -> Executor:
+        if self.max_workers <= 0:
+            return _InlineExecutor()
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads (uvicorn, writers) can deadlock
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- cache ---
+
+    def _cache_path(self, checksum: str, kind: str) -> Path:
+        return self.cache_dir / f"{checksum}.{kind}.json"
+
+    def _load_cache(self, checksum: str, kind: str) -> Optional[Dict[str, Any]]:
+        path = self._cache_path(checksum, kind)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return data if data.get("version") == CACHE_VERSION else None
+
+    def _store_cache(self, checksum: str, kind: str, data: Dict[str, Any]):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._cache_path(checksum, kind)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({**data, "version": CACHE_VERSION}), encoding="utf-8")
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache for {checksum}: {e}")
+
+    # --- extraction ---
+
+    def iter_pdf_pages(self, file_path: Path, page_count: Optional[int] = None) -> Iterator[PageResult]:
+        """Yield page results in page order while later pages are still being extracted"""
+        path = str(file_path)
+        if page_count is None:
+            page_count, _ = _pdf_info(path)
+        ranges = [(start, min(start + self.pages_per_task, page_count))
+                  for start in range(0, page_count, self.pages_per_task)]
+        # Small documents aren't worth the IPC round trip
+        executor = _InlineExecutor() if len(ranges) <= 1 else self._executor()
+        futures = [executor.submit(extract_page_range, path, start, stop, self.ocr_dpi) for start, stop in ranges]
+        try:
+            for (start, stop), future in zip(ranges, futures):
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    logger.warning(f"Page range {start + 1}-{stop} of {file_path} failed: {e}")
+                    for index in range(start, stop):
+                        yield PageResult(index + 1, "", "error", str(e))
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def extract_pdf(self, file_path: Path, on_page: Optional[PageCallback] = None) -> Tuple[str, Dict[str, Any]]:
+        """Full text and metadata of a PDF; ``on_page(result, page_count)`` sees each page as it lands"""
+        checksum = file_checksum(file_path)
+        cached = self._load_cache(checksum, "pdf")
+        if cached:
+            pages = [PageResult(**page) for page in cached["pages"]]
+            if on_page:
+                for page in pages:
+                    on_page(page, len(pages))
+            metadata = dict(cached["metadata"], cache_hit=True)
+            return self._join_pages(pages), metadata
+
+        page_count, info = _pdf_info(str(file_path))
+        pages: List[PageResult] = []
+        for page in self.iter_pdf_pages(file_path, page_count):
+            pages.append(page)
+            if on_page:
+                on_page(page, page_count)
+
+        methods: Dict[str, int] = {}
+        for page in pages:
+            methods[page.method] = methods.get(page.method, 0) + 1
+        full_text = self._join_pages(pages)
+        metadata = {
+            'pages': page_count,
+            'extraction_method': 'PyMuPDF' if PYMUPDF_AVAILABLE else 'PyPDF2',
+            'page_methods': methods,
+            'ocr_pages': methods.get('ocr', 0),
+            'text_length': len(full_text),
+            'extraction_success': methods.get('error', 0) < max(page_count, 1),
+            'checksum': checksum,
+        }
+        if info:
+            metadata['pdf_info'] = info
+        if methods.get('error', 0) == 0:
+            self._store_cache(checksum, "pdf", {"pages": [asdict(p) for p in pages], "metadata": metadata})
+        return full_text, metadata
+
+    def ocr_image(self, file_path: Path) -> str:
+        """OCR an image in the calling thread, reusing cached text for identical files.
+
+        Tesseract runs as a subprocess, so a single image gains nothing from
+        the spawn pool's pickling round trip.
+        """
+        checksum = file_checksum(file_path)
+        cached = self._load_cache(checksum, "ocr")
+        if cached:
+            return cached["text"]
+        text = ocr_image_file(str(file_path))
+        self._store_cache(checksum, "ocr", {"text": text})
+        return text
+
+    @staticmethod
+    def _join_pages(pages: List[PageResult]) -> str:
+        return "\n\n".join(f"[Page {p.page_number}]\n{p.text}" for p in pages if p.text.strip())
+
+
+_extractor: Optional[DocumentExtractor] = None
+_extractor_lock = threading.Lock()
+
+
+def get_document_extractor() -> DocumentExtractor:
+    """Process-wide extractor sharing one worker pool"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = DocumentExtractor()
+        return _extractor
+
+
+def shutdown_document_extractor():
+    """Stop the worker pool - for shutdown"""
+    global _extractor
+    with _extractor_lock:
+        extractor, _extractor = _extractor, None
+    if extractor is not None:
+        extractor.shutdown()
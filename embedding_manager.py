@@ -11,12 +11,18 @@ from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 import asyncio
 import logging
+import threading
 from datetime import datetime
 import time
 import json
 
 logger = logging.getLogger(__name__)
 
+# Per-user normalized embedding matrices shared by every EmbeddingManager
+# instance in the process: (db_path, user_id, model) -> UserEmbeddingMatrix
+_matrix_cache: Dict[Tuple[str, int, str], "UserEmbeddingMatrix"] = {}
+_matrix_cache_lock = threading.Lock()
+
 @dataclass
 class EmbeddingJob:
     """Represents an embedding generation job"""
@@ -42,6 +48,27 @@ class NoteEmbedding:
     created_at: str
     updated_at: str
 
+@dataclass
+class UserEmbeddingMatrix:
+    """Row-normalized embeddings for all of a user's notes"""
+    note_ids: np.ndarray        # shape (n,), int64
+    matrix: np.ndarray          # shape (n, dim), float32, unit-length rows
+    fingerprint: Tuple[int, int, str]
+    built_at: float
+
+    def index_of(self, note_id: int) -> Optional[int]:
+        """Row index of a note in the matrix, or None if absent"""
+        hits = np.nonzero(self.note_ids == note_id)[0]
+        return int(hits[0]) if len(hits) else None
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so dot products are cosine similarities"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
 class EmbeddingManager:
     """Manages vector embeddings for semantic search"""
     
@@ -106,7 +133,9 @@ class EmbeddingManager:
                 logger.debug(f"Stored new embedding for note {note_id}")
             
             conn.commit()
+            owner = conn.execute("SELECT user_id FROM notes WHERE id = ?", (note_id,)).fetchone()
             conn.close()
+            self.invalidate_user_matrix(owner[0] if owner else None)
             return True
             
         except Exception as e:
@@ -168,6 +197,88 @@ class EmbeddingManager:
             logger.error(f"Failed to retrieve all embeddings: {e}")
             return []
     
+    def _matrix_fingerprint(self, conn: sqlite3.Connection, user_id: int,
+                            model_name: str) -> Tuple[int, int, str]:
+        """Cheap change detector for a user's embeddings (catches other processes' writes)"""
+        row = conn.execute("""
+            SELECT COUNT(*), COALESCE(MAX(ne.id), 0), COALESCE(MAX(ne.updated_at), '')
+            FROM note_embeddings ne
+            JOIN notes n ON n.id = ne.note_id
+            WHERE n.user_id = ? AND ne.embedding_model = ?
+        """, (user_id, model_name)).fetchone()
+        return (row[0], row[1], row[2])
+
+    def get_user_matrix(self, user_id: int,
+                        model_name: str = None) -> Optional[UserEmbeddingMatrix]:
+        """Return the cached normalized embedding matrix for a user's notes.
+
+        The matrix is rebuilt only when the user's embeddings change, so
+        similarity queries become a single matrix-vector product.
+        """
+        if model_name is None:
+            model_name = self.default_model
+        key = (self.db_path, user_id, model_name)
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            fingerprint = self._matrix_fingerprint(conn, user_id, model_name)
+
+            with _matrix_cache_lock:
+                cached = _matrix_cache.get(key)
+            if cached is not None and cached.fingerprint == fingerprint:
+                conn.close()
+                return cached
+
+            rows = conn.execute("""
+                SELECT ne.note_id, ne.embedding
+                FROM note_embeddings ne
+                JOIN notes n ON n.id = ne.note_id
+                WHERE n.user_id = ? AND ne.embedding_model = ?
+                ORDER BY ne.note_id, ne.updated_at
+            """, (user_id, model_name)).fetchall()
+            conn.close()
+
+            # Later rows win so duplicate (note, model) rows keep the newest vector
+            vectors: Dict[int, np.ndarray] = {}
+            for note_id, embedding_data in rows:
+                try:
+                    vectors[note_id] = self._deserialize_embedding(embedding_data)
+                except Exception as e:
+                    logger.warning(f"Failed to deserialize embedding for note {note_id}: {e}")
+
+            if not vectors:
+                return None
+
+            dims = {len(v) for v in vectors.values()}
+            if len(dims) > 1:
+                dim = max(dims, key=lambda d: sum(1 for v in vectors.values() if len(v) == d))
+                vectors = {nid: v for nid, v in vectors.items() if len(v) == dim}
+
+            note_ids = np.fromiter(vectors.keys(), dtype=np.int64, count=len(vectors))
+            matrix = normalize_rows(np.vstack(list(vectors.values())).astype(np.float32))
+
+            entry = UserEmbeddingMatrix(
+                note_ids=note_ids,
+                matrix=matrix,
+                fingerprint=fingerprint,
+                built_at=time.time(),
+            )
+            with _matrix_cache_lock:
+                _matrix_cache[key] = entry
+            logger.debug(f"Built embedding matrix for user {user_id}: {matrix.shape}")
+            return entry
+
+        except Exception as e:
+            logger.error(f"Failed to build embedding matrix for user {user_id}: {e}")
+            return None
+
+    def invalidate_user_matrix(self, user_id: Optional[int] = None):
+        """Drop cached matrices for one user, or for every user of this database"""
+        with _matrix_cache_lock:
+            for key in list(_matrix_cache):
+                if key[0] == self.db_path and (user_id is None or key[1] == user_id):
+                    del _matrix_cache[key]
+
     def create_embedding_job(self, note_id: int, model_name: str = None) -> bool:
         """Create a new embedding generation job"""
         if model_name is None:
@@ -434,6 +545,8 @@ class EmbeddingManager:
                 """, (model_name, model_name))
             
             conn.commit()
+            if force:
+                self.invalidate_user_matrix()
             jobs_created = conn.execute("""
                 SELECT COUNT(*) FROM embedding_jobs WHERE status = 'pending'
             """).fetchone()[0]
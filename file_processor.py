@@ -38,14 +38,8 @@ try:
 except Exception:
     pass
 
-# PDF processing
-try:
-    import PyPDF2
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
 from config import settings
+from document_extraction import PageCallback, get_document_extractor
 
 logger = logging.getLogger(__name__)
 
@@ -188,6 +182,17 @@ class FileProcessor:
         - Performs type-specific processing (image OCR, PDF extraction)
         - For audio, preserves container and queues for transcription
         """
+        result = self.store_saved_file(saved_path, original_filename)
+        if not result['success']:
+            return result
+        return self.extract_stored_file(result)
+
+    def store_saved_file(self, saved_path: Path, original_filename: str) -> Dict[str, Any]:
+        """Validate a saved file and move it into place without extracting content.
+
+        Cheap enough to run while a request waits; ``extract_stored_file`` does
+        the slow OCR/PDF work afterwards on the returned result.
+        """
         result: Dict[str, Any] = {
             'success': False,
             'error': None,
@@ -236,8 +241,20 @@ class FileProcessor:
             # Move into place
             shutil.move(str(saved_path), str(final_path))
             result['stored_filename'] = safe_filename
+            result['success'] = True
+            return result
+        except Exception as e:
+            logger.error(f"store_saved_file failed for {saved_path}: {e}")
+            result['error'] = str(e)
+            return result
 
-            # Type-specific processing
+    def extract_stored_file(self, result: Dict[str, Any], on_page: Optional[PageCallback] = None) -> Dict[str, Any]:
+        """Type-specific processing for a file placed by ``store_saved_file``"""
+        file_info = result['file_info']
+        category = file_info['category']
+        target_dir = self.audio_dir if category == 'audio' else self.uploads_dir
+        final_path = target_dir / result['stored_filename']
+        try:
             if category == 'image':
                 try:
                     converted_path = self.convert_image_to_png(final_path)
@@ -261,7 +278,7 @@ class FileProcessor:
                 result['processing_type'] = 'image_ocr'
 
             elif category == 'document':
-                text, metadata = self.extract_pdf_text(final_path)
+                text, metadata = self.extract_pdf_text(final_path, on_page=on_page)
                 result['extracted_text'] = text
                 result['metadata'] = metadata
                 result['processing_type'] = 'pdf_extraction'
@@ -277,7 +294,8 @@ class FileProcessor:
             result['success'] = True
             return result
         except Exception as e:
-            logger.error(f"process_saved_file failed for {saved_path}: {e}")
+            logger.error(f"extract_stored_file failed for {final_path}: {e}")
+            result['success'] = False
             result['error'] = str(e)
             return result
     
@@ -372,10 +390,9 @@ class FileProcessor:
                             exif_data[tag] = value
                         metadata['exif'] = exif_data
                 
-                # Perform OCR
+                # Perform OCR in the extraction worker pool
                 try:
-                    text = pytesseract.image_to_string(img, config='--psm 3')
-                    text = text.strip()
+                    text = get_document_extractor().ocr_image(file_path)
                     metadata['ocr_success'] = True
                     metadata['text_length'] = len(text)
                     return text, self._json_safe(metadata)
@@ -388,46 +405,21 @@ class FileProcessor:
             logger.error(f"Failed to process image {file_path}: {e}")
             return "", {"error": str(e)}
     
-    def extract_pdf_text(self, file_path: Path) -> Tuple[str, Dict[str, Any]]:
+    def extract_pdf_text(self, file_path: Path, on_page: Optional[PageCallback] = None) -> Tuple[str, Dict[str, Any]]:
         """
         Extract text from PDF
         Returns (extracted_text, metadata)
+
+        Pages are extracted in parallel by the document extraction engine;
+        ``on_page(page_result, page_count)`` is called as each page arrives.
         """
-        if not PDF_AVAILABLE:
+        extractor = get_document_extractor()
+        if not extractor.available:
             return "", {"error": "PDF processing not available"}
         
         try:
-            text_content = []
-            metadata = {'pages': 0, 'extraction_method': 'PyPDF2'}
-            
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                metadata['pages'] = len(pdf_reader.pages)
-                
-                # Extract metadata
-                if pdf_reader.metadata:
-                    pdf_metadata = {}
-                    for key, value in pdf_reader.metadata.items():
-                        if isinstance(value, str):
-                            pdf_metadata[key.replace('/', '')] = value
-                    metadata['pdf_info'] = pdf_metadata
-                
-                # Extract text from all pages
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text.strip():
-                            text_content.append(f"[Page {page_num}]\n{page_text.strip()}")
-                    except Exception as page_error:
-                        logger.warning(f"Failed to extract text from page {page_num}: {page_error}")
-                        continue
-                
-                full_text = "\n\n".join(text_content)
-                metadata['text_length'] = len(full_text)
-                metadata['extraction_success'] = True
-                
-                return full_text, self._json_safe(metadata)
-                
+            full_text, metadata = extractor.extract_pdf(file_path, on_page=on_page)
+            return full_text, self._json_safe(metadata)
         except Exception as e:
             logger.error(f"Failed to process PDF {file_path}: {e}")
             return "", {"error": str(e)}
@@ -38,6 +38,8 @@ from pathlib import Path
 from typing import Any, Dict, List
 from collections import Counter
 
+from services.note_index import NOTE_MATCHES_CTE
+
 try:
     from mcp.server import Server
     from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
@@ -348,15 +350,16 @@ async def search_notes_tool(args: Dict[str, Any]) -> List[TextContent]:
     cursor = conn.cursor()
 
     try:
-        # Search using FTS5
-        cursor.execute("""
+        # Search using FTS5 (best-matching chunk per note)
+        cursor.execute(f"""
+            WITH {NOTE_MATCHES_CTE}
             SELECT n.id, n.title, n.content, n.tags, n.created_at, n.type
-            FROM notes n
-            JOIN notes_fts fts ON n.id = fts.rowid
-            WHERE fts MATCH ? AND n.user_id = ?
-            ORDER BY fts.rank
-            LIMIT ?
-        """, (query, user_id, limit))
+            FROM note_matches
+            JOIN notes n ON n.id = note_matches.id
+            WHERE n.user_id = :user_id
+            ORDER BY note_matches.kw_rank
+            LIMIT :limit
+        """, {"match": query, "user_id": user_id, "limit": limit})
 
         results = cursor.fetchall()
 
@@ -179,7 +179,10 @@ def main():
         for name, path in pending:
             print(f"  - {name}")
     else:
-        runner.run_migrations()
+        if runner.run_migrations():
+            # The app's own tables and backfills, versioned in services/app_schema.py
+            from services.app_schema import ensure_app_schema
+            ensure_app_schema(lambda: sqlite3.connect(args.db))
 
 
 if __name__ == "__main__":
@@ -4,18 +4,20 @@ Note Relationships and Cross-Note Discovery for Second Brain
 Implements semantic similarity clustering and related note discovery
 """
 
+import asyncio
 import sqlite3
 import numpy as np
-import pickle
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
 from dataclasses import dataclass
 import logging
 from datetime import datetime, timedelta
 import time
 import json
 
+from db_writer import BatchedWriter, get_batched_writer
+from embedding_manager import normalize_rows
+
 try:
-    from sklearn.metrics.pairwise import cosine_similarity
     from sklearn.cluster import DBSCAN
     import networkx as nx
     CLUSTERING_AVAILABLE = True
@@ -25,6 +27,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Clusters merge when their centroids are this far from the join threshold towards 1.0
+CLUSTER_MERGE_MARGIN = 0.5
+
 @dataclass
 class RelatedNote:
     """Represents a note related to another note"""
@@ -47,11 +52,40 @@ class NoteCluster:
     avg_similarity: float
     created_at: str
 
+@dataclass
+class _ClusterState:
+    """Working copy of a stored cluster during incremental clustering"""
+    members: set
+    vector_sum: np.ndarray          # sum of members' unit embeddings
+    db_id: Optional[int] = None
+    theme: Optional[str] = None
+    representative_note_id: Optional[int] = None
+    avg_similarity: float = 0.0
+    created_at: Optional[str] = None
+    dirty: bool = True
+    removed: bool = False
+
+    def unit_centroid(self) -> np.ndarray:
+        norm = np.linalg.norm(self.vector_sum)
+        return self.vector_sum / norm if norm else self.vector_sum
+
+    def recompute_sum(self, matrix: np.ndarray, id_to_row: Dict[int, int]):
+        rows = [id_to_row[nid] for nid in self.members]
+        self.vector_sum = matrix[rows].sum(axis=0) if rows else np.zeros(matrix.shape[1], np.float32)
+
+
+# Pending cluster write: the batched-writer op and what to do with the ids it returns
+_ClusterPlan = Tuple[Callable[[sqlite3.Connection], List[int]],
+                     Callable[[List[int]], List[NoteCluster]]]
+
+
 class NoteRelationshipEngine:
     """Discovers and manages relationships between notes"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, writer: BatchedWriter = None):
         self.db_path = db_path
+        # All writes go through one batched writer to avoid lock contention with captures
+        self.writer = writer or get_batched_writer(db_path)
         self._semantic_search = None
         self._embedding_manager = None
         self._init_database()
@@ -127,7 +161,17 @@ class NoteRelationshipEngine:
             )
         """)
         
+        # Incremental clustering state (added after the original schema)
+        cluster_cols = [row[1] for row in conn.execute("PRAGMA table_info(note_clusters)")]
+        if 'user_id' not in cluster_cols:
+            conn.execute("ALTER TABLE note_clusters ADD COLUMN user_id INTEGER")
+        if 'centroid' not in cluster_cols:
+            conn.execute("ALTER TABLE note_clusters ADD COLUMN centroid BLOB")
+        if 'is_active' not in cluster_cols:
+            conn.execute("ALTER TABLE note_clusters ADD COLUMN is_active INTEGER DEFAULT 1")
+        
         # Create indexes for performance
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_note_clusters_user ON note_clusters(user_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_relationships_source ON note_relationships(source_note_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_relationships_target ON note_relationships(target_note_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_relationships_score ON note_relationships(similarity_score)")
@@ -149,78 +193,73 @@ class NoteRelationshipEngine:
             return self._fallback_similarity_search(note_id, user_id, limit)
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            
-            # Get the source note embedding
-            source_embedding = embedding_manager.get_embedding(note_id)
-            if source_embedding is None:
-                logger.warning(f"No embedding found for note {note_id}")
-                return []
-            
-            # Get all embeddings for user's notes
-            all_embeddings = embedding_manager.get_all_embeddings()
-            if not all_embeddings:
+            # Per-user normalized matrix, cached until the user's embeddings change
+            user_matrix = embedding_manager.get_user_matrix(user_id)
+            if user_matrix is None:
                 return []
             
-            # Get user's note IDs for filtering
-            user_note_ids = {row[0] for row in conn.execute("""
-                SELECT id FROM notes WHERE user_id = ? AND id != ?
-            """, (user_id, note_id)).fetchall()}
+            source_idx = user_matrix.index_of(note_id)
+            if source_idx is not None:
+                source_vector = user_matrix.matrix[source_idx]
+            else:
+                source_embedding = embedding_manager.get_embedding(note_id)
+                if source_embedding is None:
+                    logger.warning(f"No embedding found for note {note_id}")
+                    return []
+                source_vector = normalize_rows(
+                    np.asarray(source_embedding, dtype=np.float32).reshape(1, -1)
+                )[0]
+                if source_vector.shape[0] != user_matrix.matrix.shape[1]:
+                    logger.warning(f"Embedding dimension mismatch for note {note_id}")
+                    return []
             
-            # Filter embeddings to user's notes only
-            user_embeddings = [(nid, emb) for nid, emb in all_embeddings 
-                              if nid in user_note_ids]
+            # One matrix-vector product scores every note
+            scores = user_matrix.matrix @ source_vector
+            if source_idx is not None:
+                scores[source_idx] = -np.inf
             
-            if not user_embeddings:
+            candidate_idx = np.nonzero(scores >= min_similarity)[0]
+            if len(candidate_idx) == 0:
                 return []
             
-            # Calculate similarities
-            similarities = []
-            for target_note_id, target_embedding in user_embeddings:
-                similarity = cosine_similarity(
-                    source_embedding.reshape(1, -1),
-                    target_embedding.reshape(1, -1)
-                )[0][0]
-                
-                if similarity >= min_similarity:
-                    similarities.append((target_note_id, float(similarity)))
+            # Over-fetch when filtering by type so the SQL filter can't starve the result
+            k = limit * 4 if include_types else limit
+            if len(candidate_idx) > k:
+                top = np.argpartition(scores[candidate_idx], -k)[-k:]
+                candidate_idx = candidate_idx[top]
+            candidate_idx = candidate_idx[np.argsort(scores[candidate_idx])[::-1]]
+            similarities = [
+                (int(user_matrix.note_ids[i]), float(scores[i])) for i in candidate_idx
+            ]
             
-            # Sort by similarity and limit
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            similarities = similarities[:limit]
+            note_rows = self._fetch_note_details(
+                [nid for nid, _ in similarities], user_id, include_types
+            )
             
-            # Get note details
             related_notes = []
             for target_note_id, similarity in similarities:
-                note_data = conn.execute("""
-                    SELECT title, summary, tags, content, timestamp, type
-                    FROM notes WHERE id = ?
-                """, (target_note_id,)).fetchone()
+                note_data = note_rows.get(target_note_id)
+                if not note_data:
+                    continue
                 
-                if note_data:
-                    # Apply type filter if specified
-                    if include_types and note_data['type'] not in include_types:
-                        continue
-                    
-                    # Generate snippet
-                    snippet = self._generate_snippet(
-                        note_data['content'] or note_data['summary'] or note_data['title'], 
-                        150
-                    )
-                    
-                    related_notes.append(RelatedNote(
-                        note_id=target_note_id,
-                        title=note_data['title'] or '',
-                        summary=note_data['summary'] or '',
-                        tags=note_data['tags'].split(',') if note_data['tags'] else [],
-                        similarity_score=similarity,
-                        relationship_type='semantic',
-                        snippet=snippet,
-                        timestamp=note_data['timestamp'] or ''
-                    ))
-            
-            conn.close()
+                # Generate snippet
+                snippet = self._generate_snippet(
+                    note_data['content'] or note_data['summary'] or note_data['title'], 
+                    150
+                )
+                
+                related_notes.append(RelatedNote(
+                    note_id=target_note_id,
+                    title=note_data['title'] or '',
+                    summary=note_data['summary'] or '',
+                    tags=note_data['tags'].split(',') if note_data['tags'] else [],
+                    similarity_score=similarity,
+                    relationship_type='semantic',
+                    snippet=snippet,
+                    timestamp=note_data['timestamp'] or ''
+                ))
+                if len(related_notes) >= limit:
+                    break
             
             # Store relationships in database for future reference
             self._store_relationships(note_id, related_notes)
@@ -231,6 +270,29 @@ class NoteRelationshipEngine:
             logger.error(f"Failed to find similar notes: {e}")
             return []
     
+    def _fetch_note_details(self, note_ids: List[int], user_id: int,
+                            include_types: List[str] = None) -> Dict[int, sqlite3.Row]:
+        """Fetch display fields for many notes in a single query"""
+        if not note_ids:
+            return {}
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        
+        placeholders = ','.join('?' * len(note_ids))
+        query = f"""
+            SELECT id, title, summary, tags, content, timestamp, type
+            FROM notes WHERE id IN ({placeholders}) AND user_id = ?
+        """
+        params = [*note_ids, user_id]
+        if include_types:
+            query += f" AND type IN ({','.join('?' * len(include_types))})"
+            params.extend(include_types)
+        
+        rows = {row['id']: row for row in conn.execute(query, params).fetchall()}
+        conn.close()
+        return rows
+    
     def _fallback_similarity_search(self, note_id: int, user_id: int, 
                                    limit: int) -> List[RelatedNote]:
         """Fallback similarity search using tag and content overlap"""
@@ -307,163 +369,484 @@ class NoteRelationshipEngine:
         return text[:max_length].rsplit(' ', 1)[0] + "..."
     
     def _store_relationships(self, source_note_id: int, related_notes: List[RelatedNote]):
-        """Store note relationships in database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            
+        """Queue note relationships for the batched writer (fire-and-forget)"""
+        now = datetime.now().isoformat()
+        rows = [
+            (source_note_id, related.note_id, related.relationship_type,
+             related.similarity_score,
+             json.dumps({
+                 'snippet': related.snippet,
+                 'common_tags': list(set(related.tags)) if related.tags else []
+             }),
+             now)
+            for related in related_notes
+        ]
+        
+        def write(conn: sqlite3.Connection):
             # Clear existing relationships for this source note
             conn.execute("""
                 DELETE FROM note_relationships 
                 WHERE source_note_id = ? AND relationship_type = 'semantic'
             """, (source_note_id,))
-            
-            # Store new relationships
-            for related in related_notes:
-                metadata = json.dumps({
-                    'snippet': related.snippet,
-                    'common_tags': list(set(related.tags)) if related.tags else []
-                })
-                
-                conn.execute("""
-                    INSERT OR REPLACE INTO note_relationships 
-                    (source_note_id, target_note_id, relationship_type, 
-                     similarity_score, metadata, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (source_note_id, related.note_id, related.relationship_type,
-                      related.similarity_score, metadata, datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Failed to store relationships: {e}")
+            conn.executemany("""
+                INSERT OR REPLACE INTO note_relationships 
+                (source_note_id, target_note_id, relationship_type, 
+                 similarity_score, metadata, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+        
+        def log_failure(f):
+            if f.exception():
+                logger.error(f"Failed to store relationships: {f.exception()}")
+
+        future = self.writer.submit(write)
+        future.add_done_callback(log_failure)
+        return future
     
     def discover_note_clusters(self, user_id: int, min_cluster_size: int = 3,
-                              similarity_threshold: float = 0.4) -> List[NoteCluster]:
-        """Discover clusters of related notes using DBSCAN clustering"""
-        if not CLUSTERING_AVAILABLE:
-            logger.warning("Clustering not available - dependencies not installed")
+                              similarity_threshold: float = 0.4,
+                              full_rebuild: bool = False) -> List[NoteCluster]:
+        """Discover clusters of related notes.
+
+        Clustering is incremental by default: new and edited notes are assigned
+        to the nearest stored cluster centroid (leader-follower), and only the
+        clusters they touch are split or merged. A full DBSCAN rebuild runs when
+        requested or when the user has no stored clusters yet.
+        """
+        plan = self._plan_clusters(user_id, min_cluster_size, similarity_threshold, full_rebuild)
+        return self._apply_cluster_plan(plan, "Cluster discovery")
+    
+    async def discover_note_clusters_async(self, user_id: int, min_cluster_size: int = 3,
+                                           similarity_threshold: float = 0.4,
+                                           full_rebuild: bool = False) -> List[NoteCluster]:
+        """``discover_note_clusters`` for the event loop: clustering runs in a
+        thread and the cluster write is awaited rather than blocked on"""
+        plan = await asyncio.to_thread(
+            self._plan_clusters, user_id, min_cluster_size, similarity_threshold, full_rebuild
+        )
+        if plan is None:
             return []
-        
+        write, finish = plan
+        try:
+            cluster_ids = await asyncio.wrap_future(await self.writer.submit_async(write))
+            return finish(cluster_ids)
+        except Exception as e:
+            logger.error(f"Cluster discovery failed: {e}")
+            return []
+    
+    def rebuild_note_clusters(self, user_id: int, min_cluster_size: int = 3,
+                              similarity_threshold: float = 0.4,
+                              user_matrix=None) -> List[NoteCluster]:
+        """Recluster all of a user's notes from scratch and replace stored clusters"""
+        plan = self._plan_rebuild(user_id, min_cluster_size, similarity_threshold, user_matrix)
+        return self._apply_cluster_plan(plan, "Cluster rebuild")
+    
+    def _apply_cluster_plan(self, plan: Optional['_ClusterPlan'], what: str) -> List[NoteCluster]:
+        if plan is None:
+            return []
+        write, finish = plan
+        try:
+            return finish(self.writer.submit(write).result(timeout=60))
+        except Exception as e:
+            logger.error(f"{what} failed: {e}")
+            return []
+    
+    def _plan_clusters(self, user_id: int, min_cluster_size: int,
+                       similarity_threshold: float, full_rebuild: bool) -> Optional['_ClusterPlan']:
+        """Cluster in memory and return the pending write; None when there is nothing to do"""
         embedding_manager = self._get_embedding_manager()
         if not embedding_manager:
-            return []
+            return None
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            user_matrix = embedding_manager.get_user_matrix(user_id)
+            if user_matrix is None or len(user_matrix.note_ids) < min_cluster_size:
+                count = 0 if user_matrix is None else len(user_matrix.note_ids)
+                logger.info(f"Not enough notes for clustering: {count}")
+                return None
             
-            # Get user's notes with embeddings
-            note_data = conn.execute("""
-                SELECT n.id, n.title, n.summary, n.tags, ne.embedding
-                FROM notes n
-                JOIN note_embeddings ne ON n.id = ne.note_id
-                WHERE n.user_id = ?
-                ORDER BY n.timestamp DESC
-            """, (user_id,)).fetchall()
+            states = None if full_rebuild else self._load_cluster_state(user_id)
+            if not states:
+                return self._plan_rebuild(
+                    user_id, min_cluster_size, similarity_threshold, user_matrix
+                )
             
-            if len(note_data) < min_cluster_size:
-                logger.info(f"Not enough notes for clustering: {len(note_data)}")
-                return []
+            id_to_row = {int(nid): i for i, nid in enumerate(user_matrix.note_ids)}
+            matrix = user_matrix.matrix
             
-            # Extract embeddings and note info
-            embeddings = []
-            notes_info = []
-            
-            for row in note_data:
-                note_id, title, summary, tags, embedding_blob = row
-                try:
-                    embedding = pickle.loads(embedding_blob)
-                    embeddings.append(embedding)
-                    notes_info.append({
-                        'id': note_id,
-                        'title': title or '',
-                        'summary': summary or '',
-                        'tags': tags.split(',') if tags else []
-                    })
-                except Exception as e:
-                    logger.warning(f"Failed to load embedding for note {note_id}: {e}")
-                    continue
+            # Drop members whose note or embedding is gone, and pull out edited notes
+            stale = self._stale_cluster_members(user_id, embedding_manager.default_model)
+            assigned = set()
+            for state in states:
+                keep = {nid for nid in state.members if nid in id_to_row and nid not in stale}
+                if keep != state.members:
+                    state.members = keep
+                    state.dirty = True
+                assigned |= keep
+            for state in states:
+                if state.dirty:
+                    state.recompute_sum(matrix, id_to_row)
             
-            if len(embeddings) < min_cluster_size:
-                return []
+            pending = [id_to_row[nid] for nid in id_to_row if nid not in assigned]
+            self._assign_to_clusters(states, pending, user_matrix, similarity_threshold)
+            states = self._split_and_merge(
+                states, matrix, id_to_row, similarity_threshold, min_cluster_size
+            )
             
-            # Perform DBSCAN clustering
-            embeddings_array = np.array(embeddings)
+            write, finish = self._plan_cluster_write(
+                user_id, states, matrix, id_to_row, min_cluster_size
+            )
             
-            # Convert similarity threshold to distance threshold for DBSCAN
-            distance_threshold = 1 - similarity_threshold
+            def finish_and_log(cluster_ids: List[int]) -> List[NoteCluster]:
+                clusters = finish(cluster_ids)
+                logger.info(
+                    f"Incrementally clustered {len(pending)} notes for user {user_id}: "
+                    f"{len(clusters)} clusters"
+                )
+                return clusters
             
-            clustering = DBSCAN(
-                eps=distance_threshold, 
-                min_samples=min_cluster_size, 
-                metric='cosine'
-            ).fit(embeddings_array)
+            return write, finish_and_log
             
-            # Process clusters
-            clusters = []
-            unique_labels = set(clustering.labels_)
+        except Exception as e:
+            logger.error(f"Cluster discovery failed: {e}")
+            return None
+    
+    def _plan_rebuild(self, user_id: int, min_cluster_size: int,
+                      similarity_threshold: float, user_matrix=None) -> Optional['_ClusterPlan']:
+        if user_matrix is None:
+            embedding_manager = self._get_embedding_manager()
+            if not embedding_manager:
+                return None
+            user_matrix = embedding_manager.get_user_matrix(user_id)
+        if user_matrix is None or len(user_matrix.note_ids) < min_cluster_size:
+            return None
+        
+        try:
+            matrix = user_matrix.matrix
+            id_to_row = {int(nid): i for i, nid in enumerate(user_matrix.note_ids)}
             
-            for label in unique_labels:
-                if label == -1:  # Skip noise points
-                    continue
-                
-                # Get notes in this cluster
-                cluster_indices = np.where(clustering.labels_ == label)[0]
-                cluster_note_ids = [notes_info[i]['id'] for i in cluster_indices]
-                cluster_notes = [notes_info[i] for i in cluster_indices]
-                
-                if len(cluster_note_ids) < min_cluster_size:
-                    continue
-                
-                # Calculate average similarity within cluster
-                cluster_embeddings = embeddings_array[cluster_indices]
-                avg_similarity = self._calculate_avg_cluster_similarity(cluster_embeddings)
-                
-                # Determine cluster theme based on common tags and titles
-                cluster_theme = self._determine_cluster_theme(cluster_notes)
-                
-                # Choose representative note (most central)
-                representative_idx = self._find_representative_note(cluster_embeddings, cluster_indices)
-                representative_note_id = notes_info[representative_idx]['id']
-                
-                cluster = NoteCluster(
-                    cluster_id=len(clusters),
-                    note_ids=cluster_note_ids,
-                    cluster_theme=cluster_theme,
-                    representative_note_id=representative_note_id,
-                    avg_similarity=avg_similarity,
-                    created_at=datetime.now().isoformat()
-                )
-                
-                clusters.append(cluster)
+            states: List[_ClusterState] = []
+            noise_rows = list(range(len(matrix)))
+            if CLUSTERING_AVAILABLE:
+                # Convert similarity threshold to distance threshold for DBSCAN
+                labels = DBSCAN(
+                    eps=1 - similarity_threshold,
+                    min_samples=min_cluster_size,
+                    metric='cosine'
+                ).fit(matrix).labels_
+                for label in set(labels):
+                    if label == -1:
+                        continue
+                    rows = np.nonzero(labels == label)[0]
+                    state = _ClusterState(
+                        members={int(user_matrix.note_ids[i]) for i in rows},
+                        vector_sum=matrix[rows].sum(axis=0),
+                    )
+                    states.append(state)
+                noise_rows = [int(i) for i in np.nonzero(labels == -1)[0]]
             
-            # Store clusters in database
-            self._store_clusters(user_id, clusters)
+            # Noise points (or everything, without sklearn) go through leader-follower
+            # so the incremental path never has to revisit them
+            self._assign_to_clusters(states, noise_rows, user_matrix, similarity_threshold)
             
-            conn.close()
-            logger.info(f"Discovered {len(clusters)} note clusters for user {user_id}")
+            write, finish = self._plan_cluster_write(
+                user_id, states, matrix, id_to_row, min_cluster_size, replace_existing=True
+            )
             
-            return clusters
+            def finish_and_log(cluster_ids: List[int]) -> List[NoteCluster]:
+                clusters = finish(cluster_ids)
+                logger.info(f"Rebuilt {len(clusters)} note clusters for user {user_id}")
+                return clusters
+            
+            return write, finish_and_log
             
         except Exception as e:
-            logger.error(f"Cluster discovery failed: {e}")
-            return []
+            logger.error(f"Cluster rebuild failed: {e}")
+            return None
+    
+    def _assign_to_clusters(self, states: List['_ClusterState'], rows: List[int],
+                            user_matrix, similarity_threshold: float):
+        """Leader-follower: join the nearest centroid above threshold or seed a new cluster"""
+        if not rows:
+            return
+        
+        matrix = user_matrix.matrix
+        # Room for every row seeding its own cluster, so growth never reallocates
+        centroids = np.empty((len(states) + len(rows), matrix.shape[1]), dtype=matrix.dtype)
+        for i, s in enumerate(states):
+            centroids[i] = s.unit_centroid()
+        count = len(states)
+        
+        for row in rows:
+            vector = matrix[row]
+            note_id = int(user_matrix.note_ids[row])
+            best = -1
+            if count:
+                scores = centroids[:count] @ vector
+                best = int(np.argmax(scores))
+                if scores[best] < similarity_threshold:
+                    best = -1
+            
+            if best >= 0:
+                state = states[best]
+                state.members.add(note_id)
+                state.vector_sum = state.vector_sum + vector
+                state.dirty = True
+                centroids[best] = state.unit_centroid()
+            else:
+                states.append(_ClusterState(members={note_id}, vector_sum=vector.copy()))
+                centroids[count] = vector
+                count += 1
+    
+    def _split_and_merge(self, states: List['_ClusterState'], matrix: np.ndarray,
+                         id_to_row: Dict[int, int], similarity_threshold: float,
+                         min_cluster_size: int) -> List['_ClusterState']:
+        """Lazily split incoherent clusters and merge near-duplicate ones.
+
+        Only clusters touched in this pass are considered, so untouched
+        clusters cost nothing.
+        """
+        # Split: a touched cluster whose cohesion fell below threshold is bisected
+        result = []
+        for state in states:
+            if state.dirty and len(state.members) >= 2 * min_cluster_size:
+                member_ids = list(state.members)
+                rows = [id_to_row[nid] for nid in member_ids]
+                if self._calculate_avg_cluster_similarity(matrix[rows]) < similarity_threshold:
+                    result.extend(self._bisect_cluster(state, member_ids, rows, matrix))
+                    continue
+            result.append(state)
+        
+        # Merge: touched clusters whose centroids nearly coincide with another's
+        merge_threshold = similarity_threshold + (1 - similarity_threshold) * CLUSTER_MERGE_MARGIN
+        dirty = [i for i, s in enumerate(result) if s.dirty]
+        if len(result) > 1 and dirty:
+            centroids = np.vstack([s.unit_centroid() for s in result])
+            # Only touched clusters look for partners: |dirty| x n, not n x n
+            gram = centroids[dirty] @ centroids.T
+            gram[np.arange(len(dirty)), dirty] = -1.0
+            for k, i in enumerate(dirty):
+                state = result[i]
+                if state.removed:
+                    continue
+                for j in np.argsort(gram[k])[::-1]:
+                    if gram[k, j] < merge_threshold:
+                        break
+                    other = result[j]
+                    if other.removed:
+                        continue
+                    keep, drop = (state, other) if len(state.members) >= len(other.members) \
+                        else (other, state)
+                    keep.members |= drop.members
+                    keep.vector_sum = keep.vector_sum + drop.vector_sum
+                    keep.dirty = True
+                    drop.removed = True
+                    drop.members = set()
+                    break
+        return result
+    
+    def _bisect_cluster(self, state: '_ClusterState', member_ids: List[int],
+                        rows: List[int], matrix: np.ndarray) -> List['_ClusterState']:
+        """Spherical 2-means over one cluster's members"""
+        vectors = matrix[rows]
+        note_ids = np.array(member_ids)
+        # Seeds: farthest member from the centroid, then farthest from that one
+        a = int(np.argmin(vectors @ state.unit_centroid()))
+        b = int(np.argmin(vectors @ vectors[a]))
+        seeds = vectors[[a, b]]
+        for _ in range(5):
+            labels = np.argmax(vectors @ seeds.T, axis=1)
+            if labels.min() == labels.max():
+                return [state]
+            seeds = normalize_rows(np.vstack([vectors[labels == k].sum(axis=0) for k in (0, 1)]))
+        
+        first = _ClusterState(
+            members={int(nid) for nid in note_ids[labels == 0]},
+            vector_sum=vectors[labels == 0].sum(axis=0),
+            db_id=state.db_id,
+            created_at=state.created_at,
+        )
+        second = _ClusterState(
+            members={int(nid) for nid in note_ids[labels == 1]},
+            vector_sum=vectors[labels == 1].sum(axis=0),
+        )
+        return [first, second]
+    
+    def _load_cluster_state(self, user_id: int) -> List['_ClusterState']:
+        """Load a user's stored clusters with centroids and members"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT c.id, c.centroid, c.note_count, c.cluster_theme,
+                   c.representative_note_id, c.avg_similarity, c.created_at,
+                   GROUP_CONCAT(cm.note_id)
+            FROM note_clusters c
+            LEFT JOIN cluster_membership cm ON cm.cluster_id = c.id
+            WHERE c.user_id = ? AND c.centroid IS NOT NULL
+            GROUP BY c.id
+        """, (user_id,)).fetchall()
+        conn.close()
+        
+        states = []
+        for (cluster_id, centroid_blob, note_count, theme, representative,
+             avg_similarity, created_at, member_ids) in rows:
+            members = {int(nid) for nid in member_ids.split(',')} if member_ids else set()
+            centroid = np.frombuffer(centroid_blob, dtype=np.float32)
+            states.append(_ClusterState(
+                members=members,
+                vector_sum=centroid * max(note_count or len(members), 1),
+                db_id=cluster_id,
+                theme=theme,
+                representative_note_id=representative,
+                avg_similarity=avg_similarity or 0.0,
+                created_at=created_at,
+                dirty=False,
+            ))
+        return states
+    
+    def _stale_cluster_members(self, user_id: int, model_name: str) -> set:
+        """Notes whose embedding changed after they were assigned to a cluster"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT DISTINCT cm.note_id
+            FROM cluster_membership cm
+            JOIN note_clusters c ON c.id = cm.cluster_id
+            JOIN note_embeddings ne ON ne.note_id = cm.note_id
+            WHERE c.user_id = ? AND ne.embedding_model = ?
+              AND ne.updated_at > cm.created_at
+        """, (user_id, model_name)).fetchall()
+        conn.close()
+        return {row[0] for row in rows}
+    
+    def _delete_user_clusters(self, conn: sqlite3.Connection, user_id: int):
+        """Remove every stored cluster for a user, including legacy rows without user_id"""
+        legacy_ids = [row[0] for row in conn.execute("""
+            SELECT DISTINCT cm.cluster_id
+            FROM cluster_membership cm
+            JOIN notes n ON n.id = cm.note_id
+            WHERE n.user_id = ?
+        """, (user_id,)).fetchall()]
+        cluster_ids = legacy_ids + [row[0] for row in conn.execute(
+            "SELECT id FROM note_clusters WHERE user_id = ?", (user_id,)
+        ).fetchall()]
+        if cluster_ids:
+            placeholders = ','.join('?' * len(cluster_ids))
+            conn.execute(f"DELETE FROM cluster_membership WHERE cluster_id IN ({placeholders})",
+                         cluster_ids)
+            conn.execute(f"DELETE FROM note_clusters WHERE id IN ({placeholders})", cluster_ids)
+    
+    def _plan_cluster_write(self, user_id: int, states: List['_ClusterState'],
+                            matrix: np.ndarray, id_to_row: Dict[int, int],
+                            min_cluster_size: int,
+                            replace_existing: bool = False) -> '_ClusterPlan':
+        """Batched-writer op for the touched clusters, and the step that turns
+        its new cluster ids into the active clusters once it has committed"""
+        dirty = [s for s in states if s.dirty and not s.removed and s.members]
+        dropped = [s.db_id for s in states
+                   if s.db_id is not None and (s.removed or not s.members)]
+        
+        tags_by_note = {}
+        dirty_note_ids = [nid for s in dirty for nid in s.members]
+        conn = sqlite3.connect(self.db_path)
+        for start in range(0, len(dirty_note_ids), 500):
+            chunk = dirty_note_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for note_id, tags in conn.execute(
+                f"SELECT id, tags FROM notes WHERE id IN ({placeholders})", chunk
+            ).fetchall():
+                tags_by_note[note_id] = tags.split(',') if tags else []
+        conn.close()
+        
+        # Cluster statistics are computed here so the writer only runs SQL
+        now = datetime.now().isoformat()
+        records = []
+        for state in dirty:
+            member_ids = sorted(state.members)
+            vectors = matrix[[id_to_row[nid] for nid in member_ids]]
+            state.avg_similarity = self._calculate_avg_cluster_similarity(vectors)
+            state.representative_note_id = member_ids[
+                int(np.argmax(vectors @ state.unit_centroid()))
+            ]
+            state.theme = self._determine_cluster_theme(
+                [{'tags': tags_by_note.get(nid, [])} for nid in member_ids]
+            )
+            centroid = (state.vector_sum / len(member_ids)).astype(np.float32).tobytes()
+            active = 1 if len(member_ids) >= min_cluster_size else 0
+            records.append((state, member_ids, centroid, active))
+        
+        def write(conn: sqlite3.Connection) -> List[int]:
+            if replace_existing:
+                self._delete_user_clusters(conn, user_id)
+            for cluster_id in dropped:
+                conn.execute("DELETE FROM cluster_membership WHERE cluster_id = ?", (cluster_id,))
+                conn.execute("DELETE FROM note_clusters WHERE id = ?", (cluster_id,))
+            
+            cluster_ids = []
+            for state, member_ids, centroid, active in records:
+                cluster_id = state.db_id
+                if cluster_id is None:
+                    cursor = conn.execute("""
+                        INSERT INTO note_clusters
+                        (cluster_theme, representative_note_id, avg_similarity, note_count,
+                         user_id, centroid, is_active, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (state.theme, state.representative_note_id, state.avg_similarity,
+                          len(member_ids), user_id, centroid, active, now))
+                    cluster_id = cursor.lastrowid
+                else:
+                    conn.execute("""
+                        UPDATE note_clusters
+                        SET cluster_theme = ?, representative_note_id = ?, avg_similarity = ?,
+                            note_count = ?, centroid = ?, is_active = ?, updated_at = ?
+                        WHERE id = ?
+                    """, (state.theme, state.representative_note_id, state.avg_similarity,
+                          len(member_ids), centroid, active, now, cluster_id))
+                    conn.execute("DELETE FROM cluster_membership WHERE cluster_id = ?",
+                                 (cluster_id,))
+                
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cluster_membership (cluster_id, note_id) VALUES (?, ?)",
+                    [(cluster_id, nid) for nid in member_ids]
+                )
+                cluster_ids.append(cluster_id)
+            return cluster_ids
+        
+        def finish(cluster_ids: List[int]) -> List[NoteCluster]:
+            for (state, _, _, _), cluster_id in zip(records, cluster_ids):
+                if state.db_id is None:
+                    state.db_id = cluster_id
+                    state.created_at = now
+                state.dirty = False
+            
+            return [
+                NoteCluster(
+                    cluster_id=state.db_id,
+                    note_ids=sorted(state.members),
+                    cluster_theme=state.theme or f"Related notes ({len(state.members)} notes)",
+                    representative_note_id=state.representative_note_id,
+                    avg_similarity=state.avg_similarity,
+                    created_at=state.created_at or now
+                )
+                for state in states
+                if not state.removed and len(state.members) >= min_cluster_size
+            ]
+        
+        return write, finish
     
     def _calculate_avg_cluster_similarity(self, cluster_embeddings: np.ndarray) -> float:
-        """Calculate average pairwise similarity within cluster"""
-        if len(cluster_embeddings) < 2:
+        """Calculate average pairwise similarity within cluster.
+
+        For unit-length rows the Gram matrix X·Xᵀ sums to ||Σx||², so the mean of
+        its off-diagonal entries is computed in O(n·d) without materialising it.
+        """
+        n = len(cluster_embeddings)
+        if n < 2:
             return 1.0
         
-        similarities = []
-        for i in range(len(cluster_embeddings)):
-            for j in range(i + 1, len(cluster_embeddings)):
-                sim = cosine_similarity(
-                    cluster_embeddings[i:i+1], 
-                    cluster_embeddings[j:j+1]
-                )[0][0]
-                similarities.append(sim)
-        
-        return float(np.mean(similarities)) if similarities else 0.0
+        unit = normalize_rows(np.asarray(cluster_embeddings, dtype=np.float32))
+        total = unit.sum(axis=0)
+        gram_sum = float(total @ total)
+        diagonal = float(np.einsum('ij,ij->', unit, unit))
+        return (gram_sum - diagonal) / (n * (n - 1))
     
     def _determine_cluster_theme(self, cluster_notes: List[Dict]) -> str:
         """Determine the theme/topic of a cluster based on common elements"""
@@ -493,64 +876,13 @@ class NoteRelationshipEngine:
         if len(cluster_embeddings) == 1:
             return cluster_indices[0]
         
-        # Calculate centroid
-        centroid = np.mean(cluster_embeddings, axis=0)
-        
-        # Find note closest to centroid
-        distances = []
-        for embedding in cluster_embeddings:
-            distance = 1 - cosine_similarity(
-                centroid.reshape(1, -1), 
-                embedding.reshape(1, -1)
-            )[0][0]
-            distances.append(distance)
+        unit = normalize_rows(np.asarray(cluster_embeddings, dtype=np.float32))
+        centroid = unit.mean(axis=0)
         
-        closest_idx = np.argmin(distances)
+        # Highest cosine to the centroid == smallest cosine distance
+        closest_idx = int(np.argmax(unit @ centroid))
         return cluster_indices[closest_idx]
     
-    def _store_clusters(self, user_id: int, clusters: List[NoteCluster]):
-        """Store discovered clusters in database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # Clear existing clusters for this user
-            # (This is a simple approach - in production you might want more sophisticated cluster management)
-            user_note_ids = [row[0] for row in conn.execute("""
-                SELECT id FROM notes WHERE user_id = ?
-            """, (user_id,)).fetchall()]
-            
-            if user_note_ids:
-                placeholders = ','.join('?' * len(user_note_ids))
-                conn.execute(f"""
-                    DELETE FROM cluster_membership 
-                    WHERE note_id IN ({placeholders})
-                """, user_note_ids)
-            
-            # Store new clusters
-            for cluster in clusters:
-                # Insert cluster
-                cursor = conn.execute("""
-                    INSERT INTO note_clusters 
-                    (cluster_theme, representative_note_id, avg_similarity, note_count)
-                    VALUES (?, ?, ?, ?)
-                """, (cluster.cluster_theme, cluster.representative_note_id, 
-                      cluster.avg_similarity, len(cluster.note_ids)))
-                
-                cluster_id = cursor.lastrowid
-                
-                # Insert cluster membership
-                for note_id in cluster.note_ids:
-                    conn.execute("""
-                        INSERT INTO cluster_membership (cluster_id, note_id)
-                        VALUES (?, ?)
-                    """, (cluster_id, note_id))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Failed to store clusters: {e}")
-    
     def get_note_clusters(self, user_id: int) -> List[Dict]:
         """Get existing clusters for a user"""
         try:
@@ -564,7 +896,7 @@ class NoteRelationshipEngine:
                 FROM note_clusters c
                 JOIN cluster_membership cm ON c.id = cm.cluster_id
                 JOIN notes n ON cm.note_id = n.id
-                WHERE n.user_id = ?
+                WHERE n.user_id = ? AND COALESCE(c.is_active, 1) = 1
                 GROUP BY c.id
                 ORDER BY c.avg_similarity DESC
             """, (user_id,)).fetchall()
@@ -618,7 +950,7 @@ class NoteRelationshipEngine:
                 FROM note_clusters c
                 JOIN cluster_membership cm ON c.id = cm.cluster_id
                 JOIN notes n ON cm.note_id = n.id
-                WHERE n.user_id = ?
+                WHERE n.user_id = ? AND COALESCE(c.is_active, 1) = 1
             """, (user_id,)).fetchone()[0]
             
             # Total notes
@@ -650,6 +982,8 @@ async def main():
     parser.add_argument("--user-id", type=int, default=1, help="User ID")
     parser.add_argument("--note-id", type=int, help="Find similar notes to this note")
     parser.add_argument("--clusters", action="store_true", help="Discover note clusters")
+    parser.add_argument("--rebuild-clusters", action="store_true",
+                        help="Recluster all notes from scratch instead of incrementally")
     parser.add_argument("--stats", action="store_true", help="Show relationship statistics")
     parser.add_argument("--limit", type=int, default=10, help="Number of similar notes to find")
     
@@ -685,9 +1019,10 @@ async def main():
         else:
             print("No similar notes found.")
     
-    if args.clusters:
+    if args.clusters or args.rebuild_clusters:
         print(f"\n🎯 Discovering note clusters for user {args.user_id}...")
-        clusters = engine.discover_note_clusters(args.user_id)
+        clusters = engine.discover_note_clusters(args.user_id,
+                                                 full_rebuild=args.rebuild_clusters)
         
         if clusters:
             print(f"Discovered {len(clusters)} clusters:")
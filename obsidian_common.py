@@ -15,12 +15,19 @@ def load_frontmatter_file(path: Path) -> Tuple[Dict, str]:
     parser that reads a leading YAML block between '---' lines.
     Returns (metadata, content).
     """
+    return loads_frontmatter(Path(path).read_text(encoding='utf-8'))
+
+def loads_frontmatter(text: str) -> Tuple[Dict, str]:
+    """Parse frontmatter and content from markdown text already in memory.
+
+    Same behaviour as load_frontmatter_file, for callers that have read the
+    bytes themselves (e.g. to hash them in the same pass).
+    """
     try:
         import frontmatter  # type: ignore
-        post = frontmatter.load(path)
+        post = frontmatter.loads(text)
         return dict(post.metadata or {}), post.content or ""
     except Exception:
-        text = Path(path).read_text(encoding='utf-8')
         meta: Dict = {}
         content = text
         if text.startswith('---'):
@@ -43,7 +50,6 @@ def load_frontmatter_file(path: Path) -> Tuple[Dict, str]:
                             v = v.strip()
                             # try JSON-like parse for lists/strings/bools
                             try:
-                                import json
                                 meta[k] = json.loads(v)
                             except Exception:
                                 meta[k] = v.strip('"')
@@ -13,10 +13,14 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import threading
 import time
 from config import settings
-from obsidian_common import sanitize_filename, dump_frontmatter_file, load_frontmatter_file
+from obsidian_common import (
+    sanitize_filename, dump_frontmatter_file, load_frontmatter_file, loads_frontmatter
+)
 import json
 
 @dataclass
@@ -25,6 +29,119 @@ class SyncState:
     last_modified: float
     content_hash: str
     note_id: Optional[int] = None
+    size: int = 0
+    note_hash: Optional[str] = None
+
+class DebouncedEventQueue:
+    """Coalesces filesystem events per path and hands them over in batches.
+
+    A path is flushed once no new event for it has arrived for
+    ``debounce_seconds``, so editors that save on every keystroke produce a
+    single import. ``on_batch`` receives the due paths and may return how
+    many of them it skipped (e.g. our own writes echoing back).
+    """
+
+    def __init__(self, on_batch, debounce_seconds: float = 2.0, max_batch: int = 200,
+                 clock=time.monotonic):
+        self.on_batch = on_batch
+        self.debounce_seconds = debounce_seconds
+        self.max_batch = max_batch
+        self._clock = clock
+        self._pending: Dict[Path, Tuple[float, float]] = {}  # path -> (first_seen, last_seen)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            'events': 0,
+            'coalesced': 0,
+            'suppressed': 0,
+            'batches': 0,
+            'flushed': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0,
+            'last_lag_seconds': 0.0,
+        }
+
+    def add(self, path: Path):
+        now = self._clock()
+        with self._lock:
+            self._metrics['events'] += 1
+            if path in self._pending:
+                self._metrics['coalesced'] += 1
+                self._pending[path] = (self._pending[path][0], now)
+            else:
+                self._pending[path] = (now, now)
+
+    def touch(self, path: Path) -> bool:
+        """Re-arm the debounce of an already pending path; never queues a new one"""
+        now = self._clock()
+        with self._lock:
+            if path not in self._pending:
+                return False
+            self._metrics['events'] += 1
+            self._metrics['coalesced'] += 1
+            self._pending[path] = (self._pending[path][0], now)
+            return True
+
+    def _take_due(self) -> List[Tuple[Path, float]]:
+        now = self._clock()
+        with self._lock:
+            due = [(path, first) for path, (first, last) in self._pending.items()
+                   if now - last >= self.debounce_seconds]
+            due = due[:self.max_batch]
+            for path, _ in due:
+                del self._pending[path]
+        return due
+
+    def run_once(self) -> int:
+        """Flush every path whose debounce window has elapsed; returns batch size"""
+        due = self._take_due()
+        if not due:
+            return 0
+        started = time.perf_counter()
+        try:
+            skipped = self.on_batch([path for path, _ in due]) or 0
+        except Exception as e:
+            print(f"Vault watcher batch failed: {e}")
+            skipped = 0
+        now = self._clock()
+        self._metrics['batches'] += 1
+        self._metrics['flushed'] += len(due)
+        self._metrics['suppressed'] += skipped
+        self._metrics['last_batch_size'] = len(due)
+        self._metrics['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self._metrics['last_lag_seconds'] = round(max(now - first for _, first in due), 3)
+        return len(due)
+
+    def get_metrics(self) -> Dict:
+        now = self._clock()
+        with self._lock:
+            depth = len(self._pending)
+            oldest = min((first for first, _ in self._pending.values()), default=None)
+        metrics = dict(self._metrics)
+        metrics['queue_depth'] = depth
+        metrics['oldest_pending_seconds'] = round(now - oldest, 3) if oldest is not None else 0.0
+        return metrics
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vault-watch-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        interval = max(0.05, self.debounce_seconds / 4)
+        while not self._stop.wait(interval):
+            while self.run_once():
+                pass
+
 
 class ObsidianSync:
     def __init__(self, vault_path: Optional[Path] = None, db_path: Optional[Path] = None):
@@ -35,10 +152,12 @@ class ObsidianSync:
             vpath = Path(settings.base_dir) / vpath
         self.vault_path = vpath
         self.db_path = db_path or settings.db_path
-        self.sync_state_file = self.vault_path / ".secondbrain" / "sync_state.json"
         self.audio_dir = self.vault_path / "audio"
         self.attachments_dir = self.vault_path / "attachments"
+        # Hashing and frontmatter parsing of changed files runs in a thread pool
+        self.max_workers = min(8, (os.cpu_count() or 2) + 2)
         self._ensure_directories()
+        self._init_sync_index()
         
     def _ensure_directories(self):
         """Create necessary directories"""
@@ -48,6 +167,26 @@ class ObsidianSync:
         self.audio_dir.mkdir(parents=True, exist_ok=True)
         self.attachments_dir.mkdir(parents=True, exist_ok=True)
     
+    def _init_sync_index(self):
+        """Create the persistent note_id <-> vault path index"""
+        import sqlite3
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS obsidian_sync_index (
+                rel_path TEXT PRIMARY KEY,
+                note_id INTEGER,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                note_hash TEXT,
+                synced_at TEXT NOT NULL DEFAULT (datetime('now'))
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_obsidian_sync_note ON obsidian_sync_index(note_id)")
+        conn.commit()
+        conn.close()
+    
     def export_note_to_obsidian(self, note_id: int) -> Path:
         """Export a single note to Obsidian vault"""
         import sqlite3
@@ -160,71 +299,153 @@ class ObsidianSync:
         dump_frontmatter_file(filepath, content + media_block, frontmatter_data)
         
         conn.close()
+        # Remember what we wrote so the watcher can ignore the echo
+        self._record_index_entries([(filepath, note_id)])
         return filepath
     
     def import_note_from_obsidian(self, filepath: Path) -> Optional[int]:
         """Import a note from Obsidian vault"""
-        import sqlite3
-        # frontmatter optional; use common helper for reading
-        
         if not filepath.suffix == '.md':
             return None
+        return self.import_notes_batch([filepath], skip_own_writes=False).get(filepath)
+    
+    def import_notes_batch(self, filepaths: List[Path], user_id: int = 1,
+                           skip_own_writes: bool = True) -> Dict[Path, int]:
+        """Import many vault files in one transaction and one embedding batch.
+
+        With skip_own_writes, files whose content hash matches what we last
+        exported (per the sync index) are ignored, so our own exports don't
+        bounce back as imports.
+        """
+        import sqlite3
         
+        paths = [p for p in filepaths if p.suffix == '.md' and p.exists()]
+        if skip_own_writes:
+            paths = [p for p in paths if not self._is_own_write(p)]
+        if not paths:
+            return {}
+        
+        imported: Dict[Path, int] = {}
+        vectors: List[Tuple[int, str]] = []
+        conn = sqlite3.connect(self.db_path)
         try:
-            metadata, content = load_frontmatter_file(filepath)
-            
-            # Extract components
-            title = metadata.get('title', filepath.stem)
-            note_type = metadata.get('type', 'note')
-            tags = ','.join(metadata.get('tags', []))
-            summary = metadata.get('summary', '')
-            actions = '\n'.join(metadata.get('actions', []))
-            created = metadata.get('created', datetime.now().isoformat())
-            
-            # Check if note already exists
-            conn = sqlite3.connect(self.db_path)
-            existing_id = metadata.get('id')
-            
-            if existing_id:
-                # Update existing note
-                conn.execute("""
-                    UPDATE notes SET title=?, content=?, summary=?, tags=?, actions=?, timestamp=?
-                    WHERE id=?
-                """, (title, content, summary, tags, actions, created, existing_id))
-                note_id = existing_id
-            else:
-                # Create new note
-                conn.execute("""
-                    INSERT INTO notes (title, content, summary, tags, actions, type, timestamp, status, user_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, 'complete', 1)
-                """, (title, content, summary, tags, actions, note_type, created))
-                note_id = conn.lastrowid
-                
-                # Update file with new ID
-                metadata['id'] = note_id
-                dump_frontmatter_file(filepath, content, metadata)
+            for filepath in paths:
+                try:
+                    metadata, content = load_frontmatter_file(filepath)
+                    
+                    # Extract components
+                    title = metadata.get('title', filepath.stem)
+                    note_type = metadata.get('type', 'note')
+                    tags = ','.join(metadata.get('tags', []))
+                    summary = metadata.get('summary', '')
+                    actions = '\n'.join(metadata.get('actions', []))
+                    created = metadata.get('created', datetime.now().isoformat())
+                    
+                    # Check if note already exists
+                    existing_id = metadata.get('id')
+                    
+                    if existing_id:
+                        # Update existing note
+                        conn.execute("""
+                            UPDATE notes SET title=?, content=?, summary=?, tags=?, actions=?, timestamp=?
+                            WHERE id=?
+                        """, (title, content, summary, tags, actions, created, existing_id))
+                        note_id = existing_id
+                    else:
+                        # Create new note
+                        cursor = conn.execute("""
+                            INSERT INTO notes (title, content, summary, tags, actions, type, timestamp, status, user_id)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, 'complete', ?)
+                        """, (title, content, summary, tags, actions, note_type, created, user_id))
+                        note_id = cursor.lastrowid
+                        
+                        # Update file with new ID
+                        metadata['id'] = note_id
+                        dump_frontmatter_file(filepath, content, metadata)
+                    
+                    imported[filepath] = note_id
+                    vectors.append((note_id, f"{title}\n\n{content}"))
+                except Exception as e:
+                    print(f"Failed to import {filepath}: {e}")
             
-            # Update vector index (FTS updates via triggers). Try unified service if available.
+            conn.commit()
+        finally:
+            conn.close()
+        
+        # Update vector index (FTS updates via triggers) after the commit so the
+        # search service's connection doesn't wait on our write lock
+        if vectors:
             try:
-                import os as _os
                 from services.search_adapter import SearchService as _SS
-                svc = _SS(db_path=str(self.db_path), vec_ext_path=_os.getenv('SQLITE_VEC_PATH'))
-                try:
-                    svc._upsert_vector(note_id, f"{title}\n\n{content}")
-                except Exception:
-                    pass
+                svc = _SS(db_path=str(self.db_path), vec_ext_path=os.getenv('SQLITE_VEC_PATH'))
+                svc.upsert_vectors(vectors)
             except Exception:
                 # If service layer unavailable, proceed without vector update
                 pass
-            
+        
+        # Index what's on disk now (including id write-backs) so it isn't re-imported
+        self._record_index_entries(list(imported.items()))
+        return imported
+    
+    def _is_own_write(self, filepath: Path) -> bool:
+        """True if the file still matches the content we last wrote or synced"""
+        import sqlite3
+        
+        try:
+            rel_path = str(filepath.relative_to(self.vault_path))
+        except ValueError:
+            return False
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute(
+            "SELECT content_hash, size FROM obsidian_sync_index WHERE rel_path = ?", (rel_path,)
+        ).fetchone()
+        conn.close()
+        if not row:
+            return False
+        try:
+            if filepath.stat().st_size != row[1]:
+                return False
+            return self._hash_file(filepath) == row[0]
+        except OSError:
+            return False
+    
+    def _record_index_entries(self, entries: List[Tuple[Path, int]]):
+        """Upsert index rows for files we just wrote or imported"""
+        import sqlite3
+        
+        if not entries:
+            return
+        states = {state.file_path: state for state in self._read_file_states([p for p, _ in entries])}
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = []
+            for filepath, note_id in entries:
+                state = states.get(str(filepath.relative_to(self.vault_path)))
+                if state is None:
+                    continue
+                note = conn.execute(
+                    "SELECT id, title, timestamp, content, summary, tags, actions FROM notes WHERE id = ?",
+                    (note_id,)
+                ).fetchone()
+                rows.append((state.file_path, note_id, state.last_modified, state.size,
+                             state.content_hash, self._hash_note_content(note) if note else None,
+                             datetime.now().isoformat()))
+            conn.executemany("""
+                INSERT INTO obsidian_sync_index
+                (rel_path, note_id, mtime, size, content_hash, note_hash, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(rel_path) DO UPDATE SET
+                    note_id = excluded.note_id,
+                    mtime = excluded.mtime,
+                    size = excluded.size,
+                    content_hash = excluded.content_hash,
+                    note_hash = excluded.note_hash,
+                    synced_at = excluded.synced_at
+            """, rows)
             conn.commit()
+        finally:
             conn.close()
-            
-            return note_id
-            
-        except Exception as e:
-            print(f"Failed to import {filepath}: {e}")
-            return None
     
     def sync_all_to_obsidian(self, user_id: int = 1):
         """Export all notes to Obsidian"""
@@ -248,29 +469,27 @@ class ObsidianSync:
     
     def sync_from_obsidian(self) -> List[int]:
         """Import all markdown files from Obsidian vault"""
-        imported = []
-        
-        for md_file in self.vault_path.rglob("*.md"):
-            # Skip files in .secondbrain directory
-            if ".secondbrain" in str(md_file):
-                continue
-                
-            note_id = self.import_note_from_obsidian(md_file)
-            if note_id:
-                imported.append(note_id)
-        
-        return imported
+        files = list(self._iter_vault_markdown())
+        imported = self.import_notes_batch(files, skip_own_writes=False)
+        return [imported[f] for f in files if imported.get(f)]
     
     def bidirectional_sync(self, user_id: int = 1) -> Dict[str, List]:
-        """Perform bidirectional sync between Second Brain and Obsidian"""
+        """Perform bidirectional sync between Second Brain and Obsidian.
+
+        Uses the persistent sync index so unchanged files (same mtime and size)
+        are never re-read, and note files are located by index lookup rather
+        than a vault walk per note.
+        """
         import sqlite3
-        import json
         
         # Load previous sync state
-        sync_state = self._load_sync_state()
+        sync_state = self._load_sync_index()
         
-        # Get current file states
-        current_files = self._scan_vault_files()
+        # Get current file states (only new/changed files are hashed)
+        current_files = self._scan_vault_files(sync_state)
+        files_by_note = {
+            state.note_id: path for path, state in current_files.items() if state.note_id
+        }
         
         # Get current database states
         conn = sqlite3.connect(self.db_path)
@@ -286,6 +505,8 @@ class ObsidianSync:
             "conflicts": [],
             "skipped": []
         }
+        touched: List[Path] = []
+        conflicted = set()
         
         # Check for changes in database notes
         for note in db_notes:
@@ -293,152 +514,251 @@ class ObsidianSync:
             note_hash = self._hash_note_content(note)
             
             # Find corresponding file
-            note_file = self._find_note_file(note_id)
+            note_file = files_by_note.get(note_id)
+            previous = sync_state.get(note_file) if note_file else None
             
-            if note_file and note_file in sync_state:
+            if previous is not None:
                 # File exists and was synced before
-                if sync_state[note_file]["content_hash"] != note_hash:
-                    # Database note changed, export to Obsidian
-                    try:
-                        filepath = self.export_note_to_obsidian(note_id)
-                        results["exported_to_obsidian"].append(str(filepath))
-                    except Exception as e:
-                        results["skipped"].append(f"Export failed for note {note_id}: {e}")
-            elif not note_file:
-                # New note, export to Obsidian
-                try:
-                    filepath = self.export_note_to_obsidian(note_id)
-                    results["exported_to_obsidian"].append(str(filepath))
-                except Exception as e:
-                    results["skipped"].append(f"Export failed for note {note_id}: {e}")
-        
-        # Check for changes in Obsidian files
-        for filepath, file_state in current_files.items():
-            if filepath in sync_state:
-                # File was synced before
-                if sync_state[filepath]["content_hash"] != file_state.content_hash:
-                    # File changed in Obsidian
-                    if file_state.note_id:
-                        # Check for conflicts (both changed)
-                        note_changed = self._check_note_changed_in_db(file_state.note_id, sync_state[filepath])
-                        if note_changed:
-                            results["conflicts"].append({
-                                "file": filepath,
-                                "note_id": file_state.note_id,
-                                "action": "manual_resolution_needed"
-                            })
-                            continue
-                    
-                    # Import from Obsidian
-                    note_id = self.import_note_from_obsidian(Path(filepath))
-                    if note_id:
-                        results["imported_from_obsidian"].append(filepath)
-            else:
-                # New file in Obsidian
-                note_id = self.import_note_from_obsidian(Path(filepath))
-                if note_id:
-                    results["imported_from_obsidian"].append(filepath)
-        
-        # Update sync state
-        self._save_sync_state(current_files, db_notes)
+                if previous.note_hash == note_hash:
+                    continue
+                if current_files[note_file].content_hash != previous.content_hash:
+                    # Both sides changed since the last sync
+                    conflicted.add(note_file)
+                    results["conflicts"].append({
+                        "file": note_file,
+                        "note_id": note_id,
+                        "action": "manual_resolution_needed"
+                    })
+                    continue
+            elif note_file:
+                # File present but never synced; let the file-side pass decide
+                continue
+            
+            # Database note changed (or is new), export to Obsidian
+            try:
+                filepath = self.export_note_to_obsidian(note_id)
+                results["exported_to_obsidian"].append(str(filepath))
+                touched.append(filepath)
+            except Exception as e:
+                results["skipped"].append(f"Export failed for note {note_id}: {e}")
+        
+        # Check for changes in Obsidian files: new files, or files changed in Obsidian
+        to_import = [
+            self.vault_path / filepath
+            for filepath, file_state in current_files.items()
+            if filepath not in conflicted and (
+                filepath not in sync_state
+                or sync_state[filepath].content_hash != file_state.content_hash
+            )
+        ]
+        imported = self.import_notes_batch(to_import, user_id=user_id, skip_own_writes=False)
+        for full_path in to_import:
+            if imported.get(full_path):
+                results["imported_from_obsidian"].append(str(full_path.relative_to(self.vault_path)))
+                touched.append(full_path)
+        
+        # Re-read files we wrote and persist the new index
+        for state in self._read_file_states([p for p in touched if p.exists()]):
+            current_files[state.file_path] = state
+        self._save_sync_index(current_files, user_id)
         
         return results
     
-    def watch_obsidian_changes(self, user_id: int = 1):
-        """Watch Obsidian vault for changes and auto-sync"""
+    def watch_obsidian_changes(self, user_id: int = 1, debounce_seconds: float = 2.0):
+        """Watch Obsidian vault for changes and auto-sync.
+
+        Events are coalesced per path for ``debounce_seconds`` and imported in
+        batches; queue depth and lag are available from get_watch_metrics().
+        """
         try:
             from watchdog.observers import Observer
             from watchdog.events import FileSystemEventHandler
         except ImportError as e:
             raise RuntimeError("watchdog package is required for watching vault changes") from e
 
+        def import_batch(paths: List[Path]) -> int:
+            imported = self.import_notes_batch(paths, user_id=user_id)
+            for filepath, note_id in imported.items():
+                print(f"Auto-imported note {note_id} from {filepath}")
+            return len(paths) - len(imported)
+
+        self.watch_queue = DebouncedEventQueue(import_batch, debounce_seconds=debounce_seconds)
+
         class ObsidianEventHandler(FileSystemEventHandler):
-            def __init__(self, sync_manager):
-                self.sync_manager = sync_manager
-                self.user_id = user_id
+            def __init__(self, event_queue):
+                self.event_queue = event_queue
                 
-            def on_modified(self, event):
-                if event.is_directory or not event.src_path.endswith('.md'):
+            def _enqueue(self, path: str):
+                if not path.endswith('.md') or ".secondbrain" in Path(path).parts:
                     return
+                self.event_queue.add(Path(path))
                 
-                # Debounce changes (wait 2 seconds)
-                time.sleep(2)
-                
-                filepath = Path(event.src_path)
-                if ".secondbrain" not in str(filepath):
-                    note_id = self.sync_manager.import_note_from_obsidian(filepath)
-                    if note_id:
-                        print(f"Auto-imported note {note_id} from {filepath}")
+            def on_modified(self, event):
+                if not event.is_directory:
+                    self._enqueue(event.src_path)
             
             def on_created(self, event):
                 self.on_modified(event)
+            
+            def on_moved(self, event):
+                if not event.is_directory:
+                    self._enqueue(event.dest_path)
         
-        event_handler = ObsidianEventHandler(self)
+        event_handler = ObsidianEventHandler(self.watch_queue)
         observer = Observer()
         observer.schedule(event_handler, str(self.vault_path), recursive=True)
+        self.watch_queue.start()
         observer.start()
         
         return observer
     
-    def _load_sync_state(self) -> Dict[str, SyncState]:
-        """Load previous sync state"""
+    def get_watch_metrics(self) -> Dict:
+        """Queue depth and lag of the vault watcher, if running"""
+        queue = getattr(self, 'watch_queue', None)
+        return queue.get_metrics() if queue else {}
+    
+    def _load_sync_index(self) -> Dict[str, SyncState]:
+        """Load previous sync state from the persistent index"""
+        import sqlite3
         
-        if not self.sync_state_file.exists():
-            return {}
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT rel_path, mtime, content_hash, note_id, size, note_hash
+            FROM obsidian_sync_index
+        """).fetchall()
+        conn.close()
+        
+        return {
+            rel_path: SyncState(
+                file_path=rel_path,
+                last_modified=mtime,
+                content_hash=content_hash,
+                note_id=note_id,
+                size=size,
+                note_hash=note_hash
+            )
+            for rel_path, mtime, content_hash, note_id, size, note_hash in rows
+        }
+    
+    def _save_sync_index(self, current_files: Dict[str, SyncState], user_id: int):
+        """Replace the sync index with the current vault state in one transaction"""
+        import sqlite3
         
+        conn = sqlite3.connect(self.db_path)
+        note_hashes = {
+            row[0]: self._hash_note_content(row)
+            for row in conn.execute("""
+                SELECT id, title, timestamp, content, summary, tags, actions
+                FROM notes WHERE user_id = ?
+            """, (user_id,)).fetchall()
+        }
+        
+        now = datetime.now().isoformat()
+        rows = [
+            (path, state.note_id, state.last_modified, state.size, state.content_hash,
+             note_hashes.get(state.note_id), now)
+            for path, state in current_files.items()
+        ]
         try:
-            with open(self.sync_state_file, 'r') as f:
-                data = json.load(f)
-            
-            return {
-                path: SyncState(**state_data) 
-                for path, state_data in data.items()
-            }
-        except:
-            return {}
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _sync_seen (rel_path TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM _sync_seen")
+            conn.executemany("INSERT INTO _sync_seen VALUES (?)", [(r[0],) for r in rows])
+            conn.execute(
+                "DELETE FROM obsidian_sync_index WHERE rel_path NOT IN (SELECT rel_path FROM _sync_seen)"
+            )
+            conn.executemany("""
+                INSERT INTO obsidian_sync_index
+                (rel_path, note_id, mtime, size, content_hash, note_hash, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(rel_path) DO UPDATE SET
+                    note_id = excluded.note_id,
+                    mtime = excluded.mtime,
+                    size = excluded.size,
+                    content_hash = excluded.content_hash,
+                    note_hash = excluded.note_hash,
+                    synced_at = excluded.synced_at
+            """, rows)
+            conn.commit()
+        finally:
+            conn.close()
     
-    def _save_sync_state(self, current_files: Dict[str, SyncState], db_notes: List):
-        """Save current sync state"""
-        
-        # Combine file and database states
-        state_data = {}
-        
-        for filepath, file_state in current_files.items():
-            state_data[filepath] = {
-                "file_path": file_state.file_path,
-                "last_modified": file_state.last_modified,
-                "content_hash": file_state.content_hash,
-                "note_id": file_state.note_id
-            }
-        
-        with open(self.sync_state_file, 'w') as f:
-            json.dump(state_data, f, indent=2)
+    def _iter_vault_markdown(self):
+        """Yield markdown files in the vault, skipping our .secondbrain folder"""
+        for root, dirs, filenames in os.walk(self.vault_path):
+            dirs[:] = [d for d in dirs if d != ".secondbrain"]
+            for name in filenames:
+                if name.endswith(".md"):
+                    yield Path(root) / name
     
-    def _scan_vault_files(self) -> Dict[str, SyncState]:
-        """Scan vault for markdown files and their states"""
-        files = {}
+    def _scan_vault_files(self, previous: Optional[Dict[str, SyncState]] = None) -> Dict[str, SyncState]:
+        """Scan vault for markdown files and their states.
+
+        Files whose mtime and size match the index keep their recorded hash and
+        note id; only new or changed files are read, in a thread pool.
+        """
+        if previous is None:
+            previous = self._load_sync_index()
         
-        for md_file in self.vault_path.rglob("*.md"):
-            if ".secondbrain" in str(md_file):
-                continue
-            
+        files = {}
+        changed: List[Path] = []
+        for md_file in self._iter_vault_markdown():
             filepath = str(md_file.relative_to(self.vault_path))
-            content_hash = self._hash_file(md_file)
-            note_id = self._extract_note_id(md_file)
-            
-            files[filepath] = SyncState(
-                file_path=filepath,
-                last_modified=md_file.stat().st_mtime,
-                content_hash=content_hash,
-                note_id=note_id
-            )
+            try:
+                stat = md_file.stat()
+            except OSError:
+                continue
+            known = previous.get(filepath)
+            if known and known.last_modified == stat.st_mtime and known.size == stat.st_size:
+                files[filepath] = known
+            else:
+                changed.append(md_file)
+        
+        for state in self._read_file_states(changed):
+            files[state.file_path] = state
         
         return files
     
+    def _read_file_states(self, paths: List[Path]) -> List[SyncState]:
+        """Hash and parse frontmatter for many files concurrently"""
+        if not paths:
+            return []
+        if len(paths) == 1:
+            states = [self._read_file_state(paths[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                states = list(pool.map(self._read_file_state, paths))
+        return [state for state in states if state is not None]
+    
+    def _read_file_state(self, md_file: Path) -> Optional[SyncState]:
+        """Read a file once to get both its hash and its frontmatter note id"""
+        try:
+            stat = md_file.stat()
+            data = md_file.read_bytes()
+        except OSError:
+            return None
+        
+        note_id = None
+        try:
+            meta, _ = loads_frontmatter(data.decode('utf-8', errors='replace'))
+            note_id = int(meta['id']) if meta.get('id') is not None else None
+        except Exception:
+            note_id = None
+        
+        return SyncState(
+            file_path=str(md_file.relative_to(self.vault_path)),
+            last_modified=stat.st_mtime,
+            content_hash=hashlib.md5(data).hexdigest(),
+            note_id=note_id,
+            size=stat.st_size
+        )
+    
     def _hash_file(self, filepath: Path) -> str:
         """Generate hash of file content"""
+        digest = hashlib.md5()
         with open(filepath, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
     
     def _hash_note_content(self, note: tuple) -> str:
         """Generate hash of note content from database"""
@@ -454,14 +774,24 @@ class ObsidianSync:
             return None
     
     def _find_note_file(self, note_id: int) -> Optional[str]:
-        """Find file corresponding to note ID"""
-        for md_file in self.vault_path.rglob("*.md"):
-            if ".secondbrain" in str(md_file):
+        """Find file corresponding to note ID via the sync index"""
+        import sqlite3
+        
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            "SELECT rel_path FROM obsidian_sync_index WHERE note_id = ?", (note_id,)
+        ).fetchall()
+        conn.close()
+        for (rel_path,) in rows:
+            if (self.vault_path / rel_path).exists():
+                return rel_path
+        
+        # Not indexed yet: exported files carry the id in their name, so a
+        # filename match avoids parsing frontmatter across the whole vault
+        for md_file in self.vault_path.rglob(f"*_id{note_id}.md"):
+            if ".secondbrain" in md_file.parts:
                 continue
-            
-            file_note_id = self._extract_note_id(md_file)
-            if file_note_id == note_id:
-                return str(md_file.relative_to(self.vault_path))
+            return str(md_file.relative_to(self.vault_path))
         
         return None
     
@@ -471,7 +801,7 @@ class ObsidianSync:
         
         conn = sqlite3.connect(self.db_path)
         note = conn.execute(
-            "SELECT title, content, summary, tags, actions FROM notes WHERE id = ?",
+            "SELECT id, title, timestamp, content, summary, tags, actions FROM notes WHERE id = ?",
             (note_id,)
         ).fetchone()
         conn.close()
@@ -480,7 +810,7 @@ class ObsidianSync:
             return False
         
         current_hash = self._hash_note_content(note)
-        return current_hash != last_sync_state.content_hash
+        return current_hash != last_sync_state.note_hash
     
     # _sanitize_filename provided by obsidian_common.sanitize_filename
     
@@ -9,11 +9,16 @@ from typing import Dict, Set, Optional, AsyncGenerator
 from fastapi import Request
 from fastapi.responses import StreamingResponse
 from config import settings
+from services.event_bus import get_event_bus
+from services.processing_status import ProcessingStatusStore, resolve_status
 # Avoid importing app-level symbols at module import time to prevent circular imports.
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Event bus channel carrying status updates between threads and worker processes
+STATUS_CHANNEL = "note_status"
+
 
 class StatusManager:
     """Manages real-time status updates for note processing"""
@@ -21,6 +26,7 @@ class StatusManager:
     def __init__(self):
         # Store active connections for each note_id
         self.connections: Dict[int, Set[asyncio.Queue]] = {}
+        self.progress = ProcessingStatusStore(self.get_conn)
         
     def get_conn(self):
         return sqlite3.connect(str(settings.db_path))
@@ -58,8 +64,25 @@ class StatusManager:
         
         self.connections[note_id] = active_queues
     
-    async def emit_progress(self, note_id: int, stage: str, progress: int, message: str = ""):
-        """Emit a progress update"""
+    def attach_event_bus(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Receive status updates published by any thread or worker process on ``loop``"""
+        loop = loop or asyncio.get_running_loop()
+        
+        async def _on_status(status_data: dict):
+            await self.broadcast_status(status_data["note_id"], status_data)
+        
+        return get_event_bus().subscribe(STATUS_CHANNEL, _on_status, loop=loop)
+    
+    def _publish(self, status_data: dict) -> bool:
+        try:
+            get_event_bus().publish(STATUS_CHANNEL, status_data)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not publish status for note {status_data.get('note_id')}: {e}")
+            return False
+    
+    def report_progress(self, note_id: int, stage: str, progress: int, message: str = "") -> dict:
+        """Record and publish a progress update; safe from worker threads (no event loop needed)"""
         status_data = {
             "note_id": note_id,
             "stage": stage,
@@ -68,21 +91,13 @@ class StatusManager:
             "timestamp": datetime.now().isoformat()
         }
         
-        # Update database
-        conn = self.get_conn()
-        c = conn.cursor()
-        c.execute(
-            "UPDATE notes SET status = ? WHERE id = ?",
-            (f"{stage}:{progress}", note_id)
-        )
-        conn.commit()
-        conn.close()
-        
-        # Broadcast to subscribers
-        await self.broadcast_status(note_id, status_data)
+        # Progress goes to the narrow status table so ticks don't touch notes/FTS
+        self.progress.set(note_id, stage, progress, message)
+        status_data["published"] = self._publish(status_data)
+        return status_data
     
-    async def emit_completion(self, note_id: int, success: bool = True, error_message: str = ""):
-        """Emit completion status"""
+    def report_completion(self, note_id: int, success: bool = True, error_message: str = "") -> dict:
+        """Record and publish completion; safe from worker threads"""
         status_data = {
             "note_id": note_id,
             "stage": "complete" if success else "error",
@@ -95,17 +110,32 @@ class StatusManager:
         
         # Update database
         conn = self.get_conn()
-        c = conn.cursor()
-        status_value = "complete" if success else f"error:{error_message}"
-        c.execute(
-            "UPDATE notes SET status = ? WHERE id = ?",
-            (status_value, note_id)
-        )
-        conn.commit()
-        conn.close()
+        try:
+            status_value = "complete" if success else f"error:{error_message}"
+            conn.execute(
+                "UPDATE notes SET status = ? WHERE id = ?",
+                (status_value, note_id)
+            )
+            self.progress.clear(note_id, conn=conn)
+            conn.commit()
+        finally:
+            conn.close()
         
-        # Broadcast to subscribers
-        await self.broadcast_status(note_id, status_data)
+        status_data["published"] = self._publish(status_data)
+        return status_data
+    
+    async def emit_progress(self, note_id: int, stage: str, progress: int, message: str = ""):
+        """Emit a progress update"""
+        status_data = self.report_progress(note_id, stage, progress, message)
+        if not status_data.pop("published"):
+            # Bus unavailable: at least reach subscribers in this process
+            await self.broadcast_status(note_id, status_data)
+    
+    async def emit_completion(self, note_id: int, success: bool = True, error_message: str = ""):
+        """Emit completion status"""
+        status_data = self.report_completion(note_id, success, error_message)
+        if not status_data.pop("published"):
+            await self.broadcast_status(note_id, status_data)
     
     async def get_note_status(self, note_id: int) -> Optional[dict]:
         """Get current status of a note"""
@@ -123,17 +153,7 @@ class StatusManager:
             return None
         
         status = row[2] or "unknown"
-        
-        # Parse status
-        if ":" in status:
-            stage, progress_str = status.split(":", 1)
-            try:
-                progress = int(progress_str)
-            except ValueError:
-                progress = 0
-        else:
-            stage = status
-            progress = 100 if status == "complete" else 0
+        stage, progress = resolve_status(status, self.progress.get(note_id))
         
         return {
             "note_id": row[0],
@@ -309,26 +329,23 @@ def create_status_endpoint(app):
         conn = status_manager.get_conn()
         c = conn.cursor()
         
-        # Get pending notes
+        # Get pending notes, with live progress from the status table
         pending_notes = c.execute(
-            """SELECT id, title, status, COALESCE(timestamp, created_at) as ts, type 
-               FROM notes 
-               WHERE user_id = ? AND (status = 'pending' OR status LIKE '%:%')
+            """SELECT n.id, n.title, n.status, COALESCE(n.timestamp, n.created_at) as ts, n.type,
+                      ps.stage, ps.pct
+               FROM notes n
+               LEFT JOIN note_processing_status ps ON ps.note_id = n.id
+               WHERE n.user_id = ? AND (n.status = 'pending' OR n.status LIKE '%:%'
+                                        OR (ps.note_id IS NOT NULL AND n.status NOT IN ('complete', 'failed')))
                ORDER BY ts DESC""",
             (user_id,)
         ).fetchall()
         
         queue_items = []
         for note in pending_notes:
-            status = note[2] or "pending"
-            if ":" in status:
-                stage, progress_str = status.split(":", 1)
-                try:
-                    progress = int(progress_str)
-                except ValueError:
-                    progress = 0
-            else:
-                stage = status
+            live = {"stage": note[5], "pct": note[6]} if note[5] is not None else None
+            stage, progress = resolve_status(note[2] or "pending", live)
+            if stage == "pending":
                 progress = 0
                 
             queue_items.append({
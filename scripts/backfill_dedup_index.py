@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Build the near-duplicate (MinHash/LSH) index for existing notes.
+
+New and edited notes are picked up by the app's background backfill loop;
+this script indexes the whole history up front.
+
+Usage:
+  python scripts/backfill_dedup_index.py [--user-id N] [--batch-size N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+
+import sys
+import pathlib as _p
+ROOT = _p.Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from config import settings
+from services.content_deduplication_service import ContentDeduplicationService
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--user-id", type=int, default=None, help="Only index this user's notes")
+    ap.add_argument("--batch-size", type=int, default=500, help="Notes indexed per transaction")
+    args = ap.parse_args()
+
+    service = ContentDeduplicationService(lambda: sqlite3.connect(str(settings.db_path)))
+    started = time.time()
+    indexed = service.backfill_index(user_id=args.user_id, batch_size=args.batch_size)
+    print(f"Indexed {indexed} notes in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -38,15 +38,6 @@ def ensure_columns(conn: sqlite3.Connection) -> Tuple[bool, bool, bool]:
     return has_file_type, has_file_mime, has_extracted
 
 
-def fts_has_extracted(conn: sqlite3.Connection) -> bool:
-    c = conn.cursor()
-    try:
-        cols = {r[1] for r in c.execute("PRAGMA table_info(notes_fts)").fetchall()}
-        return "extracted_text" in cols
-    except Exception:
-        return False
-
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--do-ocr", action="store_true", help="Also extract text for images/PDFs when missing")
@@ -60,7 +51,6 @@ def main():
     has_file_type, has_file_mime, has_extracted = ensure_columns(conn)
     if not (has_file_type and has_file_mime):
         raise SystemExit("Database missing file_type/file_mime_type columns in notes table.")
-    has_fts_extracted = fts_has_extracted(conn)
 
     processor = FileProcessor()
     uploads_dir = settings.uploads_dir
@@ -153,19 +143,6 @@ def main():
                     "UPDATE notes SET extracted_text=? WHERE id=?",
                     (new_extracted, note_id),
                 )
-                if has_fts_extracted:
-                    # Refresh FTS row to include extracted_text
-                    row2 = conn.execute(
-                        "SELECT title, summary, tags, actions, content FROM notes WHERE id=?",
-                        (note_id,),
-                    ).fetchone()
-                    if row2:
-                        conn.execute("DELETE FROM notes_fts WHERE rowid=?", (note_id,))
-                        conn.execute(
-                            "INSERT INTO notes_fts(rowid, title, summary, tags, actions, content, extracted_text) "
-                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                            (note_id, row2["title"], row2["summary"], row2["tags"], row2["actions"], row2["content"], new_extracted),
-                        )
                 ocred += 1
             if changed:
                 updated += 1
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Rebuild the note full-text index.
+
+By default the FTS table is rebuilt online with the configured tokenizer and
+prefix indexes (SEARCH_FTS_TOKENIZER, SEARCH_FTS_PREFIX) and swapped in when
+complete; the app keeps searching the old table meanwhile. --full re-chunks
+every note instead, which empties the index until it has caught up.
+
+Usage:
+  python scripts/rebuild_search_index.py [--full] [--batch-size N] [--if-needed]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+
+import sys
+import pathlib as _p
+ROOT = _p.Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from config import settings
+from services.note_index import NoteIndexService, ensure_note_index_schema, fts_rebuild_needed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="Re-chunk and re-index every note (offline)")
+    ap.add_argument("--batch-size", type=int, default=None, help="Chunks copied per transaction")
+    ap.add_argument("--if-needed", action="store_true",
+                    help="Only rebuild when the index options differ from settings")
+    args = ap.parse_args()
+
+    get_conn = lambda: sqlite3.connect(str(settings.db_path), timeout=30)
+    conn = get_conn()
+    try:
+        ensure_note_index_schema(conn)
+        conn.commit()
+        needed = fts_rebuild_needed(conn)
+    finally:
+        conn.close()
+
+    index = NoteIndexService(get_conn)
+    if args.full:
+        print(json.dumps({"status": "rebuilt", "notes": index.rebuild()}))
+    elif args.if_needed and not needed:
+        print(json.dumps({"status": "up_to_date"}))
+    else:
+        print(json.dumps(index.rebuild_online(batch_size=args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Repair drift in the per-user storage ledger.
+
+Recomputes audio, upload and web snapshot totals from the notes table and
+rewrites any ledger rows that disagree.
+
+Usage:
+  python scripts/reconcile_storage_ledger.py [--user-id N] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+
+import sys
+import pathlib as _p
+ROOT = _p.Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from config import settings
+from services.storage_ledger import StorageLedger
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--user-id", type=int, default=None, help="Only reconcile this user")
+    ap.add_argument("--dry-run", action="store_true", help="Report drift without fixing it")
+    args = ap.parse_args()
+
+    ledger = StorageLedger(lambda: sqlite3.connect(str(settings.db_path)))
+    drift = ledger.reconcile(user_id=args.user_id, dry_run=args.dry_run)
+
+    if not drift:
+        print("Storage ledger is consistent.")
+        return
+    for row in drift:
+        print(
+            f"user {row['user_id']} {row['category']}: "
+            f"recorded {row['recorded']:,} bytes, actual {row['actual']:,} bytes"
+        )
+    action = "would be corrected" if args.dry_run else "corrected"
+    print(f"{len(drift)} ledger rows {action}.")
+
+
+if __name__ == "__main__":
+    main()
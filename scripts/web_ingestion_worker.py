@@ -7,7 +7,8 @@ import os
 import sqlite3
 
 from config import settings
-from services.web_ingestion_service import WebIngestionService
+from services.browser_pool import shutdown_browser_pool
+from services.web_ingestion_service import WebIngestionService, WebIngestionWorker
 
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
 
@@ -20,23 +21,25 @@ def get_conn():
 
 async def run_worker():
     service = WebIngestionService(get_conn)
-    if not service.job_queue or not service.job_queue._client:
-        logging.error("Redis is not configured; cannot start web ingestion worker.")
+    if not service.job_queue or not service.job_queue.available:
+        logging.error("No job queue available (configure REDIS_URL or enable WEB_INGESTION_LOCAL_QUEUE).")
         return
 
-    logging.info("Web ingestion worker started (queue: web_ingestion:jobs)")
-
-    while True:
-        payload = await service.job_queue.dequeue("web_ingestion:jobs", block=True, timeout=5)
-        if not payload:
-            continue
-        job_id = payload.get("job_id")
-        try:
-            await service.process_job_payload(payload)
-            logging.info("Processed ingestion job %s", job_id)
-        except Exception as exc:  # pragma: no cover
-            logging.exception("Ingestion job %s failed: %s", job_id, exc)
-            await asyncio.sleep(1)
+    worker = WebIngestionWorker(
+        service,
+        concurrency=settings.web_ingestion_worker_concurrency,
+        per_domain_limit=settings.web_ingestion_per_domain_limit,
+    )
+    logging.info(
+        "Web ingestion worker started (%s queue, concurrency %s)",
+        service.job_queue.backend, worker.concurrency,
+    )
+
+    try:
+        await worker.run()
+    finally:
+        # Browsers are pooled across jobs; close them when the worker exits
+        await shutdown_browser_pool()
 
 
 if __name__ == "__main__":
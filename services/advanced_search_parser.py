@@ -73,7 +73,8 @@ class AdvancedSearchParser:
     """
 
     # Regex patterns
-    FIELD_SEARCH_PATTERN = r'(\w+):((?:"[^"]*")|(?:[^\s]+))'
+    # Optional preceding operator, optional "-" negation, field, value
+    FIELD_SEARCH_PATTERN = r'(?:\b(AND|OR|NOT)\s+)?(-?\w+):((?:"[^"]*")|(?:[^\s]+))'
     QUOTED_PHRASE_PATTERN = r'"([^"]*)"'
     DATE_RANGE_PATTERN = r'(\d{4}-\d{2}-\d{2})\.\.(\d{4}-\d{2}-\d{2})'
     RELATIVE_DATE_PATTERN = r'(last|past|next)-(\d+)-(day|week|month|year)s?'
@@ -123,11 +124,12 @@ class AdvancedSearchParser:
         matches = re.finditer(self.FIELD_SEARCH_PATTERN, query_string)
 
         for match in matches:
-            field_name = match.group(1).lower()
-            field_value = match.group(2).strip('"')
+            operator = SearchOperator(match.group(1)) if match.group(1) else SearchOperator.AND
+            field_name = match.group(2).lower()
+            field_value = match.group(3).strip('"')
 
             # Check if field is negated
-            is_negated = False
+            is_negated = operator == SearchOperator.NOT
             if field_name.startswith('-'):
                 is_negated = True
                 field_name = field_name[1:]
@@ -149,8 +151,9 @@ class AdvancedSearchParser:
                 term = SearchTerm(
                     field=search_field,
                     value=field_value,
+                    operator=SearchOperator.OR if operator == SearchOperator.OR else SearchOperator.AND,
                     is_negated=is_negated,
-                    is_phrase=True if '"' in match.group(2) else False
+                    is_phrase=True if '"' in match.group(3) else False
                 )
                 self.query.terms.append(term)
 
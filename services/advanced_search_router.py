@@ -12,6 +12,10 @@ from pathlib import Path
 from datetime import datetime
 
 from services.advanced_search_parser import AdvancedSearchParser, SearchQuery
+from services.note_index import NoteIndexService, ensure_note_index_schema
+from services.search_history_service import get_history_recorder
+from services.search_planner import SearchPlanner
+from services.suggestion_index import SuggestionIndex, split_tags
 
 router = APIRouter(prefix="/api/search/advanced", tags=["search"])
 
@@ -83,6 +87,10 @@ def get_db_connection():
     return conn
 
 
+def _note_columns(conn: sqlite3.Connection) -> List[str]:
+    return [row[1] for row in conn.execute("PRAGMA table_info(notes)")]
+
+
 def init_search_tables():
     """Initialize search-related tables"""
     conn = get_db_connection()
@@ -118,6 +126,9 @@ def init_search_tables():
             ON search_history(timestamp DESC)
         """)
 
+        # Note index and suggestion index, with the queue triggers that keep them current
+        ensure_note_index_schema(conn)
+
         conn.commit()
     finally:
         conn.close()
@@ -129,6 +140,10 @@ try:
 except Exception as e:
     print(f"Warning: Could not initialize search tables: {e}")
 
+note_index = NoteIndexService(get_db_connection)
+suggestion_index = SuggestionIndex(get_db_connection)
+history_recorder = get_history_recorder(get_db_connection)
+
 
 # ============================================
 # Search Endpoints
@@ -152,61 +167,37 @@ async def advanced_search(request: SearchRequest):
     parser = AdvancedSearchParser()
     parsed_query = parser.parse(request.query)
 
-    # Build SQL query
-    where_clause, parameters = parser.to_sql_conditions()
-
     conn = get_db_connection()
     try:
-        # Construct full SQL query
-        sql = f"""
-            SELECT
-                id,
-                title,
-                content,
-                created_at,
-                updated_at,
-                tags,
-                type,
-                source,
-                1.0 as score
-            FROM notes
-            WHERE {where_clause}
-            ORDER BY created_at DESC
-            LIMIT :limit OFFSET :offset
-        """
-
-        parameters['limit'] = request.limit
-        parameters['offset'] = request.offset
-
-        # Execute query
-        cursor = conn.execute(sql, parameters)
-        rows = cursor.fetchall()
+        # One statement: FTS MATCH with column filters, indexed notes predicates, bm25 order and total
+        note_index.sync_for_search(conn=conn)
+        plan = SearchPlanner(_note_columns(conn)).plan(
+            parsed_query, limit=request.limit, offset=request.offset
+        )
+        rows = plan.execute(conn)
 
         # Build results
         results = []
         for row in rows:
-            tags = json.loads(row['tags']) if row['tags'] else []
+            note = dict(row)
             results.append(SearchResult(
-                id=row['id'],
-                title=row['title'] or "Untitled",
-                content=row['content'][:500] if row['content'] else "",
-                score=row['score'],
-                created_at=row['created_at'],
-                updated_at=row['updated_at'],
-                tags=tags,
-                type=row.get('type'),
-                source=row.get('source')
+                id=note['id'],
+                title=note.get('title') or "Untitled",
+                content=(note.get('content') or note.get('body') or "")[:500],
+                score=round(note['score'], 4),
+                created_at=note.get('created_at') or "",
+                updated_at=note.get('updated_at'),
+                tags=split_tags(note.get('tags')),
+                type=note.get('type'),
+                source=note.get('source')
             ))
-
-        # Get total count
-        count_sql = f"SELECT COUNT(*) as total FROM notes WHERE {where_clause}"
-        total_count = conn.execute(count_sql, {k: v for k, v in parameters.items() if k not in ['limit', 'offset']}).fetchone()['total']
+        total_count = rows[0]['total_count'] if rows else 0
 
         # Calculate execution time
         execution_time = (datetime.now() - start_time).total_seconds() * 1000
 
         # Record in search history
-        record_search_history(request.query, len(results))
+        record_search_history(request.query, len(results), response_time_ms=int(execution_time))
 
         return SearchResponse(
             success=True,
@@ -228,48 +219,16 @@ async def get_search_suggestions(q: str = Query(..., min_length=1)):
 
     Returns: List of suggested search terms
     """
-    conn = get_db_connection()
-    try:
-        # Get title suggestions
-        cursor = conn.execute("""
-            SELECT DISTINCT title
-            FROM notes
-            WHERE title LIKE ?
-            ORDER BY created_at DESC
-            LIMIT 10
-        """, (f"%{q}%",))
-
-        suggestions = [row['title'] for row in cursor.fetchall() if row['title']]
-
-        # Get tag suggestions
-        cursor = conn.execute("""
-            SELECT DISTINCT tags
-            FROM notes
-            WHERE tags IS NOT NULL AND tags != '[]'
-            LIMIT 100
-        """)
-
-        all_tags = set()
-        for row in cursor.fetchall():
-            if row['tags']:
-                try:
-                    tags = json.loads(row['tags'])
-                    all_tags.update(tags)
-                except:
-                    pass
-
-        # Filter tags that match query
-        matching_tags = [f"tag:{tag}" for tag in all_tags if q.lower() in tag.lower()][:5]
-        suggestions.extend(matching_tags)
+    note_index.sync_for_search()
+    titles = suggestion_index.suggest(None, q, limit=10, kinds=("title",))
+    tags = suggestion_index.suggest(None, q, limit=5, kinds=("tag",))
+    suggestions = [s["text"] for s in titles] + [f"tag:{s['text']}" for s in tags]
 
-        return {
-            "success": True,
-            "query": q,
-            "suggestions": suggestions[:10]
-        }
-
-    finally:
-        conn.close()
+    return {
+        "success": True,
+        "query": q,
+        "suggestions": list(dict.fromkeys(suggestions))[:10]
+    }
 
 
 # ============================================
@@ -359,39 +318,15 @@ async def delete_saved_search(search_id: int, user_id: int = 1):
 # Search History
 # ============================================
 
-def record_search_history(query: str, results_count: int, user_id: int = 1):
-    """Record a search in history"""
-    conn = get_db_connection()
-    try:
-        conn.execute("""
-            INSERT INTO search_history (user_id, query, results_count)
-            VALUES (?, ?, ?)
-        """, (user_id, query, results_count))
-
-        conn.commit()
-
-        # Keep only last 100 entries per user
-        conn.execute("""
-            DELETE FROM search_history
-            WHERE id IN (
-                SELECT id FROM search_history
-                WHERE user_id = ?
-                ORDER BY timestamp DESC
-                LIMIT -1 OFFSET 100
-            )
-        """, (user_id,))
-
-        conn.commit()
-
-    except Exception as e:
-        print(f"Failed to record search history: {e}")
-    finally:
-        conn.close()
+def record_search_history(query: str, results_count: int, user_id: int = 1, response_time_ms: int = 0):
+    """Queue a search for history; the background flusher writes it and trims old rows"""
+    history_recorder.record(user_id, query, "keyword", results_count, response_time_ms)
 
 
 @router.get("/history", response_model=List[SearchHistoryEntry])
 async def get_search_history(user_id: int = 1, limit: int = 20):
     """Get search history for a user"""
+    history_recorder.flush()
     conn = get_db_connection()
     try:
         cursor = conn.execute("""
@@ -421,6 +356,8 @@ async def get_search_history(user_id: int = 1, limit: int = 20):
 @router.delete("/history")
 async def clear_search_history(user_id: int = 1):
     """Clear search history for a user"""
+    # Buffered searches would otherwise reappear after the clear
+    history_recorder.flush()
     conn = get_db_connection()
     try:
         conn.execute("""
@@ -0,0 +1,211 @@
+"""
+App Schema for Second Brain
+
+The tables, legacy column backfills and search index app.py relies on. This
+used to run as ``init_db()`` on every import of app.py, which made each worker
+boot repeat the schema checks and, on an FTS column mismatch, rebuild the index
+during import. It is now an explicit migration step: the startup hook (and
+``migrate_db.py``) calls ``ensure_app_schema``, which applies the step once per
+``APP_SCHEMA_VERSION`` and records it in ``schema_migrations``.
+
+Bump ``APP_SCHEMA_VERSION`` whenever ``apply_app_schema`` changes.
+"""
+
+import logging
+import sqlite3
+from typing import Callable
+
+from services.note_index import ensure_note_index_schema
+from services.processing_status import ensure_processing_status_schema
+
+logger = logging.getLogger(__name__)
+
+APP_SCHEMA_VERSION = 5
+
+
+def _migration_name(version: int = APP_SCHEMA_VERSION) -> str:
+    return f"app_schema_v{version}"
+
+
+def ensure_app_schema(get_conn_func: Callable[[], sqlite3.Connection]) -> bool:
+    """Apply the app schema unless this version is already recorded.
+
+    Returns True when the step ran. ``BEGIN IMMEDIATE`` serializes workers
+    booting at the same time: the first applies it, the rest see it recorded.
+    """
+    conn = get_conn_func()
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                migration_name TEXT NOT NULL UNIQUE,
+                applied_at TEXT NOT NULL DEFAULT (datetime('now')),
+                checksum TEXT
+            )
+            """
+        )
+        conn.commit()
+        if app_schema_applied(conn):
+            return False
+        conn.execute("BEGIN IMMEDIATE")
+        if app_schema_applied(conn):
+            conn.rollback()
+            return False
+        apply_app_schema(conn)
+        conn.execute("INSERT INTO schema_migrations (migration_name) VALUES (?)", (_migration_name(),))
+        conn.commit()
+        logger.info(f"Applied {_migration_name()}")
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def app_schema_applied(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM schema_migrations WHERE migration_name = ?", (_migration_name(),)
+    ).fetchone()
+    return row is not None
+
+
+def apply_app_schema(conn: sqlite3.Connection) -> None:
+    """Create and backfill the app tables; runs inside the caller's transaction"""
+    c = conn.cursor()
+
+    # Users table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            hashed_password TEXT NOT NULL
+        )
+    ''')
+    
+    # Notes table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            summary TEXT,
+            tags TEXT,
+            actions TEXT,
+            type TEXT,
+            timestamp TEXT,
+            audio_filename TEXT,
+            content TEXT,
+            status TEXT DEFAULT 'complete',
+            user_id INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Discord users table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS discord_users (
+            discord_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            linked_at TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Reminders table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER,
+            user_id INTEGER,
+            due_date TEXT,
+            completed BOOLEAN DEFAULT FALSE,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(note_id) REFERENCES notes(id),
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Search analytics
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS search_analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            query TEXT,
+            results_count INTEGER,
+            clicked_result_id INTEGER,
+            search_type TEXT,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_status (
+            id INTEGER PRIMARY KEY,
+            last_sync TEXT
+        )
+    ''')
+    
+    # Ensure columns exist (compatibility with legacy schema)
+    cols = [row[1] for row in c.execute("PRAGMA table_info(notes)")]
+    if 'status' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN status TEXT DEFAULT 'complete'")
+        c.execute("UPDATE notes SET status='complete' WHERE status IS NULL")
+    if 'user_id' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN user_id INTEGER")
+    # Legacy content fields expected by various services/routes
+    if 'summary' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN summary TEXT")
+    if 'content' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN content TEXT")
+    if 'timestamp' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN timestamp TEXT")
+    if 'type' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN type TEXT")
+    if 'audio_filename' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN audio_filename TEXT")
+    if 'actions' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN actions TEXT")
+    # New file-related columns used by capture pipeline
+    if 'file_filename' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN file_filename TEXT")
+    if 'file_type' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN file_type TEXT")
+    if 'file_mime_type' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN file_mime_type TEXT")
+    if 'file_size' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN file_size INTEGER")
+    if 'extracted_text' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN extracted_text TEXT")
+    if 'file_metadata' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN file_metadata TEXT")
+    # Web ingestion metadata
+    if 'source_url' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN source_url TEXT")
+    if 'web_metadata' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN web_metadata TEXT")
+    if 'screenshot_path' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN screenshot_path TEXT")
+    if 'content_hash' not in cols:
+        c.execute("ALTER TABLE notes ADD COLUMN content_hash TEXT")
+
+    # Filters services/search_planner.py pushes down next to the FTS match
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notes_user_created ON notes(user_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notes_user_type ON notes(user_id, type)")
+
+    # One chunk-level FTS index, fed by note_index_queue; retires notes_fts/notes_fts5/fts_chunk.
+    # Set up before the backfill so its updates only queue notes instead of re-indexing each one
+    ensure_note_index_schema(conn)
+
+    # One-time backfill: align legacy fields to core schema
+    try:
+        c.execute("UPDATE notes SET body=COALESCE(content, '') WHERE (body IS NULL OR body='') AND content IS NOT NULL")
+    except Exception:
+        pass
+    try:
+        c.execute("UPDATE notes SET timestamp = COALESCE(timestamp, created_at) WHERE timestamp IS NULL")
+    except Exception:
+        pass
+
+    # Live processing progress lives outside notes
+    ensure_processing_status_schema(conn)
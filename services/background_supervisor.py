@@ -0,0 +1,281 @@
+"""
+Background Service Supervisor
+
+With several gunicorn workers every worker runs the app lifespan, so each
+background loop (note job worker, audio queue, relationship automation, web
+ingestion) would run once per worker and race the others for the same rows.
+The supervisor runs each registered loop only in the worker(s) holding a
+lease row in ``service_leases``. Leases are renewed every few seconds; if the
+holder crashes or hangs, its lease expires and another worker takes over on
+its next tick.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 30.0
+# Back off before restarting a loop that crashed while we still hold its lease
+RESTART_DELAY_SECONDS = 10.0
+
+
+@dataclass
+class _ManagedService:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    stop: Optional[Callable[[], Awaitable[Any]]] = None
+    replicas: int = 1
+    slot: Optional[int] = None
+    task: Optional[asyncio.Task] = None
+    state: str = "standby"  # standby | running | started | failed
+    started_at: Optional[float] = None
+    restarts: int = 0
+    last_error: Optional[str] = None
+    retry_after: float = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return self.slot is not None
+
+
+class BackgroundServiceSupervisor:
+    """Runs each registered loop in the worker(s) holding its lease"""
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection],
+                 lease_seconds: float = LEASE_SECONDS, renew_interval: Optional[float] = None):
+        self.get_conn = get_conn_func
+        self.lease_seconds = lease_seconds
+        self.renew_interval = renew_interval or max(lease_seconds / 3, 0.05)
+        self.holder: Optional[str] = None
+        self._services: Dict[str, _ManagedService] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._ensure_table()
+
+    def _ensure_table(self) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS service_leases (
+                    name TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    holder TEXT,
+                    acquired_at REAL,
+                    expires_at REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (name, slot)
+                )
+                """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def register(self, name: str, run: Callable[[], Awaitable[Any]],
+                 stop: Optional[Callable[[], Awaitable[Any]]] = None, replicas: int = 1) -> None:
+        """Run ``run()`` in at most ``replicas`` workers at a time.
+
+        ``run`` is normally a long-running loop; if it returns, the service counts
+        as started and keeps its lease until ``stop`` is called on shutdown or
+        lease loss.
+        """
+        self._services[name] = _ManagedService(name=name, run=run, stop=stop, replicas=max(1, replicas))
+        self._ensure_loop()
+
+    # --- leases (run in a thread; each call is one short statement) ---
+
+    def _try_acquire(self, name: str, replicas: int) -> Optional[int]:
+        now = time.time()
+        conn = self.get_conn()
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO service_leases (name, slot, holder, expires_at) VALUES (?, ?, NULL, 0)",
+                [(name, slot) for slot in range(replicas)],
+            )
+            for slot in range(replicas):
+                cur = conn.execute(
+                    """
+                    UPDATE service_leases SET holder = ?, acquired_at = ?, expires_at = ?
+                    WHERE name = ? AND slot = ? AND (holder IS NULL OR holder = ? OR expires_at < ?)
+                    """,
+                    (self.holder, now, now + self.lease_seconds, name, slot, self.holder, now),
+                )
+                if cur.rowcount == 1:
+                    conn.commit()
+                    return slot
+            conn.commit()
+            return None
+        finally:
+            conn.close()
+
+    def _renew(self, name: str, slot: int) -> bool:
+        now = time.time()
+        conn = self.get_conn()
+        try:
+            cur = conn.execute(
+                "UPDATE service_leases SET expires_at = ? WHERE name = ? AND slot = ? AND holder = ?",
+                (now + self.lease_seconds, name, slot, self.holder),
+            )
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def _release(self, name: str, slot: int) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                "UPDATE service_leases SET holder = NULL, expires_at = 0 WHERE name = ? AND slot = ? AND holder = ?",
+                (name, slot, self.holder),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # --- supervision ---
+
+    def _ensure_loop(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self.holder is None:
+            # Decided here, not at import: with preload_app the import happens before fork
+            self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = loop.create_task(self._supervise())
+
+    async def _supervise(self) -> None:
+        while True:
+            for service in list(self._services.values()):
+                try:
+                    await self._tick(service)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Supervisor tick for {service.name} failed: {e}")
+            await asyncio.sleep(self.renew_interval)
+
+    async def _tick(self, service: _ManagedService) -> None:
+        if service.is_leader:
+            if not await asyncio.to_thread(self._renew, service.name, service.slot):
+                logger.warning(f"Lost lease for {service.name}; stopping it in {self.holder}")
+                service.slot = None
+                await self._stop_service(service)
+                return
+            if service.task is not None and service.task.done():
+                self._collect(service)
+            if service.task is None and service.state == "failed" and time.monotonic() >= service.retry_after:
+                service.restarts += 1
+                self._launch(service)
+            return
+
+        slot = await asyncio.to_thread(self._try_acquire, service.name, service.replicas)
+        if slot is not None:
+            service.slot = slot
+            logger.info(f"{self.holder} took lease {service.name}[{slot}]")
+            self._launch(service)
+
+    def _launch(self, service: _ManagedService) -> None:
+        service.state = "running"
+        service.started_at = time.time()
+        service.task = asyncio.get_running_loop().create_task(service.run(), name=f"service:{service.name}")
+
+    def _collect(self, service: _ManagedService) -> None:
+        task, service.task = service.task, None
+        if task.cancelled():
+            service.state = "standby"
+            return
+        error = task.exception()
+        if error is None:
+            service.state = "started"
+            return
+        service.state = "failed"
+        service.last_error = f"{type(error).__name__}: {error}"
+        service.retry_after = time.monotonic() + RESTART_DELAY_SECONDS
+        logger.error(f"Background service {service.name} crashed: {service.last_error}")
+
+    async def _stop_service(self, service: _ManagedService, timeout: float = 10.0) -> None:
+        if service.stop is not None and service.state in ("running", "started"):
+            try:
+                await asyncio.wait_for(service.stop(), timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Stopping {service.name} failed: {e}")
+        task, service.task = service.task, None
+        if task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=timeout if service.stop else 0)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+            except Exception:
+                pass
+        service.state = "standby"
+        service.started_at = None
+
+    async def stop(self) -> None:
+        """Stop every service this worker runs and hand its leases back"""
+        loop_task, self._loop_task = self._loop_task, None
+        if loop_task is not None:
+            loop_task.cancel()
+            try:
+                await loop_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        for service in self._services.values():
+            if service.is_leader:
+                await self._stop_service(service)
+                slot, service.slot = service.slot, None
+                try:
+                    await asyncio.to_thread(self._release, service.name, slot)
+                except Exception as e:
+                    logger.warning(f"Could not release lease {service.name}[{slot}]: {e}")
+
+    # --- reporting ---
+
+    def status(self) -> Dict[str, Any]:
+        """Local view of each service plus every worker's lease, for /health"""
+        now = time.time()
+        conn = self.get_conn()
+        try:
+            rows = conn.execute(
+                "SELECT name, slot, holder, acquired_at, expires_at FROM service_leases ORDER BY name, slot"
+            ).fetchall()
+        finally:
+            conn.close()
+        leases: Dict[str, List[Dict[str, Any]]] = {}
+        for name, slot, holder, acquired_at, expires_at in rows:
+            live = bool(holder) and expires_at >= now
+            leases.setdefault(name, []).append({
+                "slot": slot,
+                "holder": holder if live else None,
+                "held_for_seconds": round(now - acquired_at, 1) if live and acquired_at else None,
+                "expires_in_seconds": round(expires_at - now, 1) if live else None,
+            })
+
+        services = {}
+        for name, service in self._services.items():
+            service_leases = leases.get(name, [])
+            services[name] = {
+                "leader": service.is_leader,
+                "slot": service.slot,
+                "state": service.state,
+                "replicas": service.replicas,
+                "restarts": service.restarts,
+                "last_error": service.last_error,
+                "uptime_seconds": round(now - service.started_at, 1) if service.started_at else None,
+                "active_holders": sum(1 for lease in service_leases if lease["holder"]),
+                "leases": service_leases,
+            }
+        return {"holder": self.holder, "lease_seconds": self.lease_seconds, "services": services}
@@ -0,0 +1,199 @@
+"""
+Shared Headless Browser Pool
+
+Keeps a few long-lived Chromium instances around so web ingestion doesn't pay
+for a Playwright start and browser launch on every URL. Each page gets its own
+incognito context (no cookies or storage leak between ingestions), browsers are
+recycled after a number of pages, and crashed browsers are relaunched on the
+next request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+from config import settings
+
+BROWSER_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--disable-dev-shm-usage',
+]
+
+
+@dataclass
+class _BrowserSlot:
+    """One Chromium instance and its usage counters"""
+    index: int
+    browser: Any = None
+    pages_served: int = 0
+    in_flight: int = 0
+    launched_at: float = 0.0
+    retiring: bool = False
+
+    def is_alive(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class BrowserPool:
+    """Pool of Chromium browsers handing out pages in fresh incognito contexts"""
+
+    def __init__(self, size: int = 2, max_pages_per_browser: int = 50, max_concurrent_pages: int = 4):
+        self.size = max(1, size)
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self.max_concurrent_pages = max(1, max_concurrent_pages)
+        self._slots = [_BrowserSlot(index=i) for i in range(self.size)]
+        self._playwright = None
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_pages)
+        self._closed = False
+        self._stats = {
+            'pages': 0,
+            'launches': 0,
+            'recycles': 0,
+            'crashes': 0,
+            'waiting': 0,
+        }
+
+    @asynccontextmanager
+    async def page(self, **context_options):
+        """Yield a page in a new incognito context; context is closed afterwards"""
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("Playwright not available. Install with: pip install playwright")
+        if self._closed:
+            raise RuntimeError("Browser pool has been shut down")
+
+        self._stats['waiting'] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._stats['waiting'] -= 1
+
+        slot = None
+        context = None
+        try:
+            slot = await self._checkout()
+            context = await slot.browser.new_context(**context_options)
+            page = await context.new_page()
+            self._stats['pages'] += 1
+            yield page
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            if slot is not None:
+                await self._checkin(slot)
+            self._semaphore.release()
+
+    async def _checkout(self) -> _BrowserSlot:
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            candidates = [s for s in self._slots if not s.retiring]
+            slot = min(candidates or self._slots, key=lambda s: (s.in_flight, s.pages_served))
+
+            if slot.browser is not None and not slot.is_alive():
+                print(f"[browser_pool] Browser {slot.index} disconnected; relaunching")
+                self._stats['crashes'] += 1
+                slot.browser = None
+            if slot.browser is None:
+                await self._launch(slot)
+
+            slot.in_flight += 1
+            slot.pages_served += 1
+            if slot.pages_served >= self.max_pages_per_browser:
+                slot.retiring = True
+            return slot
+
+    async def _checkin(self, slot: _BrowserSlot):
+        async with self._lock:
+            slot.in_flight -= 1
+            if slot.retiring and slot.in_flight == 0:
+                # Recycle once the last page using it is done to cap memory growth
+                self._stats['recycles'] += 1
+                await self._close_browser(slot)
+
+    async def _launch(self, slot: _BrowserSlot):
+        slot.browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_LAUNCH_ARGS)
+        slot.pages_served = 0
+        slot.retiring = False
+        slot.launched_at = time.time()
+        self._stats['launches'] += 1
+
+    async def _close_browser(self, slot: _BrowserSlot):
+        browser, slot.browser = slot.browser, None
+        slot.pages_served = 0
+        slot.retiring = False
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    async def close(self):
+        """Close every browser and stop Playwright"""
+        self._closed = True
+        async with self._lock:
+            for slot in self._slots:
+                await self._close_browser(slot)
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        browsers: List[Dict[str, Any]] = [
+            {
+                'index': slot.index,
+                'alive': slot.is_alive(),
+                'pages_served': slot.pages_served,
+                'in_flight': slot.in_flight,
+                'uptime_seconds': round(time.time() - slot.launched_at, 1) if slot.browser else 0,
+            }
+            for slot in self._slots
+        ]
+        return {**self._stats, 'size': self.size, 'browsers': browsers}
+
+
+# Global instance, bound to the event loop that created it
+_pool: Optional[BrowserPool] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Get the shared browser pool for the running event loop"""
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool_loop is not loop or _pool._closed:
+        _pool = BrowserPool(
+            size=settings.web_browser_pool_size,
+            max_pages_per_browser=settings.web_browser_max_pages,
+            max_concurrent_pages=settings.web_browser_max_concurrency,
+        )
+        _pool_loop = loop
+    return _pool
+
+
+async def shutdown_browser_pool():
+    """Close the shared pool if one was started - for shutdown"""
+    global _pool, _pool_loop
+    pool, _pool, _pool_loop = _pool, None, None
+    if pool is not None:
+        await pool.close()
@@ -101,9 +101,6 @@ class BulkOperationsService:
                     # Delete from notes table
                     cursor.execute("DELETE FROM notes WHERE id = ? AND user_id = ?", (note_id, user_id))
                     
-                    # Delete from FTS index
-                    cursor.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
-                    
                     # Delete associated files if any
                     cursor.execute("DELETE FROM file_metadata WHERE note_id = ?", (note_id,))
                     
@@ -149,7 +146,6 @@ class BulkOperationsService:
             placeholders = ",".join("?" * len(note_ids))
             
             cursor.execute(f"DELETE FROM notes WHERE id IN ({placeholders})", note_ids)
-            cursor.execute(f"DELETE FROM notes_fts WHERE rowid IN ({placeholders})", note_ids)
             
             deleted_count = len(notes_to_delete)
             return BulkOperationResult("delete", 0, "success", f"Deleted {deleted_count} notes matching filter")
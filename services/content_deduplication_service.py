@@ -3,18 +3,77 @@ Content Deduplication Service
 
 Provides intelligent content deduplication with configurable similarity thresholds
 and efficient database queries.
+
+Near-duplicates are found through MinHash signatures of word shingles kept in
+an LSH band index (``note_minhash_bands``): notes sharing any band bucket with
+the new content become candidates, and only those few are compared exactly.
 """
 
+import asyncio
 import hashlib
 import logging
 import re
+import zlib
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from difflib import SequenceMatcher
 
+import numpy as np
+
 log = logging.getLogger(__name__)
 
+# 32 bands of 2 rows: notes with ~20% shingle overlap or more usually share a
+# bucket, so recall stays high and the exact check filters the rest
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32
+MINHASH_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+SHINGLE_SIZE = 3
+# Stored for notes with no shingles (empty or whitespace-only) so backfill
+# doesn't rescan them; it has no band rows and so never becomes a candidate
+EMPTY_SIGNATURE = b""
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def _shingles(normalized: str) -> set:
+    tokens = re.findall(r"\w+", normalized)
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(normalized: str) -> Optional[np.ndarray]:
+    """MinHash signature (uint32 per permutation) of the text's word shingles"""
+    shingles = _shingles(normalized)
+    if not shingles:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    # Universal hashing (a*x + b) mod p; uint64 wraparound is fine for hashing
+    permuted = np.bitwise_and((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[Tuple[int, int]]:
+    """(band, bucket) keys for the LSH index"""
+    buckets = []
+    for band in range(MINHASH_BANDS):
+        rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS].tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+    return buckets
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
 @dataclass
 class DuplicationResult:
     """Result of content duplication check."""
@@ -28,9 +87,59 @@ class DuplicationResult:
 class ContentDeduplicationService:
     """Service for intelligent content deduplication."""
     
-    def __init__(self, get_conn_func):
+    def __init__(self, get_conn_func, max_candidates: int = 20):
         """Initialize with database connection function."""
         self.get_conn = get_conn_func
+        self.max_candidates = max_candidates
+        self._ensure_index_tables()
+
+    def _ensure_index_tables(self):
+        """Create the MinHash signature and LSH band tables."""
+        conn = self.get_conn()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS note_minhash (
+                    note_id INTEGER PRIMARY KEY,
+                    user_id INTEGER,
+                    signature BLOB NOT NULL,
+                    updated_at TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS note_minhash_bands (
+                    user_id INTEGER,
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    note_id INTEGER NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_note_minhash_bands_lookup "
+                "ON note_minhash_bands (user_id, band, bucket)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_note_minhash_bands_note ON note_minhash_bands (note_id)"
+            )
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS notes_minhash_ad AFTER DELETE ON notes
+                BEGIN
+                    DELETE FROM note_minhash WHERE note_id = OLD.id;
+                    DELETE FROM note_minhash_bands WHERE note_id = OLD.id;
+                END
+            """)
+            # An edited note drops its stale signature; backfill re-indexes it
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS notes_minhash_au AFTER UPDATE OF title, content ON notes
+                BEGIN
+                    DELETE FROM note_minhash WHERE note_id = OLD.id;
+                    DELETE FROM note_minhash_bands WHERE note_id = OLD.id;
+                END
+            """)
+            conn.commit()
+        except Exception as e:
+            log.warning("Could not create deduplication index tables: %s", e)
+        finally:
+            conn.close()
     
     def compute_content_hash(self, title: str, content: str) -> str:
         """Compute a normalized content hash for exact duplicate detection."""
@@ -58,7 +167,8 @@ class ContentDeduplicationService:
         content: str,
         user_id: int,
         window_days: int = 30,
-        fuzzy_threshold: float = 0.85
+        fuzzy_threshold: float = 0.85,
+        use_index: bool = True
     ) -> DuplicationResult:
         """
         Check for duplicate content using multiple strategies.
@@ -69,6 +179,8 @@ class ContentDeduplicationService:
             user_id: User ID to scope search
             window_days: Look back window in days (0 = no limit)
             fuzzy_threshold: Similarity threshold for fuzzy matching (0.0-1.0)
+            use_index: Find fuzzy candidates through the LSH index across the
+                whole window instead of scanning the 50 most recent notes
             
         Returns:
             DuplicationResult with match information
@@ -82,9 +194,8 @@ class ContentDeduplicationService:
             
             # Step 2: Fuzzy content matching (more expensive)
             if fuzzy_threshold > 0:
-                fuzzy_match = self._check_fuzzy_match(
-                    title, content, user_id, window_days, fuzzy_threshold
-                )
+                check = self._check_indexed_fuzzy_match if use_index else self._check_fuzzy_match
+                fuzzy_match = check(title, content, user_id, window_days, fuzzy_threshold)
                 if fuzzy_match:
                     return fuzzy_match
             
@@ -200,6 +311,145 @@ class ContentDeduplicationService:
         finally:
             conn.close()
     
+    def _check_indexed_fuzzy_match(
+        self,
+        title: str,
+        content: str,
+        user_id: int,
+        window_days: int,
+        threshold: float
+    ) -> Optional[DuplicationResult]:
+        """Fuzzy match against LSH candidates from the user's whole history."""
+        normalized_input = self._normalize_content(title, content)
+        signature = minhash_signature(normalized_input)
+        if signature is None:
+            return None
+        buckets = band_buckets(signature)
+
+        conn = self.get_conn()
+        try:
+            values = ", ".join("(?, ?)" for _ in buckets)
+            params: List[Any] = [v for pair in buckets for v in pair]
+            params.append(user_id)
+            rows = conn.execute(f"""
+                WITH probe(band, bucket) AS (VALUES {values})
+                SELECT DISTINCT m.note_id, m.signature
+                FROM probe
+                JOIN note_minhash_bands b
+                  ON b.user_id = ? AND b.band = probe.band AND b.bucket = probe.bucket
+                JOIN note_minhash m ON m.note_id = b.note_id
+            """, params).fetchall()
+            if not rows:
+                return None
+
+            # Most similar signatures first; only these get the exact comparison
+            ranked = sorted(
+                ((estimate_jaccard(signature, np.frombuffer(blob, dtype=np.uint32)), note_id)
+                 for note_id, blob in rows),
+                reverse=True,
+            )[:self.max_candidates]
+            ids = [note_id for _, note_id in ranked]
+
+            query = f"""
+                SELECT id, title, content FROM notes
+                WHERE id IN ({", ".join("?" for _ in ids)}) AND user_id = ? AND content IS NOT NULL
+            """
+            params = [*ids, user_id]
+            if window_days > 0:
+                cutoff = (datetime.now() - timedelta(days=window_days)).isoformat()
+                query += " AND created_at >= ?"
+                params.append(cutoff)
+            notes = {row[0]: row for row in conn.execute(query, params).fetchall()}
+        finally:
+            conn.close()
+
+        best_match = None
+        best_score = 0.0
+        for _, note_id in ranked:
+            if note_id not in notes:
+                continue
+            _, existing_title, existing_content = notes[note_id]
+            matcher = SequenceMatcher(None, normalized_input, self._normalize_content(existing_title, existing_content))
+            # Cheap upper bounds first; ratio() is quadratic on long texts
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            similarity = matcher.ratio()
+            if similarity > best_score and similarity >= threshold:
+                best_score = similarity
+                best_match = (note_id, existing_title, existing_content)
+
+        if best_match:
+            note_id, existing_title, existing_content = best_match
+            return DuplicationResult(
+                is_duplicate=True,
+                existing_note_id=note_id,
+                similarity_score=best_score,
+                match_type="fuzzy",
+                existing_title=existing_title,
+                existing_content_preview=existing_content[:100] if existing_content else None
+            )
+        return None
+
+    def index_note(self, note_id: int, user_id: Optional[int], title: str, content: str, conn=None) -> bool:
+        """Store or refresh a note's MinHash signature and LSH band entries."""
+        signature = minhash_signature(self._normalize_content(title, content))
+        own_conn = conn is None
+        if own_conn:
+            conn = self.get_conn()
+        try:
+            conn.execute("DELETE FROM note_minhash_bands WHERE note_id = ?", (note_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO note_minhash (note_id, user_id, signature, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (note_id, user_id, EMPTY_SIGNATURE if signature is None else signature.tobytes(),
+                 datetime.now().isoformat())
+            )
+            if signature is not None:
+                conn.executemany(
+                    "INSERT INTO note_minhash_bands (user_id, band, bucket, note_id) VALUES (?, ?, ?, ?)",
+                    [(user_id, band, bucket, note_id) for band, bucket in band_buckets(signature)]
+                )
+            if own_conn:
+                conn.commit()
+            return signature is not None
+        except Exception as e:
+            log.error("Error indexing note %s for deduplication: %s", note_id, e)
+            if own_conn:
+                conn.rollback()
+            return False
+        finally:
+            if own_conn:
+                conn.close()
+
+    def backfill_index(self, user_id: Optional[int] = None, batch_size: int = 500) -> int:
+        """Index every note that has no signature yet; returns notes indexed."""
+        indexed = 0
+        last_id = 0
+        while True:
+            conn = self.get_conn()
+            try:
+                query = """
+                    SELECT n.id, n.user_id, n.title, n.content FROM notes n
+                    LEFT JOIN note_minhash m ON m.note_id = n.id
+                    WHERE m.note_id IS NULL AND n.content IS NOT NULL AND n.id > ?
+                """
+                params: List[Any] = [last_id]
+                if user_id is not None:
+                    query += " AND n.user_id = ?"
+                    params.append(user_id)
+                query += " ORDER BY n.id LIMIT ?"
+                params.append(batch_size)
+                rows = conn.execute(query, params).fetchall()
+                if not rows:
+                    return indexed
+                for note_id, note_user_id, title, content in rows:
+                    if self.index_note(note_id, note_user_id, title, content, conn=conn):
+                        indexed += 1
+                conn.commit()
+                last_id = rows[-1][0]
+            finally:
+                conn.close()
+
     def update_existing_note(
         self, 
         note_id: int, 
@@ -233,6 +483,13 @@ class ContentDeduplicationService:
                 
                 query = f"UPDATE notes SET {', '.join(updates)} WHERE id = ?"
                 conn.execute(query, params)
+
+                if new_content:
+                    row = conn.execute(
+                        "SELECT user_id, title FROM notes WHERE id = ?", (note_id,)
+                    ).fetchone()
+                    if row:
+                        self.index_note(note_id, row[0], row[1], new_content, conn=conn)
             else:
                 # Just update timestamp
                 conn.execute(
@@ -258,4 +515,17 @@ def get_deduplication_service(get_conn_func):
     global _deduplication_service
     if _deduplication_service is None:
         _deduplication_service = ContentDeduplicationService(get_conn_func)
-    return _deduplication_service
\ No newline at end of file
+    return _deduplication_service
+
+
+async def run_index_backfill(get_conn_func, interval: float = 30.0) -> None:
+    """Index new and edited notes in the background (one worker, under a lease)"""
+    service = get_deduplication_service(get_conn_func)
+    while True:
+        try:
+            indexed = await asyncio.to_thread(service.backfill_index)
+            if indexed:
+                log.info("Indexed %d notes for deduplication", indexed)
+        except Exception as e:
+            log.warning("Deduplication index backfill error: %s", e)
+        await asyncio.sleep(interval)
@@ -4,25 +4,33 @@ Diagnostics Router for Second Brain
 Provides lightweight diagnostics endpoints for search/index status.
 """
 import os
+import sqlite3
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pathlib import Path
 
+import startup_profiler
 from config import settings
+from services.advanced_search_parser import AdvancedSearchParser
+from services.search_history_service import get_history_recorder
 from services.search_index import SearchIndexer, SearchConfig
+from services.search_planner import SearchPlanner
 
 get_conn = None
 get_current_user = None  # optional dependency for authenticated endpoints
+router_registry = None  # lazy feature routers, reported by /startup
 
 router = APIRouter(prefix="/api/diagnostics", tags=["diagnostics"])
 
 
-def init_diagnostics_router(get_conn_func, get_current_user_func: Optional[callable] = None):
-    global get_conn, get_current_user
+def init_diagnostics_router(get_conn_func, get_current_user_func: Optional[callable] = None,
+                            router_registry_obj=None):
+    global get_conn, get_current_user, router_registry
     get_conn = get_conn_func
     get_current_user = get_current_user_func
+    router_registry = router_registry_obj
 
 
 @router.get("/health")
@@ -34,6 +42,16 @@ async def health():
     }
 
 
+@router.get("/startup")
+async def startup_profile(top: int = Query(30, ge=1, le=500, description="Number of slowest imports to list")):
+    """Per-module import times, startup phases and which feature routers are loaded."""
+    return {
+        **startup_profiler.report(top=top),
+        "routers": router_registry.status() if router_registry is not None else [],
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+
+
 @router.get("/search")
 async def search_status():
     """Report FTS and vector index presence and basic counts."""
@@ -44,14 +62,16 @@ async def search_status():
         # notes count
         notes_count = cur.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
 
-        # FTS
+        # FTS (chunk index plus notes still waiting to be indexed)
         fts_exists = cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='notes_fts'"
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='note_chunks_fts'"
         ).fetchone() is not None
         fts_rows = 0
+        fts_queued = 0
         if fts_exists:
             try:
-                fts_rows = cur.execute("SELECT COUNT(*) FROM notes_fts").fetchone()[0]
+                fts_rows = cur.execute("SELECT COUNT(*) FROM note_chunks").fetchone()[0]
+                fts_queued = cur.execute("SELECT COUNT(*) FROM note_index_queue").fetchone()[0]
             except Exception:
                 fts_rows = None
 
@@ -82,9 +102,10 @@ async def search_status():
 
         return {
             "notes": {"count": notes_count},
-            "fts": {"exists": fts_exists, "rows": fts_rows},
+            "fts": {"exists": fts_exists, "rows": fts_rows, "queued": fts_queued},
             "vectors": {"exists": vec_exists, "rows": vec_rows},
             "embeddings_fallback": {"exists": emb_exists, "rows": emb_rows},
+            "history": get_history_recorder(get_conn).get_stats(),
             "env": {"SQLITE_VEC_PATH": bool(vec_path)},
             "timestamp": datetime.utcnow().isoformat() + "Z",
         }
@@ -92,6 +113,34 @@ async def search_status():
         raise HTTPException(status_code=500, detail=f"Diagnostics failed: {e}")
 
 
+@router.get("/search/plan")
+async def search_plan(
+    q: str = Query(..., description="Advanced search query, e.g. 'tag:work type:note created:last-7-days roadmap'"),
+    user_id: Optional[int] = Query(None, description="Plan with the per-user filter the app applies"),
+):
+    """Compiled SQL, parameters and EXPLAIN QUERY PLAN for an advanced search query."""
+    conn = get_conn()
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(notes)")]
+        plan = SearchPlanner(columns).plan(
+            AdvancedSearchParser().parse(q), user_id=user_id, exclude_deleted=user_id is not None
+        )
+        return {
+            "query": q,
+            "fts_match": plan.match,
+            "fts_exclude": plan.exclude,
+            "notes": plan.notes,
+            "sql": " ".join(plan.sql.split()),
+            "params": plan.params,
+            "plan": SearchPlanner.explain(conn, plan),
+            "plan_cache": SearchPlanner.cache_info(),
+        }
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=400, detail=f"Could not plan query: {e}")
+    finally:
+        conn.close()
+
+
 @router.post("/reindex")
 async def reindex(embeddings: bool = Query(True, description="Rebuild embeddings as well as FTS")):
     """Trigger a best-effort index rebuild (FTS and optionally embeddings)."""
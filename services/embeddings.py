@@ -17,7 +17,9 @@ import json
 import os
 import random
 import struct
+import threading
 import urllib.request
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 import logging
@@ -26,6 +28,8 @@ logger = logging.getLogger(__name__)
 
 # Default dimensions for all-MiniLM-L6-v2
 DEFAULT_DIM = 384
+# Recent query embeddings kept by embed_query
+QUERY_CACHE_SIZE = 256
 
 class Embeddings:
     def __init__(self, provider: str | None = None, model: str | None = None, dim: int = DEFAULT_DIM):
@@ -36,6 +40,8 @@ class Embeddings:
         self.dim = int(os.getenv('EMBEDDINGS_DIM', str(dim)))
         self.model_path = os.getenv('SENTENCE_TRANSFORMER_MODEL_PATH', './sentence_transformer_model')
         self._sentence_transformer = None
+        self._query_cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._query_cache_lock = threading.Lock()
         
         # Check local-first AI policy
         self._check_external_allowed(settings)
@@ -81,6 +87,40 @@ class Embeddings:
                     logger.error(f"All embedding methods failed: {final_e}")
                     raise
     
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a search query, reusing recent results.
+
+        One chat turn embeds the same message for document search and for
+        episodic and semantic memory recall; with the shared service from
+        get_embeddings_service() the model runs once.
+        """
+        key = (text or "").strip()
+        with self._query_cache_lock:
+            vec = self._query_cache.get(key)
+            if vec is not None:
+                self._query_cache.move_to_end(key)
+                return vec
+        vec = self.embed(key)
+        with self._query_cache_lock:
+            self._query_cache[key] = vec
+            while len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return vec
+    
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed many texts; sentence-transformers encodes them in one pass."""
+        if not texts:
+            return []
+        if self.provider == 'sentence_transformers':
+            try:
+                if self._sentence_transformer is None:
+                    self._load_sentence_transformer()
+                embeddings = self._sentence_transformer.encode(list(texts), convert_to_numpy=True)
+                return [row.tolist() for row in embeddings]
+            except Exception as e:
+                logger.warning(f"Batch embedding failed, embedding texts one by one: {e}")
+        return [self.embed(text) for text in texts]
+    
     def _sentence_transformers_embed(self, text: str) -> list[float]:
         """Generate embeddings using sentence-transformers."""
         try:
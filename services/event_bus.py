@@ -0,0 +1,277 @@
+"""
+Cross-Process Event Bus
+
+Under gunicorn every worker has its own SSE subscribers and WebSocket
+connections, and processing runs in executor threads, so an event has to
+reach subscribers in other threads and other processes. Events are appended
+to a small SQLite (WAL) table; each process runs one poller thread that
+watches ``PRAGMA data_version`` (which changes whenever another connection
+commits) and only queries for new rows when it moves. Subscribers in the
+publishing process are called directly, without waiting for the poll.
+
+No broker process or Redis is needed, and a worker that restarts simply
+resumes from the newest event.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Events older than this are pruned; late joiners start at the newest event anyway
+RETENTION_SECONDS = 300
+PRUNE_INTERVAL_SECONDS = 30
+
+EventCallback = Callable[[Dict[str, Any]], Any]
+
+
+@dataclass
+class _Subscription:
+    channel: str
+    callback: EventCallback
+    loop: Optional[asyncio.AbstractEventLoop]
+
+    def deliver(self, payload: Dict[str, Any]):
+        if self.loop is None:
+            result = self.callback(payload)
+            if asyncio.iscoroutine(result):
+                result.close()
+                logger.warning(f"Async subscriber on {self.channel} needs an event loop")
+            return
+        if self.loop.is_closed():
+            return
+        if asyncio.iscoroutinefunction(self.callback):
+            asyncio.run_coroutine_threadsafe(self.callback(payload), self.loop)
+        else:
+            self.loop.call_soon_threadsafe(self.callback, payload)
+
+
+class EventBus:
+    """Publish/subscribe over a SQLite change feed shared by all local processes"""
+
+    def __init__(self, path: Path, poll_interval: float = 0.02, retention_seconds: float = RETENTION_SECONDS):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._subscribers: Dict[str, List[_Subscription]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {
+            'published': 0,
+            'delivered_local': 0,
+            'delivered_remote': 0,
+            'publish_errors': 0,
+            'last_remote_latency_ms': 0.0,
+        }
+        self._reset_process_state()
+        self._ensure_schema()
+
+    def _reset_process_state(self):
+        """Per-process identity and handles; redone after a fork"""
+        self._pid = os.getpid()
+        self.origin = f"{self._pid}-{uuid.uuid4().hex[:8]}"
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # Connections and threads don't survive fork (e.g. gunicorn --preload)
+            self._reset_process_state()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS realtime_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    origin TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_realtime_events_created ON realtime_events(created_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # --- publishing ---
+
+    def publish(self, channel: str, payload: Dict[str, Any]) -> bool:
+        """Deliver to subscribers in this process now and to other processes via the feed.
+
+        Safe to call from any thread; never needs an event loop.
+        """
+        self._check_fork()
+        self.stats['published'] += 1
+        try:
+            encoded = json.dumps(payload, default=str)
+            with self._write_lock:
+                if self._write_conn is None:
+                    self._write_conn = self._connect()
+                self._write_conn.execute(
+                    "INSERT INTO realtime_events (channel, payload, origin, created_at) VALUES (?, ?, ?, ?)",
+                    (channel, encoded, self.origin, time.time()),
+                )
+                self._write_conn.commit()
+            published = True
+        except Exception as e:
+            self.stats['publish_errors'] += 1
+            logger.warning(f"Could not publish {channel} event to other workers: {e}")
+            published = False
+        # Round-trip through JSON so local and remote subscribers see the same payload
+        self._dispatch(channel, json.loads(json.dumps(payload, default=str)))
+        self.stats['delivered_local'] += 1
+        return published
+
+    # --- subscribing ---
+
+    def subscribe(self, channel: str, callback: EventCallback,
+                  loop: Optional[asyncio.AbstractEventLoop] = None) -> _Subscription:
+        """Call ``callback(payload)`` for every event on ``channel``.
+
+        With ``loop`` the callback (sync or async) runs on that event loop;
+        otherwise it runs on the publishing or polling thread.
+        """
+        self._check_fork()
+        subscription = _Subscription(channel, callback, loop)
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscription)
+        self._ensure_poller()
+        return subscription
+
+    def unsubscribe(self, subscription: _Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+
+    def _dispatch(self, channel: str, payload: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(payload)
+            except Exception as e:
+                logger.warning(f"Event subscriber on {channel} failed: {e}")
+
+    # --- polling ---
+
+    def _ensure_poller(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-bus-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM realtime_events").fetchone()[0]
+            last_version = None
+            next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+            while not self._stop.is_set():
+                try:
+                    version = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if version != last_version:
+                        last_version = version
+                        last_id = self._deliver_new(conn, last_id)
+                    if time.monotonic() >= next_prune:
+                        next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+                        conn.execute("DELETE FROM realtime_events WHERE created_at < ?",
+                                     (time.time() - self.retention_seconds,))
+                        conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Event bus poll failed: {e}")
+                self._stop.wait(self.poll_interval)
+        finally:
+            conn.close()
+
+    def _deliver_new(self, conn: sqlite3.Connection, last_id: int) -> int:
+        rows = conn.execute(
+            "SELECT id, channel, payload, origin, created_at FROM realtime_events WHERE id > ? ORDER BY id",
+            (last_id,),
+        ).fetchall()
+        now = time.time()
+        for event_id, channel, payload, origin, created_at in rows:
+            last_id = event_id
+            if origin == self.origin:
+                continue  # already delivered in-process at publish time
+            try:
+                decoded = json.loads(payload)
+            except ValueError:
+                continue
+            self._dispatch(channel, decoded)
+            self.stats['delivered_remote'] += 1
+            self.stats['last_remote_latency_ms'] = round((now - created_at) * 1000, 2)
+        return last_id
+
+    def close(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=2)
+        self._thread = None
+        with self._write_lock:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'origin': self.origin,
+            'channels': {channel: len(subs) for channel, subs in self._subscribers.items()},
+            'polling': bool(self._thread and self._thread.is_alive()),
+        }
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Process-wide event bus on ``settings.realtime_events_path``"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = EventBus(
+                settings.realtime_events_path,
+                poll_interval=max(settings.realtime_poll_interval_ms, 1) / 1000,
+            )
+        return _bus
+
+
+def shutdown_event_bus():
+    """Stop the poller thread - for shutdown"""
+    global _bus
+    with _bus_lock:
+        bus, _bus = _bus, None
+    if bus is not None:
+        bus.close()
@@ -15,6 +15,8 @@ import sqlite3
 from datetime import datetime, timedelta, timezone
 from typing import Callable, Dict, Optional
 
+from services.note_index import NoteIndexService
+
 UTC = timezone.utc
 
 class JobRunner:
@@ -111,7 +113,5 @@ class JobRunner:
         conn.commit()
 
     def _handle_reindex(self, job: sqlite3.Row, conn: sqlite3.Connection):
-        # Rebuild FTS from content
-        cur = conn.cursor()
-        cur.execute("INSERT INTO notes_fts(notes_fts) VALUES('rebuild')")
-        conn.commit()
\ No newline at end of file
+        # Re-chunk and re-index every note
+        NoteIndexService(lambda: sqlite3.connect(self.db_path)).rebuild(conn=conn)
\ No newline at end of file
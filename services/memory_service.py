@@ -1,12 +1,47 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import re
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 import logging
 from services.embeddings import Embeddings
+from services.memory_vectors import MEMORY_KINDS, memory_vectors, pack_vector
 
 logger = logging.getLogger(__name__)
 
+# Reciprocal rank fusion of the FTS and vector rankings
+RRF_K = 60
+# Candidates taken from each ranking per requested result
+CANDIDATES_PER_RESULT = 4
+MIN_CANDIDATES = 20
+# Nearest neighbours below this cosine similarity are unrelated, not recall
+MIN_VECTOR_SIMILARITY = 0.3
+# Recency half-lives: conversations fade quickly, facts about the user slowly
+EPISODIC_HALF_LIFE_DAYS = 30.0
+SEMANTIC_HALF_LIFE_DAYS = 180.0
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _fts_recall_query(query: str) -> str:
+    """Any of the query's words, each quoted so punctuation can't break MATCH.
+
+    A chat message rarely contains every word of the memory it should recall,
+    so words are OR-ed; bm25 still ranks memories matching more of them first.
+    """
+    words = dict.fromkeys(word.lower() for word in _WORD_RE.findall(query or "") if len(word) > 1)
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+def _decay(timestamp, half_life_days: float) -> float:
+    try:
+        then = datetime.fromisoformat(str(timestamp))
+    except (TypeError, ValueError):
+        return 1.0
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    age_days = max((now - then.replace(tzinfo=None)).total_seconds() / 86400, 0.0)
+    return 0.5 ** (age_days / half_life_days)
+
 class MemoryService:
     """Manages episodic and semantic memories"""
 
@@ -38,18 +73,7 @@ class MemoryService:
         logger.debug(f"Added episodic memory {episode_id} for user {user_id}")
 
         # Generate and store embedding if available
-        if self.embeddings and summary:
-            try:
-                embedding = self.embeddings.generate_embedding(summary)
-                # Store embedding
-                cursor.execute("""
-                    INSERT INTO episodic_vectors (episode_id, embedding)
-                    VALUES (?, ?)
-                """, (episode_id, embedding))
-                self.db.commit()
-                logger.debug(f"Stored vector embedding for episode {episode_id}")
-            except Exception as e:
-                logger.warning(f"Could not store episode vector: {e}")
+        self._store_vector("episodic", episode_id, summary or content)
 
         return episode_id
 
@@ -60,31 +84,33 @@ class MemoryService:
         limit: int = 5,
         min_importance: float = 0.0
     ) -> List[Dict]:
-        """Search episodic memories using FTS + optional vector"""
-        cursor = self.db.cursor()
-
+        """Search episodic memories: FTS and vector rankings fused, weighted by importance and recency"""
         try:
-            # FTS search
-            cursor.execute("""
-                SELECT
-                    e.episode_id,
-                    e.content,
-                    e.summary,
-                    e.importance,
-                    e.context,
-                    e.created_at,
-                    episodic_fts.rank
-                FROM episodic_memories e
-                JOIN episodic_fts ON e.id = episodic_fts.rowid
+            fused = self._recall("episodic", user_id, query, limit, """
+                SELECT e.episode_id, episodic_fts.rank
+                FROM episodic_fts
+                JOIN episodic_memories e ON e.id = episodic_fts.rowid
                 WHERE episodic_fts MATCH ?
                     AND e.user_id = ?
                     AND e.importance >= ?
                 ORDER BY episodic_fts.rank
                 LIMIT ?
-            """, (query, user_id, min_importance, limit))
+            """, (user_id, min_importance))
+            if not fused:
+                return []
+
+            cursor = self.db.cursor()
+            cursor.execute(f"""
+                SELECT episode_id, content, summary, importance, context, created_at
+                FROM episodic_memories
+                WHERE user_id = ? AND importance >= ?
+                    AND episode_id IN ({', '.join('?' * len(fused))})
+            """, (user_id, min_importance, *fused))
 
             results = []
             for row in cursor.fetchall():
+                rrf, rank = fused[row[0]]
+                importance = row[3] if row[3] is not None else 0.5
                 results.append({
                     'episode_id': row[0],
                     'content': row[1],
@@ -92,11 +118,13 @@ class MemoryService:
                     'importance': row[3],
                     'context': row[4],
                     'created_at': row[5],
-                    'rank': row[6]
+                    'rank': rank,
+                    'score': rrf * (0.5 + importance) * _decay(row[5], EPISODIC_HALF_LIFE_DAYS)
                 })
+            results.sort(key=lambda r: r['score'], reverse=True)
 
             logger.debug(f"Found {len(results)} episodic memories for query")
-            return results
+            return results[:limit]
 
         except Exception as e:
             logger.error(f"Episodic search failed: {e}")
@@ -153,17 +181,7 @@ class MemoryService:
         logger.debug(f"Added semantic memory {fact_id} for user {user_id}: {fact[:50]}")
 
         # Generate and store embedding if available
-        if self.embeddings:
-            try:
-                embedding = self.embeddings.generate_embedding(fact)
-                cursor.execute("""
-                    INSERT INTO semantic_vectors (fact_id, embedding)
-                    VALUES (?, ?)
-                """, (fact_id, embedding))
-                self.db.commit()
-                logger.debug(f"Stored vector embedding for fact {fact_id}")
-            except Exception as e:
-                logger.warning(f"Could not store fact vector: {e}")
+        self._store_vector("semantic", fact_id, fact)
 
         return fact_id
 
@@ -174,61 +192,117 @@ class MemoryService:
         limit: int = 10,
         category: str = None
     ) -> List[Dict]:
-        """Search user facts"""
-        cursor = self.db.cursor()
-
+        """Search user facts: FTS and vector rankings fused, weighted by confidence and recency"""
+        category_filter = "AND s.category = ?" if category else ""
+        filter_params = (category,) if category else ()
         try:
-            if category:
-                cursor.execute("""
-                    SELECT
-                        s.fact_id,
-                        s.fact,
-                        s.category,
-                        s.confidence,
-                        s.created_at,
-                        semantic_fts.rank
-                    FROM semantic_memories s
-                    JOIN semantic_fts ON s.id = semantic_fts.rowid
-                    WHERE semantic_fts MATCH ?
-                        AND s.user_id = ?
-                        AND s.category = ?
-                    ORDER BY semantic_fts.rank
-                    LIMIT ?
-                """, (query, user_id, category, limit))
-            else:
-                cursor.execute("""
-                    SELECT
-                        s.fact_id,
-                        s.fact,
-                        s.category,
-                        s.confidence,
-                        s.created_at,
-                        semantic_fts.rank
-                    FROM semantic_memories s
-                    JOIN semantic_fts ON s.id = semantic_fts.rowid
-                    WHERE semantic_fts MATCH ? AND s.user_id = ?
-                    ORDER BY semantic_fts.rank
-                    LIMIT ?
-                """, (query, user_id, limit))
+            fused = self._recall("semantic", user_id, query, limit, f"""
+                SELECT s.fact_id, semantic_fts.rank
+                FROM semantic_fts
+                JOIN semantic_memories s ON s.id = semantic_fts.rowid
+                WHERE semantic_fts MATCH ?
+                    AND s.user_id = ?
+                    {category_filter}
+                ORDER BY semantic_fts.rank
+                LIMIT ?
+            """, (user_id, *filter_params))
+            if not fused:
+                return []
+
+            cursor = self.db.cursor()
+            cursor.execute(f"""
+                SELECT s.fact_id, s.fact, s.category, s.confidence, s.created_at,
+                       COALESCE(s.updated_at, s.created_at)
+                FROM semantic_memories s
+                WHERE s.user_id = ? {category_filter}
+                    AND s.fact_id IN ({', '.join('?' * len(fused))})
+            """, (user_id, *filter_params, *fused))
 
             results = []
             for row in cursor.fetchall():
+                rrf, rank = fused[row[0]]
+                confidence = row[3] if row[3] is not None else 1.0
                 results.append({
                     'fact_id': row[0],
                     'fact': row[1],
                     'category': row[2],
                     'confidence': row[3],
                     'created_at': row[4],
-                    'rank': row[5]
+                    'rank': rank,
+                    'score': rrf * (0.5 + confidence) * _decay(row[5], SEMANTIC_HALF_LIFE_DAYS)
                 })
+            results.sort(key=lambda r: r['score'], reverse=True)
 
             logger.debug(f"Found {len(results)} semantic memories for query")
-            return results
+            return results[:limit]
 
         except Exception as e:
             logger.error(f"Semantic search failed: {e}")
             return []
 
+    # ========== Hybrid Recall ==========
+
+    def _recall(
+        self,
+        kind: str,
+        user_id: int,
+        query: str,
+        limit: int,
+        fts_sql: str,
+        fts_params: tuple
+    ) -> Dict[str, Tuple[float, Optional[float]]]:
+        """Fuse the FTS and vector rankings; returns {memory_id: (rrf score, bm25 rank or None)}.
+
+        ``fts_sql`` takes the MATCH expression first, then ``fts_params``, then the candidate limit.
+        """
+        depth = max(limit * CANDIDATES_PER_RESULT, MIN_CANDIDATES)
+        fused: Dict[str, list] = {}
+
+        match = _fts_recall_query(query)
+        if match:
+            try:
+                rows = self.db.execute(fts_sql, (match, *fts_params, depth)).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"{kind} memory FTS failed: {e}")
+                rows = []
+            for position, (memory_id, rank) in enumerate(rows):
+                fused[memory_id] = [1.0 / (RRF_K + position + 1), rank]
+
+        for position, (memory_id, _) in enumerate(self._vector_candidates(kind, user_id, query, depth)):
+            entry = fused.setdefault(memory_id, [0.0, None])
+            entry[0] += 1.0 / (RRF_K + position + 1)
+
+        return {memory_id: (rrf, rank) for memory_id, (rrf, rank) in fused.items()}
+
+    def _vector_candidates(self, kind: str, user_id: int, query: str, depth: int) -> List[Tuple[str, float]]:
+        if not self.embeddings or not (query or "").strip():
+            return []
+        try:
+            return memory_vectors.search(
+                self.db, kind, user_id, self.embeddings.embed_query(query), depth,
+                min_similarity=MIN_VECTOR_SIMILARITY
+            )
+        except Exception as e:
+            # No vector tables (016 not applied) or no embedding model: FTS alone
+            logger.debug(f"{kind} memory vector recall unavailable: {e}")
+            return []
+
+    def _store_vector(self, kind: str, memory_id: str, text: str):
+        """Embed a memory; re-embedding replaces the old vector"""
+        if not self.embeddings or not (text or "").strip():
+            return
+        table, id_column, _ = MEMORY_KINDS[kind]
+        try:
+            embedding = pack_vector(self.embeddings.embed(text))
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {table} ({id_column}, embedding) VALUES (?, ?)",
+                (memory_id, embedding)
+            )
+            self.db.commit()
+            logger.debug(f"Stored vector embedding for {kind} memory {memory_id}")
+        except Exception as e:
+            logger.warning(f"Could not store {kind} memory vector: {e}")
+
     def get_all_user_facts(self, user_id: int, category: str = None) -> List[Dict]:
         """Get all facts about a user"""
         cursor = self.db.cursor()
@@ -289,10 +363,18 @@ class MemoryService:
             self.db.commit()
             logger.debug(f"Updated semantic memory {fact_id}")
 
+        if fact is not None:
+            self._store_vector("semantic", fact_id, fact)
+
     def delete_semantic_memory(self, fact_id: str):
         """Delete a semantic memory"""
         cursor = self.db.cursor()
         cursor.execute("DELETE FROM semantic_memories WHERE fact_id = ?", (fact_id,))
+        try:
+            # Foreign keys are usually off, so the cascade in 016 doesn't fire
+            cursor.execute("DELETE FROM semantic_vectors WHERE fact_id = ?", (fact_id,))
+        except sqlite3.OperationalError:
+            pass
         self.db.commit()
         logger.debug(f"Deleted semantic memory {fact_id}")
 
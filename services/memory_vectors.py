@@ -0,0 +1,119 @@
+"""
+Vector recall for episodic and semantic memories.
+
+Memory embeddings are stored as float32 BLOBs in ``episodic_vectors`` and
+``semantic_vectors`` (016_memory_vectors.sql). Each user's vectors are loaded
+into one normalized numpy matrix, cached per process, so a query costs one
+matrix-vector product instead of a scan over the BLOBs. A signature query
+(count and highest vector id over the user's memories) runs before every
+lookup; it changes on additions, re-embeddings and deletions from any worker,
+and only then is the matrix reloaded.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# kind -> (vector table, memory id column, memory table)
+MEMORY_KINDS = {
+    "episodic": ("episodic_vectors", "episode_id", "episodic_memories"),
+    "semantic": ("semantic_vectors", "fact_id", "semantic_memories"),
+}
+# Users whose matrices are kept in memory at once
+MAX_CACHED_MATRICES = 256
+
+
+def pack_vector(vec: Sequence[float]) -> bytes:
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+
+@dataclass
+class _UserMatrix:
+    signature: Tuple
+    ids: List[str]
+    matrix: np.ndarray  # rows normalized to unit length
+
+
+class MemoryVectorIndex:
+    """Per-user, per-kind matrices of memory embeddings"""
+
+    def __init__(self, max_matrices: int = MAX_CACHED_MATRICES):
+        self.max_matrices = max_matrices
+        self._matrices: "OrderedDict[tuple, _UserMatrix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0}
+
+    def search(self, conn: sqlite3.Connection, kind: str, user_id: int,
+               query_vector: Sequence[float], k: int, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """Nearest memories by cosine similarity, best first, as (memory id, similarity)"""
+        entry = self._matrix(conn, kind, user_id)
+        query = np.asarray(query_vector, dtype=np.float32)
+        if not entry.ids or entry.matrix.shape[1] != query.shape[0]:
+            return []
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        similarities = entry.matrix @ (query / norm)
+        k = min(k, len(entry.ids))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(entry.ids[i], float(similarities[i])) for i in top if similarities[i] >= min_similarity]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self._stats, "matrices": len(self._matrices)}
+
+    def _matrix(self, conn: sqlite3.Connection, kind: str, user_id: int) -> _UserMatrix:
+        vector_table, id_column, memory_table = MEMORY_KINDS[kind]
+        joined = (
+            f"FROM {vector_table} v JOIN {memory_table} m ON m.{id_column} = v.{id_column} "
+            f"WHERE m.user_id = ?"
+        )
+        # Keyed by database file too: tests and tools open several databases in one process
+        key = (conn.execute("PRAGMA database_list").fetchone()[2], kind, user_id)
+        signature = tuple(conn.execute(f"SELECT COUNT(*), MAX(v.id) {joined}", (user_id,)).fetchone())
+        with self._lock:
+            entry = self._matrices.get(key)
+            if entry is not None and entry.signature == signature:
+                self._matrices.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+
+        # Newest first: after a model change the newest vectors set the dimension
+        rows = conn.execute(f"SELECT v.{id_column}, v.embedding {joined} ORDER BY v.id DESC", (user_id,)).fetchall()
+        ids: List[str] = []
+        vectors: List[np.ndarray] = []
+        for memory_id, blob in rows:
+            vec = np.frombuffer(blob, dtype="<f4")
+            if vectors and vec.shape != vectors[0].shape:
+                # Left over from a different embedding model; skipped until re-embedded
+                continue
+            ids.append(memory_id)
+            vectors.append(vec)
+        if vectors:
+            matrix = np.vstack(vectors).astype(np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        entry = _UserMatrix(signature=signature, ids=ids, matrix=matrix)
+        with self._lock:
+            self._matrices[key] = entry
+            self._matrices.move_to_end(key)
+            while len(self._matrices) > self.max_matrices:
+                self._matrices.popitem(last=False)
+            self._stats["loads"] += 1
+        return entry
+
+
+# Process-wide, so every MemoryService instance shares the loaded matrices
+memory_vectors = MemoryVectorIndex()
@@ -395,17 +395,6 @@ class MobileCaptureService:
         ))
         
         note_id = cursor.lastrowid
-        
-        # Update search index if exists
-        try:
-            cursor.execute("""
-                INSERT INTO notes_fts (rowid, note, tags)
-                VALUES (?, ?, ?)
-            """, (note_id, content, tags))
-        except sqlite3.OperationalError:
-            # FTS table might not exist
-            pass
-        
         conn.commit()
         return note_id
 
@@ -0,0 +1,585 @@
+"""
+Note Index Service
+
+The one full-text index for notes. Notes are split into chunks
+(``note_chunks``), and a single FTS5 table, ``note_chunks_fts``, indexes those
+chunks; note-level results are rolled up from each note's best-matching chunk.
+This replaces three parallel indexes: ``notes_fts`` (trigger-maintained),
+``notes_fts5`` (backfilled once, never queried) and ``fts_chunk`` (fed from a
+``chunk`` table nothing wrote to).
+
+Writes to ``notes`` only touch ``note_index_queue`` (via triggers), so every
+writer shares the same path and pays for one small insert. ``sync()`` drains
+the queue in batches, one transaction per batch. A background loop keeps it
+drained, and searches call ``sync()`` first so new notes are searchable at once.
+
+The FTS table's tokenizer and prefix indexes come from settings
+(``search_fts_tokenizer``, ``search_fts_prefix``). When they change,
+``rebuild_online()`` builds a replacement table next to the live one in small
+batches and swaps it in, so searches keep working throughout.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from config import settings
+from services.suggestion_index import ensure_suggestion_schema, update_note_suggestions
+
+logger = logging.getLogger(__name__)
+
+# Most notes fit in one chunk; long transcripts and documents get several
+CHUNK_CHARS = 2000
+BATCH_SIZE = 200
+# Notes a search indexes before querying (one small batch, newest first); any
+# backlog is left to the background loop
+SEARCH_SYNC_LIMIT = 50
+
+LEGACY_TRIGGERS = ("notes_ai", "notes_au", "notes_ad")
+LEGACY_TABLES = ("notes_fts", "notes_fts5", "fts_chunk", "chunk")
+
+NOTE_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS note_chunks (
+    id INTEGER PRIMARY KEY,
+    note_id INTEGER NOT NULL,
+    ord INTEGER NOT NULL DEFAULT 0,
+    title TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_note_chunks_note ON note_chunks(note_id, ord);
+CREATE TABLE IF NOT EXISTS note_index_queue (
+    note_id INTEGER PRIMARY KEY,
+    queued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_index_swap (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    options TEXT NOT NULL,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_index_swap_log (
+    seq INTEGER PRIMARY KEY,
+    op TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    title TEXT,
+    tags TEXT,
+    text TEXT
+);
+"""
+
+FTS_TABLE = "note_chunks_fts"
+# Replacement table built by rebuild_online() before it is renamed over FTS_TABLE
+FTS_BUILD_TABLE = "note_chunks_fts_new"
+
+NOTE_INDEX_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS note_index_ai AFTER INSERT ON notes BEGIN
+    INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (new.id, julianday('now'));
+END;
+CREATE TRIGGER IF NOT EXISTS note_index_au AFTER UPDATE OF title, body, tags, content ON notes BEGIN
+    INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (new.id, julianday('now'));
+END;
+CREATE TRIGGER IF NOT EXISTS note_index_ad AFTER DELETE ON notes BEGIN
+    INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (old.id, julianday('now'));
+END;
+"""
+
+# Terms a query compiles into a NEAR group; longer queries only AND their terms
+MAX_NEAR_TERMS = 6
+NEAR_DISTANCE = 10
+
+
+def fts_options(tokenizer: Optional[str] = None, prefix: Optional[str] = None) -> str:
+    """Column list and options of the chunk FTS table (settings when not given)"""
+    tokenizer = settings.search_fts_tokenizer if tokenizer is None else tokenizer
+    prefix = settings.search_fts_prefix if prefix is None else prefix
+    options = ["title", "tags", "text", "content='note_chunks'", "content_rowid='id'"]
+    if tokenizer.strip():
+        options.append("tokenize='{}'".format(" ".join(tokenizer.replace("'", "''").split())))
+    if prefix.strip():
+        options.append("prefix='{}'".format(" ".join(str(int(n)) for n in prefix.split())))
+    return ", ".join(options)
+
+
+def fts_table_sql(name: str = FTS_TABLE, options: Optional[str] = None) -> str:
+    return f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({options or fts_options()})"
+
+
+def _bm25_weights(spec: str) -> str:
+    try:
+        weights = [float(w) for w in spec.split(",")]
+    except ValueError:
+        weights = []
+    if len(weights) != 3:
+        logger.warning(f"Ignoring search_fts_weights={spec!r}; expected three numbers (title, tags, text)")
+        weights = [10.0, 4.0, 1.0]
+    return ", ".join(repr(w) for w in weights)
+
+
+# bm25 with title matches counting for more than tags, and tags more than body text
+BM25_SQL = f"bm25(note_chunks_fts, {_bm25_weights(settings.search_fts_weights)})"
+
+# Best chunk per note for MATCH :match. MATERIALIZED keeps bm25() out of the
+# aggregate, where FTS5 auxiliary functions can't run.
+NOTE_MATCHES_CTE = f"""
+    chunk_hits AS MATERIALIZED (
+        SELECT rowid AS chunk_id, {BM25_SQL} AS rank
+        FROM note_chunks_fts
+        WHERE note_chunks_fts MATCH :match
+    ),
+    note_matches AS (
+        SELECT c.note_id AS id, h.chunk_id, MIN(h.rank) AS kw_rank
+        FROM chunk_hits h JOIN note_chunks c ON c.id = h.chunk_id
+        GROUP BY c.note_id
+    )
+"""
+
+# Snippet from the winning chunk only, so broad queries don't build one per hit
+NOTE_SNIPPET_SQL = """(
+    SELECT snippet(note_chunks_fts, 2, '<b>', '</b>', '…', 12)
+    FROM note_chunks_fts
+    WHERE note_chunks_fts MATCH :match AND note_chunks_fts.rowid = note_matches.chunk_id
+)"""
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def _table_options(conn: sqlite3.Connection, name: str) -> Optional[str]:
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    if row is None or not row[0]:
+        return None
+    sql = row[0]
+    return sql[sql.index("(") + 1:sql.rindex(")")]
+
+
+def _normalize(options: Optional[str]) -> str:
+    return " ".join((options or "").split()).lower()
+
+
+def fts_rebuild_needed(conn: sqlite3.Connection) -> bool:
+    """True when the live FTS table's options differ from settings, or a swap was interrupted"""
+    if conn.execute("SELECT 1 FROM note_index_swap").fetchone() is not None:
+        return True
+    live = _table_options(conn, FTS_TABLE)
+    return live is not None and _normalize(live) != _normalize(fts_options())
+
+
+def ensure_note_index_schema(conn: sqlite3.Connection) -> None:
+    """Create the chunk index and its queue triggers; retire the legacy FTS tables.
+
+    When the index is new, or legacy indexes were just dropped, every note is
+    queued for indexing. An existing FTS table built with other tokenizer or
+    prefix options is left serving searches; ``NoteIndexService.run`` swaps in
+    a rebuilt one.
+    Runs inside the caller's transaction.
+    """
+    fresh = not _table_exists(conn, "note_chunks")
+    for statement in _statements(NOTE_INDEX_SCHEMA):
+        conn.execute(statement)
+    conn.execute(fts_table_sql())
+
+    legacy = [name for name in LEGACY_TABLES if _table_exists(conn, name)]
+    for trigger in LEGACY_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for table in legacy:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    if legacy:
+        logger.info(f"Dropped legacy search indexes: {', '.join(legacy)}")
+
+    ensure_suggestion_schema(conn)
+    if not _table_exists(conn, "notes"):
+        return
+    for statement in _statements(NOTE_INDEX_TRIGGERS, separator="END;"):
+        conn.execute(statement)
+    if fresh or legacy:
+        conn.execute("INSERT OR IGNORE INTO note_index_queue(note_id, queued_at) SELECT id, 0 FROM notes")
+
+
+def _statements(script: str, separator: str = ";") -> List[str]:
+    """Split a schema script for conn.execute (executescript would commit the caller's transaction)"""
+    parts = [part.strip() for part in script.split(separator)]
+    suffix = "" if separator == ";" else separator[:-1]
+    return [part + suffix for part in parts if part]
+
+
+def split_chunks(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Pack paragraphs into chunks of at most ``max_chars``; split longer paragraphs at whitespace"""
+    text = (text or "").strip()
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces: List[str] = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+_QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+
+
+def compile_fts_query(q: str, prefix_last: bool = False) -> str:
+    """Compile free text into an FTS5 MATCH expression.
+
+    Every term has to match (AND), in any order; with several terms a NEAR
+    group over the same terms is OR-ed in, so notes with the terms close
+    together rank higher. ``"quoted text"`` stays a phrase, ``word*`` is a
+    prefix query (``prefix_last`` adds one to the last term, for type-ahead)
+    and a bare ``OR`` between terms is kept. Every term is quoted, so FTS5
+    syntax in user input can't cause a syntax error. Returns "" when nothing
+    searchable is left.
+    """
+    q = (q or "").strip()
+    if q.count('"') % 2:
+        q = q.replace('"', " ")
+
+    groups: List[List[str]] = [[]]
+    for match in _QUERY_TOKEN_RE.finditer(q):
+        phrase, raw = match.groups()
+        if raw == "OR":
+            if groups[-1]:
+                groups.append([])
+            continue
+        words = _WORD_RE.findall(phrase if phrase is not None else raw)
+        if not words:
+            continue
+        term = '"{}"'.format(" ".join(words))
+        if raw is not None and raw.endswith("*"):
+            term += "*"
+        groups[-1].append(term)
+
+    groups = [group for group in groups if group]
+    if sum(len(word) for terms in groups for word in _WORD_RE.findall(" ".join(terms))) < 2:
+        return ""
+    if prefix_last and not groups[-1][-1].endswith("*"):
+        groups[-1][-1] += "*"
+
+    compiled = []
+    for terms in groups:
+        if len(terms) == 1:
+            compiled.append(terms[0])
+            continue
+        expr = " AND ".join(terms)
+        if len(terms) <= MAX_NEAR_TERMS:
+            expr = f"NEAR({' '.join(terms)}, {NEAR_DISTANCE}) OR ({expr})"
+        compiled.append(f"({expr})" if len(groups) > 1 else expr)
+    return " OR ".join(compiled)
+
+
+class NoteIndexService:
+    """Keeps the chunk index in step with notes through note_index_queue"""
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection],
+                 chunk_chars: int = CHUNK_CHARS, batch_size: int = BATCH_SIZE):
+        self.get_conn = get_conn_func
+        self.chunk_chars = chunk_chars
+        self.batch_size = batch_size
+        self.stats = {
+            "notes_indexed": 0,
+            "chunks_written": 0,
+            "batches": 0,
+            "last_batch_ms": 0.0,
+            "max_batch_ms": 0.0,
+        }
+
+    # --- writing ---
+
+    def sync(self, limit: Optional[int] = None, conn: Optional[sqlite3.Connection] = None,
+             wait: bool = True) -> int:
+        """Index queued notes, newest first, ``batch_size`` per transaction.
+
+        Stops after ``limit`` notes (all when None). With ``wait=False`` it
+        gives up at once instead of queueing behind another writer's lock.
+        Returns the number indexed.
+        """
+        own_conn = conn is None
+        conn = conn or self.get_conn()
+        busy_timeout = None
+        done = 0
+        try:
+            if not wait:
+                busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+                conn.execute("PRAGMA busy_timeout = 0")
+            while limit is None or done < limit:
+                if conn.execute("SELECT 1 FROM note_index_queue LIMIT 1").fetchone() is None:
+                    break
+                size = self.batch_size if limit is None else min(self.batch_size, limit - done)
+                indexed = self._sync_batch(conn, size)
+                if not indexed:
+                    break
+                done += indexed
+        except sqlite3.OperationalError as e:
+            # Index tables missing (schema not applied yet) or the database is busy
+            if wait:
+                logger.warning(f"Note index sync skipped: {e}")
+            else:
+                logger.debug(f"Note index sync skipped: {e}")
+        finally:
+            if busy_timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+            if own_conn:
+                conn.close()
+        return done
+
+    def sync_for_search(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Read-path sync: one bounded batch, skipped while another writer holds the lock"""
+        return self.sync(limit=SEARCH_SYNC_LIMIT, conn=conn, wait=False)
+
+    def _sync_batch(self, conn: sqlite3.Connection, size: int) -> int:
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            note_ids = [row[0] for row in conn.execute(
+                "SELECT note_id FROM note_index_queue ORDER BY queued_at DESC LIMIT ?", (size,)
+            )]
+            if note_ids:
+                self.index_notes(note_ids, conn)
+                conn.executemany("DELETE FROM note_index_queue WHERE note_id = ?", [(i,) for i in note_ids])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats["batches"] += 1
+        self.stats["last_batch_ms"] = round(elapsed, 2)
+        self.stats["max_batch_ms"] = round(max(self.stats["max_batch_ms"], elapsed), 2)
+        return len(note_ids)
+
+    def index_notes(self, note_ids: Sequence[int], conn: sqlite3.Connection) -> int:
+        """Replace the chunks of ``note_ids`` in the caller's transaction; deleted notes lose theirs"""
+        if not note_ids:
+            return 0
+        placeholders = ",".join("?" * len(note_ids))
+        swap = conn.execute("SELECT watermark FROM note_index_swap").fetchone()
+        # Chunks an online rebuild has already copied must have their changes replayed at the swap
+        watermark = swap[0] if swap else None
+        old = conn.execute(
+            f"SELECT id, title, tags, text FROM note_chunks WHERE note_id IN ({placeholders})", list(note_ids)
+        ).fetchall()
+        if old:
+            # External-content FTS needs the old values to remove their tokens
+            conn.executemany(
+                "INSERT INTO note_chunks_fts(note_chunks_fts, rowid, title, tags, text) VALUES ('delete', ?, ?, ?, ?)",
+                old,
+            )
+            if watermark is not None:
+                self._log_swap(conn, "delete", [row for row in old if row[0] <= watermark])
+            conn.execute(f"DELETE FROM note_chunks WHERE note_id IN ({placeholders})", list(note_ids))
+
+        rows = conn.execute(
+            f"SELECT id, COALESCE(title, ''), COALESCE(tags, ''), {self._text_expr(conn)} FROM notes "
+            f"WHERE id IN ({placeholders})",
+            list(note_ids),
+        ).fetchall()
+        written = 0
+        for note_id, title, tags, text in rows:
+            for ord_, chunk in enumerate(split_chunks(text, self.chunk_chars)):
+                cur = conn.execute(
+                    "INSERT INTO note_chunks (note_id, ord, title, tags, text) VALUES (?, ?, ?, ?, ?)",
+                    (note_id, ord_, title, tags, chunk),
+                )
+                conn.execute(
+                    "INSERT INTO note_chunks_fts(rowid, title, tags, text) VALUES (?, ?, ?, ?)",
+                    (cur.lastrowid, title, tags, chunk),
+                )
+                if watermark is not None and cur.lastrowid <= watermark:
+                    # Reused rowid below the copy watermark; the batch copy won't see it
+                    self._log_swap(conn, "insert", [(cur.lastrowid, title, tags, chunk)])
+                written += 1
+        # Type-ahead titles and tags follow the same queue
+        update_note_suggestions(conn, note_ids)
+        self.stats["notes_indexed"] += len(note_ids)
+        self.stats["chunks_written"] += written
+        return written
+
+    @staticmethod
+    def _log_swap(conn: sqlite3.Connection, op: str, rows: Sequence[tuple]) -> None:
+        conn.executemany(
+            "INSERT INTO note_index_swap_log (op, chunk_id, title, tags, text) VALUES (?, ?, ?, ?, ?)",
+            [(op, *row) for row in rows],
+        )
+
+    @staticmethod
+    def _text_expr(conn: sqlite3.Connection) -> str:
+        # Core schema writes body; legacy capture paths and audio transcripts write content;
+        # uploads still being extracted only have extracted_text so far
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(notes)")}
+        sources = [col for col in ("body", "content", "extracted_text") if col in cols]
+        if not sources:
+            return "''"
+        if len(sources) == 1:
+            return f"COALESCE({sources[0]}, '')"
+        cases = " ".join(f"WHEN COALESCE({col}, '') <> '' THEN {col}" for col in sources[:-1])
+        return f"CASE {cases} ELSE COALESCE({sources[-1]}, '') END"
+
+    def rebuild(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Queue every note and re-chunk and re-index from scratch (search is incomplete until done)"""
+        own_conn = conn is None
+        conn = conn or self.get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Recreated rather than cleared, so it picks up the configured tokenizer; cancels any online rebuild
+            self._clear_swap(conn)
+            conn.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            conn.execute(fts_table_sql())
+            conn.execute("DELETE FROM note_chunks")
+            conn.execute(
+                "INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) SELECT id, 0 FROM notes"
+            )
+            conn.commit()
+            return self.sync(conn=conn)
+        finally:
+            if own_conn:
+                conn.close()
+
+    def rebuild_online(self, conn: Optional[sqlite3.Connection] = None,
+                       batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Rebuild the FTS table with the configured options and swap it in without downtime.
+
+        The replacement is filled from ``note_chunks`` in short transactions
+        while the live table keeps serving searches and indexing. Chunks
+        re-indexed meanwhile are logged by ``index_notes`` and replayed in the
+        final transaction, which also renames the new table over the old one.
+        Progress is stored in ``note_index_swap``, so an interrupted rebuild
+        resumes where it stopped.
+        """
+        own_conn = conn is None
+        conn = conn or self.get_conn()
+        batch_size = batch_size or self.batch_size * 10
+        start = time.perf_counter()
+        options = fts_options()
+        copied = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            swap = conn.execute("SELECT options FROM note_index_swap").fetchone()
+            if swap is None or swap[0] != options or not _table_exists(conn, FTS_BUILD_TABLE):
+                self._clear_swap(conn)
+                conn.execute(fts_table_sql(FTS_BUILD_TABLE, options))
+                conn.execute(
+                    "INSERT INTO note_index_swap (id, options, watermark, started_at) VALUES (1, ?, 0, julianday('now'))",
+                    (options,),
+                )
+            conn.commit()
+
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                swap = conn.execute("SELECT watermark FROM note_index_swap").fetchone()
+                if swap is None:
+                    # Finished or cancelled by another worker
+                    conn.rollback()
+                    return {"status": "cancelled", "copied": copied}
+                rows = conn.execute(
+                    "SELECT id, title, tags, text FROM note_chunks WHERE id > ? ORDER BY id LIMIT ?",
+                    (swap[0], batch_size),
+                ).fetchall()
+                conn.executemany(
+                    f"INSERT INTO {FTS_BUILD_TABLE}(rowid, title, tags, text) VALUES (?, ?, ?, ?)", rows
+                )
+                copied += len(rows)
+                if len(rows) < batch_size:
+                    break  # last batch: finish the swap in this transaction
+                conn.execute("UPDATE note_index_swap SET watermark = ?", (rows[-1][0],))
+                conn.commit()
+
+            replayed = 0
+            for op, chunk_id, title, tags, text in conn.execute(
+                "SELECT op, chunk_id, title, tags, text FROM note_index_swap_log ORDER BY seq"
+            ).fetchall():
+                if op == "delete":
+                    conn.execute(
+                        f"INSERT INTO {FTS_BUILD_TABLE}({FTS_BUILD_TABLE}, rowid, title, tags, text) "
+                        "VALUES ('delete', ?, ?, ?, ?)",
+                        (chunk_id, title, tags, text),
+                    )
+                else:
+                    conn.execute(
+                        f"INSERT INTO {FTS_BUILD_TABLE}(rowid, title, tags, text) VALUES (?, ?, ?, ?)",
+                        (chunk_id, title, tags, text),
+                    )
+                replayed += 1
+            conn.execute(f"DROP TABLE {FTS_TABLE}")
+            conn.execute(f"ALTER TABLE {FTS_BUILD_TABLE} RENAME TO {FTS_TABLE}")
+            conn.execute("DELETE FROM note_index_swap")
+            conn.execute("DELETE FROM note_index_swap_log")
+            conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if own_conn:
+                conn.close()
+        elapsed = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"Swapped in rebuilt {FTS_TABLE} ({options}): {copied} chunks, {replayed} replayed, {elapsed}ms")
+        return {"status": "swapped", "options": options, "copied": copied, "replayed": replayed, "elapsed_ms": elapsed}
+
+    @staticmethod
+    def _clear_swap(conn: sqlite3.Connection) -> None:
+        conn.execute(f"DROP TABLE IF EXISTS {FTS_BUILD_TABLE}")
+        conn.execute("DELETE FROM note_index_swap")
+        conn.execute("DELETE FROM note_index_swap_log")
+
+    def _rebuild_if_needed(self) -> None:
+        conn = self.get_conn()
+        try:
+            needed = fts_rebuild_needed(conn)
+        finally:
+            conn.close()
+        if needed:
+            self.rebuild_online()
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Background loop draining the queue; registered with the background supervisor.
+
+        Applies changed tokenizer/prefix settings first, via ``rebuild_online``.
+        """
+        try:
+            await asyncio.to_thread(self._rebuild_if_needed)
+        except Exception as e:
+            logger.warning(f"Online FTS rebuild failed: {e}")
+        while True:
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                logger.warning(f"Note index sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    # --- reporting ---
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self.get_conn()
+        try:
+            notes, chunks = conn.execute("SELECT COUNT(DISTINCT note_id), COUNT(*) FROM note_chunks").fetchone()
+            pending = conn.execute("SELECT COUNT(*) FROM note_index_queue").fetchone()[0]
+            live_options = _table_options(conn, FTS_TABLE)
+            rebuild_needed = fts_rebuild_needed(conn)
+        finally:
+            conn.close()
+        return {**self.stats, "indexed_notes": notes, "chunks": chunks, "pending": pending,
+                "fts_options": live_options, "rebuild_needed": rebuild_needed}
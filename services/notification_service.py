@@ -7,14 +7,23 @@ This service provides comprehensive notification management including:
 - Notification persistence and history
 - Type-based notification categorization
 - Processing status notifications
+
+Notifications go through an in-process bus: publishing is synchronous and
+cheap (cached preferences, no DB round trip), and a background thread writes
+queued notifications in one transaction per batch. Progress updates for the
+same task are coalesced so only the latest one is delivered.
 """
 
 import asyncio
+import itertools
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional, Any, Set
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, asdict
 from contextlib import contextmanager
 
@@ -85,12 +94,150 @@ class NotificationPreferences:
     auto_dismiss_seconds: Optional[int] = None
     max_notifications: int = 50
 
+# Queued notifications are written at most this often...
+FLUSH_INTERVAL_SECONDS = 0.5
+# ...or as soon as this many are waiting
+MAX_BATCH_SIZE = 200
+# Cached preferences are re-read after this long in case another process changed them
+PREFERENCES_TTL_SECONDS = 60.0
+
+NotificationListener = Callable[[List["Notification"]], None]
+
+
+class NotificationBus:
+    """Thread-safe queue that coalesces notifications and persists them in batches.
+
+    Non-persistent notifications carrying a ``task_id`` are progress updates:
+    a newer one for the same user and task replaces the queued one, and a
+    persistent notification for the task (completed/failed) supersedes it.
+    Listeners receive each flushed batch from the flusher thread.
+    """
+
+    def __init__(self, store_batch: Callable[[List["Notification"]], None],
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS, max_batch: int = MAX_BATCH_SIZE):
+        self._store_batch = store_batch
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: "OrderedDict[Tuple, Notification]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[NotificationListener] = []
+        self.stats = {
+            'published': 0,
+            'coalesced': 0,
+            'flushed': 0,
+            'persisted': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    @staticmethod
+    def _progress_key(notification: "Notification") -> Optional[Tuple]:
+        task_id = (notification.data or {}).get('task_id')
+        if task_id is None:
+            return None
+        return ('task', notification.user_id, str(task_id))
+
+    def publish(self, notification: "Notification"):
+        progress_key = self._progress_key(notification)
+        with self._lock:
+            if progress_key is not None and progress_key in self._pending:
+                del self._pending[progress_key]
+                self.stats['coalesced'] += 1
+            if progress_key is not None and not notification.persistent:
+                self._pending[progress_key] = notification
+            else:
+                self._pending[('id', notification.id)] = notification
+            self.stats['published'] += 1
+            queued = len(self._pending)
+        self._ensure_started()
+        if queued >= self.max_batch:
+            self._wakeup.set()
+
+    def add_listener(self, listener: NotificationListener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: NotificationListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Persist and deliver everything queued so far; returns the batch size"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.values())
+                self._pending.clear()
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            persistent = [n for n in batch if n.persistent]
+            if persistent:
+                self._store_batch(persistent)
+            for listener in list(self._listeners):
+                try:
+                    listener(batch)
+                except Exception as e:
+                    logger.warning(f"Notification listener failed: {e}")
+            self.stats['batches'] += 1
+            self.stats['flushed'] += len(batch)
+            self.stats['persisted'] += len(persistent)
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return len(batch)
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="notification-bus", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush notifications: {e}")
+        self.flush()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush what's queued and stop the flusher thread"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        thread.join(timeout=timeout)
+        self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'queue_depth': self.depth,
+                'running': bool(self._thread and self._thread.is_alive())}
+
+
 class NotificationService:
     """Service for managing real-time notifications."""
     
     def __init__(self):
         self._user_preferences: Dict[int, NotificationPreferences] = {}
+        self._preferences_loaded_at: Dict[int, float] = {}
         self._notification_history: Dict[int, List[Notification]] = {}
+        self._history_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.bus = NotificationBus(self._store_notifications)
         self._init_database()
         
     def _init_database(self):
@@ -146,68 +293,78 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Failed to initialize notification database: {e}")
     
-    async def create_notification(self, notification: Notification) -> Optional[str]:
-        """Create and store a new notification."""
+    def publish(self, notification: Notification) -> Optional[str]:
+        """Queue a notification for delivery and batched storage; safe from any thread."""
         try:
             # Generate ID if not provided
             if not notification.id:
-                notification.id = f"notif_{notification.user_id}_{int(datetime.now().timestamp() * 1000)}"
+                notification.id = (
+                    f"notif_{notification.user_id}_{int(datetime.now().timestamp() * 1000)}_{next(self._ids)}"
+                )
             
             # Set created_at if not provided
             if not notification.created_at:
                 notification.created_at = datetime.now()
             
             # Check user preferences
-            preferences = await self.get_user_preferences(notification.user_id)
+            preferences = self._get_preferences(notification.user_id)
             if not self._should_send_notification(notification, preferences):
                 return None
             
-            # Store persistent notifications in database
-            if notification.persistent:
-                await self._store_notification(notification)
-            
-            # Add to in-memory history
-            if notification.user_id not in self._notification_history:
-                self._notification_history[notification.user_id] = []
+            self.bus.publish(notification)
             
-            user_notifications = self._notification_history[notification.user_id]
-            user_notifications.append(notification)
+            # Add to in-memory history, trimmed to max_notifications
+            with self._history_lock:
+                user_notifications = self._notification_history.setdefault(notification.user_id, [])
+                user_notifications.append(notification)
+                max_notifications = preferences.max_notifications
+                if len(user_notifications) > max_notifications:
+                    self._notification_history[notification.user_id] = user_notifications[-max_notifications:]
             
-            # Trim history to max_notifications
-            max_notifications = preferences.max_notifications
-            if len(user_notifications) > max_notifications:
-                self._notification_history[notification.user_id] = user_notifications[-max_notifications:]
-            
-            logger.info(f"Created notification {notification.id} for user {notification.user_id}")
+            logger.debug(f"Queued notification {notification.id} for user {notification.user_id}")
             return notification.id
             
         except Exception as e:
             logger.error(f"Failed to create notification: {e}")
             return None
+
+    async def create_notification(self, notification: Notification) -> Optional[str]:
+        """Create and store a new notification."""
+        return self.publish(notification)
     
-    async def _store_notification(self, notification: Notification):
-        """Store notification in database."""
+    def _store_notifications(self, notifications: List[Notification]):
+        """Store a batch of notifications in one transaction."""
         try:
             conn = get_db_connection()
             with conn:
-                conn.execute("""
-                    INSERT INTO notifications 
+                conn.executemany("""
+                    INSERT OR IGNORE INTO notifications 
                     (id, user_id, type, title, message, priority, data, created_at, expires_at, persistent)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    notification.id,
-                    notification.user_id,
-                    notification.type.value,
-                    notification.title,
-                    notification.message,
-                    notification.priority.value,
-                    json.dumps(notification.data) if notification.data else None,
-                    notification.created_at,
-                    notification.expires_at,
-                    notification.persistent
-                ))
+                """, [
+                    (
+                        notification.id,
+                        notification.user_id,
+                        notification.type.value,
+                        notification.title,
+                        notification.message,
+                        notification.priority.value,
+                        json.dumps(notification.data) if notification.data else None,
+                        notification.created_at,
+                        notification.expires_at,
+                        notification.persistent
+                    )
+                    for notification in notifications
+                ])
         except Exception as e:
-            logger.error(f"Failed to store notification in database: {e}")
+            logger.error(f"Failed to store {len(notifications)} notifications in database: {e}")
+
+    def flush(self) -> int:
+        """Write queued notifications now (e.g. before reading them back)."""
+        return self.bus.flush()
+
+    def shutdown(self):
+        self.bus.stop()
     
     def _should_send_notification(self, notification: Notification, preferences: NotificationPreferences) -> bool:
         """Check if notification should be sent based on user preferences."""
@@ -234,8 +391,13 @@ class NotificationService:
     
     async def get_user_preferences(self, user_id: int) -> NotificationPreferences:
         """Get user notification preferences."""
-        if user_id in self._user_preferences:
-            return self._user_preferences[user_id]
+        return self._get_preferences(user_id)
+
+    def _get_preferences(self, user_id: int) -> NotificationPreferences:
+        cached = self._user_preferences.get(user_id)
+        loaded_at = self._preferences_loaded_at.get(user_id, 0.0)
+        if cached is not None and time.monotonic() - loaded_at < PREFERENCES_TTL_SECONDS:
+            return cached
         
         try:
             conn = get_db_connection()
@@ -273,9 +435,9 @@ class NotificationService:
                     user_id=user_id,
                     enabled_types=set(NotificationType)  # All types enabled by default
                 )
-                await self.update_user_preferences(preferences)
+                self._save_preferences(preferences)
             
-            self._user_preferences[user_id] = preferences
+            self._cache_preferences(preferences)
             return preferences
             
         except Exception as e:
@@ -285,9 +447,25 @@ class NotificationService:
                 user_id=user_id,
                 enabled_types=set(NotificationType)
             )
+
+    def _cache_preferences(self, preferences: NotificationPreferences):
+        self._user_preferences[preferences.user_id] = preferences
+        self._preferences_loaded_at[preferences.user_id] = time.monotonic()
+
+    def invalidate_preferences(self, user_id: Optional[int] = None):
+        """Drop cached preferences so the next notification re-reads them."""
+        if user_id is None:
+            self._user_preferences.clear()
+            self._preferences_loaded_at.clear()
+        else:
+            self._user_preferences.pop(user_id, None)
+            self._preferences_loaded_at.pop(user_id, None)
     
     async def update_user_preferences(self, preferences: NotificationPreferences):
         """Update user notification preferences."""
+        self._save_preferences(preferences)
+
+    def _save_preferences(self, preferences: NotificationPreferences):
         try:
             enabled_types_json = json.dumps([t.value for t in preferences.enabled_types])
             
@@ -310,15 +488,18 @@ class NotificationService:
                 ))
             
             # Update cache
-            self._user_preferences[preferences.user_id] = preferences
+            self._cache_preferences(preferences)
             logger.info(f"Updated notification preferences for user {preferences.user_id}")
             
         except Exception as e:
+            self.invalidate_preferences(preferences.user_id)
             logger.error(f"Failed to update user preferences: {e}")
     
     async def get_user_notifications(self, user_id: int, limit: int = 50, 
                                    unread_only: bool = False) -> List[Notification]:
         """Get notifications for a user."""
+        # Queued notifications must be in the table before we read them back
+        self.flush()
         try:
             conn = get_db_connection()
             
@@ -366,6 +547,7 @@ class NotificationService:
     
     async def mark_notification_read(self, notification_id: str, user_id: int):
         """Mark a notification as read."""
+        self.flush()
         try:
             conn = get_db_connection()
             with conn:
@@ -389,6 +571,7 @@ class NotificationService:
     
     async def mark_all_notifications_read(self, user_id: int):
         """Mark all notifications as read for a user."""
+        self.flush()
         try:
             conn = get_db_connection()
             with conn:
@@ -411,6 +594,7 @@ class NotificationService:
     
     async def delete_notification(self, notification_id: str, user_id: int):
         """Delete a notification."""
+        self.flush()
         try:
             conn = get_db_connection()
             with conn:
@@ -461,6 +645,7 @@ class NotificationService:
     
     async def get_notification_stats(self, user_id: int) -> Dict[str, Any]:
         """Get notification statistics for a user."""
+        self.flush()
         try:
             conn = get_db_connection()
             
@@ -516,19 +701,27 @@ class NotificationService:
 
 # Global notification service instance
 _notification_service: Optional[NotificationService] = None
+_notification_service_lock = threading.Lock()
 
 def get_notification_service() -> NotificationService:
     """Get the global notification service instance."""
     global _notification_service
     if _notification_service is None:
-        _notification_service = NotificationService()
+        # Worker threads publish too, so guard against building two services
+        with _notification_service_lock:
+            if _notification_service is None:
+                _notification_service = NotificationService()
     return _notification_service
 
+def shutdown_notification_service():
+    """Flush queued notifications and stop the flusher - for shutdown"""
+    if _notification_service is not None:
+        _notification_service.shutdown()
+
 # Convenience functions for common notification types
-async def notify_processing_started(user_id: int, task_type: str, task_id: str):
-    """Send processing started notification."""
-    service = get_notification_service()
-    notification = Notification(
+def processing_started_notification(user_id: int, task_type: str, task_id: str) -> Notification:
+    """Build a processing started notification."""
+    return Notification(
         user_id=user_id,
         type=NotificationType.PROCESSING_STARTED,
         title="Processing Started",
@@ -537,12 +730,15 @@ async def notify_processing_started(user_id: int, task_type: str, task_id: str):
         data={"task_type": task_type, "task_id": task_id},
         persistent=False
     )
-    return await service.create_notification(notification)
 
-async def notify_processing_completed(user_id: int, task_type: str, task_id: str, result_data: Dict[str, Any] = None):
-    """Send processing completed notification."""
-    service = get_notification_service()
-    notification = Notification(
+async def notify_processing_started(user_id: int, task_type: str, task_id: str):
+    """Send processing started notification."""
+    notification = processing_started_notification(user_id=user_id, task_type=task_type, task_id=task_id)
+    return get_notification_service().publish(notification)
+
+def processing_completed_notification(user_id: int, task_type: str, task_id: str, result_data: Dict[str, Any] = None) -> Notification:
+    """Build a processing completed notification."""
+    return Notification(
         user_id=user_id,
         type=NotificationType.PROCESSING_COMPLETED,
         title="Processing Completed",
@@ -551,12 +747,15 @@ async def notify_processing_completed(user_id: int, task_type: str, task_id: str
         data={"task_type": task_type, "task_id": task_id, "result": result_data},
         persistent=True
     )
-    return await service.create_notification(notification)
 
-async def notify_processing_failed(user_id: int, task_type: str, task_id: str, error: str):
-    """Send processing failed notification."""
-    service = get_notification_service()
-    notification = Notification(
+async def notify_processing_completed(user_id: int, task_type: str, task_id: str, result_data: Dict[str, Any] = None):
+    """Send processing completed notification."""
+    notification = processing_completed_notification(user_id=user_id, task_type=task_type, task_id=task_id, result_data=result_data)
+    return get_notification_service().publish(notification)
+
+def processing_failed_notification(user_id: int, task_type: str, task_id: str, error: str) -> Notification:
+    """Build a processing failed notification."""
+    return Notification(
         user_id=user_id,
         type=NotificationType.PROCESSING_FAILED,
         title="Processing Failed",
@@ -565,12 +764,15 @@ async def notify_processing_failed(user_id: int, task_type: str, task_id: str, e
         data={"task_type": task_type, "task_id": task_id, "error": error},
         persistent=True
     )
-    return await service.create_notification(notification)
 
-async def notify_note_created(user_id: int, note_id: str, title: str):
-    """Send note created notification."""
-    service = get_notification_service()
-    notification = Notification(
+async def notify_processing_failed(user_id: int, task_type: str, task_id: str, error: str):
+    """Send processing failed notification."""
+    notification = processing_failed_notification(user_id=user_id, task_type=task_type, task_id=task_id, error=error)
+    return get_notification_service().publish(notification)
+
+def note_created_notification(user_id: int, note_id: str, title: str) -> Notification:
+    """Build a note created notification."""
+    return Notification(
         user_id=user_id,
         type=NotificationType.NOTE_CREATED,
         title="Note Created",
@@ -580,4 +782,8 @@ async def notify_note_created(user_id: int, note_id: str, title: str):
         persistent=False,
         expires_at=datetime.now() + timedelta(hours=1)
     )
-    return await service.create_notification(notification)
\ No newline at end of file
+
+async def notify_note_created(user_id: int, note_id: str, title: str):
+    """Send note created notification."""
+    notification = note_created_notification(user_id=user_id, note_id=note_id, title=title)
+    return get_notification_service().publish(notification)
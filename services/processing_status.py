@@ -0,0 +1,144 @@
+"""
+Note Processing Status
+
+Progress ticks (``transcribing:42``, ``extracting:80`` ...) used to be written
+to ``notes.status``. Every such UPDATE fired the notes FTS trigger, so a long
+transcription re-indexed its note once per segment. Live progress now lives
+in the narrow ``note_processing_status`` table; ``notes.status`` only changes
+at lifecycle boundaries (pending, started, complete, failed).
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+# notes.status values that end processing; these win over any leftover progress row
+TERMINAL_STATUSES = ("complete", "failed")
+
+
+def ensure_processing_status_schema(conn: sqlite3.Connection) -> None:
+    """Create the status table"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS note_processing_status (
+            note_id INTEGER PRIMARY KEY,
+            stage TEXT NOT NULL,
+            pct INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            worker TEXT,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS notes_processing_status_ad AFTER DELETE ON notes
+        BEGIN
+            DELETE FROM note_processing_status WHERE note_id = OLD.id;
+        END
+        """
+    )
+
+
+def parse_status(status: Optional[str]) -> tuple:
+    """Split a legacy ``stage:pct`` status string into (stage, pct)"""
+    status = status or "unknown"
+    if ":" in status and not status.startswith("error:"):
+        stage, progress_str = status.split(":", 1)
+        try:
+            return stage, int(progress_str)
+        except ValueError:
+            return stage, 0
+    if status.startswith("error:"):
+        return "error", -1
+    return status, 100 if status == "complete" else 0
+
+
+def default_worker() -> str:
+    return f"{os.getpid()}/{threading.current_thread().name}"
+
+
+class ProcessingStatusStore:
+    """Reads and writes live processing progress for notes"""
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection]):
+        self.get_conn = get_conn_func
+        self._ready = False
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        if not self._ready:
+            ensure_processing_status_schema(conn)
+            self._ready = True
+
+    def set(self, note_id: int, stage: str, pct: int, message: Optional[str] = None,
+            worker: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Record progress; pass ``conn`` to join the caller's transaction"""
+        own_conn = conn is None
+        conn = conn or self.get_conn()
+        try:
+            self._ensure_schema(conn)
+            conn.execute(
+                """
+                INSERT INTO note_processing_status (note_id, stage, pct, message, worker, updated_at)
+                VALUES (?, ?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(note_id) DO UPDATE SET
+                    stage = excluded.stage,
+                    pct = excluded.pct,
+                    message = excluded.message,
+                    worker = excluded.worker,
+                    updated_at = excluded.updated_at
+                """,
+                (note_id, stage, int(pct), message, worker or default_worker()),
+            )
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+    def clear(self, note_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+        own_conn = conn is None
+        conn = conn or self.get_conn()
+        try:
+            self._ensure_schema(conn)
+            conn.execute("DELETE FROM note_processing_status WHERE note_id = ?", (note_id,))
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+    def get(self, note_id: int) -> Optional[Dict]:
+        return self.get_many([note_id]).get(note_id)
+
+    def get_many(self, note_ids: Iterable[int]) -> Dict[int, Dict]:
+        ids = list(note_ids)
+        if not ids:
+            return {}
+        conn = self.get_conn()
+        try:
+            self._ensure_schema(conn)
+            placeholders = ",".join("?" for _ in ids)
+            rows = conn.execute(
+                f"""
+                SELECT note_id, stage, pct, message, worker, updated_at
+                FROM note_processing_status WHERE note_id IN ({placeholders})
+                """,
+                ids,
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            row[0]: {"stage": row[1], "pct": row[2], "message": row[3], "worker": row[4], "updated_at": row[5]}
+            for row in rows
+        }
+
+
+def resolve_status(note_status: Optional[str], live: Optional[Dict]) -> tuple:
+    """(stage, pct) for a note: terminal ``notes.status`` first, then live progress"""
+    if note_status in TERMINAL_STATUSES or (note_status or "").startswith("error:") or not live:
+        return parse_status(note_status)
+    return live["stage"], live["pct"]
@@ -1,36 +1,30 @@
-"""Helpers for broadcasting realtime note events via WebSockets."""
+"""Helpers for broadcasting realtime note events via WebSockets.
+
+Events go through the cross-process event bus so that a note created in one
+worker (or a background thread) reaches the user's sockets in every worker.
+"""
 from __future__ import annotations
 
-import asyncio
 from datetime import datetime
 from typing import Any, Dict
 
 from services.websocket_manager import get_connection_manager
 
 
+def _note_update_message(action: str, note: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "note_update",
+        "action": action,
+        "note": note,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
 async def notify_note_update(user_id: int, action: str, note: Dict[str, Any]) -> None:
     """Send a realtime payload to all of a user's active WebSocket connections."""
-    manager = get_connection_manager()
-    await manager.send_to_user(
-        user_id,
-        {
-            "type": "note_update",
-            "action": action,
-            "note": note,
-            "timestamp": datetime.now().isoformat(),
-        },
-    )
+    get_connection_manager().publish_to_user(user_id, _note_update_message(action, note))
 
 
 def schedule_note_update(user_id: int, action: str, note: Dict[str, Any]) -> None:
-    """Schedule a realtime note update outside of an async context."""
-
-    async def _send() -> None:
-        await notify_note_update(user_id, action, note)
-
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        asyncio.run(_send())
-    else:
-        loop.create_task(_send())
+    """Send a realtime note update from sync code; works with or without a running loop."""
+    get_connection_manager().publish_to_user(user_id, _note_update_message(action, note))
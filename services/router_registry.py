@@ -0,0 +1,138 @@
+"""
+Router Registry for Second Brain
+
+Feature routers (GitHub, arXiv, shortcuts, web ingestion, ...) each pull in
+their own services and third-party packages. Rather than importing all of them
+when app.py loads, they are registered here with the URL prefixes they serve
+and imported on the first request under one of those prefixes. Routers named
+in ``settings.eager_routers`` (or every router when ``settings.lazy_routers``
+is off) are loaded during startup instead.
+
+Each load is timed and shows up in the startup profiler report.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import FastAPI
+
+import startup_profiler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RouterSpec:
+    name: str
+    module: str
+    prefixes: Tuple[str, ...]
+    setup: Optional[Callable[[ModuleType], Any]] = None
+    attr: str = "router"
+    loaded: bool = False
+    error: Optional[str] = None
+    load_ms: Optional[float] = None
+    trigger: Optional[str] = None
+
+    def matches(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix.rstrip("/") + "/") for prefix in self.prefixes)
+
+
+class RouterRegistry:
+    """Imports and mounts feature routers on demand"""
+
+    def __init__(self, app: FastAPI, lazy: bool = True, eager: Iterable[str] = ()):
+        self.app = app
+        self.lazy = lazy
+        self.eager = {name.strip() for name in eager if name.strip()}
+        self._specs: Dict[str, RouterSpec] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, module: str, prefixes: Iterable[str],
+                 setup: Optional[Callable[[ModuleType], Any]] = None, attr: str = "router") -> None:
+        """Register ``module.<attr>``; ``setup(module)`` runs before it is mounted"""
+        self._specs[name] = RouterSpec(name=name, module=module, prefixes=tuple(prefixes), setup=setup, attr=attr)
+
+    @property
+    def pending(self) -> bool:
+        return any(not spec.loaded and spec.error is None for spec in self._specs.values())
+
+    def load(self, name: str, trigger: str = "manual") -> bool:
+        spec = self._specs[name]
+        with self._lock:
+            if spec.loaded or spec.error is not None:
+                return spec.loaded
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(spec.module)
+                if spec.setup is not None:
+                    spec.setup(module)
+                self.app.include_router(getattr(module, spec.attr))
+            except Exception as e:
+                # Not retried on every request; the prefix simply 404s until restart
+                spec.error = f"{type(e).__name__}: {e}"
+                logger.error(f"Could not load router {name} ({spec.module}): {spec.error}")
+                return False
+            finally:
+                spec.load_ms = round((time.perf_counter() - start) * 1000, 2)
+                spec.trigger = trigger
+                startup_profiler.record(f"router:{name}", spec.load_ms)
+            spec.loaded = True
+            # Regenerate /openapi.json with the new routes
+            self.app.openapi_schema = None
+            logger.info(f"Loaded router {name} in {spec.load_ms}ms ({trigger})")
+            return True
+
+    def load_for_path(self, path: str) -> None:
+        """Load every pending router serving ``path``, in registration order"""
+        for spec in list(self._specs.values()):
+            if not spec.loaded and spec.error is None and spec.matches(path):
+                self.load(spec.name, trigger=f"request {path}")
+
+    def load_all(self, trigger: str = "manual") -> None:
+        for name in list(self._specs):
+            self.load(name, trigger=trigger)
+
+    def load_eager(self) -> None:
+        """Load the routers configured to skip lazy loading; called from startup"""
+        for name, spec in list(self._specs.items()):
+            if not self.lazy or "all" in self.eager or name in self.eager:
+                self.load(name, trigger="startup")
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": spec.name,
+                "module": spec.module,
+                "prefixes": list(spec.prefixes),
+                "loaded": spec.loaded,
+                "load_ms": spec.load_ms,
+                "trigger": spec.trigger,
+                "error": spec.error,
+            }
+            for spec in self._specs.values()
+        ]
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that mounts a pending router before its first request is routed"""
+
+    def __init__(self, app, registry: RouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.registry.pending:
+            path = scope.get("path", "")
+            if path == self.registry.app.openapi_url:
+                # API docs should list every route
+                self.registry.load_all(trigger=f"request {path}")
+            else:
+                self.registry.load_for_path(path)
+        await self.app(scope, receive, send)
@@ -14,7 +14,14 @@ import json
 from pathlib import Path
 from typing import Optional
 
-from services.embeddings import Embeddings
+from services.embeddings import get_embeddings_service
+from services.note_index import (
+    NOTE_MATCHES_CTE,
+    NOTE_SNIPPET_SQL,
+    NoteIndexService,
+    compile_fts_query,
+    ensure_note_index_schema,
+)
 
 MIGRATIONS = [
     Path('db/migrations/001_core.sql'),
@@ -33,7 +40,9 @@ class SearchService:
         self.conn.row_factory = sqlite3.Row
         self._enable_extensions()
         self._run_migrations()
-        self.embedder = Embeddings()
+        self.index = NoteIndexService(lambda: sqlite3.connect(self.db_path))
+        # Shared, so query embeddings are cached across document and memory search
+        self.embedder = get_embeddings_service()
 
     def _enable_extensions(self):
         self.conn.execute('PRAGMA foreign_keys=ON;')
@@ -80,6 +89,12 @@ class SearchService:
             except sqlite3.OperationalError as e:
                 print(f"[search] migration {path.name} skipped/error: {e}")
                 self.conn.rollback()
+        try:
+            ensure_note_index_schema(self.conn)
+            self.conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"[search] note index schema skipped/error: {e}")
+            self.conn.rollback()
 
     # ─── Indexing ────────────────────────────────────────────────────────────
     def upsert_note(self, note_id: Optional[int], title: str, body: str, tags: str = '') -> int:
@@ -91,7 +106,7 @@ class SearchService:
             cur.execute("UPDATE notes SET title=?, body=?, tags=?, updated_at=datetime('now') WHERE id=?",
                         (title, body, tags, note_id))
         self.conn.commit()
-        # FTS5 is updated by triggers. Now (optionally) update vectors.
+        # Triggers queue the note for the FTS index. Now (optionally) update vectors.
         self._upsert_vector(note_id, f"{title}\n\n{body}")
         return note_id
 
@@ -121,44 +136,37 @@ class SearchService:
             print(f"[search] vector upsert failed (note {note_id}): {e}")
             self.conn.rollback()
 
+    def upsert_vectors(self, items: list[tuple[int, str]]):
+        """Embed and store vectors for many notes in one batch and one commit"""
+        if not items or not self._vec_table_exists():
+            return
+        embed_batch = getattr(self.embedder, 'embed_batch', None)
+        texts = [text for _, text in items]
+        vecs = embed_batch(texts) if embed_batch else [self.embedder.embed(t) for t in texts]
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(
+                "INSERT OR REPLACE INTO note_vecs(note_id, embedding) VALUES (?, ?)",
+                [(note_id, json.dumps(vec)) for (note_id, _), vec in zip(items, vecs)]
+            )
+            self.conn.commit()
+            return
+        except Exception:
+            self.conn.rollback()
+        try:
+            from services.embeddings import Embeddings as _E
+            cur.executemany(
+                "INSERT OR REPLACE INTO note_vecs(note_id, embedding) VALUES (?, ?)",
+                [(note_id, sqlite3.Binary(_E.pack_f32(vec))) for (note_id, _), vec in zip(items, vecs)]
+            )
+            self.conn.commit()
+        except Exception as e:
+            print(f"[search] batch vector upsert failed ({len(items)} notes): {e}")
+            self.conn.rollback()
+
     def _sanitize_fts_query(self, q: str) -> str:
-        """Sanitize query for FTS5 compatibility"""
-        if not q or not q.strip():
-            return ""
-        
-        # Remove leading/trailing whitespace
-        q = q.strip()
-        
-        # Handle special characters that break FTS5
-        import re
-        
-        # Remove or escape problematic characters
-        # FTS5 special characters: " * ( ) : < > = ^ - 
-        q = re.sub(r'[<>=^]', '', q)  # Remove these entirely
-        q = re.sub(r'[@#$%&]', '', q)  # Remove email/social chars
-        q = re.sub(r'[():]', ' ', q)  # Replace with space
-        q = re.sub(r'[-]', ' ', q)    # Replace dash with space
-        
-        # Handle quotes - remove unmatched quotes
-        quote_count = q.count('"')
-        if quote_count % 2 != 0:
-            q = q.replace('"', '')
-        
-        # Clean up multiple spaces
-        q = re.sub(r'\s+', ' ', q).strip()
-        
-        # If query is still empty or too short, return empty
-        if not q or len(q) < 2:
-            return ""
-        
-        # For single words, return as-is
-        # For multiple words, wrap in quotes for phrase search
-        words = q.split()
-        if len(words) == 1:
-            return words[0]
-        else:
-            # Use phrase search for multi-word queries
-            return f'"{q}"'
+        """Compile a user query for FTS5: all terms (AND), boosted when NEAR each other"""
+        return compile_fts_query(q)
 
     # ─── Search ─────────────────────────────────────────────────────────────
     def search(self, q: str, mode: str = 'hybrid', k: int = 20) -> list[sqlite3.Row]:
@@ -176,18 +184,19 @@ class SearchService:
         if not sanitized_query:
             return []
             
+        self.index.sync_for_search()
         cur = self.conn.cursor()
         try:
             rows = cur.execute(
-                """
+                f"""
+                WITH {NOTE_MATCHES_CTE}
                 SELECT n.*,
-                       bm25(notes_fts) AS kw_rank,
-                       snippet(notes_fts, 1, '<b>', '</b>', '…', 12) AS snippet
-                FROM notes_fts JOIN notes n ON notes_fts.rowid = n.id
-                WHERE notes_fts MATCH ?
+                       note_matches.kw_rank AS kw_rank,
+                       {NOTE_SNIPPET_SQL} AS snippet
+                FROM note_matches JOIN notes n ON note_matches.id = n.id
                 ORDER BY kw_rank
-                LIMIT ?
-                """, (sanitized_query, k)).fetchall()
+                LIMIT :k
+                """, {"match": sanitized_query, "k": k}).fetchall()
             return rows
         except Exception as e:
             print(f"[search] FTS query failed for '{sanitized_query}': {e}")
@@ -196,7 +205,7 @@ class SearchService:
     def _semantic(self, q: str, k: int) -> list[sqlite3.Row]:
         if not self._vec_table_exists():
             return []
-        qvec = self.embedder.embed(q)
+        qvec = self.embedder.embed_query(q)
         cur = self.conn.cursor()
         rows = cur.execute(
             """
@@ -222,20 +231,20 @@ class SearchService:
             # If query can't be sanitized, fall back to semantic search only
             return self._semantic(q, k)
             
-        qvec = self.embedder.embed(q)
+        qvec = self.embedder.embed_query(q)
+        self.index.sync_for_search()
         cur = self.conn.cursor()
         try:
             rows = cur.execute(
-            """
-            WITH kw AS (
-              SELECT rowid AS id, bm25(notes_fts) AS kw_rank
-              FROM notes_fts
-              WHERE notes_fts MATCH ?
+            f"""
+            WITH {NOTE_MATCHES_CTE},
+            kw AS (
+              SELECT id, kw_rank FROM note_matches
               ORDER BY kw_rank
               LIMIT 50
             ),
             vs AS (
-              SELECT note_id AS id, 1.0 - vec_distance_cosine(embedding, ?) AS vs_rank
+              SELECT note_id AS id, 1.0 - vec_distance_cosine(embedding, :qvec) AS vs_rank
               FROM note_vecs
               ORDER BY vs_rank DESC
               LIMIT 50
@@ -250,8 +259,8 @@ class SearchService:
             FROM unioned u JOIN notes n ON n.id = u.id
             GROUP BY n.id
             ORDER BY score DESC
-            LIMIT ?
-            """, (sanitized_query, json.dumps(qvec), k)).fetchall()
+            LIMIT :k
+            """, {"match": sanitized_query, "qvec": json.dumps(qvec), "k": k}).fetchall()
             return rows
         except Exception as e:
             print(f"[search] Hybrid search failed for '{sanitized_query}': {e}")
@@ -308,12 +317,15 @@ class SearchService:
         # Get memory service
         try:
             from services.memory_service import MemoryService
-            from services.embeddings import get_embeddings_service
             from database import get_db_connection
             from config import get_settings
 
             settings = get_settings()
-            memory = MemoryService(get_db_connection(), get_embeddings_service())
+            # Same embedder as document search: the query is embedded once for both
+            memory = MemoryService(
+                get_db_connection(),
+                self.embedder if settings.memory_vector_enabled else None
+            )
 
             # Search episodic memories
             episodic_results = memory.search_episodic(
@@ -3,14 +3,31 @@ Search History & Saved Searches Service
 
 Provides search tracking, history management, and saved search functionality
 to enhance user search experience and provide analytics insights.
+
+Recording a search only appends an event to a per-process in-memory buffer
+(``SearchHistoryRecorder``); a background task flushes the buffer in batches,
+writing the history rows, the daily aggregates (one UPSERT per user, day and
+mode) and the suggestion counts in one transaction. Retention trimming runs
+periodically instead of after every search.
 """
 
+import asyncio
 import json
+import logging
 import sqlite3
-from datetime import datetime, date
+import threading
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 
+from services.suggestion_index import SuggestionIndex
+
+logger = logging.getLogger(__name__)
+
+# Modes accepted by the search_history CHECK constraint (migration 004)
+HISTORY_MODES = ("keyword", "semantic", "hybrid")
+
 @dataclass
 class SearchHistoryEntry:
     id: int
@@ -37,34 +54,17 @@ class SavedSearch:
 class SearchHistoryService:
     def __init__(self, get_conn: Callable[[], sqlite3.Connection]):
         self.get_conn = get_conn
+        self.recorder = get_history_recorder(get_conn)
         
-    def record_search(self, user_id: int, query: str, search_mode: str, 
-                     results_count: int, response_time_ms: int) -> int:
-        """Record a search in history for analytics and quick access"""
-        if not query.strip():
-            return 0
-            
-        conn = self.get_conn()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO search_history (user_id, query, search_mode, results_count, response_time_ms)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, query.strip(), search_mode, results_count, response_time_ms))
-        
-        search_id = cursor.lastrowid
-        conn.commit()
-        
-        # Update daily analytics
-        self._update_daily_analytics(user_id, query, search_mode, response_time_ms)
-        
-        # Cleanup old history (keep last 1000 searches per user)
-        self._cleanup_old_history(user_id)
-        
-        return search_id
+    def record_search(self, user_id: int, query: str, search_mode: str,
+                     results_count: int, response_time_ms: int) -> bool:
+        """Queue a search for history, analytics and suggestions; written by the flusher"""
+        return self.recorder.record(user_id, query, search_mode, results_count, response_time_ms)
     
     def get_search_history(self, user_id: int, limit: int = 20) -> List[SearchHistoryEntry]:
         """Get recent search history for a user"""
+        # Include searches still waiting in this worker's buffer
+        self.recorder.flush()
         conn = self.get_conn()
         cursor = conn.cursor()
         
@@ -291,47 +291,273 @@ class SearchHistoryService:
             "daily_volume": daily_volume,
             "period_days": days
         }
-    
-    def _update_daily_analytics(self, user_id: int, query: str, search_mode: str, response_time_ms: int):
-        """Update daily search analytics"""
-        conn = self.get_conn()
-        cursor = conn.cursor()
-        
-        today = date.today().isoformat()
-        
-        cursor.execute("""
-            INSERT INTO search_analytics (user_id, date, total_searches, avg_response_time_ms, 
+
+
+@dataclass
+class SearchEvent:
+    user_id: int
+    query: str
+    search_mode: str
+    results_count: int
+    response_time_ms: int
+    created_at: str  # UTC "YYYY-MM-DD HH:MM:SS", like CURRENT_TIMESTAMP
+
+
+DAILY_UPSERT_SQL = """
+    INSERT INTO search_analytics_daily (user_id, date, total_searches, avg_response_time_ms,
                                         most_common_query, search_mode_breakdown)
-            VALUES (?, ?, 1, ?, ?, ?)
-            ON CONFLICT(user_id, date) DO UPDATE SET
-                total_searches = total_searches + 1,
-                avg_response_time_ms = (avg_response_time_ms * (total_searches - 1) + ?) / total_searches,
-                search_mode_breakdown = CASE
-                    WHEN json_extract(search_mode_breakdown, '$.' || ?) IS NULL 
-                    THEN json_set(search_mode_breakdown, '$.' || ?, 1)
-                    ELSE json_set(search_mode_breakdown, '$.' || ?, json_extract(search_mode_breakdown, '$.' || ?) + 1)
-                END
-        """, (user_id, today, response_time_ms, query, json.dumps({search_mode: 1}), 
-              response_time_ms, search_mode, search_mode, search_mode, search_mode))
-        
-        conn.commit()
-    
-    def _cleanup_old_history(self, user_id: int, keep_last: int = 1000):
-        """Keep only the most recent search history entries"""
+    VALUES (:user_id, :day, :count, :avg_ms, :query, json_object(:mode, :count))
+    ON CONFLICT(user_id, date) DO UPDATE SET
+        total_searches = total_searches + excluded.total_searches,
+        avg_response_time_ms = (avg_response_time_ms * total_searches
+                                + excluded.avg_response_time_ms * excluded.total_searches)
+                               / (total_searches + excluded.total_searches),
+        search_mode_breakdown = json_set(
+            COALESCE(search_mode_breakdown, '{}'), '$.' || :mode,
+            COALESCE(json_extract(search_mode_breakdown, '$.' || :mode), 0) + excluded.total_searches
+        )
+"""
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+class SearchHistoryRecorder:
+    """Per-process buffer of searches, written in batches off the request path"""
+
+    def __init__(self, get_conn: Callable[[], sqlite3.Connection], max_buffer: int = 10000,
+                 keep_last: int = 1000, batch_size: int = 500):
+        self.get_conn = get_conn
+        self.suggestions = SuggestionIndex(get_conn)
+        self.keep_last = keep_last
+        self.batch_size = batch_size
+        # Bounded: if the database is unavailable for long, the oldest events are dropped
+        self._events: deque = deque(maxlen=max_buffer)
+        # Guards appends against a failed batch being put back at the front
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stats = {
+            'recorded': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'trimmed': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    def record(self, user_id: int, query: str, search_mode: str,
+               results_count: int, response_time_ms: int) -> bool:
+        """Buffer one search; never touches the database"""
+        query = (query or "").strip()
+        if not query:
+            return False
+        if search_mode not in HISTORY_MODES:
+            search_mode = "hybrid"
+        event = SearchEvent(
+            user_id=user_id,
+            query=query,
+            search_mode=search_mode,
+            results_count=int(results_count or 0),
+            response_time_ms=int(response_time_ms or 0),
+            created_at=datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        with self._buffer_lock:
+            if len(self._events) == self._events.maxlen:
+                self._stats['dropped'] += 1
+            self._events.append(event)
+        self._stats['recorded'] += 1
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._events)
+
+    def flush(self) -> int:
+        """Write everything buffered so far in batches; returns the number of searches written"""
+        written = 0
+        with self._flush_lock:
+            started = datetime.now()
+            while self._events:
+                batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                try:
+                    self._write_batch(batch)
+                except sqlite3.OperationalError as e:
+                    # Locked or unavailable: keep the batch for the next flush
+                    self._requeue(batch)
+                    self._stats['failed_batches'] += 1
+                    logger.warning(f"Search history flush failed, {len(self._events)} searches pending: {e}")
+                    break
+                except sqlite3.Error as e:
+                    # A batch the schema rejects would fail the same way every time
+                    self._stats['failed_batches'] += 1
+                    self._stats['dropped'] += len(batch)
+                    logger.warning(f"Dropped {len(batch)} searches the history tables rejected: {e}")
+                    continue
+                written += len(batch)
+                self._stats['batches'] += 1
+            self._stats['written'] += written
+            self._stats['last_flush_ms'] = round((datetime.now() - started).total_seconds() * 1000, 2)
+        return written
+
+    def _requeue(self, batch: List[SearchEvent]) -> None:
+        """Put a failed batch back in front of newer searches.
+
+        Only as much as fits: extendleft on a full deque would evict the
+        newest searches from the right. The batch's oldest events are dropped
+        instead, matching what record() drops when the buffer is full.
+        """
+        with self._buffer_lock:
+            free = self._events.maxlen - len(self._events)
+            keep = batch[max(0, len(batch) - free):]
+            self._events.extendleft(reversed(keep))
+        if len(keep) < len(batch):
+            self._stats['dropped'] += len(batch) - len(keep)
+            logger.warning(f"Search history buffer full, dropped {len(batch) - len(keep)} unwritten searches")
+
+    def trim(self, keep_last: Optional[int] = None) -> int:
+        """Delete all but each user's most recent ``keep_last`` searches"""
+        keep_last = keep_last or self.keep_last
         conn = self.get_conn()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            DELETE FROM search_history 
-            WHERE user_id = ? AND id NOT IN (
-                SELECT id FROM search_history 
-                WHERE user_id = ?
-                ORDER BY created_at DESC 
-                LIMIT ?
-            )
-        """, (user_id, user_id, keep_last))
-        
-        if cursor.rowcount > 0:
+        try:
+            if not _table_columns(conn, "search_history"):
+                return 0
+            cur = conn.execute("""
+                DELETE FROM search_history WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY id DESC) AS position
+                        FROM search_history
+                    ) WHERE position > ?
+                )
+            """, (keep_last,))
             conn.commit()
+            self._stats['trimmed'] += cur.rowcount
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['pending'] = self.pending
+        return stats
+
+    def _write_batch(self, batch: List[SearchEvent]) -> None:
+        """History rows, daily aggregates and suggestion counts in one transaction"""
+        conn = self.get_conn()
+        try:
+            history_columns = _table_columns(conn, "search_history")
+            if history_columns:
+                self._insert_history(conn, history_columns, batch)
+            if _table_columns(conn, "search_analytics_daily"):
+                self._upsert_daily(conn, batch, recount="created_at" in history_columns)
+            for event in batch:
+                self.suggestions.record_query(event.user_id, event.query, conn=conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _insert_history(conn: sqlite3.Connection, columns: set, batch: List[SearchEvent]) -> None:
+        # search_history exists in two shapes: migration 004's (search_mode, response_time_ms,
+        # created_at) and advanced_search_router's (timestamp)
+        fields = ["user_id", "query", "results_count"]
+        fields += [name for name in ("search_mode", "response_time_ms") if name in columns]
+        time_column = next((name for name in ("created_at", "timestamp") if name in columns), None)
+        rows = []
+        for event in batch:
+            row = [getattr(event, name) for name in fields]
+            if time_column:
+                row.append(event.created_at)
+            rows.append(row)
+        if time_column:
+            fields.append(time_column)
+        conn.executemany(
+            f"INSERT INTO search_history ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+            rows,
+        )
+
+    @staticmethod
+    def _upsert_daily(conn: sqlite3.Connection, batch: List[SearchEvent], recount: bool) -> None:
+        groups: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+        queries: Dict[tuple, Counter] = defaultdict(Counter)
+        for event in batch:
+            day = event.created_at[:10]
+            group = groups[(event.user_id, day, event.search_mode)]
+            group[0] += 1
+            group[1] += event.response_time_ms
+            queries[(event.user_id, day)][event.query] += 1
+
+        conn.executemany(DAILY_UPSERT_SQL, [
+            {
+                "user_id": user_id, "day": day, "mode": mode, "count": count,
+                "avg_ms": total_ms // count,
+                "query": queries[(user_id, day)].most_common(1)[0][0],
+            }
+            for (user_id, day, mode), (count, total_ms) in groups.items()
+        ])
+        if recount:
+            # The day's most common query over all its searches, not just this batch
+            conn.executemany("""
+                UPDATE search_analytics_daily SET most_common_query = (
+                    SELECT query FROM search_history
+                    WHERE user_id = :user_id AND created_at >= :day AND created_at < :next_day
+                    GROUP BY query ORDER BY COUNT(*) DESC, MAX(id) DESC LIMIT 1
+                )
+                WHERE user_id = :user_id AND date = :day
+            """, [
+                {"user_id": user_id, "day": day,
+                 "next_day": (datetime.fromisoformat(day) + timedelta(days=1)).strftime("%Y-%m-%d")}
+                for user_id, day in queries
+            ])
+
+
+# One recorder per connection factory, so every service sharing a database shares a buffer
+_recorders: Dict[Callable, SearchHistoryRecorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def get_history_recorder(get_conn: Callable[[], sqlite3.Connection]) -> SearchHistoryRecorder:
+    with _recorders_lock:
+        recorder = _recorders.get(get_conn)
+        if recorder is None:
+            from config import settings
+            recorder = SearchHistoryRecorder(
+                get_conn,
+                max_buffer=settings.search_history_buffer_size,
+                keep_last=settings.search_history_keep_last,
+            )
+            _recorders[get_conn] = recorder
+        return recorder
+
+
+def flush_history_recorders() -> int:
+    """Write every buffered search now - for shutdown and tests"""
+    with _recorders_lock:
+        recorders = list(_recorders.values())
+    return sum(recorder.flush() for recorder in recorders)
+
+
+async def run_history_flusher(interval: float = 2.0) -> None:
+    """Flush this process's buffers every ``interval`` seconds (each worker runs its own)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(flush_history_recorders)
+        except Exception as e:
+            logger.warning(f"Search history flusher error: {e}")
+
+
+async def run_history_retention(interval: float = 3600.0) -> None:
+    """Trim every user's history to its most recent searches (one worker, under a lease)"""
+    while True:
+        with _recorders_lock:
+            recorders = list(_recorders.values())
+        for recorder in recorders:
+            try:
+                await asyncio.to_thread(recorder.trim)
+            except Exception as e:
+                logger.warning(f"Search history retention error: {e}")
+        await asyncio.sleep(interval)
 
 print("[Search History Service] Loaded successfully")
\ No newline at end of file
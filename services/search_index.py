@@ -3,7 +3,8 @@
 # ──────────────────────────────────────────────────────────────────────────────
 """
 Search indexer refinements for Second Brain.
-Implements chunk-based indexing with FTS5 and optional sqlite-vec support.
+Chunk-level BM25 and optional sqlite-vec embeddings over the note chunk index
+(services/note_index.py owns the chunks and the FTS5 table).
 """
 from __future__ import annotations
 import json
@@ -14,6 +15,13 @@ import urllib.request
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
+from services.note_index import (
+    BM25_SQL,
+    NoteIndexService,
+    compile_fts_query,
+    ensure_note_index_schema,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +51,7 @@ class SearchIndexer:
         self.db_path = cfg.db_path
         self._vec_available = None
         self._setup_connection()
+        self.index = NoteIndexService(lambda: sqlite3.connect(self.db_path))
     
     def _setup_connection(self) -> None:
         """Initialize database connection with extensions."""
@@ -61,28 +70,8 @@ class SearchIndexer:
                 logger.warning(f"Failed to load sqlite-vec extension: {e}")
     
     def ensure_fts(self) -> None:
-        """Ensure FTS5 tables exist."""
-        cursor = self.conn.cursor()
-        
-        # Create chunk table if it doesn't exist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS chunk (
-                id TEXT PRIMARY KEY,
-                item_id TEXT NOT NULL,
-                ord INTEGER NOT NULL DEFAULT 0,
-                heading TEXT NOT NULL DEFAULT '',
-                text TEXT NOT NULL DEFAULT '',
-                token_est INTEGER NOT NULL DEFAULT 0
-            )
-        """)
-        
-        # Create FTS5 table for chunks (simplified tokenizer for compatibility)
-        cursor.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS fts_chunk USING fts5(
-                chunk_id, item_id, heading, text
-            )
-        """)
-        
+        """Ensure the note chunk index exists."""
+        ensure_note_index_schema(self.conn)
         self.conn.commit()
         logger.info("FTS5 tables ensured")
     
@@ -133,31 +122,16 @@ class SearchIndexer:
             return False
     
     def rebuild_fts(self) -> Dict[str, Any]:
-        """Wipe + reinsert from chunk table."""
+        """Re-chunk and re-index every note."""
         self.ensure_fts()
-        
-        cursor = self.conn.cursor()
         start_time = self._get_time_ms()
-        
-        # Clear FTS table
-        cursor.execute("DELETE FROM fts_chunk")
-        
-        # Get all chunks
-        cursor.execute("SELECT id, item_id, heading, text FROM chunk ORDER BY item_id, ord")
-        chunks = cursor.fetchall()
-        
-        # Batch insert into FTS
-        fts_rows = [(row['id'], row['item_id'], row['heading'], row['text']) for row in chunks]
-        cursor.executemany(
-            "INSERT INTO fts_chunk(chunk_id, item_id, heading, text) VALUES (?, ?, ?, ?)",
-            fts_rows
-        )
-        
-        self.conn.commit()
+        notes = self.index.rebuild()
+        total_chunks = self.conn.execute("SELECT COUNT(*) FROM note_chunks").fetchone()[0]
         end_time = self._get_time_ms()
         
         result = {
-            'total_chunks': len(chunks),
+            'total_notes': notes,
+            'total_chunks': total_chunks,
             'time_ms': end_time - start_time,
             'status': 'success'
         }
@@ -178,7 +152,7 @@ class SearchIndexer:
         start_time = self._get_time_ms()
         
         # Get chunks to process
-        query = "SELECT id, heading, text FROM chunk ORDER BY item_id, ord"
+        query = "SELECT id, title AS heading, text FROM note_chunks ORDER BY note_id, ord"
         if limit:
             query += f" LIMIT {limit}"
         
@@ -206,9 +180,9 @@ class SearchIndexer:
                         continue
                     
                     if vec_available:
-                        self._store_vec_embedding(chunk['id'], model, embedding)
+                        self._store_vec_embedding(str(chunk['id']), model, embedding)
                     else:
-                        self._store_json_embedding(chunk['id'], model, embedding)
+                        self._store_json_embedding(str(chunk['id']), model, embedding)
                     
                     successful += 1
                     
@@ -234,18 +208,15 @@ class SearchIndexer:
         return result
     
     def index_item(self, item_id: str) -> Dict[str, Any]:
-        """Delete/replace item's rows in FTS and embeddings."""
+        """Re-chunk one note in the FTS index and replace its embeddings."""
         self.ensure_fts()
         
         cursor = self.conn.cursor()
         start_time = self._get_time_ms()
         
-        # Delete existing FTS entries for this item
-        cursor.execute("DELETE FROM fts_chunk WHERE item_id = ?", (item_id,))
-        
         # Delete existing embeddings for this item's chunks
-        cursor.execute("SELECT id FROM chunk WHERE item_id = ?", (item_id,))
-        chunk_ids = [row['id'] for row in cursor.fetchall()]
+        cursor.execute("SELECT id FROM note_chunks WHERE note_id = ?", (item_id,))
+        chunk_ids = [str(row['id']) for row in cursor.fetchall()]
         
         for chunk_id in chunk_ids:
             if self.ensure_vec():
@@ -253,23 +224,23 @@ class SearchIndexer:
                 # Note: vec_chunk entries are handled by vec_map foreign keys
             else:
                 cursor.execute("DELETE FROM embedding WHERE chunk_id = ?", (chunk_id,))
+        self.conn.commit()
         
-        # Re-index chunks for this item
-        cursor.execute("SELECT id, item_id, heading, text FROM chunk WHERE item_id = ? ORDER BY ord", (item_id,))
+        # Re-chunk through the index's single write path
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.index.index_notes([int(item_id)], self.conn)
+        self.conn.execute("DELETE FROM note_index_queue WHERE note_id = ?", (item_id,))
+        self.conn.commit()
+        cursor.execute(
+            "SELECT id, note_id AS item_id, title AS heading, text FROM note_chunks WHERE note_id = ? ORDER BY ord",
+            (item_id,)
+        )
         chunks = cursor.fetchall()
         
-        successful_fts = 0
+        successful_fts = len(chunks)
         successful_embed = 0
         failed_embed = 0
         
-        # Add to FTS
-        for chunk in chunks:
-            cursor.execute(
-                "INSERT INTO fts_chunk(chunk_id, item_id, heading, text) VALUES (?, ?, ?, ?)",
-                (chunk['id'], chunk['item_id'], chunk['heading'], chunk['text'])
-            )
-            successful_fts += 1
-        
         # Add embeddings if enabled
         if self.cfg.enable_embeddings:
             for chunk in chunks:
@@ -284,9 +255,9 @@ class SearchIndexer:
                         continue
                     
                     if self.ensure_vec():
-                        self._store_vec_embedding(chunk['id'], self.cfg.embed_model, embedding)
+                        self._store_vec_embedding(str(chunk['id']), self.cfg.embed_model, embedding)
                     else:
-                        self._store_json_embedding(chunk['id'], self.cfg.embed_model, embedding)
+                        self._store_json_embedding(str(chunk['id']), self.cfg.embed_model, embedding)
                     
                     successful_embed += 1
                     
@@ -316,6 +287,7 @@ class SearchIndexer:
             return []
         
         self.ensure_fts()
+        self.index.sync_for_search()
         cursor = self.conn.cursor()
         
         # Sanitize query for FTS5
@@ -324,16 +296,16 @@ class SearchIndexer:
             return []
         
         try:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 
-                    c.item_id,
-                    f.chunk_id,
-                    c.heading,
-                    snippet(fts_chunk, 3, '<b>', '</b>', '…', 12) as preview,
-                    bm25(fts_chunk) as score
-                FROM fts_chunk f
-                JOIN chunk c ON c.id = f.chunk_id
-                WHERE fts_chunk MATCH ?
+                    CAST(c.note_id AS TEXT) as item_id,
+                    CAST(c.id AS TEXT) as chunk_id,
+                    c.title as heading,
+                    snippet(note_chunks_fts, 2, '<b>', '</b>', '…', 12) as preview,
+                    {BM25_SQL} as score
+                FROM note_chunks_fts f
+                JOIN note_chunks c ON c.id = f.rowid
+                WHERE note_chunks_fts MATCH ?
                 ORDER BY score
                 LIMIT ?
             """, (sanitized_q, k))
@@ -371,15 +343,15 @@ class SearchIndexer:
             try:
                 cursor.execute("""
                     SELECT 
-                        c.item_id,
-                        c.id as chunk_id,
-                        c.heading,
+                        CAST(c.note_id AS TEXT) as item_id,
+                        CAST(c.id AS TEXT) as chunk_id,
+                        c.title as heading,
                         SUBSTR(c.text, 1, 200) || CASE WHEN LENGTH(c.text) > 200 THEN '...' ELSE '' END as preview,
                         (1.0 - vec_distance_cosine(vc.embedding, ?)) as score,
                         vm.rowid_int
                     FROM vec_map vm
                     JOIN vec_chunk vc ON vc.rowid = vm.rowid_int
-                    JOIN chunk c ON c.id = vm.chunk_id
+                    JOIN note_chunks c ON c.id = vm.chunk_id
                     WHERE vm.model = ?
                     ORDER BY score DESC
                     LIMIT ?
@@ -422,7 +394,7 @@ class SearchIndexer:
                 results = []
                 for i, (chunk_id, similarity) in enumerate(top_similarities, 1):
                     cursor.execute("""
-                        SELECT item_id, heading, text FROM chunk WHERE id = ?
+                        SELECT CAST(note_id AS TEXT) AS item_id, title AS heading, text FROM note_chunks WHERE id = ?
                     """, (chunk_id,))
                     
                     row = cursor.fetchone()
@@ -564,36 +536,9 @@ class SearchIndexer:
     # Helper methods
     
     def _sanitize_fts_query(self, q: str) -> str:
-        """Sanitize query for FTS5 compatibility."""
-        if not q or not q.strip():
-            return ""
-        
-        q = q.strip()
-        
-        # Remove problematic characters
-        import re
-        q = re.sub(r'[<>=^@#$%&]', '', q)
-        q = re.sub(r'[():]', ' ', q)
-        q = re.sub(r'[-]', ' ', q)
-        
-        # Handle quotes
-        quote_count = q.count('"')
-        if quote_count % 2 != 0:
-            q = q.replace('"', '')
-        
-        # Clean up spaces
-        q = re.sub(r'\s+', ' ', q).strip()
-        
-        if not q or len(q) < 2:
-            return ""
-        
-        # For phrase search, wrap multi-word queries in quotes
-        words = q.split()
-        if len(words) == 1:
-            return words[0]
-        else:
-            return f'"{q}"'
-    
+        """Compile a user query for FTS5: all terms (AND), boosted when NEAR each other"""
+        return compile_fts_query(q)
+
     def _generate_embedding(self, text: str, model: str) -> Optional[List[float]]:
         """Generate embedding using SentenceTransformers or Ollama fallback."""
         try:
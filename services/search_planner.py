@@ -0,0 +1,209 @@
+"""
+Search Planner for Second Brain
+
+Compiles a parsed ``SearchQuery`` into one parameterized statement:
+
+- text terms (unfielded, ``title:``, ``content:``, ``tag:``) become a single
+  FTS5 expression over ``note_chunks_fts`` with column filters, ranked by
+  bm25 through the best-chunk rollup from ``services.note_index``;
+- ``type:``/``status:``/``source:`` terms and date ranges become predicates
+  on ``notes`` columns, where the (user_id, created_at) and (user_id, type)
+  indexes apply;
+- the total comes from a window count in the same statement.
+
+The SQL text depends only on the query's shape (which predicates exist and how
+many values each has), never on the values, so it is compiled once per shape
+and cached; the values travel as parameters. ``explain`` runs ``EXPLAIN QUERY
+PLAN`` for the diagnostics endpoint.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.advanced_search_parser import SearchField, SearchOperator, SearchQuery, SearchTerm
+from services.note_index import NOTE_MATCHES_CTE
+
+# Fielded text terms and the FTS column they filter on; unfielded terms search every column
+FTS_COLUMNS = {
+    SearchField.TITLE: "title",
+    SearchField.CONTENT: "text",
+    SearchField.TAG: "tags",
+}
+# Fielded terms that filter notes columns directly
+PREDICATE_COLUMNS = {
+    SearchField.TYPE: "type",
+    SearchField.STATUS: "status",
+    SearchField.SOURCE: "source",
+}
+DATE_COLUMNS = {
+    SearchField.DATE: "created_at",
+    SearchField.CREATED: "created_at",
+    SearchField.UPDATED: "updated_at",
+}
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class SearchPlan:
+    sql: str
+    params: Dict[str, Any]
+    shape: Tuple
+    match: Optional[str] = None
+    exclude: Optional[str] = None
+    notes: List[str] = field(default_factory=list)
+
+    def execute(self, conn: sqlite3.Connection) -> List[sqlite3.Row]:
+        return conn.execute(self.sql, self.params).fetchall()
+
+
+def _fts_term(term: SearchTerm) -> Optional[str]:
+    value = term.value
+    prefix = term.is_wildcard
+    if prefix:
+        # FTS5 only has trailing prefix queries; "te?t" and "pyth*" both search from the first wildcard
+        value = re.split(r"[*?]", value, maxsplit=1)[0]
+    words = _WORD_RE.findall(value)
+    if not words:
+        return None
+    expr = '"{}"'.format(" ".join(words)) + ("*" if prefix else "")
+    column = FTS_COLUMNS.get(term.field)
+    return f"{column} : {expr}" if column else expr
+
+
+def _fts_expressions(terms: Iterable[SearchTerm]) -> Tuple[Optional[str], Optional[str]]:
+    """Fold text terms left to right with their operators; returns (match, exclude)"""
+    positive: Optional[str] = None
+    negative: List[str] = []
+    for term in terms:
+        expr = _fts_term(term)
+        if expr is None:
+            continue
+        if term.is_negated or term.operator == SearchOperator.NOT:
+            negative.append(expr)
+        elif positive is None:
+            positive = expr
+        else:
+            op = "OR" if term.operator == SearchOperator.OR else "AND"
+            positive = f"({positive}) {op} {expr}"
+    exclude = " OR ".join(negative) or None
+    if positive and exclude:
+        return f"({positive}) NOT ({exclude})", None
+    return positive, exclude
+
+
+@lru_cache(maxsize=256)
+def compile_shape(shape: Tuple) -> str:
+    """SQL for a query shape; cached, since the text never depends on the searched values"""
+    has_match, has_exclude, predicates, dates, has_user, exclude_deleted = shape
+    conditions: List[str] = []
+    if has_user:
+        conditions.append("n.user_id = :user_id")
+    if exclude_deleted:
+        conditions.append("COALESCE(n.status, '') != 'deleted'")
+    for i, (column, negated, count) in enumerate(predicates):
+        values = ", ".join(f":p{i}_{j}" for j in range(count))
+        conditions.append(f"n.{column} {'NOT IN' if negated else 'IN'} ({values})")
+    for i, (column, op) in enumerate(dates):
+        conditions.append(f"n.{column} {op} :d{i}")
+    if has_exclude:
+        conditions.append(
+            "n.id NOT IN (SELECT c.note_id FROM note_chunks_fts JOIN note_chunks c ON c.id = note_chunks_fts.rowid "
+            "WHERE note_chunks_fts MATCH :exclude)"
+        )
+    where = " AND ".join(conditions) or "1 = 1"
+
+    if has_match:
+        # bm25 is negative, lower is better; map it onto 0..1 for the response
+        return f"""
+            WITH {NOTE_MATCHES_CTE}
+            SELECT n.*, (-note_matches.kw_rank) / (1.0 - note_matches.kw_rank) AS score,
+                   COUNT(*) OVER () AS total_count
+            FROM note_matches JOIN notes n ON n.id = note_matches.id
+            WHERE {where}
+            ORDER BY note_matches.kw_rank
+            LIMIT :limit OFFSET :offset
+        """
+    return f"""
+        SELECT n.*, 1.0 AS score, COUNT(*) OVER () AS total_count
+        FROM notes n
+        WHERE {where}
+        ORDER BY n.created_at DESC
+        LIMIT :limit OFFSET :offset
+    """
+
+
+class SearchPlanner:
+    """Turns parsed advanced-search queries into cached, parameterized statements"""
+
+    def __init__(self, note_columns: Optional[Iterable[str]] = None):
+        # Columns of notes in the target database; fielded terms on missing columns fall back to text search
+        self.note_columns = set(note_columns) if note_columns is not None else None
+
+    def plan(self, query: SearchQuery, user_id: Optional[int] = None, exclude_deleted: bool = False,
+             limit: int = 50, offset: int = 0) -> SearchPlan:
+        notes: List[str] = []
+        text_terms: List[SearchTerm] = []
+        grouped: Dict[Tuple[str, bool], List[str]] = {}
+        for term in query.terms:
+            column = PREDICATE_COLUMNS.get(term.field)
+            if column and self.note_columns is not None and column not in self.note_columns:
+                notes.append(f"notes has no {column} column; '{term.field.value}:{term.value}' searched as text")
+                column = None
+                term = SearchTerm(value=term.value, operator=term.operator, is_negated=term.is_negated,
+                                  is_phrase=term.is_phrase, is_wildcard=term.is_wildcard)
+            if column:
+                # Several values for one field are alternatives: type:note type:audio
+                negated = term.is_negated or term.operator == SearchOperator.NOT
+                grouped.setdefault((column, negated), []).append(term.value)
+            elif term.field is None or term.field in FTS_COLUMNS:
+                text_terms.append(term)
+            else:
+                notes.append(f"'{term.field.value}:' is not searchable; ignored")
+
+        params: Dict[str, Any] = {"limit": limit, "offset": offset}
+        predicates = []
+        for i, ((column, negated), values) in enumerate(grouped.items()):
+            predicates.append((column, negated, len(values)))
+            params.update({f"p{i}_{j}": value for j, value in enumerate(values)})
+
+        dates = []
+        for date_range in query.date_ranges:
+            column = DATE_COLUMNS.get(date_range.field, "created_at")
+            end_op, end = "<=", date_range.end
+            if end is not None and end.time() == time.min:
+                # A day bound ("..2024-03-01") covers the whole day
+                end_op, end = "<", end + timedelta(days=1)
+            for op, bound in ((">=", date_range.start), (end_op, end)):
+                if bound is not None:
+                    # Stored as "YYYY-MM-DD HH:MM:SS"; isoformat's "T" would break same-day comparisons
+                    params[f"d{len(dates)}"] = bound.strftime("%Y-%m-%d %H:%M:%S")
+                    dates.append((column, op))
+
+        match, exclude = _fts_expressions(text_terms)
+        if match:
+            params["match"] = match
+        if exclude:
+            params["exclude"] = exclude
+        if user_id is not None:
+            params["user_id"] = user_id
+
+        shape = (bool(match), bool(exclude), tuple(predicates), tuple(dates), user_id is not None, exclude_deleted)
+        return SearchPlan(sql=compile_shape(shape), params=params, shape=shape,
+                          match=match, exclude=exclude, notes=notes)
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, plan: SearchPlan) -> List[Dict[str, Any]]:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + plan.sql, plan.params).fetchall()
+        return [{"id": row[0], "parent": row[1], "detail": row[3]} for row in rows]
+
+    @staticmethod
+    def cache_info() -> Dict[str, int]:
+        info = compile_shape.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
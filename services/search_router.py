@@ -14,7 +14,6 @@ from __future__ import annotations
 import os
 import json
 import time
-import re
 from typing import Optional, Dict, List, Any
 from functools import lru_cache
 
@@ -23,6 +22,7 @@ from pydantic import BaseModel
 
 from services.search_adapter import SearchService
 from services.search_history_service import SearchHistoryService
+from services.suggestion_index import SuggestionIndex
 # get_conn will be passed from app.py context
 from services.auth_service import User
 from config import settings
@@ -32,6 +32,7 @@ get_conn = None
 get_current_user = None
 get_current_user_silent = None
 search_history_service = None
+suggestion_index = None
 
 class SearchRequest(BaseModel):
     query: str
@@ -63,11 +64,12 @@ router = APIRouter(prefix="/api/search", tags=["search"])
 
 def init_search_router(get_conn_func, get_current_user_func, get_current_user_silent_func):
     """Initialize search router with functions from app.py"""
-    global get_conn, get_current_user, get_current_user_silent, search_history_service
+    global get_conn, get_current_user, get_current_user_silent, search_history_service, suggestion_index
     get_conn = get_conn_func
     get_current_user = get_current_user_func
     get_current_user_silent = get_current_user_silent_func
     search_history_service = SearchHistoryService(get_conn_func)
+    suggestion_index = SuggestionIndex(get_conn_func)
 
 
 # ─── Utility Functions ──────────────────────────────────────────────────────
@@ -93,53 +95,6 @@ def _resolve_search_mode(filters: Optional[dict]) -> str:
     return mode
 
 
-def _fuzzy_match(query: str, text: str, threshold: float = 0.6) -> bool:
-    """Simple fuzzy matching based on character overlap"""
-    if len(query) < 3 or len(text) < 3:
-        return False
-    
-    query_chars = set(query.lower())
-    text_chars = set(text.lower())
-    overlap = len(query_chars.intersection(text_chars))
-    return overlap / len(query_chars) >= threshold
-
-
-def _extract_phrases(content: str, query: str, max_phrases: int = 2) -> List[str]:
-    """Extract meaningful phrases containing the query from content"""
-    phrases = []
-    sentences = re.split(r'[.!?]+', content)
-    
-    for sentence in sentences[:10]:  # Check first 10 sentences
-        sentence = sentence.strip()
-        if query.lower() in sentence.lower() and len(sentence) > 10:
-            # Clean up the sentence
-            words = sentence.split()
-            if len(words) > 15:  # Truncate long sentences
-                # Find query position and extract around it
-                query_pos = -1
-                for i, word in enumerate(words):
-                    if query.lower() in word.lower():
-                        query_pos = i
-                        break
-                
-                if query_pos != -1:
-                    start = max(0, query_pos - 5)
-                    end = min(len(words), query_pos + 8)
-                    phrase = " ".join(words[start:end])
-                else:
-                    phrase = " ".join(words[:12])
-            else:
-                phrase = sentence
-            
-            if len(phrase) <= 80 and phrase not in phrases:
-                phrases.append(phrase)
-                
-            if len(phrases) >= max_phrases:
-                break
-    
-    return phrases
-
-
 def _basic_query_enhancement(query: str, tags: set, searches: list) -> Dict[str, Any]:
     """Basic query enhancement without LLM"""
     from difflib import get_close_matches
@@ -174,32 +129,6 @@ def _basic_query_enhancement(query: str, tags: set, searches: list) -> Dict[str,
     }
 
 
-def _spell_correct_query(query: str, reference_texts: list) -> str:
-    """Simple spell correction using reference texts"""
-    from difflib import get_close_matches
-    
-    words = query.split()
-    corrected_words = []
-    
-    # Create a set of reference words
-    reference_words = set()
-    for text in reference_texts:
-        if text:
-            reference_words.update(text.lower().split())
-    
-    for word in words:
-        if len(word) > 3:  # Only correct longer words
-            matches = get_close_matches(word.lower(), reference_words, n=1, cutoff=0.8)
-            if matches:
-                corrected_words.append(matches[0])
-            else:
-                corrected_words.append(word)
-        else:
-            corrected_words.append(word)
-    
-    return " ".join(corrected_words)
-
-
 # ─── Search Endpoints ───────────────────────────────────────────────────────
 
 @router.post("/enhanced")
@@ -358,138 +287,23 @@ async def search_suggestions(
     q: str = Query(..., description="Search query for suggestions"),
     current_user: User = Depends(get_current_user)
 ):
-    """Get intelligent search suggestions with AI-powered enhancements"""
+    """Type-ahead suggestions from the suggestion index (recent queries, titles, tags, popular queries)"""
     if len(q.strip()) < 2:
         return {"suggestions": []}
     
-    # Cache key includes user ID and query
-    cache_key = f"suggestions_{current_user.id}_{q.lower()}"
-    
-    # Simple in-memory cache with TTL (5 minutes)
-    if not hasattr(search_suggestions, '_cache'):
-        search_suggestions._cache = {}
-        search_suggestions._cache_times = {}
-    
-    current_time = time.time()
-    if cache_key in search_suggestions._cache:
-        cache_time = search_suggestions._cache_times.get(cache_key, 0)
-        if current_time - cache_time < 300:  # 5 minutes TTL
-            return search_suggestions._cache[cache_key]
-    
-    conn = get_conn()
-    c = conn.cursor()
-    
     suggestions = []
     
-    # 1. Recent searches by this user (now using search history service)
-    if search_history_service:
-        try:
-            recent_history = search_history_service.get_search_history(current_user.id, limit=10)
-            matching_recent = [h for h in recent_history if q.lower() in h.query.lower()]
-            suggestions.extend([
-                {"text": h.query, "type": "recent", "icon": "🕐", 
-                 "count": f"{h.results_count} results"} 
-                for h in matching_recent[:3]
-            ])
-        except Exception as e:
-            print(f"Recent search history error: {e}")
-            # Fallback to direct query
-            recent_searches = c.execute(
-                """SELECT DISTINCT query FROM search_history 
-                   WHERE user_id = ? AND query LIKE ? 
-                   ORDER BY created_at DESC LIMIT 3""",
-                (current_user.id, f"%{q}%")
-            ).fetchall()
-            suggestions.extend([{"text": row["query"], "type": "recent", "icon": "🕐"} for row in recent_searches])
-    else:
-        # Fallback to direct query if service not available
-        recent_searches = c.execute(
-            """SELECT DISTINCT query FROM search_history 
-               WHERE user_id = ? AND query LIKE ? 
-               ORDER BY created_at DESC LIMIT 3""",
-            (current_user.id, f"%{q}%")
-        ).fetchall()
-        suggestions.extend([{"text": row["query"], "type": "recent", "icon": "🕐"} for row in recent_searches])
-    
-    # 2. Smart title suggestions with fuzzy matching
-    title_matches = c.execute(
-        """SELECT DISTINCT title, created_at FROM notes 
-           WHERE user_id = ? AND (title LIKE ? OR title LIKE ?) 
-           AND title != '' ORDER BY created_at DESC LIMIT 6""",
-        (current_user.id, f"%{q}%", f"%{q.replace(' ', '%')}%")
-    ).fetchall()
-    suggestions.extend([{"text": row["title"], "type": "title", "icon": "📄"} for row in title_matches])
+    # Per-user terms, each kind ranked by frequency and recency
+    for s in suggestion_index.suggest(current_user.id, q, limit=3, kinds=("query",)):
+        suggestions.append({"text": s["text"], "type": "recent", "icon": "🕐", "count": int(s["weight"])})
+    for s in suggestion_index.suggest(current_user.id, q, limit=6, kinds=("title",)):
+        suggestions.append({"text": s["text"], "type": "title", "icon": "📄"})
+    for s in suggestion_index.suggest(current_user.id, q, limit=4, kinds=("tag",)):
+        suggestions.append({"text": f"tag:{s['text']}", "type": "tag", "icon": "🏷️"})
     
-    # 3. Intelligent tag suggestions
-    tag_matches = c.execute(
-        "SELECT DISTINCT tags FROM notes WHERE user_id = ? AND tags != '' LIMIT 20",
-        (current_user.id,)
-    ).fetchall()
-    
-    all_tags = set()
-    for row in tag_matches:
-        tags = [t.strip() for t in (row["tags"] or "").split(",") if t.strip()]
-        all_tags.update(tags)
-    
-    # Find tags that match query with fuzzy matching
-    matching_tags = []
-    q_lower = q.lower()
-    for tag in all_tags:
-        tag_lower = tag.lower()
-        if (q_lower in tag_lower or 
-            any(q_part in tag_lower for q_part in q_lower.split()) or
-            _fuzzy_match(q_lower, tag_lower)):
-            matching_tags.append(tag)
-    
-    suggestions.extend([{"text": f"tag:{tag}", "type": "tag", "icon": "🏷️"} for tag in sorted(matching_tags)[:4]])
-    
-    # 4. Content-based phrase suggestions
-    content_matches = c.execute(
-        """SELECT DISTINCT content, title FROM notes 
-           WHERE user_id = ? AND content LIKE ? AND content != '' 
-           ORDER BY created_at DESC LIMIT 4""",
-        (current_user.id, f"%{q}%")
-    ).fetchall()
-    
-    for row in content_matches:
-        content = row["content"] or ""
-        title = row["title"] or "Untitled"
-        # Extract meaningful phrases around the query
-        phrases = _extract_phrases(content, q)
-        for phrase in phrases[:2]:  # Limit to 2 phrases per note
-            suggestions.append({
-                "text": phrase, 
-                "type": "phrase", 
-                "icon": "💭",
-                "source": title[:30] + "..." if len(title) > 30 else title
-            })
-    
-    # 5. Semantic suggestions if available
-    try:
-        svc = _get_search_service()
-        if svc._vec_table_exists():
-            semantic_results = svc.search(q, mode='semantic', k=3)
-            for result in semantic_results:
-                if result['title'] and result['title'].lower() != q.lower():
-                    suggestions.append({
-                        "text": result['title'], 
-                        "type": "semantic", 
-                        "icon": "🧠",
-                        "score": f"{result.get('score', 0):.2f}"
-                    })
-    except Exception as e:
-        print(f"Semantic suggestions error: {e}")
-    
-    # 6. Popular queries (global suggestions)
-    popular_queries = c.execute(
-        """SELECT query, COUNT(*) as count FROM search_history 
-           WHERE query LIKE ? 
-           GROUP BY query ORDER BY count DESC LIMIT 3""",
-        (f"%{q}%",)
-    ).fetchall()
-    suggestions.extend([{"text": row["query"], "type": "popular", "icon": "🔥", "count": row["count"]} for row in popular_queries])
-    
-    conn.close()
+    # Popular queries (global suggestions)
+    for s in suggestion_index.popular(q, limit=3):
+        suggestions.append({"text": s["text"], "type": "popular", "icon": "🔥", "count": s["count"]})
     
     # Remove duplicates while preserving order and type info
     seen = set()
@@ -500,13 +314,7 @@ async def search_suggestions(
             seen.add(text)
             unique_suggestions.append(sugg)
     
-    result = {"suggestions": unique_suggestions}
-    
-    # Cache the result
-    search_suggestions._cache[cache_key] = result
-    search_suggestions._cache_times[cache_key] = current_time
-    
-    return result
+    return {"suggestions": unique_suggestions}
 
 
 @router.post("/enhance")
@@ -598,7 +406,7 @@ Query types: keyword (exact matches), semantic (meaning-based), hybrid (both)
             enhancement_data = _basic_query_enhancement(query, context_tags, context_searches)
         
         # Add automatic spelling correction
-        corrected_query = _spell_correct_query(query, context_notes + context_searches)
+        corrected_query = suggestion_index.correct(current_user.id, query)
         if corrected_query != query:
             enhancement_data.setdefault("spelling_corrections", []).append(corrected_query)
         
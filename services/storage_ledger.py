@@ -0,0 +1,205 @@
+"""
+Per-User Storage Ledger
+
+Keeps a running byte count per user and category (audio, uploads, web
+snapshots) so quota checks are a primary-key lookup instead of a scan over
+every note's metadata. Triggers on ``notes`` adjust the ledger in the same
+transaction as the write that changed storage, which covers single deletes,
+bulk deletes and uploads alike. ``reconcile`` recomputes the totals from the
+notes table to repair any drift (e.g. rows edited with triggers disabled).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Callable, Dict, List, Optional
+
+CATEGORIES = ("audio", "upload", "web")
+
+_TRIGGER_NAMES = ("notes_storage_ai", "notes_storage_ad", "notes_storage_au")
+
+
+def _size_expressions(columns: set, row: str) -> Dict[str, str]:
+    """SQL expressions giving a note row's bytes per category.
+
+    Built from the columns the notes table actually has so older databases
+    get working triggers instead of ones that fail on every write.
+    """
+    file_size = f"COALESCE({row}.file_size, 0)" if "file_size" in columns else "0"
+    is_audio = f"COALESCE({row}.type, '') = 'audio'" if "type" in columns else "0"
+    if "file_metadata" in columns:
+        web = (
+            "(SELECT COALESCE(SUM(CAST(json_extract(value, '$.size') AS INTEGER)), 0) "
+            f"FROM json_each(CASE WHEN json_valid({row}.file_metadata) "
+            f"THEN {row}.file_metadata ELSE '{{}}' END, '$.artifacts'))"
+        )
+    else:
+        web = "0"
+    return {
+        "audio": f"(CASE WHEN {is_audio} THEN {file_size} ELSE 0 END)",
+        "upload": f"(CASE WHEN {is_audio} THEN 0 ELSE {file_size} END)",
+        "web": web,
+    }
+
+
+def _adjust_statements(columns: set, row: str, sign: str) -> str:
+    statements = []
+    for category, expr in _size_expressions(columns, row).items():
+        statements.append(
+            f"""
+            INSERT INTO user_storage_usage (user_id, category, bytes, updated_at)
+            SELECT {row}.user_id, '{category}', {sign}{expr}, datetime('now')
+            WHERE {expr} != 0
+            ON CONFLICT(user_id, category) DO UPDATE SET
+                bytes = bytes + excluded.bytes,
+                updated_at = excluded.updated_at;"""
+        )
+    return "".join(statements)
+
+
+def _trigger_sql(columns: set) -> Dict[str, str]:
+    watched = [c for c in ("file_size", "file_metadata", "type", "user_id") if c in columns]
+    return {
+        "notes_storage_ai": f"""
+            CREATE TRIGGER notes_storage_ai AFTER INSERT ON notes
+            WHEN NEW.user_id IS NOT NULL
+            BEGIN{_adjust_statements(columns, 'NEW', '')}
+            END""",
+        "notes_storage_ad": f"""
+            CREATE TRIGGER notes_storage_ad AFTER DELETE ON notes
+            WHEN OLD.user_id IS NOT NULL
+            BEGIN{_adjust_statements(columns, 'OLD', '-')}
+            END""",
+        "notes_storage_au": f"""
+            CREATE TRIGGER notes_storage_au AFTER UPDATE OF {', '.join(watched)} ON notes
+            BEGIN{_adjust_statements(columns, 'OLD', '-')}{_adjust_statements(columns, 'NEW', '')}
+            END""",
+    }
+
+
+class StorageLedger:
+    """Running per-user storage totals maintained by triggers on notes"""
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection]):
+        self.get_conn = get_conn_func
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        """Create the ledger and (re)install its triggers, backfilling when they change"""
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_storage_usage (
+                    user_id INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT,
+                    PRIMARY KEY (user_id, category)
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(notes)").fetchall()}
+            if "user_id" not in columns:
+                conn.commit()
+                return
+            wanted = _trigger_sql(columns)
+            existing = dict(conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN (?, ?, ?)",
+                _TRIGGER_NAMES,
+            ).fetchall())
+            if all(" ".join((existing.get(name) or "").split()) == " ".join(sql.split())
+                   for name, sql in wanted.items()):
+                conn.commit()
+                return
+
+            # Swap triggers and rebuild totals atomically so no write is counted twice or missed
+            conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            for name in _TRIGGER_NAMES:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            for sql in wanted.values():
+                conn.execute(sql)
+            self._rebuild(conn, columns)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _computed_totals(self, conn: sqlite3.Connection, columns: set,
+                         user_id: Optional[int] = None) -> Dict[tuple, int]:
+        exprs = _size_expressions(columns, "notes")
+        where = "WHERE user_id IS NOT NULL" + (" AND user_id = ?" if user_id is not None else "")
+        params = (user_id,) if user_id is not None else ()
+        row_sql = f"""
+            SELECT user_id, SUM({exprs['audio']}), SUM({exprs['upload']}), SUM({exprs['web']})
+            FROM notes {where} GROUP BY user_id
+        """
+        totals: Dict[tuple, int] = {}
+        for uid, audio, upload, web in conn.execute(row_sql, params).fetchall():
+            for category, value in zip(CATEGORIES, (audio, upload, web)):
+                if value:
+                    totals[(uid, category)] = int(value)
+        return totals
+
+    def _rebuild(self, conn: sqlite3.Connection, columns: set, user_id: Optional[int] = None) -> None:
+        if user_id is None:
+            conn.execute("DELETE FROM user_storage_usage")
+        else:
+            conn.execute("DELETE FROM user_storage_usage WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            "INSERT INTO user_storage_usage (user_id, category, bytes, updated_at) VALUES (?, ?, ?, datetime('now'))",
+            [(uid, category, value) for (uid, category), value in
+             self._computed_totals(conn, columns, user_id).items()],
+        )
+
+    def get_usage(self, user_id: int) -> Dict[str, int]:
+        """Bytes used per category"""
+        conn = self.get_conn()
+        try:
+            rows = conn.execute(
+                "SELECT category, bytes FROM user_storage_usage WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        usage = {category: 0 for category in CATEGORIES}
+        usage.update({category: int(value) for category, value in rows})
+        return usage
+
+    def get_total(self, user_id: int) -> int:
+        return sum(self.get_usage(user_id).values())
+
+    def reconcile(self, user_id: Optional[int] = None, dry_run: bool = False) -> List[Dict[str, int]]:
+        """Recompute totals from notes; returns the rows that had drifted"""
+        conn = self.get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(notes)").fetchall()}
+            expected = self._computed_totals(conn, columns, user_id)
+            query = "SELECT user_id, category, bytes FROM user_storage_usage"
+            params: tuple = ()
+            if user_id is not None:
+                query += " WHERE user_id = ?"
+                params = (user_id,)
+            recorded = {(uid, category): int(value) for uid, category, value in conn.execute(query, params).fetchall()}
+
+            drift = []
+            for key in sorted(set(expected) | set(recorded), key=lambda k: (k[0], k[1])):
+                want, have = expected.get(key, 0), recorded.get(key, 0)
+                if want != have:
+                    drift.append({"user_id": key[0], "category": key[1], "recorded": have, "actual": want})
+
+            if drift and not dry_run:
+                self._rebuild(conn, columns, user_id)
+                conn.commit()
+            else:
+                conn.rollback()
+            return drift
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,422 @@
+"""
+Suggestion Index
+
+Type-ahead suggestions and spelling corrections for search. Note titles, note
+tags and past queries are kept per user in ``suggest_terms``, each with a
+weight (notes carrying the title or tag, or times the query was searched) and
+the time it was last used. ``suggest_terms_fts`` is an FTS5 prefix index over
+their text, so a keystroke is one indexed lookup ranked by weight and recency
+instead of LIKE scans over notes and history.
+
+The index is updated incrementally: ``NoteIndexService`` passes every batch of
+changed notes to ``update_note_suggestions`` (which diffs against the last
+applied title/tags in ``suggest_sources``), and ``SearchHistoryService`` calls
+``record_query`` for each search.
+
+Spelling corrections use a symmetric-delete index: every vocabulary word is
+stored under the strings obtained by deleting up to ``max_edit_distance(word)``
+characters, so candidates for a misspelling are found by looking up its own
+deletes rather than comparing it against every known word.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import sqlite3
+from itertools import combinations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("query", "title", "tag")
+# Words shorter than this are neither corrected nor used as corrections
+MIN_WORD_LENGTH = 4
+# A week-old term ranks at half the weight of one used just now
+RECENCY_DAYS = 7.0
+# Matches ranked per lookup, newest terms first; keeps short prefixes like "me" within budget
+CANDIDATES = 300
+BACKFILL_BATCH = 500
+
+SUGGESTION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggest_terms (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    norm TEXT NOT NULL,
+    text TEXT NOT NULL,
+    weight REAL NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL,
+    UNIQUE (user_id, kind, norm)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS suggest_terms_fts USING fts5(
+    text,
+    content='suggest_terms', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+);
+CREATE TABLE IF NOT EXISTS suggest_sources (
+    note_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS suggest_vocab (
+    user_id INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    freq INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, word)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS suggest_deletes (
+    user_id INTEGER NOT NULL,
+    variant TEXT NOT NULL,
+    word TEXT NOT NULL,
+    PRIMARY KEY (user_id, variant, word)
+) WITHOUT ROWID;
+"""
+
+SUGGESTION_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS suggest_terms_ai AFTER INSERT ON suggest_terms BEGIN
+    INSERT INTO suggest_terms_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS suggest_terms_ad AFTER DELETE ON suggest_terms BEGIN
+    INSERT INTO suggest_terms_fts(suggest_terms_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_SCORE_SQL = f"t.weight / (1.0 + (julianday('now') - t.last_used) / {RECENCY_DAYS})"
+_WORD_RE = re.compile(r"\w+")
+
+
+def _statements(script: str, separator: str = ";") -> List[str]:
+    parts = [part.strip() for part in script.split(separator)]
+    suffix = "" if separator == ";" else separator[:-1]
+    return [part + suffix for part in parts if part]
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def ensure_suggestion_schema(conn: sqlite3.Connection) -> None:
+    """Create the suggestion tables; a new index is filled from notes and search history.
+
+    Runs inside the caller's transaction.
+    """
+    fresh = not _table_exists(conn, "suggest_sources")
+    for statement in _statements(SUGGESTION_SCHEMA):
+        conn.execute(statement)
+    for statement in _statements(SUGGESTION_TRIGGERS, separator="END;"):
+        conn.execute(statement)
+    if fresh:
+        _backfill(conn)
+
+
+def _backfill(conn: sqlite3.Connection) -> None:
+    if _table_exists(conn, "notes"):
+        note_ids = [row[0] for row in conn.execute("SELECT id FROM notes ORDER BY id")]
+        for start in range(0, len(note_ids), BACKFILL_BATCH):
+            update_note_suggestions(conn, note_ids[start:start + BACKFILL_BATCH])
+    if _table_exists(conn, "search_history"):
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(search_history)")}
+        when = "created_at" if "created_at" in cols else "timestamp" if "timestamp" in cols else None
+        last_used = f"julianday(MAX({when}))" if when else "julianday('now')"
+        rows = conn.execute(
+            f"SELECT user_id, query, COUNT(*), {last_used} FROM search_history "
+            "WHERE TRIM(COALESCE(query, '')) <> '' GROUP BY user_id, query"
+        ).fetchall()
+        for user_id, query, count, used in rows:
+            _adjust_term(conn, user_id or 0, "query", query.strip(), count, used)
+
+
+# --- text helpers ---
+
+def normalize(text: str) -> str:
+    return " ".join((text or "").casefold().split())
+
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """Tags stored as "a, b" or as a JSON list"""
+    tags = (tags or "").strip()
+    if not tags:
+        return []
+    if tags.startswith("["):
+        try:
+            return [str(tag).strip() for tag in json.loads(tags) if str(tag).strip()]
+        except (ValueError, TypeError):
+            pass
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+
+def _note_terms(title: Optional[str], tags: Optional[str]) -> List[Tuple[str, str]]:
+    terms = []
+    if (title or "").strip():
+        terms.append(("title", title.strip()))
+    terms.extend(("tag", tag) for tag in dict.fromkeys(split_tags(tags)))
+    return terms
+
+
+def _vocab_words(text: str) -> Set[str]:
+    return {word for word in _WORD_RE.findall(text.casefold()) if len(word) >= MIN_WORD_LENGTH and not word.isdigit()}
+
+
+def max_edit_distance(word: str) -> int:
+    # Two edits on short words would "correct" them into unrelated words
+    return 2 if len(word) >= 8 else 1
+
+
+def deletes(word: str, distance: Optional[int] = None) -> Set[str]:
+    """``word`` plus every string made by deleting up to ``distance`` characters"""
+    distance = max_edit_distance(word) if distance is None else distance
+    variants = {word}
+    for n in range(1, min(distance, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), n):
+            variants.add("".join(ch for i, ch in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)"""
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[len(b)]
+
+
+# --- incremental updates ---
+
+def _adjust_term(conn: sqlite3.Connection, user_id: int, kind: str, text: str, delta: float,
+                 used: Optional[float] = None) -> None:
+    norm = normalize(text)
+    if not norm:
+        return
+    if delta > 0:
+        conn.execute(
+            """
+            INSERT INTO suggest_terms (user_id, kind, norm, text, weight, last_used)
+            VALUES (?, ?, ?, ?, ?, COALESCE(?, julianday('now')))
+            ON CONFLICT (user_id, kind, norm) DO UPDATE
+            SET weight = weight + excluded.weight, last_used = MAX(last_used, excluded.last_used)
+            """,
+            (user_id, kind, norm, text, delta, used),
+        )
+        _adjust_words(conn, user_id, _vocab_words(text), 1)
+        return
+    cur = conn.execute(
+        "UPDATE suggest_terms SET weight = weight + ? WHERE user_id = ? AND kind = ? AND norm = ?",
+        (delta, user_id, kind, norm),
+    )
+    if cur.rowcount:
+        conn.execute(
+            "DELETE FROM suggest_terms WHERE user_id = ? AND kind = ? AND norm = ? AND weight <= 0",
+            (user_id, kind, norm),
+        )
+        _adjust_words(conn, user_id, _vocab_words(text), -1)
+
+
+def _adjust_words(conn: sqlite3.Connection, user_id: int, words: Iterable[str], delta: int) -> None:
+    for word in words:
+        row = conn.execute(
+            """
+            INSERT INTO suggest_vocab (user_id, word, freq) VALUES (?, ?, ?)
+            ON CONFLICT (user_id, word) DO UPDATE SET freq = freq + excluded.freq
+            RETURNING freq
+            """,
+            (user_id, word, delta),
+        ).fetchone()
+        if delta > 0 and row[0] == delta:
+            conn.executemany(
+                "INSERT OR IGNORE INTO suggest_deletes (user_id, variant, word) VALUES (?, ?, ?)",
+                [(user_id, variant, word) for variant in deletes(word)],
+            )
+        elif row[0] <= 0:
+            conn.execute("DELETE FROM suggest_vocab WHERE user_id = ? AND word = ?", (user_id, word))
+            conn.executemany(
+                "DELETE FROM suggest_deletes WHERE user_id = ? AND variant = ? AND word = ?",
+                [(user_id, variant, word) for variant in deletes(word)],
+            )
+
+
+def update_note_suggestions(conn: sqlite3.Connection, note_ids: Sequence[int]) -> int:
+    """Apply title/tag changes of ``note_ids`` (deleted notes included) in the caller's transaction.
+
+    Returns the number of notes whose suggestions changed; body-only edits cost one comparison.
+    """
+    if not note_ids:
+        return 0
+    placeholders = ",".join("?" * len(note_ids))
+    old = {
+        row[0]: (row[1], row[2], row[3])
+        for row in conn.execute(
+            f"SELECT note_id, user_id, title, tags FROM suggest_sources WHERE note_id IN ({placeholders})",
+            list(note_ids),
+        )
+    }
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(notes)")}
+    user_expr = "COALESCE(user_id, 0)" if "user_id" in cols else "0"
+    tags_expr = "COALESCE(tags, '')" if "tags" in cols else "''"
+    new = {
+        row[0]: (row[1], row[2], row[3])
+        for row in conn.execute(
+            f"SELECT id, {user_expr}, COALESCE(title, ''), {tags_expr} FROM notes WHERE id IN ({placeholders})",
+            list(note_ids),
+        )
+    }
+
+    changed = 0
+    for note_id in note_ids:
+        before, after = old.get(note_id), new.get(note_id)
+        if before == after:
+            continue
+        changed += 1
+        if before is not None:
+            for kind, text in _note_terms(before[1], before[2]):
+                _adjust_term(conn, before[0], kind, text, -1)
+        if after is not None:
+            for kind, text in _note_terms(after[1], after[2]):
+                _adjust_term(conn, after[0], kind, text, 1)
+            conn.execute(
+                "INSERT OR REPLACE INTO suggest_sources (note_id, user_id, title, tags) VALUES (?, ?, ?, ?)",
+                (note_id, *after),
+            )
+        else:
+            conn.execute("DELETE FROM suggest_sources WHERE note_id = ?", (note_id,))
+    return changed
+
+
+def _prefix_match(q: str) -> str:
+    """All words must match; the last one is still being typed, so it's a prefix"""
+    words = _WORD_RE.findall(q or "")
+    if not words:
+        return ""
+    return " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+
+
+class SuggestionIndex:
+    """Reads and records type-ahead suggestions"""
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection]):
+        self.get_conn = get_conn_func
+
+    def suggest(self, user_id: Optional[int], q: str, limit: int = 10,
+                kinds: Sequence[str] = KINDS) -> List[Dict[str, Any]]:
+        """Terms whose words start with what was typed, best first; ``user_id`` None searches every user"""
+        match = _prefix_match(q)
+        if not match or not kinds:
+            return []
+        params: List[Any] = [match, *kinds]
+        user_clause = ""
+        if user_id is not None:
+            user_clause = "AND t.user_id = ?"
+            params.append(user_id)
+        conn = self.get_conn()
+        try:
+            rows = conn.execute(
+                f"""
+                WITH candidates AS (
+                    SELECT t.* FROM suggest_terms_fts f JOIN suggest_terms t ON t.id = f.rowid
+                    WHERE suggest_terms_fts MATCH ? AND t.kind IN ({",".join("?" * len(kinds))}) {user_clause}
+                    ORDER BY f.rowid DESC
+                    LIMIT {CANDIDATES}
+                )
+                SELECT t.kind, t.text, t.weight, {_SCORE_SQL} AS score
+                FROM candidates t
+                ORDER BY score DESC
+                LIMIT ?
+                """,
+                (*params, limit),
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Suggestion lookup failed: {e}")
+            return []
+        finally:
+            conn.close()
+        return [{"kind": r[0], "text": r[1], "weight": r[2], "score": round(r[3], 4)} for r in rows]
+
+    def popular(self, q: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Matching queries searched most across all users"""
+        match = _prefix_match(q)
+        if not match:
+            return []
+        conn = self.get_conn()
+        try:
+            rows = conn.execute(
+                """
+                SELECT MIN(t.text), SUM(t.weight) AS total
+                FROM suggest_terms_fts f JOIN suggest_terms t ON t.id = f.rowid
+                WHERE suggest_terms_fts MATCH ? AND t.kind = 'query'
+                GROUP BY t.norm
+                ORDER BY total DESC
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Popular query lookup failed: {e}")
+            return []
+        finally:
+            conn.close()
+        return [{"text": r[0], "count": int(r[1])} for r in rows]
+
+    def record_query(self, user_id: int, query: str, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Count a search; pass ``conn`` to join the caller's transaction"""
+        if not (query or "").strip():
+            return
+        own_conn = conn is None
+        conn = conn or self.get_conn()
+        try:
+            _adjust_term(conn, user_id, "query", query.strip(), 1)
+            if own_conn:
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Could not record query suggestion: {e}")
+        finally:
+            if own_conn:
+                conn.close()
+
+    def correct(self, user_id: int, query: str) -> str:
+        """Replace unknown words with the closest known word (fewest edits, then most frequent)"""
+        words = query.split()
+        candidates_for: Dict[str, str] = {}
+        lookups = {word.casefold() for word in words if len(word) >= MIN_WORD_LENGTH and word.isalpha()}
+        if not lookups:
+            return query
+        conn = self.get_conn()
+        try:
+            known = {
+                row[0] for row in conn.execute(
+                    f"SELECT word FROM suggest_vocab WHERE user_id = ? AND word IN ({','.join('?' * len(lookups))})",
+                    (user_id, *lookups),
+                )
+            }
+            for word in lookups - known:
+                variants = list(deletes(word))
+                rows = conn.execute(
+                    f"""
+                    SELECT DISTINCT d.word, v.freq
+                    FROM suggest_deletes d
+                    JOIN suggest_vocab v ON v.user_id = d.user_id AND v.word = d.word
+                    WHERE d.user_id = ? AND d.variant IN ({','.join('?' * len(variants))})
+                    """,
+                    (user_id, *variants),
+                ).fetchall()
+                scored = [
+                    (distance, -freq, candidate)
+                    for candidate, freq in rows
+                    if (distance := edit_distance(word, candidate)) <= max_edit_distance(word)
+                ]
+                if scored:
+                    candidates_for[word] = min(scored)[2]
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Spelling lookup failed: {e}")
+            return query
+        finally:
+            conn.close()
+        return " ".join(candidates_for.get(word.casefold(), word) for word in words)
@@ -412,13 +412,13 @@ class UnifiedCaptureService:
         elif request.content_type == CaptureContentType.PDF:
             return await self._handle_pdf_capture(request)
         elif request.content_type == CaptureContentType.URL:
-            return await self._handle_url_capture(request)
+            return await self._handle_url_capture(request, user_id)
         elif request.content_type == CaptureContentType.THREAD_SUMMARY:
             return await self._handle_discord_thread(request)
         elif request.content_type == CaptureContentType.QUICK_NOTE:
             return await self._handle_quick_note(request)
         elif request.content_type == CaptureContentType.WEB_CLIP:
-            return await self._handle_web_clip(request)
+            return await self._handle_web_clip(request, user_id)
         elif request.content_type == CaptureContentType.AUDIO:
             return await self._handle_audio_capture(request)
         else:
@@ -719,58 +719,36 @@ class UnifiedCaptureService:
                 source_service="unified_capture_pdf"
             )
     
-    async def _handle_url_capture(self, request: UnifiedCaptureRequest) -> UnifiedCaptureResponse:
+    async def _handle_url_capture(self, request: UnifiedCaptureRequest, user_id: Optional[str] = None) -> UnifiedCaptureResponse:
         """Handle URL capture requests."""
         try:
-            # Dedup by URL if enabled
+            # Dedup by URL if enabled; only against the capturing user's own notes
             from config import settings
-            if getattr(settings, 'capture_dedup_enabled', True) and request.url:
-                import urllib.parse
-                def _normalize_url(u: str) -> str:
-                    try:
-                        p = urllib.parse.urlsplit(u.strip())
-                        # Normalize scheme/host lower-case, strip fragment
-                        scheme = (p.scheme or 'http').lower()
-                        netloc = (p.netloc or '').lower()
-                        path = p.path or '/'
-                        if path != '/' and path.endswith('/'):
-                            path = path[:-1]
-                        query = urllib.parse.parse_qsl(p.query, keep_blank_values=True)
-                        query.sort()
-                        query_str = urllib.parse.urlencode(query)
-                        return urllib.parse.urlunsplit((scheme, netloc, path, query_str, ''))
-                    except Exception:
-                        return u.strip()
-                norm_url = _normalize_url(request.url)
+            if getattr(settings, 'capture_dedup_enabled', True) and request.url and user_id:
+                from services.url_content_cache import UrlContentCache, normalize_url
+                norm_url = normalize_url(request.url)
 
-                conn = self.get_conn()
-                cur = conn.cursor()
-                try:
-                    params = [f'%"url":"{norm_url}"%']
-                    window_days = max(0, int(getattr(settings, 'capture_dedup_window_days', 30)))
-                    date_clause = ""
-                    if window_days > 0:
-                        cutoff = (datetime.now() - timedelta(days=window_days)).isoformat()
-                        date_clause = " AND created_at >= ?"
-                        params.append(cutoff)
-                    row = cur.execute(
-                        f"SELECT id FROM notes WHERE metadata LIKE ?{date_clause} ORDER BY created_at DESC LIMIT 1",
-                        tuple(params)
-                    ).fetchone()
-                    if row:
-                        try:
-                            cur.execute("UPDATE notes SET updated_at=? WHERE id=?", (datetime.now().isoformat(), row[0]))
-                            conn.commit()
-                        except Exception:
-                            pass
-                        return UnifiedCaptureResponse(
-                            success=True,
-                            note_id=int(row[0]),
-                            title=None,
-                            source_service="unified_capture_url_dedup"
+                window_days = max(0, int(getattr(settings, 'capture_dedup_window_days', 30)))
+                since = (datetime.now() - timedelta(days=window_days)).timestamp() if window_days > 0 else None
+                existing_note = UrlContentCache(self.get_conn).find_note(norm_url, int(user_id), since=since)
+                if existing_note:
+                    conn = self.get_conn()
+                    try:
+                        conn.execute(
+                            "UPDATE notes SET updated_at=? WHERE id=? AND user_id=?",
+                            (datetime.now().isoformat(), existing_note, int(user_id)),
                         )
-                finally:
-                    conn.close()
+                        conn.commit()
+                    except Exception:
+                        pass
+                    finally:
+                        conn.close()
+                    return UnifiedCaptureResponse(
+                        success=True,
+                        note_id=existing_note,
+                        title=None,
+                        source_service="unified_capture_url_dedup"
+                    )
             if request.source_type == CaptureSourceType.APPLE_SHORTCUTS:
                 # Use Apple Shortcuts service for web clips
                 apple_service = self._get_apple_shortcuts()
@@ -791,7 +769,7 @@ class UnifiedCaptureService:
             else:
                 # Use web ingestion service
                 web_service = self._get_web_ingestion()
-                result = await web_service.ingest_url(request.url)
+                result = await web_service.ingest_url(request.url, user_id=int(user_id) if user_id else 1)
                 
                 if result.get("success"):
                     return UnifiedCaptureResponse(
@@ -913,9 +891,9 @@ class UnifiedCaptureService:
                 source_service="unified_capture_quick_note"
             )
     
-    async def _handle_web_clip(self, request: UnifiedCaptureRequest) -> UnifiedCaptureResponse:
+    async def _handle_web_clip(self, request: UnifiedCaptureRequest, user_id: Optional[str] = None) -> UnifiedCaptureResponse:
         """Handle web clip capture requests."""
-        return await self._handle_url_capture(request)
+        return await self._handle_url_capture(request, user_id)
     
     async def _handle_audio_capture(self, request: UnifiedCaptureRequest) -> UnifiedCaptureResponse:
         """Handle audio capture requests."""
@@ -5,11 +5,16 @@ Handles file upload operations including chunked/resumable uploads.
 Extracted from app.py to provide clean separation of upload concerns.
 """
 
+import asyncio
+import hashlib
 import json
+import logging
+import sqlite3
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from fastapi import HTTPException, BackgroundTasks, Request
 from fastapi.responses import JSONResponse
@@ -18,6 +23,30 @@ from services.auth_service import User
 from config import settings
 from file_processor import FileProcessor
 from obsidian_sync import ObsidianSync
+from services.processing_status import ProcessingStatusStore
+
+logger = logging.getLogger(__name__)
+
+# Stream chunks are small; buffer them so each thread hop writes a useful amount
+WRITE_BUFFER_BYTES = 1024 * 1024
+# Minimum gap between extraction progress writes while a long PDF is processed
+PROGRESS_INTERVAL_SECONDS = 2.0
+# A claimed extraction with no progress heartbeat for this long is presumed dead
+CLAIM_STALE_SECONDS = 600
+
+
+def _part_size(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+def _hash_file(path: Path) -> Tuple["hashlib._Hash", int]:
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(WRITE_BUFFER_BYTES), b""):
+            hasher.update(block)
+            size += len(block)
+    return hasher, size
 
 
 class UploadService:
@@ -28,8 +57,42 @@ class UploadService:
         self.get_conn = get_conn_func
         self.auth_service = auth_service
         self.audio_queue = audio_queue
+        # Running SHA-256 per active upload and the byte count it covers
+        self._hashers: Dict[str, Tuple["hashlib._Hash", int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.processing_status = ProcessingStatusStore(get_conn_func)
+        self._ensure_table()
     
     # --- Helper Methods ---
+
+    def _ensure_table(self) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upload_sessions (
+                    upload_id TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    filename TEXT,
+                    mime_type TEXT,
+                    total_size INTEGER,
+                    received_bytes INTEGER DEFAULT 0,
+                    sha256 TEXT,
+                    status TEXT DEFAULT 'active',
+                    note_id INTEGER,
+                    file_info TEXT,
+                    error TEXT,
+                    created_at TEXT,
+                    updated_at TEXT
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_upload_sessions_sha256 ON upload_sessions(user_id, sha256)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
     
     def _get_incoming_dir(self) -> Path:
         """Get incoming directory for temporary files."""
@@ -38,7 +101,7 @@ class UploadService:
         return incoming_dir
     
     def _get_manifest_path(self, upload_id: str) -> Path:
-        """Get path for upload manifest file."""
+        """Get path for a legacy JSON upload manifest."""
         return self._get_incoming_dir() / f"{upload_id}.json"
     
     def _get_part_path(self, upload_id: str) -> Path:
@@ -46,19 +109,121 @@ class UploadService:
         return self._get_incoming_dir() / f"{upload_id}.part"
     
     def _load_manifest(self, upload_id: str) -> Optional[dict]:
-        """Load upload manifest from disk."""
+        """Load upload session state."""
+        conn = self.get_conn()
+        try:
+            cur = conn.execute(
+                """
+                SELECT upload_id, user_id, filename, mime_type, total_size, received_bytes,
+                       sha256, status, note_id, file_info, error, created_at
+                FROM upload_sessions WHERE upload_id = ?
+                """,
+                (upload_id,),
+            )
+            row = cur.fetchone()
+        finally:
+            conn.close()
+        if row:
+            keys = ("upload_id", "created_by", "filename", "mime_type", "total_size", "received_bytes",
+                    "sha256", "status", "note_id", "file_info", "error", "created_at")
+            manifest = dict(zip(keys, row))
+            manifest["file_info"] = json.loads(manifest["file_info"]) if manifest["file_info"] else None
+            return manifest
+
+        # Uploads started before sessions moved into SQLite
         p = self._get_manifest_path(upload_id)
         if not p.exists():
             return None
         try:
-            return json.loads(p.read_text())
+            manifest = json.loads(p.read_text())
         except Exception:
             return None
+        self._save_manifest(upload_id, manifest)
+        p.unlink(missing_ok=True)
+        return manifest
     
     def _save_manifest(self, upload_id: str, data: dict) -> None:
-        """Save upload manifest to disk."""
-        p = self._get_manifest_path(upload_id)
-        p.write_text(json.dumps(data))
+        """Insert or update upload session state."""
+        file_info = data.get("file_info")
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                INSERT INTO upload_sessions (
+                    upload_id, user_id, filename, mime_type, total_size, received_bytes,
+                    sha256, status, note_id, file_info, error, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(upload_id) DO UPDATE SET
+                    received_bytes = excluded.received_bytes,
+                    sha256 = excluded.sha256,
+                    status = excluded.status,
+                    note_id = excluded.note_id,
+                    file_info = excluded.file_info,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    upload_id,
+                    data.get("created_by"),
+                    data.get("filename"),
+                    data.get("mime_type"),
+                    data.get("total_size"),
+                    data.get("received_bytes") or 0,
+                    data.get("sha256"),
+                    data.get("status", "active"),
+                    data.get("note_id"),
+                    json.dumps(file_info, default=str) if file_info else None,
+                    data.get("error"),
+                    data.get("created_at") or datetime.utcnow().isoformat(),
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _lock_for(self, upload_id: str) -> asyncio.Lock:
+        lock = self._locks.get(upload_id)
+        if lock is None:
+            lock = self._locks[upload_id] = asyncio.Lock()
+        return lock
+
+    def _forget(self, upload_id: str) -> None:
+        self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+
+    async def _hasher_at(self, upload_id: str, part_path: Path, size: int) -> "hashlib._Hash":
+        """Running hash covering the first ``size`` bytes of the part file.
+
+        Normally kept in memory as chunks arrive; rebuilt from disk if the
+        process restarted mid-upload.
+        """
+        hasher, hashed = self._hashers.get(upload_id, (None, -1))
+        if hasher is None or hashed != size:
+            if size:
+                hasher, hashed = await asyncio.to_thread(_hash_file, part_path)
+            else:
+                hasher, hashed = hashlib.sha256(), 0
+            self._hashers[upload_id] = (hasher, hashed)
+        return hasher
+
+    def _find_duplicate(self, user_id: int, sha256: str) -> Optional[int]:
+        """Note already created from an upload with identical bytes"""
+        conn = self.get_conn()
+        try:
+            cur = conn.execute(
+                """
+                SELECT s.note_id FROM upload_sessions s
+                JOIN notes n ON n.id = s.note_id
+                WHERE s.user_id = ? AND s.sha256 = ? AND s.status IN ('finalized', 'extracting', 'resuming')
+                ORDER BY s.updated_at DESC LIMIT 1
+                """,
+                (user_id, sha256),
+            )
+            row = cur.fetchone()
+        finally:
+            conn.close()
+        return int(row[0]) if row else None
     
     # --- Upload Operations ---
     
@@ -87,7 +252,8 @@ class UploadService:
         }
         self._save_manifest(upload_id, manifest)
         # Ensure empty part file
-        self._get_part_path(upload_id).write_bytes(b"")
+        await asyncio.to_thread(self._get_part_path(upload_id).write_bytes, b"")
+        self._hashers[upload_id] = (hashlib.sha256(), 0)
         return {"upload_id": upload_id, "offset": 0}
     
     async def get_upload_status(self, upload_id: str, current_user: User) -> dict:
@@ -95,14 +261,17 @@ class UploadService:
         manifest = self._load_manifest(upload_id)
         if not manifest or manifest.get("created_by") != current_user.id:
             raise HTTPException(status_code=404, detail="Upload not found")
-        part_path = self._get_part_path(upload_id)
-        size = part_path.stat().st_size if part_path.exists() else 0
+        size = await asyncio.to_thread(_part_size, self._get_part_path(upload_id))
+        if manifest.get("status") != "active":
+            size = manifest.get("received_bytes") or size
         return {
             "upload_id": upload_id,
             "offset": size,
             "status": manifest.get("status", "active"),
             "filename": manifest.get("filename"),
             "total_size": manifest.get("total_size"),
+            "sha256": manifest.get("sha256"),
+            "note_id": manifest.get("note_id"),
         }
     
     async def upload_chunk(self, request: Request, upload_id: str, offset: int, current_user: User) -> dict:
@@ -119,29 +288,53 @@ class UploadService:
             raise HTTPException(status_code=400, detail="Upload not active")
 
         part_path = self._get_part_path(upload_id)
-        part_path.parent.mkdir(parents=True, exist_ok=True)
-        current_size = part_path.stat().st_size if part_path.exists() else 0
-        if current_size != int(offset):
-            # Client should resume from server-reported offset
-            return JSONResponse({"expected_offset": current_size}, status_code=409)
-
-        # Read raw body in chunks and append
-        max_size = settings.max_file_size
-        total_after = current_size
-        try:
-            with open(part_path, "ab") as out:
-                async for chunk in request.stream():
-                    if not chunk:
-                        continue
-                    total_after += len(chunk)
-                    if total_after > max_size:
-                        raise HTTPException(status_code=400, detail=f"File too large (>{max_size} bytes)")
-                    out.write(chunk)
-            return {"upload_id": upload_id, "offset": total_after}
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Chunk append failed: {e}")
+        async with self._lock_for(upload_id):
+            current_size = await asyncio.to_thread(_part_size, part_path)
+            if current_size != int(offset):
+                # Client should resume from server-reported offset
+                return JSONResponse({"expected_offset": current_size}, status_code=409)
+
+            hasher = await self._hasher_at(upload_id, part_path, current_size)
+
+            # Read raw body in chunks and append; disk writes happen off the event loop
+            max_size = settings.max_file_size
+            written = current_size
+            buffer = bytearray()
+
+            async def flush():
+                nonlocal written
+                if not buffer:
+                    return
+                data = bytes(buffer)
+                buffer.clear()
+                await asyncio.to_thread(out.write, data)
+                await asyncio.to_thread(out.flush)
+                hasher.update(data)
+                written += len(data)
+                self._hashers[upload_id] = (hasher, written)
+
+            try:
+                out = await asyncio.to_thread(open, part_path, "ab")
+                try:
+                    async for chunk in request.stream():
+                        if not chunk:
+                            continue
+                        if written + len(buffer) + len(chunk) > max_size:
+                            raise HTTPException(status_code=400, detail=f"File too large (>{max_size} bytes)")
+                        buffer.extend(chunk)
+                        if len(buffer) >= WRITE_BUFFER_BYTES:
+                            await flush()
+                    await flush()
+                finally:
+                    await asyncio.to_thread(out.close)
+                return {"upload_id": upload_id, "offset": written}
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Chunk append failed: {e}")
+            finally:
+                manifest["received_bytes"] = written
+                self._save_manifest(upload_id, manifest)
     
     async def finalize_upload(
         self, 
@@ -152,7 +345,11 @@ class UploadService:
         tags: str, 
         current_user: User
     ) -> dict:
-        """Finalize an upload and create a note."""
+        """Finalize an upload and create a note.
+
+        Only validation and the move into place happen here; OCR and PDF
+        extraction run as a background task that fills in the note.
+        """
         # Validate CSRF token
         csrf_header = request.headers.get("X-CSRF-Token")
         if not self.auth_service.validate_csrf(request, csrf_header):
@@ -165,33 +362,54 @@ class UploadService:
             raise HTTPException(status_code=400, detail="Upload not active")
 
         part_path = self._get_part_path(upload_id)
-        if not part_path.exists():
-            raise HTTPException(status_code=400, detail="No data uploaded")
+        async with self._lock_for(upload_id):
+            if not await asyncio.to_thread(part_path.exists):
+                raise HTTPException(status_code=400, detail="No data uploaded")
 
-        # Process the saved file
-        processor = FileProcessor()
-        result = processor.process_saved_file(part_path, manifest.get("filename") or "uploaded.bin")
-        if not result.get("success"):
-            raise HTTPException(status_code=400, detail=f"File processing failed: {result.get('error')}")
+            size = await asyncio.to_thread(_part_size, part_path)
+            sha256 = (await self._hasher_at(upload_id, part_path, size)).hexdigest()
+            manifest["received_bytes"] = size
+            manifest["sha256"] = sha256
 
-        manifest["status"] = "finalized"
-        self._save_manifest(upload_id, manifest)
+            existing_id = self._find_duplicate(current_user.id, sha256)
+            if existing_id:
+                await asyncio.to_thread(part_path.unlink, True)
+                manifest["status"] = "finalized"
+                manifest["note_id"] = existing_id
+                self._save_manifest(upload_id, manifest)
+                self._forget(upload_id)
+                return {
+                    "success": True,
+                    "id": existing_id,
+                    "status": "duplicate",
+                    "duplicate": True,
+                    "message": "Identical file already uploaded",
+                }
+
+            processor = FileProcessor()
+            result = await asyncio.to_thread(
+                processor.store_saved_file, part_path, manifest.get("filename") or "uploaded.bin"
+            )
+            if not result.get("success"):
+                manifest["status"] = "failed"
+                manifest["error"] = result.get("error")
+                self._save_manifest(upload_id, manifest)
+                self._forget(upload_id)
+                raise HTTPException(status_code=400, detail=f"File processing failed: {result.get('error')}")
 
         file_info = result['file_info']
         note_type = file_info['category']
         stored_filename = result['stored_filename']
-        extracted_text = result.get('extracted_text', "")
         file_metadata = {
             'original_filename': file_info['original_filename'],
             'mime_type': file_info['mime_type'],
             'size_bytes': file_info['size_bytes'],
-            'processing_type': result['processing_type'],
-            'metadata': result.get('metadata'),
+            'sha256': sha256,
+            'processing_type': 'audio_transcription' if note_type == 'audio' else 'pending_extraction',
+            'metadata': None,
         }
-        processing_status = "pending" if note_type == 'audio' else "complete"
+        processing_status = "pending" if note_type == 'audio' else "processing"
         content = (note or "").strip()
-        if processing_status == "complete" and not content and extracted_text:
-            content = extracted_text[:1000]
 
         title = content[:60] if content else (f"File: {file_info['original_filename']}" if file_info['original_filename'] else "New Note")
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -222,8 +440,8 @@ class UploadService:
                     note_type,
                     file_metadata.get('mime_type'),
                     file_metadata.get('size_bytes'),
-                    extracted_text,
-                    json.dumps(file_metadata, default=str) if file_metadata else None,
+                    "",
+                    json.dumps(file_metadata, default=str),
                     processing_status,
                     current_user.id,
                 ),
@@ -237,15 +455,22 @@ class UploadService:
         finally:
             conn.close()
 
-        # After note is created, export an Obsidian markdown file in background
-        try:
-            sync = ObsidianSync()
-            background_tasks.add_task(sync.export_note_to_obsidian, note_id)
-        except Exception:
-            pass
+        manifest["note_id"] = note_id
+        result["note_provided"] = bool(content)
+        manifest["file_info"] = result
+        manifest["status"] = "finalized" if note_type == 'audio' else "extracting"
+        self._save_manifest(upload_id, manifest)
+        self._forget(upload_id)
 
         # Queue background processing for audio using FIFO queue
         if processing_status == "pending":
+            # After note is created, export an Obsidian markdown file in background
+            try:
+                sync = ObsidianSync()
+                background_tasks.add_task(sync.export_note_to_obsidian, note_id)
+            except Exception:
+                pass
+
             # Add to FIFO queue for ordered processing
             self.audio_queue.add_to_queue(note_id, current_user.id)
             
@@ -257,7 +482,204 @@ class UploadService:
                 "id": note_id,
                 "status": processing_status,
                 "file_type": note_type,
+                "sha256": sha256,
                 "message": "Upload finalized and queued for processing",
             }
 
-        return {"success": True, "id": note_id, "status": processing_status, "file_type": note_type, "message": "Upload finalized"}
+        # Sync function, so Starlette runs it in its thread pool after the response
+        background_tasks.add_task(self.complete_extraction, upload_id)
+        return {
+            "success": True,
+            "id": note_id,
+            "status": processing_status,
+            "file_type": note_type,
+            "sha256": sha256,
+            "message": "Upload finalized; extracting content in background",
+        }
+
+    def _claim_extraction(self, upload_id: str, status: str = "extracting", updated_at: Optional[str] = None) -> bool:
+        """Atomically move an upload to 'resuming' so only one worker extracts it."""
+        sql = "UPDATE upload_sessions SET status = 'resuming', updated_at = ? WHERE upload_id = ? AND status = ?"
+        params = [datetime.utcnow().isoformat(), upload_id, status]
+        if updated_at is not None:
+            sql += " AND updated_at = ?"
+            params.append(updated_at)
+        conn = self.get_conn()
+        try:
+            claimed = conn.execute(sql, params).rowcount == 1
+            conn.commit()
+        finally:
+            conn.close()
+        return claimed
+
+    def complete_extraction(self, upload_id: str, claimed: bool = False) -> bool:
+        """Run OCR/PDF extraction for a finalized upload and fill in its note."""
+        if not claimed and not self._claim_extraction(upload_id):
+            return False
+        manifest = self._load_manifest(upload_id)
+        if not manifest or manifest.get("status") != "resuming":
+            return False
+        # Past the claim, any failure must leave the upload and note marked failed;
+        # otherwise both stay 'resuming'/'processing' until the next restart
+        try:
+            return self._run_extraction(upload_id, manifest)
+        except Exception as e:
+            logger.error(f"Extraction of upload {upload_id} failed: {e}")
+            self._fail_extraction(upload_id, manifest, str(e))
+            return False
+
+    def _fail_extraction(self, upload_id: str, manifest: dict, error: Optional[str]) -> None:
+        note_id = manifest.get("note_id")
+        if note_id is not None:
+            conn = self.get_conn()
+            try:
+                conn.execute("UPDATE notes SET status = 'failed' WHERE id = ?", (note_id,))
+                self.processing_status.set(note_id, "failed", 0, error, conn=conn)
+                conn.commit()
+            except Exception as e:
+                logger.error(f"Could not mark note {note_id} failed: {e}")
+            finally:
+                conn.close()
+        manifest["status"] = "failed"
+        manifest["error"] = error
+        self._save_manifest(upload_id, manifest)
+
+    def _run_extraction(self, upload_id: str, manifest: dict) -> bool:
+        if not manifest.get("file_info"):
+            raise ValueError("upload has no stored file to extract")
+        note_id = manifest["note_id"]
+        fill_from_text = not manifest["file_info"].get("note_provided")
+
+        pages: list = []
+        last_write = [0.0]
+
+        def on_page(page, page_count):
+            # Publish pages as they land so search can find the start of long scans early
+            if page.text.strip():
+                pages.append(f"[Page {page.page_number}]\n{page.text}")
+            now = time.monotonic()
+            if page.page_number >= page_count or now - last_write[0] < PROGRESS_INTERVAL_SECONDS:
+                return
+            last_write[0] = now
+            self._write_extraction_progress(
+                upload_id, note_id, int(page.page_number * 100 / page_count),
+                f"page {page.page_number}/{page_count}", "\n\n".join(pages)
+            )
+
+        result = FileProcessor().extract_stored_file(manifest["file_info"], on_page=on_page)
+        if not result.get("success"):
+            self._fail_extraction(upload_id, manifest, result.get("error"))
+            return False
+
+        conn = self.get_conn()
+        try:
+            file_info = result['file_info']
+            extracted_text = result.get('extracted_text', "") or ""
+            file_metadata = {
+                'original_filename': file_info['original_filename'],
+                'mime_type': file_info['mime_type'],
+                'size_bytes': file_info['size_bytes'],
+                'sha256': manifest.get("sha256"),
+                'processing_type': result['processing_type'],
+                'metadata': result.get('metadata'),
+            }
+            conn.execute(
+                """
+                UPDATE notes SET
+                    file_filename = ?, file_mime_type = ?, file_size = ?,
+                    extracted_text = ?, file_metadata = ?, status = 'complete'
+                WHERE id = ?
+                """,
+                (
+                    result['stored_filename'], file_info['mime_type'], file_info['size_bytes'],
+                    extracted_text, json.dumps(file_metadata, default=str), note_id,
+                ),
+            )
+            # Fill body/title from the extracted text only when the user gave no note
+            preview = extracted_text[:1000]
+            if fill_from_text and preview:
+                conn.execute(
+                    "UPDATE notes SET title = ?, body = ?, content = ? WHERE id = ?",
+                    (preview[:60], preview, preview, note_id),
+                )
+            # Replace any chunks indexed from partial text
+            self._queue_for_index(conn, note_id)
+            self.processing_status.clear(note_id, conn=conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+        manifest["status"] = "finalized"
+        manifest["file_info"] = result
+        self._save_manifest(upload_id, manifest)
+
+        try:
+            ObsidianSync().export_note_to_obsidian(note_id)
+        except Exception:
+            pass
+        return True
+
+    def _write_extraction_progress(self, upload_id: str, note_id: int, percent: int,
+                                   message: str, text: str) -> None:
+        """Publish partial text and progress for a long extraction.
+
+        Only ``extracted_text`` changes, which no notes trigger watches; the
+        note is queued for the chunk index directly, and the index falls back
+        to ``extracted_text`` while the body is still empty.
+        """
+        conn = self.get_conn()
+        try:
+            # Doubles as the claim heartbeat for resume_pending_extractions
+            conn.execute(
+                "UPDATE upload_sessions SET updated_at = ? WHERE upload_id = ?",
+                (datetime.utcnow().isoformat(), upload_id),
+            )
+            if text:
+                conn.execute("UPDATE notes SET extracted_text = ? WHERE id = ?", (text, note_id))
+                self._queue_for_index(conn, note_id)
+            self.processing_status.set(note_id, "extracting", percent, message, conn=conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _queue_for_index(conn, note_id: int) -> None:
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO note_index_queue(note_id, queued_at) VALUES (?, julianday('now'))",
+                (note_id,),
+            )
+        except sqlite3.OperationalError:
+            # Search index schema not applied to this database
+            pass
+
+    def resume_pending_extractions(self) -> int:
+        """Re-run extractions interrupted by a restart; returns how many ran.
+
+        Every worker calls this at startup, so each upload is claimed with a
+        conditional UPDATE first; claims whose heartbeat has gone stale belong
+        to a worker that died mid-extraction and are taken over.
+        """
+        stale_before = datetime.utcfromtimestamp(time.time() - CLAIM_STALE_SECONDS).isoformat()
+        conn = self.get_conn()
+        try:
+            cur = conn.execute(
+                """
+                SELECT upload_id, status, updated_at FROM upload_sessions
+                WHERE status = 'extracting' OR (status = 'resuming' AND updated_at < ?)
+                """,
+                (stale_before,),
+            )
+            rows = cur.fetchall()
+        finally:
+            conn.close()
+        ran = 0
+        for upload_id, status, updated_at in rows:
+            stale_claim = updated_at if status == "resuming" else None
+            if not self._claim_extraction(upload_id, status, stale_claim):
+                continue
+            if self.complete_extraction(upload_id, claimed=True):
+                ran += 1
+        return ran
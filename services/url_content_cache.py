@@ -0,0 +1,267 @@
+"""
+URL Content Cache
+
+Remembers what a URL looked like the last time it was ingested: HTTP
+validators (ETag / Last-Modified), a hash of the response body, the extracted
+content and the AI results. Re-captures of the same link reuse all of that
+after a cheap conditional request instead of fetching, rendering and
+summarising the page again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Revalidation reads at most this much body before treating the page as changed
+MAX_REVALIDATE_BYTES = 10 * 1024 * 1024
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "mc_cid", "mc_eid", "igshid", "ref_src", "si"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to key captures of the same page"""
+    try:
+        parts = urllib.parse.urlsplit(url.strip())
+        # Normalize scheme/host lower-case, strip fragment
+        scheme = (parts.scheme or 'http').lower()
+        netloc = (parts.netloc or '').lower()
+        path = parts.path or '/'
+        if path != '/' and path.endswith('/'):
+            path = path[:-1]
+        query = [
+            (key, value)
+            for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+        ]
+        query.sort()
+        query_str = urllib.parse.urlencode(query)
+        return urllib.parse.urlunsplit((scheme, netloc, path, query_str, ''))
+    except Exception:
+        return url.strip()
+
+
+def hash_body(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+@dataclass
+class CachedUrlContent:
+    """One cached URL; ``web_content`` holds the serialized WebContent fields"""
+    normalized_url: str
+    final_url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_hash: Optional[str]
+    content_hash: Optional[str]
+    web_content: Dict[str, Any] = field(default_factory=dict)
+    ai_results: Dict[str, Any] = field(default_factory=dict)
+    fetched_at: float = 0.0
+    validated_at: float = 0.0
+    hits: int = 0
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        return time.time() - self.validated_at < ttl_seconds
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class UrlContentCache:
+    """SQLite-backed cache of extracted URL content, keyed by normalized URL"""
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection]):
+        self.get_conn = get_conn_func
+        self._ensure_tables()
+
+    def _ensure_tables(self) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS url_content_cache (
+                    normalized_url TEXT PRIMARY KEY,
+                    final_url TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT,
+                    content_hash TEXT,
+                    web_content TEXT,
+                    ai_results TEXT,
+                    fetched_at REAL,
+                    validated_at REAL,
+                    hits INTEGER DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS url_content_cache_notes (
+                    normalized_url TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    note_id INTEGER NOT NULL,
+                    content_hash TEXT,
+                    created_at REAL,
+                    PRIMARY KEY (normalized_url, user_id)
+                )
+                """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, normalized_url: str) -> Optional[CachedUrlContent]:
+        conn = self.get_conn()
+        try:
+            row = conn.execute(
+                """
+                SELECT normalized_url, final_url, etag, last_modified, body_hash, content_hash,
+                       web_content, ai_results, fetched_at, validated_at, hits
+                FROM url_content_cache WHERE normalized_url = ?
+                """,
+                (normalized_url,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        try:
+            web_content = json.loads(row[6] or "{}")
+            ai_results = json.loads(row[7] or "{}")
+        except ValueError:
+            return None
+        return CachedUrlContent(
+            normalized_url=row[0], final_url=row[1], etag=row[2], last_modified=row[3],
+            body_hash=row[4], content_hash=row[5], web_content=web_content, ai_results=ai_results,
+            fetched_at=row[8] or 0.0, validated_at=row[9] or 0.0, hits=row[10] or 0,
+        )
+
+    def store(self, entry: CachedUrlContent) -> None:
+        now = time.time()
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                INSERT INTO url_content_cache
+                (normalized_url, final_url, etag, last_modified, body_hash, content_hash,
+                 web_content, ai_results, fetched_at, validated_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT(normalized_url) DO UPDATE SET
+                    final_url = excluded.final_url,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    body_hash = excluded.body_hash,
+                    content_hash = excluded.content_hash,
+                    web_content = excluded.web_content,
+                    ai_results = excluded.ai_results,
+                    fetched_at = excluded.fetched_at,
+                    validated_at = excluded.validated_at
+                """,
+                (
+                    entry.normalized_url, entry.final_url, entry.etag, entry.last_modified,
+                    entry.body_hash, entry.content_hash, json.dumps(entry.web_content, default=str),
+                    json.dumps(entry.ai_results, default=str), now, now,
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def mark_hit(self, normalized_url: str, revalidated: bool = False) -> None:
+        conn = self.get_conn()
+        try:
+            if revalidated:
+                conn.execute(
+                    "UPDATE url_content_cache SET hits = hits + 1, validated_at = ? WHERE normalized_url = ?",
+                    (time.time(), normalized_url),
+                )
+            else:
+                conn.execute(
+                    "UPDATE url_content_cache SET hits = hits + 1 WHERE normalized_url = ?",
+                    (normalized_url,),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def link_note(self, normalized_url: str, user_id: int, note_id: int, content_hash: Optional[str]) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO url_content_cache_notes
+                (normalized_url, user_id, note_id, content_hash, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (normalized_url, user_id, note_id, content_hash, time.time()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def find_note(self, normalized_url: str, user_id: int,
+                  content_hash: Optional[str] = None, since: Optional[float] = None) -> Optional[int]:
+        """Most recent still-existing note this user captured from this URL"""
+        query = """
+            SELECT l.note_id FROM url_content_cache_notes l
+            JOIN notes n ON n.id = l.note_id AND n.user_id = l.user_id
+            WHERE l.normalized_url = ? AND l.user_id = ?
+        """
+        params: list = [normalized_url, user_id]
+        if content_hash is not None:
+            query += " AND l.content_hash = ?"
+            params.append(content_hash)
+        if since is not None:
+            query += " AND l.created_at >= ?"
+            params.append(since)
+        query += " ORDER BY l.created_at DESC LIMIT 1"
+        conn = self.get_conn()
+        try:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            row = cur.fetchone()
+        finally:
+            conn.close()
+        return int(row[0]) if row else None
+
+    async def is_unchanged(self, entry: CachedUrlContent, client,
+                           max_bytes: int = MAX_REVALIDATE_BYTES) -> bool:
+        """Revalidate with a conditional GET; falls back to comparing body hashes.
+
+        The body is hashed as it streams; past ``max_bytes`` the page counts
+        as changed and the normal, size-capped fetch path takes over.
+        """
+        headers = entry.conditional_headers()
+        if not headers and not entry.body_hash:
+            return False
+        try:
+            async with client.stream("GET", entry.final_url or entry.normalized_url, headers=headers) as response:
+                if response.status_code == 304:
+                    return True
+                if response.status_code != 200 or not entry.body_hash:
+                    return False
+                declared = response.headers.get("content-length", "")
+                if declared.isdigit() and int(declared) > max_bytes:
+                    return False
+                hasher = hashlib.sha256()
+                received = 0
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if received > max_bytes:
+                        return False
+                    hasher.update(chunk)
+        except Exception as exc:
+            print(f"[url_cache] Revalidation failed for {entry.normalized_url}: {exc}")
+            return False
+        return hasher.hexdigest() == entry.body_hash
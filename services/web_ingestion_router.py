@@ -7,6 +7,7 @@ Provides endpoints for URL processing and integrates with Smart Automation.
 
 from __future__ import annotations
 
+import asyncio
 from typing import List, Optional
 import re
 
@@ -14,10 +15,12 @@ from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl
 
+from config import settings
 from services.web_ingestion_service import (
     WebIngestionService, UrlIngestionRequest, UrlIngestionResponse,
     ExtractionConfig, UrlDetectionWorkflow
 )
+from services.browser_pool import get_browser_pool
 from services.auth_service import User
 from services.workflow_engine import WorkflowEngine, TriggerType
 
@@ -27,11 +30,20 @@ web_ingestion_service: Optional[WebIngestionService] = None
 url_workflow: Optional[UrlDetectionWorkflow] = None
 get_conn = None
 get_current_user = None
+# Shared by every bulk request so concurrent batches can't multiply the fan-out
+_bulk_slots: Optional[asyncio.Semaphore] = None
 
 # FastAPI router
 router = APIRouter(prefix="/api/web", tags=["web-ingestion"])
 
 
+def _get_bulk_slots() -> asyncio.Semaphore:
+    global _bulk_slots
+    if _bulk_slots is None:
+        _bulk_slots = asyncio.Semaphore(max(1, settings.web_ingestion_worker_concurrency))
+    return _bulk_slots
+
+
 def init_web_ingestion_router(get_conn_func, workflow_engine: WorkflowEngine, get_current_user_func):
     """Initialize Web Ingestion services"""
     global web_ingestion_service, url_workflow, get_conn, get_current_user
@@ -179,18 +191,20 @@ async def ingest_bulk_urls(
     # Process URLs in background
     async def process_urls():
         config, async_mode = _build_config_from_request(request)
+        slots = _get_bulk_slots()
         
-        results = []
-        for url in valid_urls:
-            try:
-                result = await web_ingestion_service.ingest_url(
-                    url, current_user.id, config=config, async_mode=async_mode
-                )
-                results.append({"url": url, "success": True, "note_id": result.get("note_id")})
-            except Exception as e:
-                results.append({"url": url, "success": False, "error": str(e)})
+        async def process_url(url):
+            async with slots:
+                try:
+                    result = await web_ingestion_service.ingest_url(
+                        url, current_user.id, config=config, async_mode=async_mode
+                    )
+                    return {"url": url, "success": True, "note_id": result.get("note_id")}
+                except Exception as e:
+                    return {"url": url, "success": False, "error": str(e)}
         
-        return results
+        # At most web_ingestion_worker_concurrency URLs in flight across all bulk requests
+        return await asyncio.gather(*(process_url(url) for url in valid_urls))
     
     background_tasks.add_task(process_urls)
     
@@ -232,6 +246,37 @@ async def list_jobs(limit: int = 50, fastapi_request: Request = None):
     return [JobStatus(**job) for job in jobs]
 
 
+@router.get("/stats/fetch-tiers")
+async def get_fetch_tier_stats(fastapi_request: Request, limit: int = 500):
+    """Hit rate and latency of each fetch tier (handler, http, browser)"""
+    if not web_ingestion_service:
+        raise HTTPException(status_code=500, detail="Web ingestion service not initialized")
+
+    current_user = await get_current_user(fastapi_request)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return web_ingestion_service.get_fetch_tier_stats(current_user.id, limit=limit)
+
+
+@router.get("/stats/storage")
+async def get_storage_usage(fastapi_request: Request):
+    """Stored bytes per category against the web storage quota"""
+    if not web_ingestion_service:
+        raise HTTPException(status_code=500, detail="Web ingestion service not initialized")
+
+    current_user = await get_current_user(fastapi_request)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    usage = web_ingestion_service.storage_ledger.get_usage(current_user.id)
+    return {
+        "usage": usage,
+        "total_bytes": sum(usage.values()),
+        "limit_bytes": settings.web_storage_limit_mb * 1024 * 1024,
+    }
+
+
 # ─── Smart Capture Enhancement ───
 
 @router.post("/capture/smart", response_model=QuickCaptureResponse)
@@ -442,6 +487,7 @@ async def web_ingestion_health():
             "playwright_available": True,  # Would check PLAYWRIGHT_AVAILABLE
             "url_workflow": url_workflow is not None
         },
+        "browser_pool": get_browser_pool().get_stats(),
         "capabilities": {
             "url_detection": True,
             "content_extraction": True,
@@ -12,6 +12,8 @@ import json
 import os
 import re
 import hashlib
+import shutil
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass, field, asdict
@@ -34,6 +36,9 @@ from pydantic import BaseModel
 
 from config import settings
 from llm_utils import ollama_summarize, ollama_generate_title
+from services.browser_pool import BrowserPool, get_browser_pool
+from services.storage_ledger import StorageLedger
+from services.url_content_cache import CachedUrlContent, UrlContentCache, hash_body, normalize_url
 
 try:
     import redis.asyncio as redis
@@ -67,6 +72,108 @@ class WebContent:
     artifacts: List[IngestionArtifact] = field(default_factory=list)
 
 
+MAIN_CONTENT_SELECTORS = [
+    'article',
+    '[role="main"]',
+    'main',
+    '.content',
+    '.post-content',
+    '.entry-content',
+    '.article-content',
+    '.story-body',
+    '.post-body',
+    '#content',
+    '.container .row .col'
+]
+
+BOILERPLATE_SELECTORS = [
+    'nav', 'header', 'footer', '.nav', '.navigation',
+    '.sidebar', '.menu', '.ads', '.advertisement',
+    '.social', '.comments', '.related', '.recommendations'
+]
+
+
+def _clean_content(content: str) -> str:
+    """Clean extracted page text"""
+    if not content:
+        return ""
+    
+    # Remove excessive whitespace
+    content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)
+    content = re.sub(r' +', ' ', content)
+    content = content.strip()
+    
+    # Remove common footer/header patterns
+    patterns_to_remove = [
+        r'Cookie[s]?\s+Policy.*',
+        r'Privacy\s+Policy.*',
+        r'Terms\s+of\s+Service.*',
+        r'Subscribe\s+to.*',
+        r'Follow\s+us.*',
+        r'Share\s+this.*',
+    ]
+    
+    for pattern in patterns_to_remove:
+        content = re.sub(pattern, '', content, flags=re.IGNORECASE)
+    
+    return content
+
+
+def _artifact_dir(name: str) -> Path:
+    directory = Path(settings.snapshots_dir) / name
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _save_text_artifact(content: str, subdir: str, suffix: str) -> Tuple[str, int]:
+    path = _artifact_dir(subdir) / f"{uuid.uuid4().hex}{suffix}"
+    path.write_text(content, encoding="utf-8")
+    return str(path), path.stat().st_size
+
+
+def _web_content_from_cache(data: Dict[str, Any]) -> WebContent:
+    """Rebuild a WebContent serialized with asdict() into the URL cache"""
+    extracted_at = data.get("extracted_at")
+    return WebContent(
+        url=data.get("url", ""),
+        title=data.get("title", ""),
+        content=data.get("content", ""),
+        summary=data.get("summary", ""),
+        metadata={**(data.get("metadata") or {}), "served_from_cache": True},
+        screenshot_path=data.get("screenshot_path"),
+        extracted_at=datetime.fromisoformat(extracted_at) if extracted_at else datetime.now(),
+        content_hash=data.get("content_hash"),
+        artifacts=[IngestionArtifact(**artifact) for artifact in data.get("artifacts", [])],
+    )
+
+
+def _copy_cached_artifacts(web_content: WebContent) -> WebContent:
+    """Give a note built from the URL cache its own copies of the artifact files.
+
+    The cache is shared across users; without copies two notes (possibly of
+    different users) would point at one screenshot/HTML file, so deleting one
+    note's files would break the other and the storage ledger would count the
+    same bytes for both. Artifacts whose file is gone are dropped.
+    """
+    copies: Dict[str, str] = {}
+    artifacts = []
+    for artifact in web_content.artifacts:
+        source = Path(artifact.path) if artifact.path else None
+        if source is None or not source.exists():
+            continue
+        target = source.with_name(f"{uuid.uuid4().hex}{source.suffix}")
+        shutil.copyfile(source, target)
+        copies[str(source)] = str(target)
+        artifact.path = str(target)
+        artifact.size = target.stat().st_size
+        artifact.id = uuid.uuid4().hex
+        artifacts.append(artifact)
+    web_content.artifacts = artifacts
+    if web_content.screenshot_path:
+        web_content.screenshot_path = copies.get(web_content.screenshot_path)
+    return web_content
+
+
 def _truncate_content(content: str, max_length: int) -> Tuple[str, bool]:
     """Limit content length, returning truncated content and flag."""
     if max_length and len(content) > max_length:
@@ -93,6 +200,8 @@ class ExtractionConfig:
     block_ads: bool = True
     extract_links: bool = True
     max_content_length: int = 50000
+    fetch_strategy: str = "auto"  # auto (HTTP first, browser if needed) | http | browser
+    use_cache: bool = True  # reuse extraction + AI results for unchanged, already-seen URLs
 
     def override(self, **kwargs) -> "ExtractionConfig":
         data = asdict(self)
@@ -112,12 +221,15 @@ class ExtractionConfig:
             fetch_captions=settings.web_fetch_captions_default,
             extract_images=settings.web_extract_images_default,
             timeout=settings.web_timeout_default,
+            fetch_strategy=settings.web_fetch_strategy_default,
         )
 
 
 class IngestionJobQueue:
     """Simple Redis-backed queue for ingestion jobs."""
 
+    backend = "redis"
+
     def __init__(self):
         self._client = None
         if redis and settings.redis_url:
@@ -127,6 +239,20 @@ class IngestionJobQueue:
                 print(f"[web_ingestion] Failed to connect to Redis: {exc}")
                 self._client = None
 
+    @property
+    def available(self) -> bool:
+        return self._client is not None
+
+    async def complete(self, job_id: str) -> None:
+        """Redis pops are final; nothing to acknowledge"""
+
+    async def fail(self, job_id: str, error: str) -> bool:
+        """No redelivery on the Redis backend; returns whether the job was requeued"""
+        return False
+
+    async def heartbeat(self, job_id: str) -> None:
+        """Redis jobs have no visibility timeout"""
+
     async def enqueue(self, key: str, payload: Dict[str, Any]):
         if not self._client:
             return
@@ -159,6 +285,201 @@ class IngestionJobQueue:
             return None
 
 
+class SQLiteJobQueue:
+    """Durable local queue on top of the web_ingestion_jobs table.
+
+    Used when Redis isn't configured. A job becomes claimable once enqueued
+    (``available_at`` set). Claiming is atomic (``BEGIN IMMEDIATE``) and
+    leases the job for ``visibility_timeout`` seconds; a worker that dies
+    mid-job lets the lease lapse and the job is picked up again. Failed jobs
+    are retried with exponential backoff up to ``max_attempts``.
+    """
+
+    backend = "sqlite"
+    JOBS_KEY = "web_ingestion:jobs"
+
+    def __init__(self, get_conn_func: Callable[[], sqlite3.Connection], max_attempts: int = 3,
+                 visibility_timeout: int = 300, retry_backoff: float = 30.0, poll_interval: float = 1.0):
+        self.get_conn = get_conn_func
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.worker_id = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def enqueue(self, key: str, payload: Dict[str, Any]):
+        # Completion notifications are already reflected in the jobs table
+        if key != self.JOBS_KEY:
+            return
+        await asyncio.to_thread(self._mark_available, payload["job_id"], time.time())
+
+    async def dequeue(self, key: str, block: bool = True, timeout: int = 5,
+                      exclude_domains: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + (timeout if block else 0)
+        while True:
+            payload = await asyncio.to_thread(self.claim, exclude_domains or [])
+            if payload or time.monotonic() >= deadline:
+                return payload
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    async def complete(self, job_id: str) -> None:
+        await asyncio.to_thread(self._release, job_id)
+
+    async def fail(self, job_id: str, error: str) -> bool:
+        return await asyncio.to_thread(self._fail, job_id, error)
+
+    async def heartbeat(self, job_id: str) -> None:
+        await asyncio.to_thread(self._extend_lease, job_id)
+
+    def claim(self, exclude_domains: List[str]) -> Optional[Dict[str, Any]]:
+        """Atomically lease the next due job, skipping busy domains"""
+        now = time.time()
+        conn = self.get_conn()
+        try:
+            # Cheap read first so idle polling never takes the write lock
+            due = conn.execute(
+                """
+                SELECT 1 FROM web_ingestion_jobs
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'processing' AND claim_expires_at < ?)
+                LIMIT 1
+                """,
+                (now, now),
+            ).fetchone()
+            if due is None:
+                return None
+
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose lease lapsed too many times are given up on
+            conn.execute(
+                """
+                UPDATE web_ingestion_jobs
+                SET status = 'failed', error = 'Worker lease expired too many times',
+                    claimed_by = NULL, claim_expires_at = NULL, available_at = NULL
+                WHERE status = 'processing' AND claim_expires_at < ? AND attempts >= ?
+                """,
+                (now, self.max_attempts),
+            )
+            query = """
+                SELECT job_id, payload, attempts FROM web_ingestion_jobs
+                WHERE ((status = 'queued' AND available_at <= ?)
+                       OR (status = 'processing' AND claim_expires_at < ?))
+            """
+            params: List[Any] = [now, now]
+            if exclude_domains:
+                query += f" AND COALESCE(domain, '') NOT IN ({','.join('?' * len(exclude_domains))})"
+                params.extend(exclude_domains)
+            query += " ORDER BY available_at, id LIMIT 1"
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                conn.commit()
+                return None
+
+            job_id, payload_json, attempts = row[0], row[1], row[2] or 0
+            conn.execute(
+                """
+                UPDATE web_ingestion_jobs
+                SET status = 'processing', attempts = ?, claimed_by = ?, claim_expires_at = ?, started_at = ?
+                WHERE job_id = ?
+                """,
+                (attempts + 1, self.worker_id, now + self.visibility_timeout, datetime.now().isoformat(), job_id),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        payload = json.loads(payload_json)
+        payload["attempt"] = attempts + 1
+        return payload
+
+    def _mark_available(self, job_id: str, available_at: float) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                "UPDATE web_ingestion_jobs SET status = 'queued', available_at = ? WHERE job_id = ?",
+                (available_at, job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _release(self, job_id: str) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                """
+                UPDATE web_ingestion_jobs
+                SET claimed_by = NULL, claim_expires_at = NULL, available_at = NULL
+                WHERE job_id = ?
+                """,
+                (job_id,),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _fail(self, job_id: str, error: str) -> bool:
+        conn = self.get_conn()
+        try:
+            row = conn.execute("SELECT attempts FROM web_ingestion_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            attempts = (row[0] or 0) if row else self.max_attempts
+            if attempts < self.max_attempts:
+                retry_at = time.time() + self.retry_backoff * (2 ** (attempts - 1))
+                conn.execute(
+                    """
+                    UPDATE web_ingestion_jobs
+                    SET status = 'queued', error = ?, available_at = ?, claimed_by = NULL, claim_expires_at = NULL
+                    WHERE job_id = ?
+                    """,
+                    (error, retry_at, job_id),
+                )
+                requeued = True
+            else:
+                conn.execute(
+                    """
+                    UPDATE web_ingestion_jobs
+                    SET status = 'failed', error = ?, available_at = NULL, claimed_by = NULL, claim_expires_at = NULL
+                    WHERE job_id = ?
+                    """,
+                    (error, job_id),
+                )
+                requeued = False
+            conn.commit()
+            return requeued
+        finally:
+            conn.close()
+
+    def _extend_lease(self, job_id: str) -> None:
+        conn = self.get_conn()
+        try:
+            conn.execute(
+                "UPDATE web_ingestion_jobs SET claim_expires_at = ? WHERE job_id = ? AND claimed_by = ?",
+                (time.time() + self.visibility_timeout, job_id, self.worker_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def build_job_queue(get_conn_func: Callable[[], sqlite3.Connection]):
+    """Redis when configured and reachable, else the local SQLite queue"""
+    redis_queue = IngestionJobQueue()
+    if redis_queue.available or not settings.web_ingestion_local_queue:
+        return redis_queue
+    return SQLiteJobQueue(
+        get_conn_func,
+        max_attempts=settings.web_ingestion_max_attempts,
+        visibility_timeout=settings.web_ingestion_visibility_timeout,
+    )
+
+
 class DomainHandler:
     """Base class for domain-specific ingestion handlers."""
 
@@ -497,48 +818,282 @@ DOMAIN_HANDLERS: List[DomainHandler] = [
 ]
 
 
+class HttpFirstFetcher:
+    """Fast path: plain pooled HTTP GET plus main-content extraction.
+
+    Returns ``(content, reason)``; content is None when the page needs a real
+    browser (client-rendered shell, thin content, non-HTML, errors) or the
+    config asks for something only a browser can produce (PDF snapshot).
+    Screenshots are skipped on this tier.
+    """
+
+    MIN_TEXT_CHARS = 500
+    SCRIPT_TEXT_RATIO = 8
+    MAX_BYTES = 10 * 1024 * 1024
+    SPA_ROOT_IDS = ("root", "app", "__next", "__nuxt", "svelte", "ember-app")
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+                      " AppleWebKit/537.36 (KHTML, like Gecko)"
+                      " Chrome/123.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # One keep-alive pool per event loop; httpx negotiates gzip/deflate (and br when available)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                timeout=httpx.Timeout(15.0, connect=5.0),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str, config: ExtractionConfig) -> Tuple[Optional[WebContent], str]:
+        if config.capture_pdf:
+            return None, "pdf_requested"
+
+        # Stream so non-HTML and oversized responses are rejected before the body is read
+        async with self._get_client().stream("GET", url, timeout=min(config.timeout, 15)) as response:
+            if response.status_code >= 400:
+                return None, f"http_{response.status_code}"
+
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type.lower():
+                return None, "non_html"
+            declared = response.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > self.MAX_BYTES:
+                return None, "too_large"
+
+            chunks: List[bytes] = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > self.MAX_BYTES:
+                    return None, "too_large"
+                chunks.append(chunk)
+        body = b"".join(chunks)
+
+        # Decoding, parsing and artifact writes of up to MAX_BYTES stay off the event loop
+        return await asyncio.to_thread(
+            self._parse_page, body, response.encoding, str(response.url), response.headers, config
+        )
+
+    def _parse_page(self, body: bytes, encoding: Optional[str], final_url: str,
+                    headers: httpx.Headers, config: ExtractionConfig) -> Tuple[Optional[WebContent], str]:
+        """Extract a fetched HTML body; runs in a worker thread"""
+        content_type = headers.get("content-type", "")
+        html = body.decode(encoding or "utf-8", errors="replace")
+        soup = BeautifulSoup(html, "html.parser")
+
+        reason = self._needs_browser(soup)
+        if reason:
+            return None, reason
+
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        description_tag = soup.find("meta", attrs={"name": "description"})
+        description = description_tag.get("content", "") if description_tag else ""
+        metadata = self._extract_metadata(soup, final_url, config)
+
+        main_text = self._extract_main_content(soup)
+        if len(main_text) < self.MIN_TEXT_CHARS:
+            return None, "thin_content"
+        content, truncated = _truncate_content(main_text, config.max_content_length)
+        metadata["content_truncated"] = truncated
+        metadata["validators"] = {
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "body_hash": hash_body(body),
+        }
+
+        artifacts: List[IngestionArtifact] = []
+        if config.download_original:
+            try:
+                original_path = _artifact_dir("original") / f"{uuid.uuid4().hex}.html"
+                original_path.write_bytes(body)
+                artifacts.append(
+                    IngestionArtifact(
+                        type="original",
+                        path=str(original_path),
+                        size=original_path.stat().st_size,
+                        mime_type=content_type.split(";")[0],
+                        label="Original response",
+                        metadata={"headers": dict(headers)}
+                    )
+                )
+            except Exception as exc:
+                print(f"[web_ingestion] Original download failed: {exc}")
+        if config.capture_html:
+            try:
+                html_path, html_size = _save_text_artifact(html, "html", ".html")
+                artifacts.append(
+                    IngestionArtifact(
+                        type="html",
+                        path=html_path,
+                        size=html_size,
+                        mime_type="text/html",
+                        label="HTML snapshot"
+                    )
+                )
+            except Exception as exc:
+                print(f"[web_ingestion] HTML capture failed: {exc}")
+
+        metadata["artifacts"] = [asdict(artifact) for artifact in artifacts]
+        content_hash = hashlib.sha256((title + content).encode()).hexdigest()[:16]
+
+        return WebContent(
+            url=final_url,
+            title=title,
+            content=content,
+            summary=description,
+            metadata=metadata,
+            screenshot_path=None,
+            extracted_at=datetime.now(),
+            content_hash=content_hash,
+            artifacts=artifacts
+        ), "ok"
+
+    def _needs_browser(self, soup: BeautifulSoup) -> Optional[str]:
+        """Heuristics for pages whose content only appears after JavaScript runs"""
+        body = soup.body
+        if body is None:
+            return "no_body"
+
+        script_chars = sum(len(script.get_text()) for script in soup.find_all("script"))
+        for element in soup.find_all(["script", "style", "template"]):
+            element.decompose()
+
+        js_notice = False
+        for noscript in soup.find_all("noscript"):
+            notice = noscript.get_text(" ", strip=True).lower()
+            noscript.decompose()
+            if "javascript" in notice and ("enable" in notice or "require" in notice):
+                js_notice = True
+        visible_chars = len(body.get_text(" ", strip=True))
+
+        if js_notice and visible_chars < self.MIN_TEXT_CHARS * 4:
+            return "noscript_notice"
+
+        for root_id in self.SPA_ROOT_IDS:
+            root = soup.find(id=root_id)
+            if root is not None and len(root.get_text(strip=True)) < 50 and visible_chars < self.MIN_TEXT_CHARS * 2:
+                return "spa_shell"
+
+        if visible_chars < self.MIN_TEXT_CHARS:
+            return "thin_content"
+        if script_chars > visible_chars * self.SCRIPT_TEXT_RATIO:
+            return "script_heavy"
+        return None
+
+    def _extract_main_content(self, soup: BeautifulSoup) -> str:
+        for selector in MAIN_CONTENT_SELECTORS:
+            element = soup.select_one(selector)
+            if element:
+                text = element.get_text("\n", strip=True)
+                if len(text) > 200:  # Minimum content length
+                    return _clean_content(text)
+
+        for selector in BOILERPLATE_SELECTORS:
+            for element in soup.select(selector):
+                element.decompose()
+        return _clean_content(soup.body.get_text("\n", strip=True) if soup.body else "")
+
+    def _extract_metadata(self, soup: BeautifulSoup, url: str, config: ExtractionConfig) -> Dict[str, Any]:
+        """Same shape as the browser extractor's metadata"""
+        metadata: Dict[str, Any] = {
+            'domain': urlparse(url).netloc,
+            'extracted_at': datetime.now().isoformat(),
+            'final_url': url,
+        }
+
+        open_graph = {}
+        for tag in soup.select('meta[property^="og:"]'):
+            if tag.get('content'):
+                open_graph[tag['property'].replace('og:', '')] = tag['content']
+        metadata['open_graph'] = open_graph
+        metadata['meta_tags'] = {
+            tag['name']: tag['content']
+            for tag in soup.select('meta[name]')
+            if tag.get('content')
+        }
+
+        for selector in ['.author', '.byline', '[rel="author"]', '.post-author', '.article-author']:
+            element = soup.select_one(selector)
+            if element and element.get_text(strip=True):
+                metadata['author'] = element.get_text(strip=True)
+                break
+
+        for selector in ['time[datetime]', '.published', '.post-date', '.article-date', '.date']:
+            element = soup.select_one(selector)
+            if element:
+                date_value = element.get('datetime') or element.get_text(strip=True)
+                if date_value:
+                    metadata['published_date'] = date_value
+                    break
+
+        if config.extract_links:
+            metadata['links'] = self._extract_links(soup, url)
+        return metadata
+
+    def _extract_links(self, soup: BeautifulSoup, url: str) -> Dict[str, List[Dict[str, str]]]:
+        domain = urlparse(url).netloc
+        internal_links: List[Dict[str, str]] = []
+        external_links: List[Dict[str, str]] = []
+        seen = set()
+        for anchor in soup.find_all('a', href=True):
+            href = anchor['href'].strip()
+            if not href or href.startswith('mailto:') or href.startswith('javascript:') or href.startswith('#'):
+                continue
+            href = urljoin(url, href)
+            if href in seen:
+                continue
+            seen.add(href)
+            entry = {'url': href, 'text': anchor.get_text(strip=True)[:120]}
+            target = internal_links if urlparse(href).netloc == domain else external_links
+            if len(target) < 15:
+                target.append(entry)
+        return {'internal': internal_links, 'external': external_links}
+
+
 class WebContentExtractor:
-    """Playwright-based web content extraction"""
+    """Playwright-based web content extraction on top of the shared browser pool"""
     
-    def __init__(self):
-        self.browser: Optional[Browser] = None
-        self.playwright = None
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        self.pool = pool
 
     async def __aenter__(self):
         """Async context manager entry"""
         if not PLAYWRIGHT_AVAILABLE:
             raise RuntimeError("Playwright not available")
-            
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=True,
-            args=[
-                '--no-sandbox',
-                '--disable-blink-features=AutomationControlled',
-                '--disable-extensions',
-                '--disable-plugins',
-                '--disable-images' if not True else '',  # Can be configured
-            ]
-        )
+        if self.pool is None:
+            self.pool = get_browser_pool()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        """Async context manager exit - browsers stay in the pool"""
+        return None
     
     async def extract_content(self, url: str, config: ExtractionConfig = None) -> WebContent:
         """Extract content from a web page"""
         config = config or ExtractionConfig()
+        pool = self.pool or get_browser_pool()
         
-        page = await self.browser.new_page(
+        async with pool.page(
             viewport={'width': config.viewport_width, 'height': config.viewport_height},
             user_agent=config.user_agent
-        )
-        
-        try:
+        ) as page:
             # Block ads and trackers if requested
             if config.block_ads:
                 await page.route("**/*", self._block_ads_handler)
@@ -573,6 +1128,11 @@ class WebContentExtractor:
             
             # Extract additional metadata
             metadata = await self._extract_metadata(page, final_url, config, truncated)
+            headers = response.headers or {}
+            metadata["validators"] = {
+                "etag": headers.get("etag"),
+                "last_modified": headers.get("last-modified"),
+            }
 
             # Optionally persist original response body
             if config.download_original and response:
@@ -669,9 +1229,6 @@ class WebContentExtractor:
                 content_hash=content_hash,
                 artifacts=artifacts
             )
-            
-        finally:
-            await page.close()
     
     async def _block_ads_handler(self, route):
         """Block ads and tracking requests"""
@@ -698,33 +1255,15 @@ class WebContentExtractor:
             await route.continue_()
 
     def _artifact_dir(self, name: str) -> Path:
-        directory = Path(settings.snapshots_dir) / name
-        directory.mkdir(parents=True, exist_ok=True)
-        return directory
+        return _artifact_dir(name)
 
     def _save_text_artifact(self, content: str, subdir: str, suffix: str) -> Tuple[str, int]:
-        path = self._artifact_dir(subdir) / f"{uuid.uuid4().hex}{suffix}"
-        path.write_text(content, encoding="utf-8")
-        return str(path), path.stat().st_size
+        return _save_text_artifact(content, subdir, suffix)
     
     async def _extract_main_content(self, page: Page) -> str:
         """Extract main content using multiple strategies"""
-        content_selectors = [
-            'article',
-            '[role="main"]',
-            'main',
-            '.content',
-            '.post-content',
-            '.entry-content',
-            '.article-content',
-            '.story-body',
-            '.post-body',
-            '#content',
-            '.container .row .col'
-        ]
-        
         # Try structured content extraction first
-        for selector in content_selectors:
+        for selector in MAIN_CONTENT_SELECTORS:
             try:
                 element = await page.query_selector(selector)
                 if element:
@@ -738,17 +1277,12 @@ class WebContentExtractor:
         try:
             # Remove navigation, sidebar, and footer elements
             await page.evaluate("""
-                () => {
-                    const selectorsToRemove = [
-                        'nav', 'header', 'footer', '.nav', '.navigation', 
-                        '.sidebar', '.menu', '.ads', '.advertisement',
-                        '.social', '.comments', '.related', '.recommendations'
-                    ];
+                (selectorsToRemove) => {
                     selectorsToRemove.forEach(selector => {
                         document.querySelectorAll(selector).forEach(el => el.remove());
                     });
                 }
-            """)
+            """, BOILERPLATE_SELECTORS)
             
             # Get remaining body content
             body_content = await page.evaluate("document.body.innerText")
@@ -760,28 +1294,7 @@ class WebContentExtractor:
     
     def _clean_content(self, content: str) -> str:
         """Clean extracted content"""
-        if not content:
-            return ""
-        
-        # Remove excessive whitespace
-        content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)
-        content = re.sub(r' +', ' ', content)
-        content = content.strip()
-        
-        # Remove common footer/header patterns
-        patterns_to_remove = [
-            r'Cookie[s]?\s+Policy.*',
-            r'Privacy\s+Policy.*',
-            r'Terms\s+of\s+Service.*',
-            r'Subscribe\s+to.*',
-            r'Follow\s+us.*',
-            r'Share\s+this.*',
-        ]
-        
-        for pattern in patterns_to_remove:
-            content = re.sub(pattern, '', content, flags=re.IGNORECASE)
-        
-        return content
+        return _clean_content(content)
     
     async def _extract_metadata(self, page: Page, url: str, config: ExtractionConfig, truncated: bool) -> Dict[str, Any]:
         """Extract metadata from the page"""
@@ -952,8 +1465,11 @@ class WebIngestionService:
     def __init__(self, get_conn_func: Callable[[], sqlite3.Connection]):
         self.get_conn = get_conn_func
         self.default_config = ExtractionConfig.from_settings()
-        self.job_queue = IngestionJobQueue()
+        self.http_fetcher = HttpFirstFetcher()
+        self.url_cache = UrlContentCache(get_conn_func)
+        self.storage_ledger = StorageLedger(get_conn_func)
         self._ensure_job_table()
+        self.job_queue = build_job_queue(get_conn_func)
 
     def _build_job_payload(self, url: str, user_id: int, note_id: Optional[int], config: ExtractionConfig) -> Dict[str, Any]:
         return {
@@ -977,49 +1493,215 @@ class WebIngestionService:
         note_id = payload.get("note_id")
         config = ExtractionConfig(**payload.get("config", {}))
 
+        norm_url = normalize_url(url)
+        attempts: List[Dict[str, Any]] = []
+        ai_results: Optional[Dict[str, Any]] = None
+        try:
+            cached = await self._lookup_cached_content(norm_url, attempts) if config.use_cache else None
+            if cached:
+                # Same page the user already saved: hand back that note, no writes
+                if note_id is None:
+                    existing_note = self.url_cache.find_note(norm_url, user_id, content_hash=cached.content_hash)
+                    if existing_note:
+                        return self._cached_note_result(existing_note, cached, payload)
+                web_content = await asyncio.to_thread(
+                    _copy_cached_artifacts, _web_content_from_cache(cached.web_content)
+                )
+                ai_results = cached.ai_results
+            else:
+                web_content = await self._fetch_content(url, config, attempts)
+        finally:
+            self._record_fetch_attempts(payload.get("job_id"), attempts)
+
+        if ai_results is None:
+            ai_results = await self._process_with_ai(web_content)
+            if config.use_cache:
+                self._cache_content(norm_url, web_content, ai_results)
+        note_id_created, file_metadata = await self._store_content(
+            web_content, ai_results, user_id, note_id, config
+        )
+        self.url_cache.link_note(norm_url, user_id, note_id_created, web_content.content_hash)
+
+        return {
+            "success": True,
+            "note_id": note_id_created,
+            "title": web_content.title,
+            "content_length": len(web_content.content),
+            "content_preview": web_content.content[:500],
+            "summary": ai_results.get("summary", ""),
+            "tags": ai_results.get("tags", []),
+            "screenshot_path": web_content.screenshot_path,
+            "metadata": file_metadata,
+            "queued": False,
+            "job_id": payload.get("job_id")
+        }
+
+    async def _lookup_cached_content(self, norm_url: str, attempts: List[Dict[str, Any]]) -> Optional[CachedUrlContent]:
+        """Cached extraction if it is fresh or a conditional request says the page is unchanged"""
+        cached = self.url_cache.get(norm_url)
+        if cached is None:
+            return None
+
+        started = time.perf_counter()
+        revalidated = False
+        unchanged = cached.is_fresh(settings.web_url_cache_ttl_seconds)
+        if not unchanged:
+            revalidated = True
+            unchanged = await self.url_cache.is_unchanged(
+                cached, self.http_fetcher._get_client(), max_bytes=self.http_fetcher.MAX_BYTES
+            )
+        attempts.append({
+            "tier": "cache",
+            "outcome": "hit" if unchanged else "stale",
+            "revalidated": revalidated,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+        if not unchanged:
+            return None
+        self.url_cache.mark_hit(norm_url, revalidated=revalidated)
+        return cached
+
+    def _cache_content(self, norm_url: str, web_content: WebContent, ai_results: Dict[str, Any]) -> None:
+        validators = web_content.metadata.get("validators") or {}
+        try:
+            self.url_cache.store(CachedUrlContent(
+                normalized_url=norm_url,
+                final_url=web_content.url,
+                etag=validators.get("etag"),
+                last_modified=validators.get("last_modified"),
+                body_hash=validators.get("body_hash"),
+                content_hash=web_content.content_hash,
+                web_content=asdict(web_content),
+                ai_results=ai_results,
+            ))
+        except Exception as exc:
+            print(f"[web_ingestion] URL cache store failed: {exc}")
+
+    def _cached_note_result(self, note_id: int, cached: CachedUrlContent, payload: Dict[str, Any]) -> Dict[str, Any]:
+        content = cached.web_content.get("content", "")
+        return {
+            "success": True,
+            "note_id": note_id,
+            "title": cached.web_content.get("title"),
+            "content_length": len(content),
+            "content_preview": content[:500],
+            "summary": cached.ai_results.get("summary", ""),
+            "tags": cached.ai_results.get("tags", []),
+            "screenshot_path": cached.web_content.get("screenshot_path"),
+            "metadata": None,
+            "queued": False,
+            "cached": True,
+            "job_id": payload.get("job_id")
+        }
+
+    async def _fetch_content(self, url: str, config: ExtractionConfig, attempts: List[Dict[str, Any]]) -> WebContent:
+        """Tiered fetch: domain handler, then plain HTTP, then a browser render.
+
+        Each tier tried is appended to ``attempts`` with its outcome and latency.
+        """
         parsed = urlparse(url)
         handler = next((h for h in DOMAIN_HANDLERS if h.matches(parsed)), None)
         web_content: Optional[WebContent] = None
-        handler_error: Optional[str] = None
+        errors: List[str] = []
+
+        async def run_tier(tier: str, fetch) -> Optional[WebContent]:
+            started = time.perf_counter()
+            outcome = "miss"
+            try:
+                result = await fetch()
+                if isinstance(result, tuple):
+                    result, outcome = result
+                if result is not None:
+                    outcome = "hit"
+                return result
+            except Exception as exc:
+                outcome = "error"
+                errors.append(str(exc))
+                raise
+            finally:
+                attempts.append({
+                    "tier": tier,
+                    "outcome": outcome,
+                    "ms": round((time.perf_counter() - started) * 1000, 1),
+                })
 
         if handler:
             try:
-                web_content = await handler.fetch(url, config)
-            except Exception as handler_exc:
-                handler_error = str(handler_exc)
+                web_content = await run_tier(
+                    f"handler:{type(handler).__name__}", lambda: handler.fetch(url, config)
+                )
+            except Exception:
+                web_content = None
+
+        if web_content is None and config.fetch_strategy != "browser":
+            try:
+                web_content = await run_tier("http", lambda: self.http_fetcher.fetch(url, config))
+            except Exception:
                 web_content = None
+            if web_content is None and config.fetch_strategy == "http":
+                raise RuntimeError("; ".join(errors) or f"HTTP fetch insufficient: {attempts[-1]['outcome']}")
 
         if web_content is None:
             if not PLAYWRIGHT_AVAILABLE:
-                raise RuntimeError(handler_error or "Playwright not available. Install with: pip install playwright")
+                raise RuntimeError("; ".join(errors) or "Playwright not available. Install with: pip install playwright")
 
             async with WebContentExtractor() as extractor:
                 try:
-                    web_content = await extractor.extract_content(url, config)
+                    web_content = await run_tier("browser", lambda: extractor.extract_content(url, config))
                 except Exception as extractor_exc:
                     error_message = str(extractor_exc)
-                    if handler_error:
-                        error_message = f"{handler_error}; fallback failed: {extractor_exc}"
+                    if len(errors) > 1:
+                        error_message = f"{'; '.join(errors[:-1])}; fallback failed: {extractor_exc}"
                     raise RuntimeError(error_message) from extractor_exc
 
-        ai_results = await self._process_with_ai(web_content)
-        note_id_created, file_metadata = await self._store_content(
-            web_content, ai_results, user_id, note_id, config
+        web_content.metadata["fetch_tier"] = attempts[-1]["tier"]
+        return web_content
+
+    def _record_fetch_attempts(self, job_id: Optional[str], attempts: List[Dict[str, Any]]) -> None:
+        if not attempts:
+            return
+        winner = next((a for a in attempts if a["outcome"] == "hit"), None)
+        self._update_job(
+            job_id,
+            fetch_tier=winner["tier"] if winner else None,
+            fetch_ms=round(sum(a["ms"] for a in attempts), 1),
+            fetch_attempts=json.dumps(attempts),
         )
 
-        return {
-            "success": True,
-            "note_id": note_id_created,
-            "title": web_content.title,
-            "content_length": len(web_content.content),
-            "content_preview": web_content.content[:500],
-            "summary": ai_results.get("summary", ""),
-            "tags": ai_results.get("tags", []),
-            "screenshot_path": web_content.screenshot_path,
-            "metadata": file_metadata,
-            "queued": False,
-            "job_id": payload.get("job_id")
-        }
+    def get_fetch_tier_stats(self, user_id: Optional[int] = None, limit: int = 500) -> Dict[str, Any]:
+        """Hit rate and latency per fetch tier over the most recent jobs"""
+        conn = self.get_conn()
+        try:
+            query = "SELECT fetch_attempts FROM web_ingestion_jobs WHERE fetch_attempts IS NOT NULL"
+            params: List[Any] = []
+            if user_id is not None:
+                query += " AND user_id = ?"
+                params.append(user_id)
+            query += " ORDER BY id DESC LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        tiers: Dict[str, Dict[str, Any]] = {}
+        for (attempts_json,) in rows:
+            try:
+                attempts = json.loads(attempts_json)
+            except (TypeError, ValueError):
+                continue
+            for attempt in attempts:
+                tier = tiers.setdefault(attempt["tier"], {"attempts": 0, "hits": 0, "total_ms": 0.0, "outcomes": {}})
+                tier["attempts"] += 1
+                tier["total_ms"] += attempt.get("ms", 0.0)
+                outcome = attempt.get("outcome", "miss")
+                tier["outcomes"][outcome] = tier["outcomes"].get(outcome, 0) + 1
+                if outcome == "hit":
+                    tier["hits"] += 1
+
+        for tier in tiers.values():
+            tier["hit_rate"] = round(tier["hits"] / tier["attempts"], 3)
+            tier["avg_ms"] = round(tier.pop("total_ms") / tier["attempts"], 1)
+        return {"jobs": len(rows), "tiers": tiers}
 
     async def ingest_url(self, url: str, user_id: int = 1, note_id: Optional[int] = None, 
                         config: ExtractionConfig = None, async_mode: Optional[bool] = None) -> Dict[str, Any]:
@@ -1028,7 +1710,7 @@ class WebIngestionService:
         job_payload = self._build_job_payload(url, user_id, note_id, config)
         self._record_job(job_payload)
 
-        use_async = self._determine_async(async_mode) and self.job_queue and self.job_queue._client
+        use_async = self._determine_async(async_mode) and self.job_queue and self.job_queue.available
 
         if use_async:
             await self.job_queue.enqueue("web_ingestion:jobs", job_payload)
@@ -1112,6 +1794,24 @@ class WebIngestionService:
                 )
                 """
             )
+            columns = {row[1] for row in c.execute("PRAGMA table_info(web_ingestion_jobs)")}
+            for column, column_type in (
+                ("fetch_tier", "TEXT"),
+                ("fetch_ms", "REAL"),
+                ("fetch_attempts", "TEXT"),
+                # Local queue bookkeeping (SQLiteJobQueue)
+                ("domain", "TEXT"),
+                ("attempts", "INTEGER DEFAULT 0"),
+                ("available_at", "REAL"),
+                ("claimed_by", "TEXT"),
+                ("claim_expires_at", "REAL"),
+            ):
+                if column not in columns:
+                    c.execute(f"ALTER TABLE web_ingestion_jobs ADD COLUMN {column} {column_type}")
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS idx_web_ingestion_jobs_claim "
+                "ON web_ingestion_jobs(status, available_at)"
+            )
             conn.commit()
         finally:
             conn.close()
@@ -1123,13 +1823,14 @@ class WebIngestionService:
             c.execute(
                 """
                 INSERT OR REPLACE INTO web_ingestion_jobs
-                (job_id, user_id, url, note_id, title, status, error, payload, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (job_id, user_id, url, domain, note_id, title, status, error, payload, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     payload.get("job_id"),
                     payload.get("user_id"),
                     payload.get("url"),
+                    urlparse(payload.get("url") or "").netloc.lower(),
                     payload.get("note_id"),
                     payload.get("title"),
                     payload.get("status", "queued"),
@@ -1145,7 +1846,10 @@ class WebIngestionService:
     def _update_job(self, job_id: Optional[str], **fields) -> None:
         if not job_id:
             return
-        allowed = {"status", "note_id", "title", "error", "started_at", "completed_at"}
+        allowed = {
+            "status", "note_id", "title", "error", "started_at", "completed_at",
+            "fetch_tier", "fetch_ms", "fetch_attempts",
+        }
         updates = {k: v for k, v in fields.items() if k in allowed and v is not None}
         if not updates:
             return
@@ -1371,28 +2075,8 @@ class WebIngestionService:
         return str(manifest_path)
 
     def _calculate_storage_usage(self, user_id: int) -> int:
-        conn = self.get_conn()
-        try:
-            c = conn.cursor()
-            rows = c.execute(
-                "SELECT file_metadata FROM notes WHERE user_id = ?",
-                (user_id,)
-            ).fetchall()
-
-            total = 0
-            for (metadata_json,) in rows:
-                if not metadata_json:
-                    continue
-                try:
-                    meta = json.loads(metadata_json)
-                except Exception:
-                    continue
-                artifacts = meta.get("artifacts", [])
-                for artifact in artifacts:
-                    total += int(artifact.get("size", 0))
-            return total
-        finally:
-            conn.close()
+        """Bytes the user has stored across audio, uploads and web snapshots"""
+        return self.storage_ledger.get_total(user_id)
 
     def _enforce_storage_quota(self, user_id: int, additional_bytes: int) -> None:
         if additional_bytes <= 0:
@@ -1407,6 +2091,93 @@ class WebIngestionService:
             )
 
 
+class WebIngestionWorker:
+    """Runs queued ingestion jobs concurrently with a per-domain cap.
+
+    Works with either queue backend. On the SQLite queue, busy domains are
+    skipped at claim time and leases are renewed while a job runs; failed jobs
+    go back to the queue until they run out of attempts.
+    """
+
+    def __init__(self, service: WebIngestionService, concurrency: int = 4, per_domain_limit: int = 2):
+        self.service = service
+        self.queue = service.job_queue
+        self.concurrency = max(1, concurrency)
+        self.per_domain_limit = max(1, per_domain_limit)
+        self._active: Dict[str, str] = {}  # job_id -> domain
+        self._domain_slots: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: set = set()
+        self._stopping = asyncio.Event()
+        self.stats = {"completed": 0, "failed": 0, "retried": 0}
+
+    def _busy_domains(self) -> List[str]:
+        counts: Dict[str, int] = {}
+        for domain in self._active.values():
+            counts[domain] = counts.get(domain, 0) + 1
+        return [domain for domain, count in counts.items() if count >= self.per_domain_limit]
+
+    async def run(self):
+        try:
+            while not self._stopping.is_set():
+                if len(self._active) >= self.concurrency:
+                    await asyncio.sleep(0.2)
+                    continue
+                if self.queue.backend == "sqlite":
+                    # Poll without blocking so the busy-domain filter stays current
+                    payload = await self.queue.dequeue(
+                        SQLiteJobQueue.JOBS_KEY, block=False, exclude_domains=self._busy_domains()
+                    )
+                    if not payload:
+                        await asyncio.sleep(self.queue.poll_interval)
+                        continue
+                else:
+                    payload = await self.queue.dequeue("web_ingestion:jobs", block=True, timeout=5)
+                    if not payload:
+                        continue
+                job_id = payload.get("job_id")
+                self._active[job_id] = urlparse(payload.get("url", "")).netloc.lower()
+                task = asyncio.create_task(self._run_job(payload))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def stop(self):
+        self._stopping.set()
+
+    async def _run_job(self, payload: Dict[str, Any]):
+        job_id = payload.get("job_id")
+        domain = self._active.get(job_id, "")
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        # Redis jobs aren't filtered at claim time, so they may wait for a domain slot here
+        slot = self._domain_slots.setdefault(domain, asyncio.Semaphore(self.per_domain_limit))
+        try:
+            async with slot:
+                await self.service.process_job_payload(payload)
+            await self.queue.complete(job_id)
+            self.stats["completed"] += 1
+        except Exception as exc:
+            if await self.queue.fail(job_id, str(exc)):
+                self.stats["retried"] += 1
+                print(f"[web_ingestion] Job {job_id} failed (attempt {payload.get('attempt', 1)}), will retry: {exc}")
+            else:
+                self.stats["failed"] += 1
+                print(f"[web_ingestion] Job {job_id} failed: {exc}")
+        finally:
+            heartbeat.cancel()
+            self._active.pop(job_id, None)
+
+    async def _heartbeat(self, job_id: str):
+        interval = max(5, getattr(self.queue, "visibility_timeout", 300) / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.queue.heartbeat(job_id)
+            except Exception as exc:
+                print(f"[web_ingestion] Lease renewal failed for {job_id}: {exc}")
+
+
 # Integration with Smart Automation System
 class UrlDetectionWorkflow:
     """Workflow for automatic URL detection and processing"""
@@ -1430,24 +2201,26 @@ class UrlDetectionWorkflow:
         if not valid_urls:
             return {"urls_processed": 0, "results": []}
         
-        # Process URLs
-        results = []
-        for url in valid_urls[:3]:  # Limit to first 3 URLs to avoid overload
+        # Process URLs concurrently; the shared browser pool bounds rendering
+        async def process_url(url: str) -> Dict[str, Any]:
             try:
                 result = await self.web_service.ingest_url(url, user_id)
-                results.append({
+                return {
                     "url": url,
                     "success": result["success"],
                     "note_id": result.get("note_id"),
                     "title": result.get("title", ""),
                     "error": result.get("error")
-                })
+                }
             except Exception as e:
-                results.append({
+                return {
                     "url": url,
                     "success": False,
                     "error": str(e)
-                })
+                }
+        
+        # Limit to first 3 URLs to avoid overload
+        results = list(await asyncio.gather(*(process_url(url) for url in valid_urls[:3])))
         
         return {
             "urls_processed": len(results),
@@ -5,6 +5,7 @@ Handles webhook endpoints for Discord, Apple Shortcuts, and other external integ
 Extracted from app.py to provide clean separation of webhook processing logic.
 """
 
+import asyncio
 import json
 import secrets
 import tempfile
@@ -362,7 +363,7 @@ class WebhookService:
             
             # Process the uploaded file
             processor = FileProcessor()
-            result = processor.process_saved_file(tmp_path, file.filename or "unknown")
+            result = await asyncio.to_thread(processor.process_saved_file, tmp_path, file.filename or "unknown")
             
             if not result['success']:
                 raise HTTPException(status_code=400, detail=f"File processing failed: {result['error']}")
@@ -6,7 +6,14 @@ This module provides comprehensive WebSocket connection management with:
 - Connection health monitoring
 - User presence tracking
 - Message queuing for offline users
+- Per-connection outbound queues with their own writer tasks
 - Performance metrics
+
+Messages are serialized once and appended to each target connection's
+bounded send queue; a writer task per connection drains it, so a slow
+client only delays itself. Progress-style messages are coalesced (a newer
+one replaces a queued one with the same key) and are the first to be dropped
+when a queue fills up.
 """
 
 import asyncio
@@ -14,15 +21,168 @@ import json
 import logging
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Set, Optional, Any
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from collections import defaultdict, deque
 from dataclasses import dataclass, asdict
 
 from fastapi import WebSocket, WebSocketDisconnect
+from services.event_bus import get_event_bus
 from services.notification_service import get_notification_service, Notification
 
 logger = logging.getLogger(__name__)
 
+# Outbound messages buffered per connection before older ones are dropped
+SEND_QUEUE_SIZE = 256
+# A send that takes longer than this means the client has stopped reading
+SEND_TIMEOUT_SECONDS = 10.0
+# Event bus channels for messages that must reach sockets held by other workers
+USER_CHANNEL = "ws_user"
+BROADCAST_CHANNEL = "ws_broadcast"
+# Message types where only the latest queued one matters
+COALESCED_MESSAGE_TYPES = {'server_ping', 'presence_update', 'progress', 'processing_progress', 'status_update'}
+
+
+def _coalesce_key(message: Dict[str, Any]) -> Optional[Tuple]:
+    """Key under which a newer message replaces a queued one; None keeps every copy"""
+    explicit = message.get('coalesce_key')
+    if explicit is not None:
+        return ('explicit', str(explicit))
+    message_type = message.get('type')
+    if message_type in COALESCED_MESSAGE_TYPES:
+        note_id = message.get('note_id') or (message.get('presence') or {}).get('user_id')
+        return (message_type, note_id)
+    if message_type == 'notification':
+        notification = message.get('notification') or {}
+        task_id = (notification.get('data') or {}).get('task_id')
+        if task_id is not None and not notification.get('persistent', True):
+            return ('task_progress', str(task_id))
+    return None
+
+
+def serialize_message(message: Dict[str, Any]) -> str:
+    """Encode once for every recipient; same format as ``WebSocket.send_json``"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ConnectionSender:
+    """Bounded outbound queue for one WebSocket, drained by its own writer task."""
+
+    def __init__(self, connection_id: str, websocket: WebSocket,
+                 on_failure: Callable[[str], None],
+                 max_queue: int = SEND_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT_SECONDS):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.send_timeout = send_timeout
+        self._on_failure = on_failure
+        # Each entry is [coalesce_key, payload, enqueued_at]
+        self._queue: deque = deque()
+        self._by_key: Dict[Tuple, list] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.metrics = {
+            'sent': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'last_lag_ms': 0.0,
+            'max_lag_ms': 0.0,
+            'avg_lag_ms': 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, payload: str, coalesce_key: Optional[Tuple] = None) -> bool:
+        """Queue a serialized message; never waits on the socket"""
+        if self.closed:
+            return False
+        if coalesce_key is not None and coalesce_key in self._by_key:
+            # Keep the queue position (and its age) but send the newest content
+            self._by_key[coalesce_key][1] = payload
+            self.metrics['coalesced'] += 1
+            return True
+        if len(self._queue) >= self.max_queue:
+            self._drop_one()
+        entry = [coalesce_key, payload, time.monotonic()]
+        self._queue.append(entry)
+        if coalesce_key is not None:
+            self._by_key[coalesce_key] = entry
+        self._wakeup.set()
+        return True
+
+    def _drop_one(self):
+        """Make room: the oldest coalescable message goes first, else the oldest message"""
+        victim = next((entry for entry in self._queue if entry[0] is not None), None)
+        if victim is None:
+            victim = self._queue[0]
+        self._queue.remove(victim)
+        if victim[0] is not None:
+            self._by_key.pop(victim[0], None)
+        self.metrics['dropped'] += 1
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                key, payload, enqueued_at = self._queue.popleft()
+                if key is not None:
+                    self._by_key.pop(key, None)
+                await asyncio.wait_for(self.websocket.send_text(payload), timeout=self.send_timeout)
+                self._record_lag((time.monotonic() - enqueued_at) * 1000)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to send message to connection {self.connection_id}: {e}")
+            self.closed = True
+            self._on_failure(self.connection_id)
+
+    def _record_lag(self, lag_ms: float):
+        metrics = self.metrics
+        metrics['sent'] += 1
+        metrics['last_lag_ms'] = round(lag_ms, 2)
+        metrics['max_lag_ms'] = round(max(metrics['max_lag_ms'], lag_ms), 2)
+        # Exponential moving average so one stall doesn't dominate
+        metrics['avg_lag_ms'] = round(metrics['avg_lag_ms'] * 0.9 + lag_ms * 0.1, 2)
+
+    def current_lag_ms(self) -> float:
+        """Age of the oldest message still waiting to be sent"""
+        if not self._queue:
+            return 0.0
+        return round((time.monotonic() - self._queue[0][2]) * 1000, 2)
+
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far has been written"""
+        deadline = time.monotonic() + timeout
+        while self._queue and not self.closed:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return not self._queue
+
+    async def close(self):
+        self.closed = True
+        self._queue.clear()
+        self._by_key.clear()
+        task, self._task = self._task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, 'queue_depth': self.depth, 'current_lag_ms': self.current_lag_ms()}
+
 @dataclass
 class ConnectionInfo:
     """Information about a WebSocket connection."""
@@ -32,6 +192,7 @@ class ConnectionInfo:
     last_ping: datetime
     user_agent: Optional[str] = None
     ip_address: Optional[str] = None
+    sender: Optional[ConnectionSender] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
@@ -40,7 +201,8 @@ class ConnectionInfo:
             'connected_at': self.connected_at.isoformat(),
             'last_ping': self.last_ping.isoformat(),
             'user_agent': self.user_agent,
-            'ip_address': self.ip_address
+            'ip_address': self.ip_address,
+            'send': self.sender.get_metrics() if self.sender else None
         }
 
 @dataclass
@@ -73,6 +235,8 @@ class EnhancedConnectionManager:
             'active_connections': 0,
             'messages_sent': 0,
             'messages_queued': 0,
+            'messages_enqueued': 0,
+            'broadcasts': 0,
             'connection_errors': 0,
             'last_cleanup': datetime.now()
         }
@@ -109,14 +273,17 @@ class EnhancedConnectionManager:
             now = datetime.now()
             
             # Create connection info
+            sender = ConnectionSender(connection_id, websocket, self._on_send_failure)
             connection_info = ConnectionInfo(
                 websocket=websocket,
                 user_id=user_id,
                 connected_at=now,
                 last_ping=now,
                 user_agent=user_agent,
-                ip_address=ip_address
+                ip_address=ip_address,
+                sender=sender
             )
+            sender.start()
             
             # Store connection
             self.active_connections[connection_id] = connection_info
@@ -155,8 +322,10 @@ class EnhancedConnectionManager:
         try:
             if connection_id in self.active_connections:
                 # Remove connection
-                del self.active_connections[connection_id]
+                connection_info = self.active_connections.pop(connection_id)
                 self.user_connections[user_id].discard(connection_id)
+                if connection_info.sender is not None:
+                    self._retire_sender(connection_info.sender)
                 
                 # Clean up empty user entries
                 if not self.user_connections[user_id]:
@@ -174,24 +343,34 @@ class EnhancedConnectionManager:
         except Exception as e:
             logger.error(f"Error disconnecting {connection_id}: {e}")
     
-    async def _send_to_connection(self, connection_id: str, message: Dict[str, Any]) -> bool:
-        """Send message to a specific connection."""
-        try:
-            if connection_id in self.active_connections:
-                connection_info = self.active_connections[connection_id]
-                await connection_info.websocket.send_json(message)
-                self.stats['messages_sent'] += 1
-                return True
-        except Exception as e:
-            logger.warning(f"Failed to send message to connection {connection_id}: {e}")
-            # Connection is likely dead, remove it
-            if connection_id in self.active_connections:
-                user_id = self.active_connections[connection_id].user_id
-                await self.disconnect(connection_id, user_id)
+    def _retire_sender(self, sender: ConnectionSender):
+        """Fold a closing connection's counters into the totals and stop its writer"""
+        self.stats['messages_sent'] += sender.metrics['sent']
+        sender.metrics['sent'] = 0
+        asyncio.ensure_future(sender.close())
+    
+    def _on_send_failure(self, connection_id: str):
+        """Called by a writer whose socket failed; disconnect outside the writer"""
+        connection_info = self.active_connections.get(connection_id)
+        if connection_info is not None:
+            self.stats['connection_errors'] += 1
+            asyncio.get_running_loop().create_task(self.disconnect(connection_id, connection_info.user_id))
+    
+    def _enqueue(self, connection_id: str, payload: str, coalesce_key: Optional[Tuple]) -> bool:
+        connection_info = self.active_connections.get(connection_id)
+        if connection_info is None or connection_info.sender is None:
+            return False
+        if connection_info.sender.enqueue(payload, coalesce_key):
+            self.stats['messages_enqueued'] += 1
+            return True
         return False
     
+    async def _send_to_connection(self, connection_id: str, message: Dict[str, Any]) -> bool:
+        """Queue a message for a specific connection."""
+        return self._enqueue(connection_id, serialize_message(message), _coalesce_key(message))
+    
     async def send_to_user(self, user_id: int, message: Dict[str, Any]) -> int:
-        """Send message to all connections of a user."""
+        """Queue a message on every connection of a user."""
         if user_id not in self.user_connections:
             # User is offline, queue the message
             self.message_queue[user_id].append({
@@ -202,21 +381,29 @@ class EnhancedConnectionManager:
             logger.debug(f"Queued message for offline user {user_id}")
             return 0
         
-        sent_count = 0
-        connection_ids = list(self.user_connections[user_id])  # Create copy to avoid modification during iteration
-        
-        for connection_id in connection_ids:
-            if await self._send_to_connection(connection_id, message):
-                sent_count += 1
-        
-        return sent_count
+        payload = serialize_message(message)
+        coalesce_key = _coalesce_key(message)
+        return sum(
+            1 for connection_id in list(self.user_connections[user_id])
+            if self._enqueue(connection_id, payload, coalesce_key)
+        )
     
     async def broadcast_to_all(self, message: Dict[str, Any]) -> int:
         """Broadcast message to all connected users."""
-        sent_count = 0
-        for user_id in list(self.user_connections.keys()):
-            sent_count += await self.send_to_user(user_id, message)
-        return sent_count
+        # One encode for every socket; writers deliver concurrently
+        payload = serialize_message(message)
+        coalesce_key = _coalesce_key(message)
+        self.stats['broadcasts'] += 1
+        return sum(
+            1 for connection_id in list(self.active_connections)
+            if self._enqueue(connection_id, payload, coalesce_key)
+        )
+    
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Wait for every connection's send queue to empty (tests, shutdown)"""
+        senders = [info.sender for info in list(self.active_connections.values()) if info.sender]
+        results = await asyncio.gather(*(sender.drain(timeout) for sender in senders))
+        return all(results)
     
     async def send_notification(self, notification: Notification) -> int:
         """Send a notification via WebSocket."""
@@ -228,6 +415,47 @@ class EnhancedConnectionManager:
         
         return await self.send_to_user(notification.user_id, message)
     
+    def publish_to_user(self, user_id: int, message: Dict[str, Any]) -> bool:
+        """Send to a user's sockets in every worker process; safe from any thread"""
+        return get_event_bus().publish(USER_CHANNEL, {'user_id': user_id, 'message': message})
+    
+    def publish_broadcast(self, message: Dict[str, Any]) -> bool:
+        """Broadcast to all sockets in every worker process; safe from any thread"""
+        return get_event_bus().publish(BROADCAST_CHANNEL, {'message': message})
+    
+    async def _on_user_event(self, event: Dict[str, Any]):
+        user_id = event.get('user_id')
+        # Every worker gets the event; only the ones holding a socket for the user send it
+        if user_id in self.user_connections:
+            await self.send_to_user(user_id, event.get('message') or {})
+    
+    async def _on_broadcast_event(self, event: Dict[str, Any]):
+        await self.broadcast_to_all(event.get('message') or {})
+    
+    def attach_event_bus(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Deliver messages published by other threads and worker processes on ``loop``"""
+        loop = loop or asyncio.get_running_loop()
+        bus = get_event_bus()
+        bus.subscribe(USER_CHANNEL, self._on_user_event, loop=loop)
+        bus.subscribe(BROADCAST_CHANNEL, self._on_broadcast_event, loop=loop)
+    
+    def attach_notification_bus(self):
+        """Push notifications flushed by the notification bus to connected users.
+
+        The bus flushes from its own thread; messages go out over the event bus
+        so users connected to other worker processes get them too.
+        """
+        def deliver(batch: List[Notification]):
+            for notification in batch:
+                self.publish_to_user(notification.user_id, {
+                    'type': 'notification',
+                    'notification': notification.to_dict(),
+                    'timestamp': datetime.now().isoformat()
+                })
+        
+        get_notification_service().bus.add_listener(deliver)
+        return deliver
+    
     async def _send_queued_messages(self, user_id: int):
         """Send queued messages when user comes online."""
         if user_id in self.message_queue and self.message_queue[user_id]:
@@ -339,8 +567,14 @@ class EnhancedConnectionManager:
     
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get connection statistics."""
+        senders = [info.sender for info in self.active_connections.values() if info.sender]
         return {
             **self.stats,
+            'messages_sent': self.stats['messages_sent'] + sum(s.metrics['sent'] for s in senders),
+            'messages_dropped': sum(s.metrics['dropped'] for s in senders),
+            'messages_coalesced': sum(s.metrics['coalesced'] for s in senders),
+            'send_queue_depth': sum(s.depth for s in senders),
+            'max_send_lag_ms': max((s.current_lag_ms() for s in senders), default=0.0),
             'active_users': len(self.user_connections),
             'queued_messages': sum(len(queue) for queue in self.message_queue.values()),
             'avg_connections_per_user': (
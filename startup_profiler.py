@@ -0,0 +1,118 @@
+"""
+Startup profiler for Second Brain
+
+Records how long each module takes to import while the app boots, plus named
+startup phases (schema migration, router loading). ``install()`` runs first
+thing in app.py and ``finish()`` once startup completes; the report is served
+by ``GET /api/diagnostics/startup``.
+
+Module timings come from wrapping ``builtins.__import__``, so they cover
+``import`` statements; each entry has the cumulative time (including the
+modules it imported) and the self time (excluding them).
+"""
+
+from __future__ import annotations
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+_original_import = builtins.__import__
+_local = threading.local()
+_lock = threading.Lock()
+
+_started_at: Optional[float] = None
+_finished_at: Optional[float] = None
+_modules: Dict[str, Dict[str, float]] = {}
+_phases: Dict[str, float] = {}
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Relative and already-loaded imports are dictionary lookups; skip the bookkeeping
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        if name in sys.modules:
+            with _lock:
+                _modules.setdefault(name, {"cumulative_ms": round(elapsed, 2),
+                                           "self_ms": round(elapsed - children, 2)})
+
+
+def install() -> None:
+    """Start timing imports; call before the app's own imports"""
+    global _started_at, _finished_at
+    if builtins.__import__ is _timed_import:
+        return
+    _started_at = time.perf_counter()
+    _finished_at = None
+    builtins.__import__ = _timed_import
+
+
+def finish() -> None:
+    """Stop timing imports and freeze the total startup time"""
+    global _finished_at
+    if builtins.__import__ is _timed_import:
+        builtins.__import__ = _original_import
+    if _started_at is not None and _finished_at is None:
+        _finished_at = time.perf_counter()
+
+
+def record(name: str, elapsed_ms: float) -> None:
+    """Record a named phase; repeated names accumulate"""
+    with _lock:
+        _phases[name] = round(_phases.get(name, 0.0) + elapsed_ms, 2)
+
+
+@contextmanager
+def phase(name: str):
+    """Time the enclosed block as a startup phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def report(top: int = 30) -> Dict[str, Any]:
+    """Slowest imports, per-package totals and startup phases"""
+    with _lock:
+        modules = dict(_modules)
+        phases = dict(_phases)
+
+    # Per top-level package: sum of self times, so nested imports aren't double counted
+    packages: Dict[str, float] = {}
+    for name, timing in modules.items():
+        package = name.split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + timing["self_ms"]
+
+    slowest: List[Dict[str, Any]] = [
+        {"module": name, **timing}
+        for name, timing in sorted(modules.items(), key=lambda item: item[1]["cumulative_ms"], reverse=True)[:top]
+    ]
+    end = _finished_at if _finished_at is not None else time.perf_counter()
+    return {
+        "profiling": builtins.__import__ is _timed_import,
+        "total_ms": round((end - _started_at) * 1000, 2) if _started_at is not None else None,
+        "modules_imported": len(modules),
+        "phases": phases,
+        "slowest_imports": slowest,
+        "packages": [
+            {"package": name, "self_ms": round(ms, 2)}
+            for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+    }
@@ -2,12 +2,12 @@ import sqlite3
 import time
 from datetime import datetime
 from typing import Optional
-import asyncio
 
 from llm_utils import ollama_summarize, ollama_generate_title
 from config import settings
 from audio_utils import transcribe_audio
 from services.audio_queue import audio_queue
+from services.processing_status import ProcessingStatusStore
 try:
     # Optional realtime status broadcasting
     from realtime_status import status_manager  # type: ignore
@@ -18,51 +18,35 @@ except Exception:
 # Import notification functions
 try:
     from services.notification_service import (
-        notify_processing_started, 
-        notify_processing_completed, 
-        notify_processing_failed,
-        notify_note_created
+        get_notification_service,
+        processing_started_notification,
+        processing_completed_notification,
+        processing_failed_notification,
     )
     from services.websocket_manager import get_connection_manager
     _NOTIFICATIONS_AVAILABLE = True
 except ImportError:
     _NOTIFICATIONS_AVAILABLE = False
 
-def _send_notification_sync(coro):
-    """Helper to run async notification functions in sync context"""
+def _publish_notification(notification):
+    """Queue a notification on the batched bus; no event loop needed"""
     if not _NOTIFICATIONS_AVAILABLE:
         return
     try:
-        # Try to get existing event loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If loop is already running, create a task
-            asyncio.create_task(coro)
-        else:
-            # If no loop is running, run the coroutine
-            loop.run_until_complete(coro)
-    except RuntimeError:
-        # No event loop, create new one
-        try:
-            asyncio.run(coro)
-        except Exception as e:
-            print(f"Failed to send notification: {e}")
+        get_notification_service().publish(notification)
+    except Exception as e:
+        print(f"Failed to send notification: {e}")
 
 def _send_websocket_notification_sync(user_id: int, notification_data: dict):
     """Helper to send WebSocket notification synchronously"""
     if not _NOTIFICATIONS_AVAILABLE:
         return
     try:
-        manager = get_connection_manager()
-        
-        async def send_notification():
-            await manager.send_to_user(user_id, {
-                'type': 'notification',
-                'notification': notification_data,
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        _send_notification_sync(send_notification())
+        get_connection_manager().publish_to_user(user_id, {
+            'type': 'notification',
+            'notification': notification_data,
+            'timestamp': datetime.now().isoformat()
+        })
     except Exception as e:
         print(f"Failed to send WebSocket notification: {e}")
 
@@ -82,6 +66,9 @@ def get_conn():
     return sqlite3.connect(str(settings.db_path))
 
 
+_processing_status = ProcessingStatusStore(get_conn)
+
+
 def process_note(note_id: int):
     conn = get_conn()
     c = conn.cursor()
@@ -101,7 +88,7 @@ def process_note(note_id: int):
     # Send processing started notification
     if user_id:
         task_type = "audio transcription" if note_type == "audio" else "note processing"
-        _send_notification_sync(notify_processing_started(
+        _publish_notification(processing_started_notification(
             user_id=user_id,
             task_type=task_type,
             task_id=str(note_id)
@@ -116,8 +103,7 @@ def process_note(note_id: int):
             if _REALTIME:
                 # Best-effort broadcast; ignore errors
                 try:
-                    import asyncio
-                    asyncio.run(status_manager.emit_progress(note_id, "transcribing", 10, "Starting transcription"))
+                    status_manager.report_progress(note_id, "transcribing", 10, "Starting transcription")
                 except Exception:
                     pass
         except Exception:
@@ -125,17 +111,17 @@ def process_note(note_id: int):
 
         def _on_progress(done: int, total: int):
             pct = 10 + int((done / max(total, 1)) * 70)
+            message = f"Segment {done}/{total}"
             try:
-                c2 = get_conn().cursor()
-                c2.execute("UPDATE notes SET status=? WHERE id=?", (f"transcribing:{pct}", note_id))
-                c2.connection.commit()
-                c2.connection.close()
+                # Ticks go to note_processing_status, not notes, so FTS isn't re-indexed
                 if _REALTIME:
                     try:
-                        import asyncio
-                        asyncio.run(status_manager.emit_progress(note_id, "transcribing", pct, f"Segment {done}/{total}"))
+                        # Reaches SSE clients in every worker via the event bus
+                        status_manager.report_progress(note_id, "transcribing", pct, message)
+                        return
                     except Exception:
                         pass
+                _processing_status.set(note_id, "transcribing", pct, message)
             except Exception:
                 pass
 
@@ -163,10 +149,8 @@ def process_note(note_id: int):
         "UPDATE notes SET title=?, content=?, summary=?, tags=?, actions=?, status='complete', timestamp=?, audio_filename=? WHERE id=?",
         (title, content, summary, tags, actions, now, audio_filename, note_id),
     )
-    c.execute(
-        "INSERT INTO notes_fts(rowid, title, body, tags) VALUES (?, ?, ?, ?)",
-        (note_id, title, content, tags),
-    )
+    # The note_index triggers queue the note for re-indexing
+    _processing_status.clear(note_id, conn=conn)
     conn.commit()
     conn.close()
     
@@ -182,7 +166,7 @@ def process_note(note_id: int):
             "tags_count": len([t for t in tags.split(",") if t.strip()]),
             "summary": summary[:100] + "..." if len(summary) > 100 else summary
         }
-        _send_notification_sync(notify_processing_completed(
+        _publish_notification(processing_completed_notification(
             user_id=user_id,
             task_type=task_type,
             task_id=str(note_id),
@@ -218,7 +202,7 @@ def run_worker(poll_interval: int = 5):
                     
                     # Send processing failed notification
                     if user_id:
-                        _send_notification_sync(notify_processing_failed(
+                        _publish_notification(processing_failed_notification(
                             user_id=user_id,
                             task_type="note processing",
                             task_id=str(note_id),
@@ -248,7 +232,7 @@ def process_audio_queue():
         
         # Send processing failed notification
         if user_id:
-            _send_notification_sync(notify_processing_failed(
+            _publish_notification(processing_failed_notification(
                 user_id=user_id,
                 task_type="note processing",
                 task_id=str(note_id),
@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from services.background_supervisor import BackgroundServiceSupervisor
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "leases.db"
+    return lambda: sqlite3.connect(db_path)
+
+
+def _worker(get_conn, name, lease_seconds=0.3):
+    supervisor = BackgroundServiceSupervisor(get_conn, lease_seconds=lease_seconds, renew_interval=0.02)
+    supervisor.holder = name
+    return supervisor
+
+
+async def _wait_for(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+@pytest.mark.asyncio
+async def test_one_worker_runs_the_loop_and_another_takes_over_after_a_crash(get_conn):
+    running = set()
+
+    def make_loop(worker_name):
+        async def loop():
+            running.add(worker_name)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                running.discard(worker_name)
+        return loop
+
+    workers = {name: _worker(get_conn, name) for name in ("w1", "w2", "w3")}
+    for name, supervisor in workers.items():
+        supervisor.register("job_worker", make_loop(name))
+
+    assert await _wait_for(lambda: len(running) == 1)
+    await asyncio.sleep(0.1)
+    assert len(running) == 1
+    leader = next(iter(running))
+    status = workers[leader].status()["services"]["job_worker"]
+    assert status["leader"] and status["state"] == "running" and status["active_holders"] == 1
+
+    # Simulate a crashed worker: its supervisor stops renewing and the loop dies with it
+    crashed = workers.pop(leader)
+    crashed._loop_task.cancel()
+    crashed._services["job_worker"].task.cancel()
+
+    assert await _wait_for(lambda: len(running) == 1 and leader not in running)
+    for supervisor in workers.values():
+        await supervisor.stop()
+    assert running == set()
+
+
+@pytest.mark.asyncio
+async def test_replicas_and_lease_handoff_on_shutdown(get_conn):
+    started = []
+
+    async def one_shot():
+        started.append(1)
+
+    first, second = _worker(get_conn, "w1", lease_seconds=30), _worker(get_conn, "w2", lease_seconds=30)
+    first.register("job_worker", one_shot, replicas=2)
+    second.register("job_worker", one_shot, replicas=2)
+    assert await _wait_for(lambda: len(started) == 2)
+
+    first.register("audio_worker", one_shot)
+    second.register("audio_worker", one_shot)
+    assert await _wait_for(lambda: len(started) == 3)
+    audio_leader, standby = (first, second) if first._services["audio_worker"].is_leader else (second, first)
+    assert standby.status()["services"]["audio_worker"]["state"] == "standby"
+
+    # A clean shutdown releases the lease at once instead of waiting 30s for expiry
+    await audio_leader.stop()
+    assert await _wait_for(lambda: standby._services["audio_worker"].is_leader)
+    await standby.stop()
@@ -0,0 +1,90 @@
+import pytest
+
+import services.browser_pool as browser_pool
+from services.browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.launched = []
+        self.chromium = self
+
+    async def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    fake = FakePlaywright()
+    monkeypatch.setattr(browser_pool, "PLAYWRIGHT_AVAILABLE", True)
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: fake, raising=False)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_browsers_and_recycles(fake_playwright):
+    pool = BrowserPool(size=1, max_pages_per_browser=3)
+
+    for _ in range(3):
+        async with pool.page():
+            pass
+    assert len(fake_playwright.launched) == 1
+    assert all(c.closed for c in fake_playwright.launched[0].contexts)
+    # Page limit reached, so the browser was closed and the next page relaunches
+    assert not fake_playwright.launched[0].connected
+
+    async with pool.page():
+        pass
+    assert len(fake_playwright.launched) == 2
+    assert pool.get_stats()["recycles"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_relaunches_crashed_browser(fake_playwright):
+    pool = BrowserPool(size=1)
+    async with pool.page():
+        pass
+    fake_playwright.launched[0].connected = False
+
+    async with pool.page():
+        pass
+    assert len(fake_playwright.launched) == 2
+    assert pool.get_stats()["crashes"] == 1
+    await pool.close()
@@ -0,0 +1,116 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.content_deduplication_service import ContentDeduplicationService
+
+BASE_TEXT = (
+    "Meeting notes from the quarterly planning session. We agreed to migrate the "
+    "ingestion workers to the new queue, review storage quotas for heavy users, "
+    "and schedule a follow up with the design team about the capture flow on mobile."
+)
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "dedup.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, title TEXT, content TEXT, content_hash TEXT,
+            user_id INTEGER, created_at TEXT, updated_at TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(db_path)
+
+
+def _add_note(get_conn, note_id, content, user_id=1, days_ago=0):
+    conn = get_conn()
+    conn.execute(
+        "INSERT INTO notes (id, title, content, user_id, created_at) VALUES (?, ?, ?, ?, ?)",
+        (note_id, f"Note {note_id}", content, user_id,
+         (datetime.now() - timedelta(days=days_ago)).isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_indexed_match_finds_old_near_duplicate_beyond_recent_window(get_conn):
+    service = ContentDeduplicationService(get_conn)
+    _add_note(get_conn, 1, BASE_TEXT, days_ago=200)
+    for note_id in range(2, 80):
+        _add_note(get_conn, note_id, f"Unrelated entry {note_id} about groceries and errands number {note_id}")
+
+    service.backfill_index()
+
+    edited = BASE_TEXT.replace("quarterly", "quarterly roadmap")
+    result = service.check_for_duplicates("Note 1", edited, user_id=1, window_days=0)
+
+    assert result.is_duplicate and result.match_type == "fuzzy"
+    assert result.existing_note_id == 1
+    assert result.similarity_score >= 0.85
+
+    # The old scan only looks at the 50 most recent notes
+    legacy = service.check_for_duplicates("Note 1", edited, user_id=1, window_days=0, use_index=False)
+    assert not legacy.is_duplicate
+
+
+def test_index_is_scoped_per_user_and_cleaned_on_delete(get_conn):
+    service = ContentDeduplicationService(get_conn)
+    _add_note(get_conn, 1, BASE_TEXT, user_id=2)
+    service.backfill_index()
+    assert not service.check_for_duplicates("Note 1", BASE_TEXT + " extra", user_id=1).is_duplicate
+
+    _add_note(get_conn, 2, BASE_TEXT, user_id=1)
+    service.backfill_index()
+    assert service.check_for_duplicates("Note 2", BASE_TEXT + " extra", user_id=1).existing_note_id == 2
+
+    conn = get_conn()
+    conn.execute("DELETE FROM notes WHERE id = 2")
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM note_minhash_bands WHERE note_id = 2").fetchone()[0] == 0
+    conn.close()
+    assert not service.check_for_duplicates("Note 2", BASE_TEXT + " extra", user_id=1).is_duplicate
+
+
+def test_backfill_indexes_each_note_once(get_conn):
+    _add_note(get_conn, 1, BASE_TEXT)
+    _add_note(get_conn, 2, "short")
+    service = ContentDeduplicationService(get_conn)
+
+    assert service.backfill_index() == 2
+    assert service.backfill_index() == 0
+
+
+def test_edited_note_is_dropped_from_index_until_reindexed(get_conn):
+    service = ContentDeduplicationService(get_conn)
+    _add_note(get_conn, 1, BASE_TEXT)
+    service.backfill_index()
+    assert service.check_for_duplicates("Note 1", BASE_TEXT + " extra", user_id=1).is_duplicate
+
+    conn = get_conn()
+    conn.execute("UPDATE notes SET content = ? WHERE id = 1", ("A grocery list: eggs, milk, bread and coffee",))
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM note_minhash WHERE note_id = 1").fetchone()[0] == 0
+    conn.close()
+
+    assert service.backfill_index() == 1
+    assert not service.check_for_duplicates("Note 1", BASE_TEXT + " extra", user_id=1).is_duplicate
+
+
+def test_empty_notes_get_a_sentinel_and_are_not_rescanned(get_conn):
+    conn = get_conn()
+    conn.execute("INSERT INTO notes (id, title, content, user_id) VALUES (1, '', '   ', 1)")
+    conn.commit()
+    conn.close()
+    service = ContentDeduplicationService(get_conn)
+
+    service.backfill_index()
+    conn = get_conn()
+    assert conn.execute("SELECT signature FROM note_minhash WHERE note_id = 1").fetchone()[0] == b""
+    assert conn.execute("SELECT COUNT(*) FROM note_minhash_bands WHERE note_id = 1").fetchone()[0] == 0
+    conn.close()
+    assert service.backfill_index() == 0
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from db_writer import BatchedWriter, WebLoadMonitor
+
+
+@pytest.fixture
+def writer():
+    fd, path = tempfile.mkstemp(suffix=".db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+
+    w = BatchedWriter(path)
+    yield w
+
+    w.stop()
+    os.close(fd)
+    os.unlink(path)
+
+
+def test_writes_are_committed_in_batches(writer):
+    futures = [writer.execute("INSERT INTO items (name) VALUES (?)", (f"n{i}",)) for i in range(50)]
+    assert writer.flush(timeout=5)
+    assert all(f.result() == 1 for f in futures)
+
+    conn = sqlite3.connect(writer.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 50
+    conn.close()
+    assert writer.get_stats()['batches'] < 50
+
+
+def test_failing_op_does_not_roll_back_neighbours(writer):
+    ok = writer.execute("INSERT INTO items (name) VALUES ('a')")
+    dup = writer.execute("INSERT INTO items (name) VALUES ('a')")
+    after = writer.execute("INSERT INTO items (name) VALUES ('b')")
+
+    assert ok.result(timeout=5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        dup.result(timeout=5)
+    assert after.result(timeout=5) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_submit_returns_awaitable_futures(writer):
+    futures = [await writer.execute_async("INSERT INTO items (name) VALUES (?)", (f"a{i}",)) for i in range(20)]
+    assert sum(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))) == 20
+
+
+def test_web_load_monitor_reports_busy():
+    monitor = WebLoadMonitor()
+    assert not monitor.is_busy(max_in_flight=2, max_rps=100)
+    monitor.request_started()
+    monitor.request_started()
+    assert monitor.is_busy(max_in_flight=2, max_rps=100)
+    monitor.request_finished()
+    assert not monitor.is_busy(max_in_flight=2, max_rps=100)
@@ -0,0 +1,60 @@
+import fitz
+import pytest
+
+import document_extraction
+from document_extraction import DocumentExtractor
+
+
+def _make_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.fixture
+def text_pdf(tmp_path):
+    path = tmp_path / "book.pdf"
+    _make_pdf(path, [f"Chapter {n} covers the text layer extraction path in detail." for n in range(1, 10)])
+    return path
+
+
+def test_pages_stream_in_order_from_process_pool(tmp_path, text_pdf):
+    extractor = DocumentExtractor(max_workers=2, cache_dir=tmp_path / "cache", pages_per_task=2)
+    seen = []
+    try:
+        text, metadata = extractor.extract_pdf(text_pdf, on_page=lambda page, total: seen.append((page.page_number, total)))
+    finally:
+        extractor.shutdown()
+
+    assert seen == [(n, 9) for n in range(1, 10)]
+    assert metadata["pages"] == 9 and metadata["page_methods"] == {"text": 9}
+    assert text.index("Chapter 1 ") < text.index("Chapter 9 ")
+
+
+def test_results_are_cached_by_checksum(tmp_path, text_pdf, monkeypatch):
+    extractor = DocumentExtractor(max_workers=0, cache_dir=tmp_path / "cache")
+    first_text, _ = extractor.extract_pdf(text_pdf)
+
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(text_pdf.read_bytes())
+    monkeypatch.setattr(document_extraction, "extract_page_range", lambda *a, **k: pytest.fail("cache miss"))
+    text, metadata = extractor.extract_pdf(copy)
+
+    assert text == first_text
+    assert metadata["cache_hit"] is True
+
+
+def test_only_pages_without_text_layer_are_ocrd(tmp_path, monkeypatch):
+    path = tmp_path / "mixed.pdf"
+    _make_pdf(path, ["This page has a perfectly good text layer to read.", None])
+    monkeypatch.setattr(document_extraction, "OCR_AVAILABLE", True)
+    monkeypatch.setattr(document_extraction, "_ocr_pixmap", lambda page, dpi: "scanned words")
+
+    pages = list(DocumentExtractor(max_workers=0, cache_dir=tmp_path / "cache").iter_pdf_pages(path))
+
+    assert [(p.page_number, p.method) for p in pages] == [(1, "text"), (2, "ocr")]
+    assert pages[1].text == "scanned words"
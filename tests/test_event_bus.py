@@ -0,0 +1,86 @@
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from services.event_bus import EventBus
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def buses(tmp_path):
+    path = tmp_path / "events.db"
+    created = []
+
+    def make():
+        bus = EventBus(path, poll_interval=0.005)
+        created.append(bus)
+        return bus
+
+    yield make
+    for bus in created:
+        bus.close()
+
+
+def test_events_reach_other_buses_once_and_in_order(buses):
+    publisher, worker = buses(), buses()
+    local, remote = [], []
+    publisher.subscribe("note_status", local.append)
+    worker.subscribe("note_status", remote.append)
+    worker.subscribe("other", lambda payload: remote.append(("other", payload)))
+
+    for pct in (10, 20, 30):
+        publisher.publish("note_status", {"note_id": 1, "progress": pct})
+
+    assert [e["progress"] for e in local] == [10, 20, 30]
+    assert _wait_for(lambda: len(remote) == 3)
+    assert [e["progress"] for e in remote] == [10, 20, 30]
+    time.sleep(0.05)
+    # Own events are not redelivered by the poller
+    assert len(local) == 3
+    assert worker.stats["delivered_remote"] == 3
+
+
+@pytest.mark.asyncio
+async def test_async_subscriber_runs_on_its_loop(buses):
+    publisher, worker = buses(), buses()
+    loop = asyncio.get_running_loop()
+    received = asyncio.Queue()
+
+    async def on_event(payload):
+        assert asyncio.get_running_loop() is loop
+        await received.put(payload)
+
+    worker.subscribe("ws_user", on_event, loop=loop)
+    # Published from a plain thread, as tasks.process_note does
+    threading.Thread(target=publisher.publish, args=("ws_user", {"user_id": 5})).start()
+    assert await asyncio.wait_for(received.get(), timeout=2) == {"user_id": 5}
+
+
+def test_events_cross_process_boundaries(buses, tmp_path):
+    worker = buses()
+    received = []
+    worker.subscribe("note_status", received.append)
+
+    script = (
+        "import sys; from pathlib import Path; "
+        "from services.event_bus import EventBus; "
+        "EventBus(Path(sys.argv[1])).publish('note_status', {'note_id': 9, 'stage': 'complete'})"
+    )
+    subprocess.run([sys.executable, "-c", script, str(tmp_path / "events.db")], cwd=ROOT, check=True)
+
+    assert _wait_for(lambda: received == [{"note_id": 9, "stage": "complete"}])
@@ -1,4 +1,5 @@
 import pytest
+import re
 import sqlite3
 import tempfile
 import os
@@ -197,3 +198,87 @@ def test_end_conversation(temp_db):
     cursor.execute("SELECT ended_at FROM conversation_sessions WHERE session_id = ?", (session_id,))
     ended_at = cursor.fetchone()[0]
     assert ended_at is not None
+
+
+class ConceptEmbeddings:
+    """Maps words onto a few concepts, so paraphrases land close together"""
+
+    CONCEPTS = {"dog": 0, "puppy": 0, "canine": 0, "coffee": 1, "espresso": 1, "python": 2, "code": 2}
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, text):
+        self.calls += 1
+        vec = [0.0] * 4
+        for word in re.findall(r"[a-z]+", text.lower()):
+            if word in self.CONCEPTS:
+                vec[self.CONCEPTS[word]] += 1.0
+        return vec
+
+    def embed_query(self, text):
+        return self.embed(text)
+
+
+@pytest.fixture
+def vector_db(temp_db):
+    with open('db/migrations/016_memory_vectors.sql', 'r') as f:
+        temp_db.executescript(f.read())
+    return temp_db
+
+
+def test_hybrid_recall_finds_paraphrases_and_tolerates_punctuation(vector_db):
+    memory = MemoryService(vector_db, embeddings_service=ConceptEmbeddings())
+    puppy = memory.add_semantic_memory(1, "User adopted a puppy", "context", 0.9)
+    memory.add_semantic_memory(1, "User drinks espresso", "preference", 0.9)
+    memory.add_semantic_memory(2, "Other user has a dog", "context", 0.9)
+
+    # No word in common with the fact: only the vector ranking finds it
+    results = memory.search_semantic(1, "what's my dog's name? (AND NOT \"", limit=1)
+    assert [r['fact_id'] for r in results] == [puppy]
+    assert results[0]['rank'] is None and results[0]['score'] > 0
+
+    # Matching both ways beats matching one way
+    memory.add_semantic_memory(1, "User walks the puppy daily", "context", 0.9)
+    assert memory.search_semantic(1, "puppy", limit=3)[0]['fact'] in {"User adopted a puppy", "User walks the puppy daily"}
+    assert memory.search_semantic(1, "dog", category="preference") == []
+
+
+def test_importance_and_recency_weight_fused_scores(vector_db):
+    memory = MemoryService(vector_db, embeddings_service=ConceptEmbeddings())
+    old = memory.add_episodic_memory(1, "Talked about python code", "python session", 0.9)
+    vector_db.execute("UPDATE episodic_memories SET created_at = datetime('now', '-120 days') WHERE episode_id = ?", (old,))
+    vector_db.commit()
+    recent = memory.add_episodic_memory(1, "Talked about python code", "python session", 0.9)
+    minor = memory.add_episodic_memory(1, "Talked about python code", "python session", 0.1)
+
+    results = memory.search_episodic(1, "python", limit=3)
+    assert [r['episode_id'] for r in results] == [recent, minor, old]
+    assert memory.search_episodic(1, "python", min_importance=0.5, limit=3)[0]['episode_id'] == recent
+
+
+def test_vector_matrices_reload_only_when_memories_change(vector_db):
+    from services.memory_vectors import memory_vectors
+
+    memory = MemoryService(vector_db, embeddings_service=ConceptEmbeddings())
+    fact_id = memory.add_semantic_memory(1, "User adopted a puppy", "context", 0.9)
+    memory.search_semantic(1, "canine")
+    loads = memory_vectors.get_stats()["loads"]
+    memory.search_semantic(1, "canine")
+    assert memory_vectors.get_stats()["loads"] == loads
+
+    # Re-embedded on update, dropped on delete
+    memory.update_semantic_memory(fact_id, fact="User drinks espresso")
+    assert memory.search_semantic(1, "canine") == []
+    assert memory_vectors.get_stats()["loads"] == loads + 1
+    memory.delete_semantic_memory(fact_id)
+    assert memory.search_semantic(1, "coffee") == []
+
+
+def test_query_embeddings_are_cached():
+    from services.embeddings import Embeddings
+
+    embeddings = Embeddings(provider='none', dim=8)
+    first = embeddings.embed_query("  dog walking ")
+    embeddings.embed = lambda text: pytest.fail("query should have been cached")
+    assert embeddings.embed_query("dog walking") == first
@@ -0,0 +1,222 @@
+import sqlite3
+
+import pytest
+
+from services import note_index
+from services.note_index import (
+    NOTE_MATCHES_CTE,
+    NOTE_SNIPPET_SQL,
+    NoteIndexService,
+    compile_fts_query,
+    ensure_note_index_schema,
+    fts_rebuild_needed,
+    split_chunks,
+)
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "index.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT, body TEXT, content TEXT, tags TEXT, status TEXT);
+        -- Legacy layout: two note-level indexes and an unused chunk index
+        CREATE VIRTUAL TABLE notes_fts USING fts5(title, body, tags, content='notes', content_rowid='id');
+        CREATE VIRTUAL TABLE notes_fts5 USING fts5(title, content);
+        CREATE TRIGGER notes_ai AFTER INSERT ON notes BEGIN
+          INSERT INTO notes_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, new.tags);
+        END;
+        INSERT INTO notes (id, title, body, tags) VALUES (1, 'Roadmap', 'quarterly planning', 'work');
+    """)
+    ensure_note_index_schema(conn)
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(db_path)
+
+
+def _search(conn, query):
+    return conn.execute(
+        f"WITH {NOTE_MATCHES_CTE} SELECT id, {NOTE_SNIPPET_SQL} FROM note_matches ORDER BY kw_rank",
+        {"match": query},
+    ).fetchall()
+
+
+def test_legacy_indexes_are_replaced_and_existing_notes_queued(get_conn):
+    conn = get_conn()
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert not names & {"notes_fts", "notes_fts5", "notes_ai"}
+    assert {"note_index_ai", "note_index_au", "note_index_ad"} <= names
+    assert NoteIndexService(get_conn).sync() == 1
+    assert [row[0] for row in _search(conn, "quarterly")] == [1]
+    conn.close()
+
+
+def test_writes_only_queue_and_sync_indexes_in_batches(get_conn):
+    index = NoteIndexService(get_conn, batch_size=2)
+    index.sync()
+    conn = get_conn()
+    conn.executemany(
+        "INSERT INTO notes (id, title, body, tags) VALUES (?, ?, ?, '')",
+        [(i, f"Note {i}", f"meeting notes {i}") for i in range(2, 7)],
+    )
+    # A status-only update is not an indexed column
+    conn.execute("UPDATE notes SET status = 'complete' WHERE id = 1")
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM note_index_queue").fetchone()[0] == 5
+    assert _search(conn, "meeting") == []
+
+    assert index.sync(limit=3) == 3
+    assert index.sync() == 2
+    assert index.stats["batches"] == 4
+    assert len(_search(conn, "meeting")) == 5
+
+    # Edits re-index, deletes drop the note's chunks; content stands in for an empty body
+    conn.execute("UPDATE notes SET body = '', content = 'voice memo transcript' WHERE id = 2")
+    conn.execute("DELETE FROM notes WHERE id = 3")
+    conn.commit()
+    index.sync()
+    assert [row[0] for row in _search(conn, "transcript")] == [2]
+    assert {row[0] for row in _search(conn, "meeting")} == {4, 5, 6}
+    assert conn.execute("SELECT COUNT(*) FROM note_chunks WHERE note_id = 3").fetchone()[0] == 0
+    assert index.get_stats()["pending"] == 0
+    conn.close()
+
+
+def test_search_sync_is_bounded_and_skips_while_the_write_lock_is_held(get_conn, monkeypatch):
+    monkeypatch.setattr(note_index, "SEARCH_SYNC_LIMIT", 2)
+    index = NoteIndexService(get_conn)
+    index.sync()
+    conn = get_conn()
+    conn.executemany(
+        "INSERT INTO notes (id, title, body, tags) VALUES (?, ?, ?, '')",
+        [(i, f"Note {i}", f"meeting notes {i}") for i in range(2, 7)],
+    )
+    conn.commit()
+
+    writer = sqlite3.connect(conn.execute("PRAGMA database_list").fetchone()[2], timeout=5)
+    writer.execute("BEGIN IMMEDIATE")
+    search_conn = get_conn()
+    assert index.sync_for_search(conn=search_conn) == 0
+    # The caller's busy timeout is restored afterwards
+    assert search_conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    writer.rollback()
+    writer.close()
+
+    assert index.sync_for_search(conn=search_conn) == 2
+    assert conn.execute("SELECT COUNT(*) FROM note_index_queue").fetchone()[0] == 3
+    search_conn.close()
+    conn.close()
+
+
+def test_long_notes_roll_up_to_their_best_chunk(get_conn):
+    index = NoteIndexService(get_conn, chunk_chars=60)
+    body = "\n\n".join([
+        "intro paragraph about gardening and soil",
+        "tomatoes need sun, tomatoes need water, tomatoes need stakes",
+        "closing words on compost",
+    ])
+    conn = get_conn()
+    conn.execute("INSERT INTO notes (id, title, body, tags) VALUES (2, 'Garden', ?, '')", (body,))
+    conn.commit()
+    index.sync()
+
+    assert conn.execute("SELECT COUNT(*) FROM note_chunks WHERE note_id = 2").fetchone()[0] == 3
+    rows = _search(conn, "tomatoes")
+    assert len(rows) == 1 and rows[0][0] == 2
+    assert "<b>tomatoes</b>" in rows[0][1]
+    # A title hit matches every chunk of the note but still returns the note once
+    assert [row[0] for row in _search(conn, "garden")] == [2]
+
+    assert index.rebuild() == 2
+    assert [row[0] for row in _search(conn, "tomatoes")] == [2]
+    conn.close()
+
+
+def test_split_chunks_packs_paragraphs_and_splits_long_ones():
+    assert split_chunks("short") == ["short"]
+    chunks = split_chunks("word " * 50, max_chars=40)
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks).split() == ["word"] * 50
+
+
+def test_compile_fts_query_uses_and_near_instead_of_phrases():
+    assert compile_fts_query("meeting notes") == 'NEAR("meeting" "notes", 10) OR ("meeting" AND "notes")'
+    assert compile_fts_query('"exact phrase" budget*') == (
+        'NEAR("exact phrase" "budget"*, 10) OR ("exact phrase" AND "budget"*)'
+    )
+    assert compile_fts_query("roadmap OR planning") == '"roadmap" OR "planning"'
+    assert compile_fts_query("proj", prefix_last=True) == '"proj"*'
+    # FTS5 syntax in user input is quoted, not interpreted
+    assert compile_fts_query('AND (col: x-ray) "scan') == (
+        'NEAR("AND" "col" "x ray" "scan", 10) OR ("AND" AND "col" AND "x ray" AND "scan")'
+    )
+    assert compile_fts_query("  ") == "" and compile_fts_query("a") == ""
+
+
+def test_tokenizer_stems_folds_diacritics_and_weights_titles(get_conn):
+    index = NoteIndexService(get_conn)
+    conn = get_conn()
+    conn.executemany("INSERT INTO notes (id, title, body, tags) VALUES (?, ?, ?, '')", [
+        (2, "Café opening", "planning the menu"),
+        (3, "Groceries", "the cafe needs planned deliveries and more of the opening stock"),
+    ])
+    conn.commit()
+    index.sync()
+
+    # Porter stemming and diacritic folding; the title hit ranks first
+    assert [row[0] for row in _search(conn, compile_fts_query("cafe opening"))] == [2, 3]
+    assert {row[0] for row in _search(conn, compile_fts_query("plans"))} == {1, 2, 3}
+    # Terms no longer need to be adjacent
+    assert [row[0] for row in _search(conn, compile_fts_query("menu café"))] == [2]
+    conn.close()
+
+
+def test_online_rebuild_swaps_in_new_options_and_replays_concurrent_changes(get_conn, monkeypatch):
+    index = NoteIndexService(get_conn)
+    conn = get_conn()
+    conn.executemany(
+        "INSERT INTO notes (id, title, body, tags) VALUES (?, ?, ?, '')",
+        [(i, f"Note {i}", f"running notes {i}") for i in range(2, 12)],
+    )
+    conn.commit()
+    index.sync()
+
+    monkeypatch.setattr(note_index.settings, "search_fts_tokenizer", "unicode61")
+    monkeypatch.setattr(note_index.settings, "search_fts_prefix", "")
+    assert fts_rebuild_needed(conn)
+
+    # A rebuild interrupted after copying every chunk so far
+    build = get_conn()
+    build.execute("BEGIN IMMEDIATE")
+    build.execute(note_index.fts_table_sql(note_index.FTS_BUILD_TABLE))
+    build.execute(
+        "INSERT INTO note_index_swap (id, options, watermark, started_at) VALUES (1, ?, 0, 0)",
+        (note_index.fts_options(),),
+    )
+    rows = build.execute("SELECT id, title, tags, text FROM note_chunks ORDER BY id").fetchall()
+    build.executemany(f"INSERT INTO {note_index.FTS_BUILD_TABLE}(rowid, title, tags, text) VALUES (?, ?, ?, ?)", rows)
+    build.execute("UPDATE note_index_swap SET watermark = ?", (rows[-1][0],))
+    build.commit()
+    build.close()
+
+    # Edits and deletes behind the copy watermark, plus a new note ahead of it
+    conn.execute("UPDATE notes SET body = 'walking notes' WHERE id = 2")
+    conn.execute("DELETE FROM notes WHERE id = 3")
+    conn.execute("INSERT INTO notes (id, title, body, tags) VALUES (20, 'Late', 'running late', '')")
+    conn.commit()
+    index.sync()
+    # The live table kept serving searches during the build
+    assert {row[0] for row in _search(conn, '"walking"')} == {2}
+
+    result = index.rebuild_online()
+    assert result["status"] == "swapped" and result["replayed"] >= 2
+    assert not fts_rebuild_needed(conn)
+    assert "porter" not in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'note_chunks_fts'"
+    ).fetchone()[0]
+    # No stemming under unicode61: "running" no longer matches "run"
+    assert _search(conn, '"run"') == []
+    assert {row[0] for row in _search(conn, '"running"')} == set(range(4, 12)) | {20}
+    assert [row[0] for row in _search(conn, '"walking"')] == [2]
+    conn.execute("INSERT INTO note_chunks_fts(note_chunks_fts) VALUES ('integrity-check')")
+    conn.close()
@@ -0,0 +1,116 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+
+import numpy as np
+import pytest
+
+from embedding_manager import EmbeddingManager
+from note_relationships import NoteRelationshipEngine
+
+
+@pytest.fixture
+def db_path():
+    """Temporary database with notes and embeddings tables"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, title TEXT, summary TEXT, tags TEXT,
+            content TEXT, timestamp TEXT, type TEXT, user_id INTEGER
+        )
+    """)
+    with open('db/migrations/002_vector_embeddings.sql', 'r') as f:
+        conn.executescript(f.read())
+    conn.commit()
+    conn.close()
+
+    yield path
+
+    os.close(fd)
+    os.unlink(path)
+
+
+def _add_note(path, note_id, user_id, vector, note_type='text'):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO notes (id, title, tags, content, type, user_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (note_id, f"Note {note_id}", "a,b", "content", note_type, user_id),
+    )
+    conn.execute(
+        "INSERT INTO note_embeddings (note_id, embedding, embedding_dim) VALUES (?, ?, ?)",
+        (note_id, pickle.dumps(np.asarray(vector, dtype=np.float32)), len(vector)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_find_similar_notes_ranks_by_cosine(db_path):
+    _add_note(db_path, 1, 1, [1.0, 0.0, 0.0])
+    _add_note(db_path, 2, 1, [0.9, 0.1, 0.0])
+    _add_note(db_path, 3, 1, [0.0, 1.0, 0.0])
+    _add_note(db_path, 4, 2, [1.0, 0.0, 0.0])  # other user's note
+
+    engine = NoteRelationshipEngine(db_path)
+    results = engine.find_similar_notes(1, user_id=1, limit=5, min_similarity=0.5)
+
+    assert [r.note_id for r in results] == [2]
+    assert results[0].similarity_score == pytest.approx(0.9939, abs=1e-3)
+
+
+def test_user_matrix_refreshes_after_new_embedding(db_path):
+    _add_note(db_path, 1, 1, [1.0, 0.0])
+    manager = EmbeddingManager(db_path)
+
+    first = manager.get_user_matrix(1)
+    assert first.matrix.shape == (1, 2)
+    assert manager.get_user_matrix(1) is first
+
+    _add_note(db_path, 2, 1, [0.0, 3.0])
+    second = manager.get_user_matrix(1)
+    assert second.matrix.shape == (2, 2)
+    assert np.allclose(np.linalg.norm(second.matrix, axis=1), 1.0)
+
+
+def test_avg_cluster_similarity_matches_pairwise(db_path):
+    engine = NoteRelationshipEngine(db_path)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(6, 8))
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.mean([unit[i] @ unit[j] for i in range(6) for j in range(i + 1, 6)])
+
+    assert engine._calculate_avg_cluster_similarity(vectors) == pytest.approx(expected, abs=1e-5)
+
+
+def test_incremental_clustering_assigns_new_notes(db_path):
+    for note_id in range(1, 5):
+        _add_note(db_path, note_id, 1, [1.0, 0.05 * note_id, 0.0])
+    for note_id in range(5, 9):
+        _add_note(db_path, note_id, 1, [0.0, 0.05 * note_id, 1.0])
+
+    engine = NoteRelationshipEngine(db_path)
+    clusters = engine.discover_note_clusters(1, min_cluster_size=3, similarity_threshold=0.8)
+    assert sorted(len(c.note_ids) for c in clusters) == [4, 4]
+
+    _add_note(db_path, 9, 1, [1.0, 0.0, 0.0])
+    updated = engine.discover_note_clusters(1, min_cluster_size=3, similarity_threshold=0.8)
+
+    by_size = sorted(updated, key=lambda c: len(c.note_ids))
+    assert 9 in by_size[-1].note_ids and 1 in by_size[-1].note_ids
+    assert {c.cluster_id for c in updated} == {c.cluster_id for c in clusters}
+    assert len(engine.get_note_clusters(1)) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_discovery_awaits_the_cluster_write(db_path):
+    for note_id in range(1, 5):
+        _add_note(db_path, note_id, 1, [1.0, 0.05 * note_id, 0.0])
+
+    engine = NoteRelationshipEngine(db_path)
+    clusters = await engine.discover_note_clusters_async(1, min_cluster_size=3, similarity_threshold=0.8)
+
+    assert [sorted(c.note_ids) for c in clusters] == [[1, 2, 3, 4]]
+    assert clusters[0].cluster_id is not None
+    assert [c["cluster_id"] for c in engine.get_note_clusters(1)] == [clusters[0].cluster_id]
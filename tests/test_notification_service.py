@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+import services.notification_service as notification_module
+from services.notification_service import (
+    NotificationService,
+    NotificationType,
+    processing_completed_notification,
+    processing_started_notification,
+)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    db_path = tmp_path / "notifications.db"
+    monkeypatch.setattr(notification_module, "get_db_connection", lambda: sqlite3.connect(db_path))
+    svc = NotificationService()
+    svc.bus.flush_interval = 60  # flush only when the test asks
+    yield svc, db_path
+    svc.shutdown()
+
+
+def _stored(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT id, type, user_id FROM notifications ORDER BY created_at").fetchall()
+    finally:
+        conn.close()
+
+
+def test_progress_updates_are_coalesced_and_persisted_in_one_batch(service):
+    svc, db_path = service
+    delivered = []
+    svc.bus.add_listener(delivered.append)
+
+    for _ in range(5):
+        svc.publish(processing_started_notification(1, "audio transcription", "7"))
+    svc.publish(processing_started_notification(1, "audio transcription", "8"))
+    assert svc.bus.depth == 2
+    assert _stored(db_path) == []
+
+    # The terminal notification replaces the queued progress update for its task
+    svc.publish(processing_completed_notification(1, "audio transcription", "7", {"title": "t"}))
+    assert svc.flush() == 2
+
+    assert len(delivered) == 1
+    assert [n.type for n in delivered[0]] == [NotificationType.PROCESSING_STARTED, NotificationType.PROCESSING_COMPLETED]
+    stored = _stored(db_path)
+    assert [row[1] for row in stored] == ["processing_completed"]
+    assert svc.bus.stats["coalesced"] == 5
+    assert svc.bus.stats["batches"] == 1
+
+
+def test_ids_are_unique_within_the_same_millisecond(service):
+    svc, db_path = service
+    ids = {svc.publish(processing_completed_notification(1, "note processing", str(i))) for i in range(50)}
+    svc.flush()
+    assert len(ids) == 50
+    assert len(_stored(db_path)) == 50
+
+
+@pytest.mark.asyncio
+async def test_preferences_are_cached_and_invalidated_on_update(service, monkeypatch):
+    svc, db_path = service
+    prefs = await svc.get_user_preferences(3)
+
+    calls = []
+    real_get_conn = notification_module.get_db_connection
+    monkeypatch.setattr(notification_module, "get_db_connection", lambda: calls.append(1) or real_get_conn())
+    for i in range(10):
+        svc.publish(processing_started_notification(3, "note processing", str(i)))
+    assert calls == []  # preferences came from the cache
+
+    prefs.enabled_types = {NotificationType.PROCESSING_FAILED}
+    await svc.update_user_preferences(prefs)
+    assert svc.publish(processing_completed_notification(3, "note processing", "1")) is None
+
+    svc.invalidate_preferences(3)
+    assert (await svc.get_user_preferences(3)).enabled_types == {NotificationType.PROCESSING_FAILED}
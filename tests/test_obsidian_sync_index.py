@@ -0,0 +1,115 @@
+import sqlite3
+import sys
+import pytest
+
+from pathlib import Path
+
+from obsidian_sync import DebouncedEventQueue, ObsidianSync
+
+
+@pytest.fixture
+def sync(tmp_path):
+    db_path = tmp_path / "notes.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, title TEXT, content TEXT, summary TEXT, tags TEXT,
+            actions TEXT, type TEXT, timestamp TEXT, status TEXT, user_id INTEGER,
+            audio_filename TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO notes (id, title, content, summary, tags, actions, type, timestamp, status, user_id)
+        VALUES (1, 'First', 'hello', '', 'a', '', 'note', '2024-01-01 10:00:00', 'complete', 1)
+    """)
+    conn.commit()
+    conn.close()
+    return ObsidianSync(vault_path=tmp_path / "vault", db_path=db_path)
+
+
+def test_second_sync_skips_unchanged_files(sync, monkeypatch):
+    first = sync.bidirectional_sync(user_id=1)
+    assert len(first["exported_to_obsidian"]) == 1
+    assert sync._find_note_file(1).endswith("_id1.md")
+
+    reads = []
+    original = sync._read_file_state
+    monkeypatch.setattr(sync, "_read_file_state", lambda p: reads.append(p) or original(p))
+
+    second = sync.bidirectional_sync(user_id=1)
+    assert second["exported_to_obsidian"] == []
+    assert second["imported_from_obsidian"] == []
+    assert second["conflicts"] == []
+    assert reads == []
+
+
+def test_edited_file_is_imported(sync, monkeypatch):
+    # Skip the vector upsert on import; it needs the embedding stack
+    monkeypatch.setitem(sys.modules, "services.search_adapter", None)
+    sync.bidirectional_sync(user_id=1)
+    path = sync.vault_path / sync._find_note_file(1)
+    path.write_text(path.read_text() + "\nmore text\n")
+
+    result = sync.bidirectional_sync(user_id=1)
+    assert result["imported_from_obsidian"] == [str(path.relative_to(sync.vault_path))]
+
+    conn = sqlite3.connect(sync.db_path)
+    content = conn.execute("SELECT content FROM notes WHERE id = 1").fetchone()[0]
+    conn.close()
+    assert "more text" in content
+
+
+def test_debounced_queue_coalesces_events():
+    now = [0.0]
+    batches = []
+    queue = DebouncedEventQueue(batches.append, debounce_seconds=2.0, clock=lambda: now[0])
+
+    queue.add(Path("a.md"))
+    now[0] = 1.0
+    queue.add(Path("a.md"))
+    queue.add(Path("b.md"))
+    now[0] = 2.5
+    assert queue.run_once() == 0  # both paths still saw an event within the window
+
+    now[0] = 3.5
+    assert queue.run_once() == 2
+    assert sorted(batches[0]) == [Path("a.md"), Path("b.md")]
+
+    metrics = queue.get_metrics()
+    assert metrics["events"] == 3
+    assert metrics["coalesced"] == 1
+    assert metrics["queue_depth"] == 0
+    assert metrics["last_lag_seconds"] == pytest.approx(3.5)
+
+
+def test_touch_only_extends_pending_paths():
+    now = [0.0]
+    batches = []
+    queue = DebouncedEventQueue(batches.append, debounce_seconds=2.0, clock=lambda: now[0])
+
+    assert queue.touch(Path("memo.m4a")) is False
+    queue.add(Path("memo.m4a"))
+    now[0] = 1.5
+    assert queue.touch(Path("memo.m4a")) is True
+    now[0] = 3.0
+    assert queue.run_once() == 0  # still being written
+    now[0] = 4.0
+    assert queue.run_once() == 1
+    # Modify events after the flush don't queue it again
+    assert queue.touch(Path("memo.m4a")) is False
+    now[0] = 10.0
+    assert queue.run_once() == 0
+    assert batches == [[Path("memo.m4a")]]
+
+
+def test_batch_import_skips_own_exports(sync, monkeypatch):
+    monkeypatch.setitem(sys.modules, "services.search_adapter", None)
+    exported = sync.export_note_to_obsidian(1)
+    assert sync.import_notes_batch([exported]) == {}
+
+    new_file = sync.vault_path / "fresh.md"
+    new_file.write_text("---\ntitle: Fresh\n---\nbody\n")
+    imported = sync.import_notes_batch([exported, new_file])
+    assert list(imported) == [new_file]
+    # The id write-back is recorded, so the next watcher event is an echo
+    assert sync.import_notes_batch([new_file]) == {}
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from services.processing_status import ProcessingStatusStore, ensure_processing_status_schema, resolve_status
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "status.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT, body TEXT, tags TEXT, status TEXT);
+        CREATE VIRTUAL TABLE notes_fts USING fts5(title, body, tags, content='notes', content_rowid='id');
+        CREATE TABLE fts_writes (n INTEGER);
+        -- Legacy trigger: re-indexes on any update
+        CREATE TRIGGER notes_au AFTER UPDATE ON notes BEGIN
+          INSERT INTO notes_fts(notes_fts, rowid, title, body, tags)
+          VALUES('delete', old.id, old.title, old.body, old.tags);
+          INSERT INTO notes_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, new.tags);
+          INSERT INTO fts_writes VALUES (1);
+        END;
+        INSERT INTO notes (id, title, body, tags, status) VALUES (1, 'Standup', 'audio pending', '', 'pending');
+        INSERT INTO notes_fts(rowid, title, body, tags) VALUES (1, 'Standup', 'audio pending', '');
+    """)
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(db_path)
+
+
+def test_progress_ticks_do_not_touch_notes(get_conn):
+    conn = get_conn()
+    ensure_processing_status_schema(conn)
+    conn.commit()
+    conn.close()
+
+    store = ProcessingStatusStore(get_conn)
+    for pct in range(10, 80, 10):
+        store.set(1, "transcribing", pct, f"{pct}%", worker="w1")
+    assert store.get(1)["pct"] == 70
+
+    conn = get_conn()
+    # Ticks only wrote note_processing_status: no notes trigger fired
+    assert conn.execute("SELECT COUNT(*) FROM fts_writes").fetchone()[0] == 0
+    assert conn.execute("SELECT status FROM notes WHERE id = 1").fetchone()[0] == "pending"
+    conn.execute("UPDATE notes SET body = 'the transcript', status = 'complete' WHERE id = 1")
+    store.clear(1, conn=conn)
+    conn.commit()
+    conn.close()
+    assert store.get(1) is None
+
+
+def test_resolve_status_prefers_terminal_note_status():
+    live = {"stage": "transcribing", "pct": 40}
+    assert resolve_status("transcribing:0", live) == ("transcribing", 40)
+    assert resolve_status("complete", live) == ("complete", 100)
+    assert resolve_status("error:boom", live) == ("error", -1)
+    assert resolve_status("extracting:55", None) == ("extracting", 55)
@@ -0,0 +1,104 @@
+import sqlite3
+import sys
+import textwrap
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import startup_profiler
+from services.app_schema import APP_SCHEMA_VERSION, ensure_app_schema
+from services.note_index import NoteIndexService
+from services.router_registry import LazyRouterMiddleware, RouterRegistry
+
+
+@pytest.fixture
+def feature_modules(tmp_path, monkeypatch):
+    """Two throwaway router modules sharing a prefix, like the shortcuts routers"""
+    for name, path in (("lazy_feature_a", "/ping"), ("lazy_feature_b", "/pong")):
+        (tmp_path / f"{name}.py").write_text(textwrap.dedent(f"""
+            from fastapi import APIRouter
+            router = APIRouter(prefix="/api/feature")
+            calls = []
+
+            def init(value):
+                calls.append(value)
+
+            @router.get("{path}")
+            def handler():
+                return {{"module": "{name}", "calls": calls}}
+        """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in ("lazy_feature_a", "lazy_feature_b"):
+        sys.modules.pop(name, None)
+
+
+def _app(lazy=True, eager=()):
+    app = FastAPI()
+    registry = RouterRegistry(app, lazy=lazy, eager=eager)
+    app.add_middleware(LazyRouterMiddleware, registry=registry)
+    registry.register("a", "lazy_feature_a", ["/api/feature"], setup=lambda m: m.init("a"))
+    registry.register("b", "lazy_feature_b", ["/api/feature"])
+    registry.register("broken", "lazy_feature_missing", ["/api/broken"])
+    return app, registry
+
+
+def test_routers_import_on_first_request_under_their_prefix(feature_modules):
+    app, registry = _app()
+    client = TestClient(app)
+
+    assert "lazy_feature_a" not in sys.modules
+    assert client.get("/api/other").status_code == 404
+    assert "lazy_feature_a" not in sys.modules
+
+    assert client.get("/api/feature/pong").json() == {"module": "lazy_feature_b", "calls": []}
+    assert client.get("/api/feature/ping").json() == {"module": "lazy_feature_a", "calls": ["a"]}
+    status = {entry["name"]: entry for entry in registry.status()}
+    assert status["a"]["loaded"] and status["a"]["trigger"] == "request /api/feature/pong"
+    assert not status["broken"]["loaded"]
+
+    # A router that fails to import is reported, not retried, and its prefix 404s
+    assert client.get("/api/broken/x").status_code == 404
+    status = {entry["name"]: entry for entry in registry.status()}
+    assert status["broken"]["error"].startswith("ModuleNotFoundError")
+    assert not registry.pending
+    assert "router:a" in startup_profiler.report()["phases"]
+
+
+def test_eager_routers_load_at_startup(feature_modules):
+    app, registry = _app(eager=["b"])
+    registry.load_eager()
+    assert "lazy_feature_b" in sys.modules and "lazy_feature_a" not in sys.modules
+
+    app, registry = _app(lazy=False)
+    registry.load_eager()
+    assert {entry["name"] for entry in registry.status() if entry["loaded"]} == {"a", "b"}
+
+
+def test_app_schema_runs_once_per_version(tmp_path):
+    db_path = tmp_path / "notes.db"
+    get_conn = lambda: sqlite3.connect(db_path)
+    conn = get_conn()
+    # Legacy FTS layout that used to force a rebuild on every import of app.py
+    conn.executescript("""
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT, body TEXT, tags TEXT, created_at TEXT);
+        CREATE VIRTUAL TABLE notes_fts USING fts5(title, summary, tags, actions, content, content='notes', content_rowid='id');
+        INSERT INTO notes (id, title, body, tags) VALUES (1, 'Roadmap', 'quarterly planning', 'work');
+    """)
+    conn.commit()
+    conn.close()
+
+    assert ensure_app_schema(get_conn) is True
+    assert ensure_app_schema(get_conn) is False
+
+    conn = get_conn()
+    # The legacy index is retired and the existing note waits in the index queue
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'notes_fts'").fetchone() is None
+    assert conn.execute("SELECT note_id FROM note_index_queue").fetchall() == [(1,)]
+    assert NoteIndexService(get_conn).sync() == 1
+    assert conn.execute("SELECT rowid FROM note_chunks_fts WHERE note_chunks_fts MATCH 'quarterly'").fetchall() == [(1,)]
+    assert conn.execute(
+        "SELECT COUNT(*) FROM schema_migrations WHERE migration_name = ?", (f"app_schema_v{APP_SCHEMA_VERSION}",)
+    ).fetchone()[0] == 1
+    conn.close()
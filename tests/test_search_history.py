@@ -0,0 +1,127 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from services.search_history_service import SearchHistoryRecorder, SearchHistoryService
+from services.suggestion_index import SuggestionIndex, ensure_suggestion_schema
+
+MIGRATION = Path(__file__).resolve().parent.parent / "db" / "migrations" / "004_search_features.sql"
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "history.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("CREATE TABLE notes (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, body TEXT, tags TEXT);")
+    conn.executescript(MIGRATION.read_text())
+    ensure_suggestion_schema(conn)
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(db_path, timeout=0.1)
+
+
+def _count(get_conn, sql, *params):
+    conn = get_conn()
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_record_only_buffers_until_flush(get_conn):
+    recorder = SearchHistoryRecorder(get_conn)
+    assert recorder.record(1, "  project budget ", "keyword", 3, 12)
+    assert not recorder.record(1, "   ", "keyword", 0, 1)
+    assert recorder.pending == 1
+    assert _count(get_conn, "SELECT COUNT(*) FROM search_history") == 0
+
+    assert recorder.flush() == 1
+    assert recorder.pending == 0
+    conn = get_conn()
+    row = conn.execute("SELECT user_id, query, search_mode, results_count, response_time_ms FROM search_history").fetchone()
+    conn.close()
+    assert row == (1, "project budget", "keyword", 3, 12)
+    # Suggestion counts ride along in the same batch
+    assert [s["text"] for s in SuggestionIndex(get_conn).suggest(1, "proj", kinds=("query",))] == ["project budget"]
+
+
+def test_daily_aggregates_upsert_across_batches(get_conn):
+    recorder = SearchHistoryRecorder(get_conn, batch_size=2)
+    for query, mode, ms in [("alpha", "keyword", 10), ("beta", "semantic", 20), ("alpha", "keyword", 30),
+                            ("alpha", "advanced", 40)]:
+        recorder.record(1, query, mode, 1, ms)
+    recorder.record(2, "gamma", "hybrid", 1, 5)
+    assert recorder.flush() == 5
+    assert recorder.get_stats()["batches"] == 3
+
+    conn = get_conn()
+    rows = conn.execute(
+        "SELECT user_id, total_searches, avg_response_time_ms, most_common_query, search_mode_breakdown "
+        "FROM search_analytics_daily ORDER BY user_id"
+    ).fetchall()
+    conn.close()
+    assert len(rows) == 2
+    user_id, total, avg_ms, common, breakdown = rows[0]
+    assert (user_id, total, avg_ms, common) == (1, 4, 25, "alpha")
+    # Unknown modes are recorded as hybrid to satisfy the history CHECK constraint
+    assert json.loads(breakdown) == {"keyword": 2, "semantic": 1, "hybrid": 1}
+    assert rows[1][1:4] == (1, 5, "gamma")
+
+
+def test_failed_flushes_and_trim_keeps_latest_per_user(get_conn):
+    conn = get_conn()
+    conn.execute("ALTER TABLE search_history RENAME TO search_history_old")
+    conn.execute("CREATE TABLE search_history (id INTEGER PRIMARY KEY, user_id INTEGER, query TEXT NOT NULL, "
+                 "results_count INTEGER, timestamp TEXT, CHECK (results_count >= 0))")
+    conn.commit()
+    conn.close()
+
+    recorder = SearchHistoryRecorder(get_conn, keep_last=2)
+    recorder.record(1, "bad", "keyword", -1, 1)
+    conn = get_conn()
+    conn.execute("BEGIN EXCLUSIVE")
+    # Locked: kept for the next flush
+    assert recorder.flush() == 0 and recorder.pending == 1
+    conn.rollback()
+    conn.close()
+    # Rejected by the schema: dropped rather than retried forever
+    assert recorder.flush() == 0 and recorder.pending == 0
+    assert recorder.get_stats()["dropped"] == 1
+
+    for i in range(4):
+        recorder.record(1, f"q{i}", "keyword", 1, 1)
+    recorder.record(2, "other", "keyword", 1, 1)
+    recorder.flush()
+    # advanced_search_router's table shape: no search_mode, timestamp instead of created_at
+    assert _count(get_conn, "SELECT COUNT(*) FROM search_history WHERE timestamp IS NOT NULL") == 5
+
+    assert recorder.trim() == 2
+    conn = get_conn()
+    remaining = conn.execute("SELECT user_id, query FROM search_history ORDER BY id").fetchall()
+    conn.close()
+    assert remaining == [(1, "q2"), (1, "q3"), (2, "other")]
+
+
+def test_failed_batch_never_evicts_newer_searches(get_conn, monkeypatch):
+    recorder = SearchHistoryRecorder(get_conn, max_buffer=3)
+    for query in ("a", "b", "c"):
+        recorder.record(1, query, "keyword", 1, 1)
+
+    def locked(batch):
+        # Searches keep arriving while the failing batch is out of the buffer
+        recorder.record(1, "d", "keyword", 1, 1)
+        recorder.record(1, "e", "keyword", 1, 1)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(recorder, "_write_batch", locked)
+    assert recorder.flush() == 0
+    assert [event.query for event in recorder._events] == ["c", "d", "e"]
+    assert recorder.get_stats()["dropped"] == 2
+
+
+def test_service_history_reads_include_buffered_searches(get_conn):
+    service = SearchHistoryService(get_conn)
+    service.record_search(1, "roadmap", "hybrid", 2, 8)
+    assert [entry.query for entry in service.get_search_history(1)] == ["roadmap"]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from services.advanced_search_parser import AdvancedSearchParser
+from services.note_index import NoteIndexService, ensure_note_index_schema
+from services.search_planner import SearchPlanner, compile_shape
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = tmp_path / "plan.db"
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, body TEXT, tags TEXT,
+            type TEXT, status TEXT, created_at TEXT, updated_at TEXT
+        );
+        CREATE INDEX idx_notes_user_created ON notes(user_id, created_at);
+        CREATE INDEX idx_notes_user_type ON notes(user_id, type);
+        INSERT INTO notes VALUES
+            (1, 1, 'Python roadmap', 'learning plan for the year', 'work, python', 'note', 'complete', '2024-03-01 09:00:00', NULL),
+            (2, 1, 'Grocery list', 'python snake food, apples', 'home', 'note', 'complete', '2024-03-02 09:00:00', NULL),
+            (3, 1, 'Standup audio', 'python migration blocked', 'work, draft', 'audio', 'complete', '2024-06-01 09:00:00', NULL),
+            (4, 2, 'Python roadmap', 'another user', 'work', 'note', 'complete', '2024-03-01 09:00:00', NULL),
+            (5, 1, 'Old python notes', 'deleted', 'work', 'note', 'deleted', '2024-03-01 09:00:00', NULL);
+    """)
+    ensure_note_index_schema(conn)
+    conn.commit()
+    NoteIndexService(lambda: sqlite3.connect(db_path)).sync()
+    yield conn
+    conn.close()
+
+
+def _run(conn, q, **kwargs):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(notes)")]
+    plan = SearchPlanner(columns).plan(AdvancedSearchParser().parse(q), **kwargs)
+    return plan, [row["id"] for row in plan.execute(conn)]
+
+
+def test_text_terms_and_field_filters_run_as_one_ranked_statement(conn):
+    plan, ids = _run(conn, "python", user_id=1, exclude_deleted=True)
+    # Title matches rank first; other users' and deleted notes are filtered in SQL
+    assert ids[0] == 1 and set(ids) == {1, 2, 3}
+    assert plan.execute(conn)[0]["total_count"] == 3
+
+    assert set(_run(conn, "title:python tag:work", user_id=1)[1]) == {1, 5}
+    assert _run(conn, "python type:audio", user_id=1)[1] == [3]
+    assert _run(conn, "python -tag:draft type:note", user_id=1, exclude_deleted=True)[1] == [1, 2]
+    assert set(_run(conn, "tag:home OR tag:draft", user_id=1)[1]) == {2, 3}
+    assert _run(conn, "python created:2024-03-01..2024-03-01", user_id=1, exclude_deleted=True)[1] == [1]
+    # No text terms: newest first, filtered on indexed columns only
+    assert _run(conn, "type:note created:2024-03-01..2024-12-31", user_id=1, exclude_deleted=True)[1] == [2, 1]
+    # Only negative text terms
+    assert _run(conn, "-python", user_id=2)[1] == []
+    assert _run(conn, "-grocery", user_id=1)[1][0] == 3 and set(_run(conn, "-grocery", user_id=1)[1]) == {1, 3, 5}
+
+
+def test_sql_is_cached_per_shape_and_values_are_parameters(conn):
+    planner = SearchPlanner()
+    a = planner.plan(AdvancedSearchParser().parse("python type:note"), user_id=1)
+    b = planner.plan(AdvancedSearchParser().parse("'; DROP TABLE notes; -- type:audio"), user_id=7)
+    assert a.shape == b.shape and a.sql is b.sql
+    assert "DROP" not in a.sql and b.params["p0_0"] == "audio"
+    hits = compile_shape.cache_info().hits
+    planner.plan(AdvancedSearchParser().parse("roadmap type:audio"), user_id=3)
+    assert compile_shape.cache_info().hits == hits + 1
+
+    # A field the table lacks is searched as text instead of failing
+    plan = SearchPlanner(["id", "title"]).plan(AdvancedSearchParser().parse("source:github"))
+    assert plan.match == '"github"' and plan.notes
+
+
+def test_explain_uses_fts_and_notes_indexes(conn):
+    plan, _ = _run(conn, "python type:note", user_id=1)
+    details = " | ".join(step["detail"] for step in SearchPlanner.explain(conn, plan))
+    assert "VIRTUAL TABLE INDEX" in details and "note_chunks_fts" in details
+
+    plan, _ = _run(conn, "type:note created:last-30-days", user_id=1)
+    details = " | ".join(step["detail"] for step in SearchPlanner.explain(conn, plan))
+    assert "idx_notes_user_" in details
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+
+import pytest
+
+from services.storage_ledger import StorageLedger
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "ledger.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, title TEXT, type TEXT, user_id INTEGER,
+            file_size INTEGER, file_metadata TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(db_path)
+
+
+def _web_metadata(*sizes):
+    return json.dumps({"artifacts": [{"type": "html", "size": size} for size in sizes]})
+
+
+def test_ledger_tracks_inserts_updates_and_bulk_deletes(get_conn):
+    ledger = StorageLedger(get_conn)
+    conn = get_conn()
+    conn.executemany(
+        "INSERT INTO notes (id, type, user_id, file_size, file_metadata) VALUES (?, ?, ?, ?, ?)",
+        [
+            (1, "audio", 1, 1000, None),
+            (2, "document", 1, 300, "not json"),
+            (3, "web_content", 1, None, _web_metadata(50, 25)),
+            (4, "web_content", 2, None, _web_metadata(99)),
+        ],
+    )
+    conn.commit()
+    assert ledger.get_usage(1) == {"audio": 1000, "upload": 300, "web": 75}
+
+    conn.execute("UPDATE notes SET file_metadata = ? WHERE id = 3", (_web_metadata(10),))
+    conn.execute("UPDATE notes SET user_id = 2 WHERE id = 2")
+    conn.commit()
+    assert ledger.get_usage(1) == {"audio": 1000, "upload": 0, "web": 10}
+    assert ledger.get_total(2) == 399
+
+    conn.execute("DELETE FROM notes WHERE id IN (1, 3, 4)")
+    conn.commit()
+    conn.close()
+    assert ledger.get_total(1) == 0
+    assert ledger.get_usage(2) == {"audio": 0, "upload": 300, "web": 0}
+
+
+def test_existing_notes_are_backfilled_and_reconcile_repairs_drift(get_conn):
+    conn = get_conn()
+    conn.execute("INSERT INTO notes (type, user_id, file_size) VALUES ('image', 1, 500)")
+    conn.commit()
+    conn.close()
+
+    ledger = StorageLedger(get_conn)
+    assert ledger.get_total(1) == 500
+
+    conn = get_conn()
+    conn.execute("UPDATE user_storage_usage SET bytes = 7 WHERE user_id = 1")
+    conn.execute("INSERT INTO user_storage_usage (user_id, category, bytes) VALUES (3, 'web', 40)")
+    conn.commit()
+    conn.close()
+
+    drift = ledger.reconcile(dry_run=True)
+    assert {(d["user_id"], d["category"], d["actual"]) for d in drift} == {(1, "upload", 500), (3, "web", 0)}
+    assert ledger.get_total(1) == 7
+
+    assert len(ledger.reconcile()) == 2
+    assert ledger.get_total(1) == 500
+    assert ledger.get_total(3) == 0
+    assert ledger.reconcile() == []
@@ -0,0 +1,98 @@
+import sqlite3
+import time
+
+import pytest
+
+from services.note_index import NoteIndexService, ensure_note_index_schema
+from services.suggestion_index import SuggestionIndex, deletes, edit_distance
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "suggest.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, body TEXT, tags TEXT);
+        CREATE TABLE search_history (id INTEGER PRIMARY KEY, user_id INTEGER, query TEXT, created_at TEXT);
+        INSERT INTO notes (id, user_id, title, body, tags) VALUES
+            (1, 1, 'Project roadmap', 'q3 planning', 'work, planning'),
+            (2, 1, 'Grocery list', 'tomatoes', 'home'),
+            (3, 2, 'Project kickoff', 'someone else', 'work');
+        INSERT INTO search_history (user_id, query, created_at) VALUES
+            (1, 'project budget', '2026-01-01 10:00:00'),
+            (1, 'project budget', '2026-01-02 10:00:00'),
+            (2, 'project budget', '2026-01-02 10:00:00');
+    """)
+    ensure_note_index_schema(conn)
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(db_path)
+
+
+def _texts(results):
+    return [(r["kind"], r["text"]) for r in results]
+
+
+def test_backfill_serves_per_user_prefix_suggestions(get_conn):
+    index = SuggestionIndex(get_conn)
+    # The title was indexed just now; the query was last searched months ago
+    assert _texts(index.suggest(1, "proj")) == [("title", "Project roadmap"), ("query", "project budget")]
+    assert _texts(index.suggest(1, "plan", kinds=("tag",))) == [("tag", "planning")]
+    # Every typed word must match; the last one as a prefix
+    assert _texts(index.suggest(1, "project ro")) == [("title", "Project roadmap")]
+    assert _texts(index.suggest(2, "proj", kinds=("title",))) == [("title", "Project kickoff")]
+    assert index.popular("budg") == [{"text": "project budget", "count": 3}]
+    assert index.suggest(1, "") == [] and index.suggest(1, "zzz") == []
+
+
+def test_note_and_query_changes_update_incrementally(get_conn):
+    notes = NoteIndexService(get_conn)
+    index = SuggestionIndex(get_conn)
+    conn = get_conn()
+    conn.execute("UPDATE notes SET title = 'Product roadmap', tags = 'work' WHERE id = 1")
+    conn.execute("DELETE FROM notes WHERE id = 2")
+    conn.execute("INSERT INTO notes (id, user_id, title, body, tags) VALUES (4, 1, 'Project retro', '', 'work')")
+    conn.commit()
+    notes.sync()
+
+    assert _texts(index.suggest(1, "pro", kinds=("title",))) == [("title", "Project retro"), ("title", "Product roadmap")]
+    assert index.suggest(1, "groc") == [] and index.suggest(1, "planning", kinds=("tag",)) == []
+    # "work" is now on two of user 1's notes
+    assert index.suggest(1, "wor", kinds=("tag",))[0]["weight"] == 2
+
+    index.record_query(1, "Retro notes")
+    index.record_query(1, "retro  NOTES")
+    recent = index.suggest(1, "retro", kinds=("query",))
+    assert _texts(recent) == [("query", "Retro notes")] and recent[0]["weight"] == 2
+    conn.close()
+
+
+def test_spelling_uses_symmetric_delete_index(get_conn):
+    index = SuggestionIndex(get_conn)
+    assert index.correct(1, "projcet roadmp") == "project roadmap"
+    assert index.correct(1, "grocrey lsit") == "grocery list"
+    # Known words and short words are left alone; other users' words aren't used
+    assert index.correct(1, "project q3 budget") == "project q3 budget"
+    assert index.correct(2, "roadmp") == "roadmp"
+
+    assert "roadmp" in deletes("roadmap") and "rodmp" not in deletes("roadmap")
+    assert "plnnng" in deletes("planning")
+    assert edit_distance("projcet", "project") == 1
+    assert edit_distance("roadmp", "roadmap") == 1
+
+
+def test_suggest_is_an_index_lookup(get_conn):
+    conn = get_conn()
+    conn.executemany(
+        "INSERT INTO notes (id, user_id, title, body, tags) VALUES (?, 1, ?, '', ?)",
+        [(i, f"Meeting {i} notes about topic {i % 50}", f"tag{i % 20}") for i in range(10, 3010)],
+    )
+    conn.commit()
+    conn.close()
+    NoteIndexService(get_conn).sync()
+
+    index = SuggestionIndex(get_conn)
+    start = time.perf_counter()
+    for _ in range(20):
+        assert len(index.suggest(1, "meeting 12", limit=6)) == 6
+    assert (time.perf_counter() - start) / 20 < 0.05
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from fastapi import BackgroundTasks
+from fastapi.responses import JSONResponse
+
+import services.upload_service as upload_module
+from config import settings
+from file_processor import FileProcessor
+from services.note_index import NOTE_MATCHES_CTE, NoteIndexService, ensure_note_index_schema
+from services.upload_service import UploadService
+
+
+class _Auth:
+    def validate_csrf(self, request, token):
+        return True
+
+
+class _Request:
+    headers = {"X-CSRF-Token": "token"}
+
+    def __init__(self, *chunks):
+        self._chunks = chunks
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "base_dir", tmp_path)
+    monkeypatch.setattr(settings, "uploads_dir", tmp_path / "uploads")
+    monkeypatch.setattr(settings, "audio_dir", tmp_path / "audio")
+    monkeypatch.setattr(upload_module, "ObsidianSync", lambda: SimpleNamespace(export_note_to_obsidian=lambda note_id: None))
+    monkeypatch.setattr(FileProcessor, "extract_pdf_text", lambda self, path, on_page=None: ("quarterly report text", {"pages": 1}))
+
+    db_path = tmp_path / "uploads.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, title TEXT, body TEXT, content TEXT, summary TEXT, tags TEXT,
+            actions TEXT, type TEXT, timestamp TEXT, audio_filename TEXT, file_filename TEXT,
+            file_type TEXT, file_mime_type TEXT, file_size INTEGER, extracted_text TEXT,
+            file_metadata TEXT, status TEXT, user_id INTEGER
+        )
+    """)
+    conn.commit()
+    conn.close()
+    get_conn = lambda: sqlite3.connect(db_path)
+    return UploadService(get_conn, _Auth(), audio_queue=None), get_conn
+
+
+async def _upload(service, user, data, chunk_size=4):
+    started = await service.init_upload(_Request(), {"filename": "report.pdf", "total_size": len(data)}, user)
+    upload_id = started["upload_id"]
+    for offset in range(0, len(data), chunk_size):
+        result = await service.upload_chunk(_Request(data[offset:offset + chunk_size]), upload_id, offset, user)
+        assert result["offset"] == min(offset + chunk_size, len(data))
+    return upload_id
+
+
+@pytest.mark.asyncio
+async def test_finalize_returns_before_extraction_and_background_fills_note(service):
+    service, get_conn = service
+    user = SimpleNamespace(id=1)
+    data = b"%PDF-1.4 fake pdf body"
+    upload_id = await _upload(service, user, data)
+
+    stale = await service.upload_chunk(_Request(b"x"), upload_id, 3, user)
+    assert isinstance(stale, JSONResponse) and stale.status_code == 409
+
+    tasks = BackgroundTasks()
+    result = await service.finalize_upload(_Request(), tasks, upload_id, "", "", user)
+    assert result["status"] == "processing"
+    assert result["sha256"] == hashlib.sha256(data).hexdigest()
+
+    conn = get_conn()
+    assert conn.execute("SELECT status FROM notes WHERE id = ?", (result["id"],)).fetchone()[0] == "processing"
+    conn.close()
+
+    await tasks()
+    conn = get_conn()
+    status, title, extracted = conn.execute(
+        "SELECT status, title, extracted_text FROM notes WHERE id = ?", (result["id"],)
+    ).fetchone()
+    conn.close()
+    assert (status, title, extracted) == ("complete", "quarterly report text", "quarterly report text")
+    assert (await service.get_upload_status(upload_id, user))["status"] == "finalized"
+
+
+@pytest.mark.asyncio
+async def test_identical_upload_reuses_existing_note(service):
+    service, _ = service
+    user = SimpleNamespace(id=1)
+    data = b"%PDF-1.4 same bytes twice"
+
+    first = await service.finalize_upload(_Request(), BackgroundTasks(), await _upload(service, user, data), "", "", user)
+    second = await service.finalize_upload(_Request(), BackgroundTasks(), await _upload(service, user, data), "", "", user)
+
+    assert second["duplicate"] is True
+    assert second["id"] == first["id"]
+
+
+@pytest.mark.asyncio
+async def test_resumed_upload_after_restart_hashes_whole_file(service):
+    service, get_conn = service
+    user = SimpleNamespace(id=1)
+    upload_id = await _upload(service, user, b"%PDF-1.4 first half ")
+
+    restarted = UploadService(get_conn, _Auth(), audio_queue=None)
+    status = await restarted.get_upload_status(upload_id, user)
+    await restarted.upload_chunk(_Request(b"second half"), upload_id, status["offset"], user)
+    result = await restarted.finalize_upload(_Request(), BackgroundTasks(), upload_id, "my note", "", user)
+
+    assert result["sha256"] == hashlib.sha256(b"%PDF-1.4 first half second half").hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_pending_extraction_is_claimed_by_one_worker(service):
+    service, get_conn = service
+    user = SimpleNamespace(id=1)
+    upload_id = await _upload(service, user, b"%PDF-1.4 interrupted scan")
+    tasks = BackgroundTasks()
+    await service.finalize_upload(_Request(), tasks, upload_id, "", "", user)
+
+    other_worker = UploadService(get_conn, _Auth(), audio_queue=None)
+    assert other_worker.resume_pending_extractions() == 1
+    assert service.resume_pending_extractions() == 0
+    # The original background task loses the claim too
+    assert service.complete_extraction(upload_id) is False
+    assert (await service.get_upload_status(upload_id, user))["status"] == "finalized"
+
+
+@pytest.mark.asyncio
+async def test_partial_pages_are_searchable_before_extraction_completes(service, monkeypatch):
+    service, get_conn = service
+    conn = get_conn()
+    ensure_note_index_schema(conn)
+    conn.commit()
+    conn.close()
+    index = NoteIndexService(get_conn)
+    user = SimpleNamespace(id=1)
+    monkeypatch.setattr(upload_module, "PROGRESS_INTERVAL_SECONDS", 0)
+    seen = []
+
+    def search(term):
+        conn = get_conn()
+        try:
+            return [row[0] for row in conn.execute(
+                f"WITH {NOTE_MATCHES_CTE} SELECT id FROM note_matches", {"match": term}
+            )]
+        finally:
+            conn.close()
+
+    def extract(self, path, on_page=None):
+        for number, word in ((1, "aardvark"), (2, "bobcat"), (3, "capybara")):
+            on_page(SimpleNamespace(page_number=number, text=f"{word} sighting"), 3)
+            index.sync()
+            conn = get_conn()
+            seen.append((conn.execute("SELECT body FROM notes").fetchone()[0], search("aardvark")))
+            conn.close()
+        return "aardvark sighting bobcat sighting capybara sighting", {"pages": 3}
+
+    monkeypatch.setattr(FileProcessor, "extract_pdf_text", extract)
+    upload_id = await _upload(service, user, b"%PDF-1.4 three page scan")
+    tasks = BackgroundTasks()
+    note_id = (await service.finalize_upload(_Request(), tasks, upload_id, "", "", user))["id"]
+    index.sync()
+    await tasks()
+
+    # The first page is found mid-extraction, while the body is still untouched
+    assert seen[0][1] == [note_id]
+    assert all(body == seen[0][0] for body, _ in seen)
+    assert search("capybara") == []
+    index.sync()
+    assert search("capybara") == [note_id]
+
+
+@pytest.mark.asyncio
+async def test_extraction_error_after_claim_marks_upload_and_note_failed(service, monkeypatch):
+    service, get_conn = service
+    user = SimpleNamespace(id=1)
+
+    def explode(self, file_info, on_page=None):
+        raise RuntimeError("disk vanished")
+
+    monkeypatch.setattr(FileProcessor, "extract_stored_file", explode)
+    upload_id = await _upload(service, user, b"%PDF-1.4 doomed scan")
+    tasks = BackgroundTasks()
+    note_id = (await service.finalize_upload(_Request(), tasks, upload_id, "", "", user))["id"]
+    await tasks()
+
+    status = await service.get_upload_status(upload_id, user)
+    assert status["status"] == "failed"
+    conn = get_conn()
+    assert conn.execute("SELECT status FROM notes WHERE id = ?", (note_id,)).fetchone()[0] == "failed"
+    conn.close()
+    assert service.processing_status.get(note_id)["message"] == "disk vanished"
+    # Nothing is left for a restart to pick up
+    assert service.resume_pending_extractions() == 0
@@ -0,0 +1,125 @@
+import sqlite3
+from datetime import datetime
+
+import httpx
+import pytest
+
+from config import settings
+from services.url_content_cache import CachedUrlContent, UrlContentCache, hash_body, normalize_url
+from services.web_ingestion_service import IngestionArtifact, WebContent, WebIngestionService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    db_path = tmp_path / "notes.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY, title TEXT, body TEXT, content TEXT, summary TEXT, tags TEXT,
+            actions TEXT, type TEXT, timestamp TEXT, file_metadata TEXT, status TEXT,
+            user_id INTEGER, updated_at TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(settings, "snapshots_dir", tmp_path / "snapshots")
+    return WebIngestionService(lambda: sqlite3.connect(db_path))
+
+
+def test_normalize_url_drops_tracking_and_fragments():
+    assert normalize_url("HTTPS://Example.com/post/?utm_source=x&b=2&a=1#top") == "https://example.com/post?a=1&b=2"
+
+
+@pytest.mark.asyncio
+async def test_repeat_capture_reuses_note_without_refetching(service, monkeypatch):
+    calls = {"fetch": 0, "ai": 0}
+
+    async def fake_fetch(url, config, attempts):
+        calls["fetch"] += 1
+        attempts.append({"tier": "http", "outcome": "hit", "ms": 1.0})
+        return WebContent(url=url, title="Article", content="body text", summary="", metadata={},
+                          extracted_at=datetime.now(), content_hash="abc")
+
+    async def fake_ai(web_content):
+        calls["ai"] += 1
+        return {"summary": "short", "tags": ["web"]}
+
+    monkeypatch.setattr(service, "_fetch_content", fake_fetch)
+    monkeypatch.setattr(service, "_process_with_ai", fake_ai)
+
+    first = await service.ingest_url("https://example.com/a?utm_source=discord", user_id=1, async_mode=False)
+    second = await service.ingest_url("https://example.com/a", user_id=1, async_mode=False)
+    other_user = await service.ingest_url("https://example.com/a", user_id=2, async_mode=False)
+
+    assert second["note_id"] == first["note_id"] and second["cached"] is True
+    assert other_user["note_id"] != first["note_id"]
+    assert other_user["summary"] == "short"
+    assert calls == {"fetch": 1, "ai": 1}
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_for_other_users_get_their_own_artifact_files(service, monkeypatch, tmp_path):
+    snapshot = tmp_path / "snapshots" / "html"
+    snapshot.mkdir(parents=True)
+    original = snapshot / "page.html"
+    original.write_text("<html>page</html>")
+
+    async def fake_fetch(url, config, attempts):
+        return WebContent(url=url, title="Article", content="body text", summary="", metadata={},
+                          extracted_at=datetime.now(), content_hash="abc",
+                          artifacts=[IngestionArtifact(type="html", path=str(original), size=17)])
+
+    async def fake_ai(web_content):
+        return {"summary": "short", "tags": []}
+
+    monkeypatch.setattr(service, "_fetch_content", fake_fetch)
+    monkeypatch.setattr(service, "_process_with_ai", fake_ai)
+
+    await service.ingest_url("https://example.com/b", user_id=1, async_mode=False)
+    other = await service.ingest_url("https://example.com/b", user_id=2, async_mode=False)
+
+    [artifact] = other["metadata"]["artifacts"]
+    assert artifact["path"] != str(original)
+    original.unlink()
+    assert open(artifact["path"]).read() == "<html>page</html>"
+    assert service.url_cache.find_note("https://example.com/b", 2) == other["note_id"]
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_revalidates_with_conditional_get(service):
+    seen = {}
+
+    def handler(request):
+        seen.update(request.headers)
+        return httpx.Response(304)
+
+    entry = CachedUrlContent(
+        normalized_url="https://example.com/a", final_url="https://example.com/a",
+        etag='"v1"', last_modified=None, body_hash=None, content_hash="abc",
+    )
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assert await service.url_cache.is_unchanged(entry, client) is True
+    assert seen["if-none-match"] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_revalidation_hashes_a_capped_stream(service):
+    body = b"<html>" + b"x" * 4000 + b"</html>"
+    served = []
+
+    async def stream():
+        for start in range(0, len(body), 1000):
+            served.append(start)
+            yield body[start:start + 1000]
+
+    entry = CachedUrlContent(
+        normalized_url="https://example.com/a", final_url="https://example.com/a",
+        etag=None, last_modified=None, body_hash=hash_body(body), content_hash="abc",
+    )
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=stream()))
+    async with httpx.AsyncClient(transport=transport) as client:
+        assert await service.url_cache.is_unchanged(entry, client) is True
+        served.clear()
+        # Past the cap the page counts as changed without buffering the rest
+        assert await service.url_cache.is_unchanged(entry, client, max_bytes=1500) is False
+    assert len(served) == 2
@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+
+import httpx
+import pytest
+
+from config import settings
+from services.web_ingestion_service import ExtractionConfig, HttpFirstFetcher, WebIngestionService
+
+ARTICLE = "<html><head><title>Static article</title></head><body><nav>Home</nav><article>{}</article></body></html>".format(
+    "<p>" + "Plain server-rendered text. " * 60 + "</p>"
+)
+SPA_SHELL = "<html><head><title>App</title></head><body><div id='root'></div><script>{}</script></body></html>".format(
+    "var x = 1;" * 500
+)
+
+
+def _fetcher(pages):
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=pages[str(request.url)])
+
+    fetcher = HttpFirstFetcher()
+    fetcher._get_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+@pytest.mark.asyncio
+async def test_http_tier_extracts_static_pages():
+    fetcher = _fetcher({"https://example.com/a": ARTICLE})
+    config = ExtractionConfig(capture_html=False, capture_screenshot=True)
+
+    content, reason = await fetcher.fetch("https://example.com/a", config)
+
+    assert reason == "ok"
+    assert content.title == "Static article"
+    assert content.content.startswith("Plain server-rendered text.")
+    assert content.screenshot_path is None
+
+
+@pytest.mark.asyncio
+async def test_http_tier_defers_client_rendered_pages():
+    fetcher = _fetcher({"https://example.com/app": SPA_SHELL})
+
+    content, reason = await fetcher.fetch("https://example.com/app", ExtractionConfig(capture_html=False))
+
+    assert content is None
+    assert reason == "spa_shell"
+
+
+@pytest.mark.asyncio
+async def test_http_tier_parses_off_the_event_loop(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "snapshots_dir", tmp_path)
+    fetcher = _fetcher({"https://example.com/a": ARTICLE})
+    threads = []
+    parse = HttpFirstFetcher._parse_page
+
+    def recording_parse(self, *args):
+        threads.append(threading.current_thread())
+        return parse(self, *args)
+
+    monkeypatch.setattr(HttpFirstFetcher, "_parse_page", recording_parse)
+    content, reason = await fetcher.fetch("https://example.com/a", ExtractionConfig(capture_html=True))
+
+    assert reason == "ok" and content.artifacts
+    assert threads and threads[0] is not threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_http_tier_stops_reading_oversized_or_non_html_bodies(monkeypatch):
+    monkeypatch.setattr(HttpFirstFetcher, "MAX_BYTES", 1024)
+    served = []
+
+    async def body():
+        for _ in range(100):
+            served.append(1)
+            yield b"x" * 512
+
+    def handler(request):
+        content_type = "application/pdf" if request.url.path == "/file.pdf" else "text/html"
+        return httpx.Response(200, headers={"content-type": content_type}, content=body())
+
+    fetcher = HttpFirstFetcher()
+    fetcher._get_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await fetcher.fetch("https://example.com/big", ExtractionConfig()) == (None, "too_large")
+    assert len(served) == 3
+    served.clear()
+    assert await fetcher.fetch("https://example.com/file.pdf", ExtractionConfig()) == (None, "non_html")
+    assert served == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_attempts_are_recorded_per_tier(tmp_path):
+    db_path = tmp_path / "jobs.db"
+    service = WebIngestionService(lambda: sqlite3.connect(db_path))
+    service.http_fetcher = _fetcher({"https://example.com/a": ARTICLE})
+    payload = service._build_job_payload("https://example.com/a", 1, None, ExtractionConfig(capture_html=False))
+    service._record_job(payload)
+
+    attempts = []
+    content = await service._fetch_content(payload["url"], ExtractionConfig(capture_html=False), attempts)
+    service._record_fetch_attempts(payload["job_id"], attempts)
+
+    assert content.metadata["fetch_tier"] == "http"
+    stats = service.get_fetch_tier_stats()
+    assert stats["tiers"]["http"]["hits"] == 1
+    assert stats["tiers"]["http"]["hit_rate"] == 1.0
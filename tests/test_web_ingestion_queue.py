@@ -0,0 +1,99 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from services.web_ingestion_service import (
+    ExtractionConfig,
+    SQLiteJobQueue,
+    WebIngestionService,
+    WebIngestionWorker,
+)
+
+
+@pytest.fixture
+def service(tmp_path):
+    db_path = tmp_path / "jobs.db"
+    svc = WebIngestionService(lambda: sqlite3.connect(db_path))
+    assert isinstance(svc.job_queue, SQLiteJobQueue)
+    svc.job_queue.poll_interval = 0.01
+    return svc
+
+
+async def _queue_job(service, url):
+    payload = service._build_job_payload(url, 1, None, ExtractionConfig())
+    service._record_job(payload)
+    await service.job_queue.enqueue("web_ingestion:jobs", payload)
+    return payload["job_id"]
+
+
+def _job(service, job_id):
+    conn = service.get_conn()
+    row = conn.execute(
+        "SELECT status, attempts, available_at FROM web_ingestion_jobs WHERE job_id = ?", (job_id,)
+    ).fetchone()
+    conn.close()
+    return row
+
+
+@pytest.mark.asyncio
+async def test_claim_is_exclusive_and_failures_retry(service):
+    queue = service.job_queue
+    job_id = await _queue_job(service, "https://example.com/a")
+
+    claimed = await queue.dequeue("web_ingestion:jobs", block=False)
+    assert claimed["job_id"] == job_id and claimed["attempt"] == 1
+    assert await queue.dequeue("web_ingestion:jobs", block=False) is None
+
+    assert await queue.fail(job_id, "boom") is True
+    status, attempts, available_at = _job(service, job_id)
+    assert status == "queued" and attempts == 1 and available_at > time.time()
+
+    queue.max_attempts = 1
+    assert await queue.fail(job_id, "boom") is False
+    assert _job(service, job_id)[0] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed(service):
+    queue = service.job_queue
+    queue.visibility_timeout = -1  # lease expires immediately
+    job_id = await _queue_job(service, "https://example.com/a")
+
+    assert (await queue.dequeue("web_ingestion:jobs", block=False))["job_id"] == job_id
+    again = await queue.dequeue("web_ingestion:jobs", block=False)
+    assert again["job_id"] == job_id and again["attempt"] == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_limits_concurrency_per_domain(service, monkeypatch):
+    for i in range(3):
+        await _queue_job(service, f"https://slow.example/{i}")
+    await _queue_job(service, "https://other.example/0")
+
+    running = {"slow.example": 0, "other.example": 0}
+    peak = {"slow.example": 0, "other.example": 0}
+    done = []
+
+    async def fake_process(payload):
+        domain = payload["url"].split("/")[2]
+        running[domain] += 1
+        peak[domain] = max(peak[domain], running[domain])
+        await asyncio.sleep(0.05)
+        running[domain] -= 1
+        done.append(payload["job_id"])
+
+    monkeypatch.setattr(service, "process_job_payload", fake_process)
+    worker = WebIngestionWorker(service, concurrency=4, per_domain_limit=1)
+    task = asyncio.create_task(worker.run())
+    for _ in range(100):
+        if len(done) == 4:
+            break
+        await asyncio.sleep(0.02)
+    await worker.stop()
+    await asyncio.wait_for(task, timeout=10)
+
+    assert len(done) == 4
+    assert peak["slow.example"] == 1
+    assert worker.stats["completed"] == 4
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+import services.websocket_manager as websocket_module
+from services.websocket_manager import ConnectionSender, EnhancedConnectionManager
+
+
+class _Socket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    mgr = EnhancedConnectionManager()
+    # Keep the periodic ping/cleanup loops out of the tests
+    monkeypatch.setattr(mgr, "_ensure_background_tasks", lambda: None)
+    return mgr
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_others_and_payload_is_encoded_once(manager, monkeypatch):
+    encoded = []
+    real_serialize = websocket_module.serialize_message
+    monkeypatch.setattr(websocket_module, "serialize_message", lambda m: encoded.append(m) or real_serialize(m))
+
+    slow = _Socket(delay=0.5)
+    fast = [_Socket() for _ in range(5)]
+    await manager.connect(slow, user_id=1)
+    for user_id, socket in enumerate(fast, start=2):
+        await manager.connect(socket, user_id=user_id)
+    encoded.clear()
+
+    assert await manager.broadcast_to_all({"type": "announcement", "text": "hi"}) == 6
+    assert len(encoded) == 1
+
+    await asyncio.sleep(0.05)
+    assert all(any(m["type"] == "announcement" for m in s.sent) for s in fast)
+    assert not any(m["type"] == "announcement" for m in slow.sent)
+
+    connections = {c["user_id"]: c["send"] for c in manager.get_all_connections()}
+    assert connections[1]["queue_depth"] > 0
+    assert connections[1]["current_lag_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_progress_messages_coalesce_and_are_dropped_first():
+    socket = _Socket()
+    sender = ConnectionSender("c1", socket, on_failure=lambda cid: None, max_queue=3)
+
+    sender.enqueue('{"type":"progress","n":1}', ("progress", 7))
+    sender.enqueue('{"type":"note_update","n":2}')
+    sender.enqueue('{"type":"progress","n":3}', ("progress", 7))
+    assert sender.depth == 2
+    assert sender.metrics["coalesced"] == 1
+
+    sender.enqueue('{"type":"note_update","n":4}')
+    sender.enqueue('{"type":"note_update","n":5}')  # full: the progress message makes room
+    assert sender.metrics["dropped"] == 1
+
+    sender.start()
+    assert await sender.drain()
+    assert [m["n"] for m in socket.sent] == [2, 4, 5]
+    await sender.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_socket_is_disconnected_by_its_writer(manager):
+    healthy, broken = _Socket(), _Socket()
+    await manager.connect(healthy, user_id=1)
+    broken_id = await manager.connect(broken, user_id=1)
+    broken.fail = True
+
+    assert await manager.send_to_user(1, {"type": "note_update", "note": {"id": 1}}) == 2
+    await asyncio.sleep(0.05)
+
+    assert broken_id not in manager.active_connections
+    assert manager.stats["connection_errors"] == 1
+    assert any(m["type"] == "note_update" for m in healthy.sent)
@@ -1,30 +1,100 @@
 import time
 from pathlib import Path
+from typing import Optional
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from processor import process_audio_file
+from obsidian_sync import DebouncedEventQueue, ObsidianSync
 
 VAULT_PATH = Path("/Users/dhouchin/Obsidian/SecondBrain")
 AUDIO_PATH = VAULT_PATH / "audio"
+AUDIO_SUFFIXES = {".m4a", ".wav", ".mp3"}
+# Seconds a file must stay quiet before we act on it; recorders and editors
+# write in bursts, so this also keeps us from transcribing half-written audio
+DEBOUNCE_SECONDS = 2.0
+
+
+# (mtime_ns, size) of each recording already sent for transcription
+_transcribed = {}
+
+
+def _process_audio_batch(paths):
+    skipped = 0
+    for path in paths:
+        if not path.exists():
+            continue
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if _transcribed.get(path) == signature:
+            skipped += 1
+            continue
+        _transcribed[path] = signature
+        print(f"New audio: {path.name} -- Triggering transcription...")
+        process_audio_file(path)
+    return skipped
+
 
 class VaultHandler(FileSystemEventHandler):
-    def on_created(self, event):
-        path = Path(event.src_path)
+    def __init__(self, audio_queue: DebouncedEventQueue, note_queue: DebouncedEventQueue):
+        self.audio_queue = audio_queue
+        self.note_queue = note_queue
+
+    @staticmethod
+    def _watched(src_path: str) -> Optional[Path]:
+        path = Path(src_path)
         # Skip hidden/temp files (e.g., ._ or ~)
         name = path.name
         if name.startswith('.') or name.startswith('._') or name.endswith('~'):
+            return None
+        return path
+
+    def _enqueue(self, src_path: str):
+        path = self._watched(src_path)
+        if path is None:
             return
-        if path.suffix.lower() in {".m4a", ".wav", ".mp3"}:
-            print(f"New audio: {path.name} -- Triggering transcription...")
-            process_audio_file(path)
+        if path.suffix.lower() in AUDIO_SUFFIXES:
+            self.audio_queue.add(path)
         elif path.suffix == ".md":
-            print(f"New note: {path.name} -- Index or process as needed.")
+            self.note_queue.add(path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._enqueue(event.src_path)
+
+    def on_modified(self, event):
+        if event.is_directory:
+            return
+        path = self._watched(event.src_path)
+        if path is None:
+            return
+        if path.suffix == ".md":
+            self.note_queue.add(path)
+        elif path.suffix.lower() in AUDIO_SUFFIXES:
+            # Writes to a new recording only extend its debounce; modify events
+            # alone never queue a transcription
+            self.audio_queue.touch(path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._enqueue(event.dest_path)
+
 
 def watch_vault():
-    event_handler = VaultHandler()
+    sync = ObsidianSync(vault_path=VAULT_PATH)
+
+    def import_notes(paths):
+        imported = sync.import_notes_batch(paths)
+        print(f"Imported {len(imported)} of {len(paths)} changed notes")
+        return len(paths) - len(imported)
+
+    audio_queue = DebouncedEventQueue(_process_audio_batch, debounce_seconds=DEBOUNCE_SECONDS)
+    note_queue = DebouncedEventQueue(import_notes, debounce_seconds=DEBOUNCE_SECONDS)
+    event_handler = VaultHandler(audio_queue, note_queue)
     observer = Observer()
     observer.schedule(event_handler, str(AUDIO_PATH), recursive=False)
     observer.schedule(event_handler, str(VAULT_PATH), recursive=False)
+    audio_queue.start()
+    note_queue.start()
     observer.start()
     print("Watching vault for changes...")
     try:
@@ -33,6 +103,8 @@ def watch_vault():
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    audio_queue.stop()
+    note_queue.stop()
 
 if __name__ == "__main__":
     watch_vault()